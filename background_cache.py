@@ -0,0 +1,61 @@
+"""
+Background image cache for the PING Optimizer application.
+Decodes background.jpg once and serves scaled copies: a cheap fast-scaled pixmap
+while the window is being resized, and a smooth one (kept in a small LRU cache)
+once resizing settles.
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QRect, QSize
+from PyQt5.QtGui import QPixmap
+
+# Common window sizes to pre-scale in idle time (the window minimum is 1200x800)
+COMMON_SIZES = [
+    (1200, 800),
+    (1280, 800),
+    (1366, 768),
+    (1440, 900),
+    (1600, 900),
+    (1920, 1080),
+    (1920, 1200),
+    (2560, 1440),
+]
+
+
+class BackgroundCache:
+    def __init__(self, image, x_offset=-200, max_entries=12):
+        pixmap = QPixmap.fromImage(image)
+        # Same framing as before: shift the image right by copying from a negative x offset
+        self.source = pixmap.copy(QRect(x_offset, 0, pixmap.width(), pixmap.height()))
+        self.max_entries = max_entries
+        self.smooth_cache = OrderedDict()  # (width, height) -> QPixmap
+
+    def _key(self, size):
+        return (size.width(), size.height())
+
+    def cached(self, size):
+        key = self._key(size)
+        pixmap = self.smooth_cache.get(key)
+        if pixmap is not None:
+            self.smooth_cache.move_to_end(key)
+        return pixmap
+
+    def fast(self, size):
+        # Interactive resize: reuse a smooth copy if we have one, otherwise a cheap scale
+        pixmap = self.cached(size)
+        if pixmap is not None:
+            return pixmap
+        return self.source.scaled(size, Qt.KeepAspectRatioByExpanding, Qt.FastTransformation)
+
+    def smooth(self, size):
+        pixmap = self.cached(size)
+        if pixmap is None:
+            pixmap = self.source.scaled(size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+            self.smooth_cache[self._key(size)] = pixmap
+            while len(self.smooth_cache) > self.max_entries:
+                self.smooth_cache.popitem(last=False)
+        return pixmap
+
+    def missing_common_sizes(self):
+        return [QSize(w, h) for w, h in COMMON_SIZES if (w, h) not in self.smooth_cache]
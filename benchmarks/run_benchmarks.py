@@ -0,0 +1,380 @@
+"""
+Benchmark suite for the PING Optimizer measurement and persistence paths.
+Not a test suite: each case times one hot path on seeded synthetic data (see
+synthetic.py) and the results are compared with the stored baselines.
+
+    parse      ping output parsing, per platform                ns per line
+    stats      RollingPingStats.add_sample per window size      us per sample
+    metrics    MetricsHandler write per history size            ms per write
+    startup    window startup, first paint and complete         ms
+    animation  petal step + paint per petal count               ms per frame
+
+    python benchmarks/run_benchmarks.py                  # every case, compared with baselines.json
+    python benchmarks/run_benchmarks.py parse stats      # selected cases
+    python benchmarks/run_benchmarks.py --quick          # smaller inputs, fewer repeats
+    python benchmarks/run_benchmarks.py --save           # record the results as the new baselines
+
+Runs headless (Qt's offscreen platform) and never touches the app's own
+tcp_metrics.json or log. Exits with status 1 when a metric is slower than its
+baseline by more than --tolerance. Baselines are machine-specific; re-record
+them with --save on the machine that runs the comparison.
+
+Shared machines change speed from one second to the next, so every timed repeat
+runs right after a fixed reference workload, and a metric is compared with its
+baseline through the median ratio of repeat to reference time.
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import synthetic  # noqa: E402  (benchmarks/ is on sys.path when run as a script)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_TOLERANCE = 0.3  # Micro-benchmarks wobble by 10-20% between runs
+REFERENCE_LOOPS = 150000  # Fixed reference workload, ~25-50 ms in all
+REFERENCE_ITEMS = 15000
+REFERENCE_RE = re.compile(r"value=(\d+)")
+REFERENCE_DATA = None  # Built on first use
+CALIBRATION_RUNS = 15
+
+CASES = {}
+paired = []  # (reference ms, repeat seconds) for the current case's repeats
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def reference_ms():
+    # Its time tracks how fast the machine is running right now. Half arithmetic, half strings
+    # and a regex over ~1 MB of objects: on a shared host, cache pressure from neighbours slows
+    # the parsing and I/O paths about twice as much as it slows the statistics' arithmetic,
+    # and a blend stays within ~15% of both.
+    global REFERENCE_DATA
+    if REFERENCE_DATA is None:
+        rng = random.Random(0)
+        REFERENCE_DATA = [f"{rng.random():.12f} item-{i} value={rng.randint(0, 10 ** 6)} units"
+                          for i in range(REFERENCE_ITEMS)]
+    started = time.perf_counter()
+    total = 0
+    for i in range(REFERENCE_LOOPS):
+        total += i * i % 7
+    for text in REFERENCE_DATA:
+        total += int(REFERENCE_RE.search(text).group(1)) + len(text.upper())
+    return (time.perf_counter() - started) * 1000
+
+
+def best_of(func, repeat):
+    # Fastest of several runs: the least disturbed by the rest of the machine.
+    # Each repeat is paired with the reference run just before it (see relative()).
+    timings = []
+    for _ in range(repeat):
+        reference = reference_ms()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+        paired.append((reference, timings[-1]))
+    return min(timings)
+
+
+def relative(value, pairs):
+    """value expressed in reference runs: its unit per ms of reference work.
+
+    The median repeat/reference ratio, rescaled from best_of's fastest repeat to value's
+    unit. A repeat and its reference run moments apart, so a machine that slows down
+    or speeds up mid-case moves both.
+    """
+    fastest = min(timing for _, timing in pairs)
+    if not fastest:
+        return None
+    return value / fastest * statistics.median(timing / reference for reference, timing in pairs)
+
+
+@case('parse')
+def bench_parse(quick):
+    from ping_monitor import parse_ping_line
+
+    repeat = 5 if quick else 7
+    for name in synthetic.PLATFORMS:
+        # ~10 ms per repeat even in quick mode; a 1 ms repeat is mostly scheduler noise
+        lines = synthetic.ping_output(10000 if quick else 20000, name)
+
+        def run():
+            for line in lines:
+                parse_ping_line(line)
+        yield f"parse.{name}", best_of(run, repeat) / len(lines) * 1e9, 'ns/line'
+
+
+@case('stats')
+def bench_stats(quick):
+    from ping_monitor import RollingPingStats
+
+    series = synthetic.rtt_series(20000)
+    for window in (10, 100, 1000) if quick else (10, 100, 1000, 10000):
+        samples = series[:max(200, (20000 if quick else 200000) // window)]
+        tracker = RollingPingStats(window_size=window)
+        for rtt in series[-window:]:
+            tracker.add_sample(rtt)  # Start from a full window, as in a long session
+
+        def run():
+            for rtt in samples:
+                tracker.add_sample(rtt, baseline=20.0)
+        yield f"stats.window_{window}", best_of(run, 3 if quick else 5) / len(samples) * 1e6, 'us/sample'
+
+
+@case('metrics')
+def bench_metrics(quick):
+    from metrics_store import MetricsHandler
+    from ping_monitor import format_ping_stats
+
+    message = format_ping_stats({'current': 21.4, 'min': 18.2, 'max': 35.0, 'avg': 22.7})
+    with tempfile.TemporaryDirectory() as directory:
+        for records in (0, 1000, 10000) if quick else (0, 1000, 10000, 50000):
+            path = synthetic.write_metrics_file(os.path.join(directory, f'metrics_{records}.json'), records)
+            handler = MetricsHandler(path)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+            handler.preload()  # Time the writes, not the one-off history parse
+            record = logging.LogRecord('metrics', logging.INFO, __file__, 0, message, None, None)
+            writes = 3 if records >= 10000 else 20
+
+            def run():
+                for _ in range(writes):
+                    handler.emit(record)
+            yield f"metrics.history_{records}", best_of(run, 2 if quick else 5) / writes * 1000, 'ms/write'
+
+
+def copy_app(directory, history_records):
+    # The app writes its log and metrics next to its modules, so startup runs from a copy
+    for pattern in ('*.py', '*.jpg', '*.png'):
+        for path in glob.glob(os.path.join(ROOT, pattern)):
+            shutil.copy(path, directory)
+    synthetic.write_metrics_file(os.path.join(directory, 'tcp_metrics.json'), history_records)
+
+
+@case('startup')
+def bench_startup(quick):
+    marks = {'first paint': [], 'startup complete': [], 'process': []}
+    with tempfile.TemporaryDirectory() as directory:
+        copy_app(directory, 10000)
+        for _ in range(2 if quick else 5):
+            started = time.perf_counter()
+            result = subprocess.run([sys.executable, 'tcp_optimizer_qt.py', '--profile-startup',
+                                     '--exit-after-startup'], cwd=directory, capture_output=True,
+                                    text=True, timeout=120)
+            marks['process'].append((time.perf_counter() - started) * 1000)
+            if result.returncode != 0:
+                raise RuntimeError(f"Startup run failed: {result.stderr.strip()[-500:]}")
+            for name in ('first paint', 'startup complete'):
+                match = re.search(rf"^{name}\s+([\d.]+)$", result.stdout, re.MULTILINE)
+                if match is None:
+                    raise RuntimeError(f"No '{name}' mark in the startup profile")
+                marks[name].append(float(match.group(1)))
+    # Median: a cold first run (disk cache, font cache) shouldn't decide the result either way
+    yield 'startup.first_paint', statistics.median(marks['first paint']), 'ms'
+    yield 'startup.complete', statistics.median(marks['startup complete']), 'ms'
+    yield 'startup.process', statistics.median(marks['process']), 'ms'
+
+
+@case('animation')
+def bench_animation(quick):
+    from PyQt5.QtWidgets import QApplication, QWidget
+    from cherry_blossom_animation import CherryBlossomAnimation
+    from petal_physics import PetalField
+
+    app = QApplication.instance() or QApplication([])
+    host = QWidget()
+    host.resize(1200, 800)
+    animation = CherryBlossomAnimation(host)
+    animation.resize(host.size())
+    host.show()
+    app.processEvents()
+    # Frames are driven by hand at a fixed petal count
+    animation.timer.timeout.disconnect()
+    animation.timer.stop()
+    animation.adaptive = False
+    frames = 50 if quick else 200
+    try:
+        for count in (25, 100, 400):
+            animation.petals = PetalField(count, animation.width(), animation.height(), seed=0)
+
+            def run():
+                for _ in range(frames):
+                    animation.update_animation()
+                    app.processEvents()  # Paints the dirty region, as the event loop would
+            run()  # Warm up: sprite caches, backing store
+            yield f"animation.petals_{count}", best_of(run, 2 if quick else 5) / frames * 1000, 'ms/frame'
+    finally:
+        host.close()
+        host.deleteLater()
+        app.processEvents()
+
+
+def run_case(name, quick, relatives):
+    # The case's results; relative() figures of the ones timed with best_of go into relatives
+    results = []
+    paired.clear()
+    for result in CASES[name](quick):
+        results.append(result)
+        if paired:
+            relatives[result[0]] = relative(result[1], paired)
+        paired.clear()
+    return results
+
+
+def calibrate(runs=CALIBRATION_RUNS):
+    # Median of many reference runs; scales metrics that weren't timed next to references (startup)
+    return statistics.median(reference_ms() for _ in range(runs))
+
+
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baselines(path=BASELINE_FILE):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'machine': None, 'metrics': {}}
+
+
+def save_baselines(results, calibration_ms, path=BASELINE_FILE, relatives=None):
+    # Merged into the stored set, so recording one case keeps the others
+    baselines = load_baselines(path)
+    baselines['machine'] = machine_info()
+    baselines['recorded'] = time.strftime('%Y-%m-%d')
+    baselines['calibration_ms'] = round(calibration_ms, 3)
+    relatives = relatives or {}
+    for name, value, unit in results:
+        baselines['metrics'][name] = {'value': round(value, 4), 'unit': unit}
+        if relatives.get(name):
+            baselines['metrics'][name]['relative'] = float(f"{relatives[name]:.6g}")
+    baselines['metrics'] = dict(sorted(baselines['metrics'].items()))
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2)
+        f.write("\n")
+
+
+def compare(results, baselines, tolerance, scale=1.0, relatives=None):
+    """[(name, value, unit, baseline or None, change or None, status)]; lower is better everywhere.
+
+    A metric with a relative() figure now and in its baseline is compared through those;
+    otherwise the baseline is multiplied by scale, the machine's current speed relative to
+    when it was recorded. relatives=None compares raw timings.
+    """
+    rows = []
+    for name, value, unit in results:
+        stored = baselines['metrics'].get(name)
+        if stored is None:
+            rows.append((name, value, unit, None, None, 'new'))
+            continue
+        if relatives is not None and relatives.get(name) and stored.get('relative'):
+            change = relatives[name] / stored['relative'] - 1
+        else:
+            change = value / (stored['value'] * scale) - 1 if stored['value'] else 0.0
+        status = 'REGRESSED' if change > tolerance else 'faster' if change < -tolerance else 'ok'
+        rows.append((name, value, unit, stored['value'], change, status))
+    return rows
+
+
+def format_rows(rows):
+    lines = [f"{'metric':<28}{'value':>12} {'unit':<10}{'baseline':>12}{'change':>9}  status"]
+    for name, value, unit, baseline, change, status in rows:
+        baseline_text = f"{baseline:>12.3f}" if baseline is not None else f"{'-':>12}"
+        change_text = f"{change * 100:>+8.1f}%" if change is not None else f"{'-':>9}"
+        lines.append(f"{name:<28}{value:>12.3f} {unit:<10}{baseline_text}{change_text}  {status}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PING Optimizer benchmarks")
+    parser.add_argument('cases', nargs='*', metavar='CASE',
+                        help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument('--quick', action='store_true', help="smaller inputs and fewer repeats")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a metric counts as regressed (0.3 = 30%%)")
+    parser.add_argument('--baselines', default=BASELINE_FILE, help="baseline file")
+    parser.add_argument('--no-calibrate', action='store_true',
+                        help="compare raw timings, without scaling the baselines to the machine's current speed")
+    parser.add_argument('--json', action='store_true', help="print machine-readable output")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s) {', '.join(unknown)}; choose from {', '.join(CASES)}")
+
+    calibration_ms = calibrate()
+    results = []
+    relatives = {}  # Metric -> relative() figure, for the cases timed with best_of
+    for name in args.cases or list(CASES):
+        if not args.json:
+            print(f"Running {name}...", file=sys.stderr, flush=True)
+        results.extend(run_case(name, args.quick, relatives))
+
+    # Shared hosts and laptops on battery slow everything down at once; that isn't a regression
+    baselines = load_baselines(args.baselines)
+    scale = 1.0
+    if baselines.get('calibration_ms') and not args.no_calibrate:
+        scale = (calibration_ms + calibrate()) / 2 / baselines['calibration_ms']
+    rows = compare(results, baselines, args.tolerance, scale, None if args.no_calibrate else relatives)
+    # A real regression shows up again; a burst of load on the machine rarely hits the same case twice
+    retry = list(dict.fromkeys(row[0].split('.')[0] for row in rows if row[5] == 'REGRESSED'))
+    if retry and not args.save:
+        if not args.json:
+            print(f"Re-running {', '.join(retry)} to confirm...", file=sys.stderr, flush=True)
+        retried = {}
+        rerun = [result for name in retry for result in run_case(name, args.quick, retried)]
+        better = {row[0]: row for row in compare(rerun, baselines, args.tolerance, scale,
+                                                 None if args.no_calibrate else retried)}
+        rows = [better[row[0]] if row[0] in better and (better[row[0]][4] or 0) < (row[4] or 0) else row
+                for row in rows]
+    regressed = [row[0] for row in rows if row[5] == 'REGRESSED']
+    if args.json:
+        print(json.dumps({'machine': machine_info(), 'baseline_machine': baselines['machine'], 'scale': scale,
+                          'results': [dict(zip(('metric', 'value', 'unit', 'baseline', 'change', 'status'), row))
+                                      for row in rows]}, indent=2))
+    else:
+        print(format_rows(rows))
+        if not args.no_calibrate:
+            print(f"\nChanges are relative to a reference workload timed alongside each metric "
+                  f"(startup: machine speed {scale:.2f}x the baseline's; --no-calibrate to compare raw)")
+        if baselines['machine'] and baselines['machine'] != machine_info():
+            print(f"\nBaselines were recorded on {baselines['machine']['platform']} "
+                  f"({baselines['machine']['cpus']} CPUs); differences may be the machine, not the code.")
+    if args.save:
+        save_baselines(results, calibration_ms, args.baselines, relatives)
+        print(f"Baselines saved to {args.baselines}", file=sys.stderr)
+        return 0
+    if regressed:
+        print(f"\n{len(regressed)} metric(s) regressed by more than {args.tolerance * 100:.0f}%: "
+              f"{', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Synthetic data for the PING Optimizer benchmarks.
+Everything is seeded, so a benchmark sees the same input on every run and machine:
+latency series (baseline, jitter, spikes, loss), system ping output for each
+platform, and metrics histories of any size in the tcp_metrics.json layout.
+
+    python benchmarks/synthetic.py ping --platform linux --count 20
+    python benchmarks/synthetic.py metrics --records 50000 --out /tmp/tcp_metrics.json
+"""
+
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+PLATFORMS = ('windows', 'linux', 'macos')
+START_TIME = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def rtt_series(count, seed=0, base_ms=20.0, jitter_ms=2.0, spike_rate=0.01, loss_rate=0.005):
+    """RTTs in ms (None = lost): log-normal jitter around base_ms with occasional spikes."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        if rng.random() < loss_rate:
+            samples.append(None)
+            continue
+        rtt = base_ms + rng.lognormvariate(0, 0.5) * jitter_ms
+        if rng.random() < spike_rate:
+            rtt += rng.uniform(50, 300)
+        samples.append(round(rtt, 3))
+    return samples
+
+
+def ping_output(count, platform='windows', target='8.8.8.8', seed=0):
+    """Lines of system ping output, banner and summary included, the way PingMonitor reads them."""
+    samples = rtt_series(count, seed=seed)
+    if platform == 'windows':
+        lines = ["", f"Pinging {target} with 32 bytes of data:"]
+        for rtt in samples:
+            if rtt is None:
+                lines.append("Request timed out.")
+            elif rtt < 1:
+                lines.append(f"Reply from {target}: bytes=32 time<1ms TTL=117")
+            else:
+                lines.append(f"Reply from {target}: bytes=32 time={int(rtt)}ms TTL=117")
+        lost = samples.count(None)
+        lines += ["", f"Ping statistics for {target}:",
+                  f"    Packets: Sent = {count}, Received = {count - lost}, Lost = {lost}"]
+        return lines
+    lines = [f"PING {target} ({target}): 56 data bytes" if platform == 'macos'
+             else f"PING {target} ({target}) 56(84) bytes of data."]
+    for sequence, rtt in enumerate(samples, 1):
+        if rtt is None:
+            if platform == 'macos':
+                lines.append(f"Request timeout for icmp_seq {sequence}")
+            else:
+                lines.append(f"no answer yet for icmp_seq={sequence}")  # PingMonitor passes -O
+            continue
+        lines.append(f"64 bytes from {target}: icmp_seq={sequence} ttl=117 time={rtt:.3f} ms")
+    lines += ["", f"--- {target} ping statistics ---",
+              f"{count} packets transmitted, {count - samples.count(None)} received"]
+    return lines
+
+
+def ping_record(rtt, window, when):
+    # One "Ping stats" entry as MetricsHandler stores it
+    return {
+        'time': when.timestamp(),
+        'Current': rtt,
+        'Min': min(window),
+        'Max': max(window),
+        'Avg': round(sum(window) / len(window), 1),
+    }
+
+
+def metrics_history(records, sessions=10, seed=0):
+    """A tcp_metrics.json document with `records` ping stats entries spread over `sessions` sessions."""
+    samples = [rtt for rtt in rtt_series(records * 2, seed=seed) if rtt is not None][:records]
+    history = {'sessions': []}
+    per_session = max(1, -(-records // sessions))
+    when = START_TIME
+    for first in range(0, max(records, 1), per_session):
+        session = {
+            'start_time': when.isoformat(),
+            'baseline_ping': samples[first] if first < len(samples) else None,
+            'optimized_pings': [],
+            'tcp_commands': {'successful': [], 'failed': []},
+            'improvements': [],
+        }
+        window = []
+        for rtt in samples[first:first + per_session]:
+            window = (window + [rtt])[-10:]
+            when += timedelta(seconds=1)
+            session['optimized_pings'].append(ping_record(rtt, window, when))
+        history['sessions'].append(session)
+        when += timedelta(hours=1)
+    return history
+
+
+def write_metrics_file(path, records, sessions=10, seed=0):
+    with open(path, 'w') as f:
+        json.dump(metrics_history(records, sessions, seed), f, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic PING Optimizer data")
+    subparsers = parser.add_subparsers(dest='kind', required=True)
+    ping = subparsers.add_parser('ping', help="system ping output")
+    ping.add_argument('--platform', choices=PLATFORMS, default='windows')
+    ping.add_argument('--count', type=int, default=10)
+    ping.add_argument('--seed', type=int, default=0)
+    metrics = subparsers.add_parser('metrics', help="a tcp_metrics.json history")
+    metrics.add_argument('--records', type=int, default=10000)
+    metrics.add_argument('--sessions', type=int, default=10)
+    metrics.add_argument('--seed', type=int, default=0)
+    metrics.add_argument('--out', help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.kind == 'ping':
+        print("\n".join(ping_output(args.count, args.platform, seed=args.seed)))
+    elif args.out:
+        write_metrics_file(args.out, args.records, args.sessions, args.seed)
+    else:
+        json.dump(metrics_history(args.records, args.sessions, args.seed), sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Latency-under-load (bufferbloat) test for the PING Optimizer application.
+Measures idle latency, then latency while a saturating upload/download load runs,
+and grades the difference.
+"""
+
+import socket
+import threading
+import time
+import logging
+
+from latency_stats import summarize
+from probes import UdpEchoProbe
+from local_endpoints import UdpEchoServer, TcpSinkServer, TcpSourceServer
+
+# (max added P95 latency in ms, grade)
+BUFFERBLOAT_GRADES = [
+    (5, 'A+'),
+    (30, 'A'),
+    (60, 'B'),
+    (200, 'C'),
+    (400, 'D'),
+]
+
+LOAD_DIRECTIONS = ('upload', 'download', 'both')
+
+
+def grade_bufferbloat(delta_ms):
+    if delta_ms is None:
+        return 'N/A'
+    for limit, grade in BUFFERBLOAT_GRADES:
+        if delta_ms < limit:
+            return grade
+    return 'F'
+
+
+class LoadGenerator:
+    """Saturates the link with parallel TCP streams towards a sink and/or from a source."""
+
+    def __init__(self, direction='both', upload_address=None, download_address=None,
+                 streams=4, rate_limit_mbps=None, chunk_size=64 * 1024):
+        if direction not in LOAD_DIRECTIONS:
+            raise ValueError(f"Unknown load direction: {direction}")
+        if direction in ('upload', 'both') and upload_address is None:
+            raise ValueError("Upload load needs an upload address")
+        if direction in ('download', 'both') and download_address is None:
+            raise ValueError("Download load needs a download address")
+        self.direction = direction
+        self.upload_address = upload_address
+        self.download_address = download_address
+        self.streams = streams
+        self.rate_limit_mbps = rate_limit_mbps
+        self.chunk_size = chunk_size
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.running = False
+        self.threads = []
+        self.lock = threading.Lock()
+        self.started_at = None
+        self.stopped_at = None
+
+    def start(self):
+        self.running = True
+        self.started_at = time.perf_counter()
+        for _ in range(self.streams):
+            if self.direction in ('upload', 'both'):
+                self.threads.append(threading.Thread(target=self._upload, daemon=True))
+            if self.direction in ('download', 'both'):
+                self.threads.append(threading.Thread(target=self._download, daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.threads = []
+        self.stopped_at = time.perf_counter()
+
+    def throughput_mbps(self):
+        if self.started_at is None:
+            return {'upload': 0.0, 'download': 0.0}
+        elapsed = (self.stopped_at or time.perf_counter()) - self.started_at
+        if elapsed <= 0:
+            return {'upload': 0.0, 'download': 0.0}
+        return {
+            'upload': self.bytes_sent * 8 / elapsed / 1e6,
+            'download': self.bytes_received * 8 / elapsed / 1e6,
+        }
+
+    def _stream_rate(self):
+        # Per-stream byte rate when a limit is configured, None for "as fast as possible"
+        if not self.rate_limit_mbps:
+            return None
+        return self.rate_limit_mbps * 1e6 / 8 / self.streams
+
+    def _pace(self, stream_start, stream_bytes):
+        rate = self._stream_rate()
+        if rate:
+            ahead = stream_bytes / rate - (time.perf_counter() - stream_start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def _upload(self):
+        payload = b'\x00' * self.chunk_size
+        try:
+            with socket.create_connection(self.upload_address, timeout=2) as sock:
+                stream_start = time.perf_counter()
+                stream_bytes = 0
+                while self.running:
+                    sock.sendall(payload)
+                    stream_bytes += len(payload)
+                    with self.lock:
+                        self.bytes_sent += len(payload)
+                    self._pace(stream_start, stream_bytes)
+        except OSError as e:
+            if self.running:
+                logging.warning(f"Upload load stream ended: {str(e)}")
+
+    def _download(self):
+        try:
+            with socket.create_connection(self.download_address, timeout=2) as sock:
+                stream_start = time.perf_counter()
+                stream_bytes = 0
+                while self.running:
+                    data = sock.recv(self.chunk_size)
+                    if not data:
+                        break
+                    stream_bytes += len(data)
+                    with self.lock:
+                        self.bytes_received += len(data)
+                    self._pace(stream_start, stream_bytes)
+        except OSError as e:
+            if self.running:
+                logging.warning(f"Download load stream ended: {str(e)}")
+
+
+def measure_latency(probe, duration, interval):
+    samples = []
+    sent = 0
+    end = time.perf_counter() + duration
+    next_send = time.perf_counter()
+    while time.perf_counter() < end:
+        sent += 1
+        rtt = probe.probe()
+        if rtt is not None:
+            samples.append(rtt)
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return samples, sent
+
+
+def run_bufferbloat_test(probe_address, upload_address=None, download_address=None,
+                         direction='both', idle_seconds=5.0, loaded_seconds=10.0,
+                         interval=0.1, streams=4, rate_limit_mbps=None, warmup_seconds=1.0,
+                         probe_timeout=1.0):
+    """Run one idle + loaded measurement and return the summaries, delta and grade."""
+    probe = UdpEchoProbe(probe_address, timeout=probe_timeout)
+    try:
+        idle_samples, idle_sent = measure_latency(probe, idle_seconds, interval)
+
+        load = LoadGenerator(direction, upload_address, download_address,
+                             streams=streams, rate_limit_mbps=rate_limit_mbps)
+        load.start()
+        try:
+            # Give the streams time to fill the queues before sampling
+            time.sleep(warmup_seconds)
+            loaded_samples, loaded_sent = measure_latency(probe, loaded_seconds, interval)
+        finally:
+            load.stop()
+    finally:
+        probe.close()
+
+    idle = summarize(idle_samples, idle_sent)
+    loaded = summarize(loaded_samples, loaded_sent)
+    delta = {}
+    for key in ('p50', 'p95'):
+        if idle[key] is not None and loaded[key] is not None:
+            delta[key] = loaded[key] - idle[key]
+        else:
+            delta[key] = None
+
+    return {
+        'timestamp': time.time(),
+        'direction': direction,
+        'streams': streams,
+        'rate_limit_mbps': rate_limit_mbps,
+        'idle': idle,
+        'loaded': loaded,
+        'delta': delta,
+        'throughput_mbps': load.throughput_mbps(),
+        'grade': grade_bufferbloat(delta['p95']),
+    }
+
+
+def run_profile_comparison(profiles, **test_kwargs):
+    """Run the test once per profile.
+
+    `profiles` is a list of (name, apply_fn, revert_fn); either function may be None.
+    """
+    results = []
+    for name, apply_fn, revert_fn in profiles:
+        try:
+            if apply_fn:
+                apply_fn()
+            result = run_bufferbloat_test(**test_kwargs)
+            result['profile'] = name
+            results.append(result)
+            logging.info(f"Bufferbloat [{name}]: {format_result(result)}")
+        except Exception as e:
+            logging.error(f"Bufferbloat test failed for profile {name}: {str(e)}")
+            results.append({'profile': name, 'error': str(e)})
+        finally:
+            if revert_fn:
+                try:
+                    revert_fn()
+                except Exception as e:
+                    logging.error(f"Failed to revert profile {name}: {str(e)}")
+    return results
+
+
+def run_local_profile_comparison(profiles, **test_kwargs):
+    """Same as run_profile_comparison, against local stand-in endpoints."""
+    with UdpEchoServer() as echo, TcpSinkServer() as sink, TcpSourceServer() as source:
+        test_kwargs.update({
+            'probe_address': echo.address,
+            'upload_address': sink.address,
+            'download_address': source.address,
+        })
+        return run_profile_comparison(profiles, **test_kwargs)
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"error: {result['error']}"
+    idle = result['idle']
+    loaded = result['loaded']
+    if idle['p50'] is None or loaded['p50'] is None:
+        return f"no replies (grade {result['grade']})"
+    return (
+        f"Idle P50/P95: {idle['p50']:.1f}/{idle['p95']:.1f}ms - "
+        f"Loaded P50/P95: {loaded['p50']:.1f}/{loaded['p95']:.1f}ms - "
+        f"Delta P95: {result['delta']['p95']:+.1f}ms - Grade: {result['grade']}"
+    )
@@ -0,0 +1,202 @@
+"""
+High-frequency burst probing for the PING Optimizer application.
+Probes one UDP target at 100-1000 Hz for a bounded time to catch sub-second
+spikes a 1 Hz ping never sees. Sending is paced on a dedicated thread by a
+drift-correcting Pacer and replies are matched on a second thread, so neither
+the GUI nor a slow reply can skew the schedule or the timestamps.
+
+Only echo services (udp-echo:host:port) can be burst, and only ones you run
+or may load this way. A DNS resolver is somebody else's server: hundreds of
+queries a second look like an attack and get rate-limited or blocked, so udp:
+targets stay with the 1 Hz probe scheduler. ICMP needs the system ping, which
+cannot send this fast, and a TCP handshake per millisecond is a SYN flood.
+"""
+
+import time
+import socket
+import logging
+import threading
+
+from latency_stats import summarize, percentile
+from pacing import Pacer
+from probes import PROBE_HEADER
+from probe_scheduler import parse_target
+
+BURST_RATES = (100, 250, 500, 1000)
+DEFAULT_BURST_RATE = 500
+DEFAULT_BURST_DURATION = 5.0
+MIN_BURST_RATE = 10
+MAX_BURST_RATE = 1000
+MAX_BURST_DURATION = 30.0
+BURST_TIMEOUT = 1.0
+BATCH_INTERVAL = 0.05  # Results are handed over in send order at this period
+PAYLOAD_SIZE = 32
+
+metrics_logger = logging.getLogger('metrics')
+
+
+class BurstProber:
+    """Sends rate probes per second for duration seconds and matches the replies.
+
+    on_samples(list of (epoch send time, rtt_ms or None)) receives results in send
+    order every BATCH_INTERVAL; a probe is reported once answered or timed out.
+    Sending ends at the duration deadline, so ticks the Pacer skips after a stall
+    shorten the burst instead of extending it.
+    """
+
+    def __init__(self, target, rate=DEFAULT_BURST_RATE, duration=DEFAULT_BURST_DURATION,
+                 timeout=BURST_TIMEOUT, on_samples=None):
+        self.target = parse_target(target) if isinstance(target, str) else target
+        if self.target.kind != 'udp-echo':
+            raise ValueError("Burst probing needs an echo target (udp-echo:HOST:PORT); "
+                             "resolvers and other third-party servers are probed at 1 Hz instead")
+        if not MIN_BURST_RATE <= rate <= MAX_BURST_RATE:
+            raise ValueError(f"Burst rate must be between {MIN_BURST_RATE} and {MAX_BURST_RATE} Hz")
+        self.rate = rate
+        self.duration = min(duration, MAX_BURST_DURATION)
+        self.timeout_ns = int(timeout * 1e9)
+        self.on_samples = on_samples
+        self.total = int(self.rate * self.duration)  # Upper bound: the Pacer only ever skips ticks
+        # Indexed by sequence number; written by the sender before each send
+        self.send_ns = [0] * self.total
+        self.send_time = [0.0] * self.total
+        self.rtts = [None] * self.total
+        self.sent = 0
+        self.send_elapsed = 0.0
+        self.cursor = 0  # Next sequence to hand over
+        self.pacer = Pacer(1.0 / rate)
+        self.stop_event = threading.Event()
+        self.sending_done = threading.Event()
+        address = self.target.resolve()
+        family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.connect(address)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.settimeout(BATCH_INTERVAL / 2)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def request(self, sequence, sent_ns):
+        payload = PROBE_HEADER.pack(sequence, sent_ns)
+        return payload + b'\x00' * (PAYLOAD_SIZE - len(payload))
+
+    def reply_sequence(self, data):
+        if len(data) < PROBE_HEADER.size:
+            return None
+        return PROBE_HEADER.unpack_from(data)[0]
+
+    def send_loop(self):
+        self.pacer.start()
+        end_ns = self.pacer.start_ns + int(self.duration * 1e9)
+        try:
+            for sequence in range(self.total):
+                if self.pacer.wait(self.stop_event) is None or time.perf_counter_ns() >= end_ns:
+                    break
+                sent_ns = time.perf_counter_ns()
+                self.send_ns[sequence] = sent_ns
+                self.send_time[sequence] = time.time()
+                packet = self.request(sequence, sent_ns)
+                # Published before sending so a fast reply is never taken for a stray
+                self.sent = sequence + 1
+                try:
+                    self.sock.send(packet)
+                except OSError:
+                    pass  # Times out like any other lost probe
+        finally:
+            self.send_elapsed = (time.perf_counter_ns() - self.pacer.start_ns) / 1e9
+            self.sending_done.set()
+
+    def receive_loop(self):
+        next_flush = time.perf_counter() + BATCH_INTERVAL
+        while True:
+            try:
+                data = self.sock.recv(65535)
+                received_ns = time.perf_counter_ns()
+                sequence = self.reply_sequence(data)
+                if sequence is not None and sequence < self.sent and self.rtts[sequence] is None:
+                    rtt_ns = received_ns - self.send_ns[sequence]
+                    if rtt_ns <= self.timeout_ns and sequence >= self.cursor:
+                        self.rtts[sequence] = rtt_ns / 1e6
+            except socket.timeout:
+                pass
+            except OSError:
+                pass  # e.g. port unreachable; those probes time out
+            if time.perf_counter() >= next_flush:
+                next_flush += BATCH_INTERVAL
+                self.flush()
+                if self.sending_done.is_set() and self.cursor >= self.sent:
+                    break
+                if self.stop_event.is_set() and self.sending_done.is_set():
+                    self.flush(force=True)
+                    break
+
+    def flush(self, force=False):
+        # Hand over the answered-or-expired prefix so samples stay in send order
+        now_ns = time.perf_counter_ns()
+        batch = []
+        while self.cursor < self.sent:
+            rtt = self.rtts[self.cursor]
+            if rtt is None and not force and now_ns - self.send_ns[self.cursor] <= self.timeout_ns:
+                break
+            batch.append((self.send_time[self.cursor], rtt))
+            self.cursor += 1
+        if batch and self.on_samples:
+            self.on_samples(batch)
+
+    def run(self):
+        """Run the burst to completion (or stop()) and return its summary."""
+        sender = threading.Thread(target=self.send_loop, name='BurstSender', daemon=True)
+        sender.start()
+        try:
+            self.receive_loop()
+        finally:
+            self.stop_event.set()
+            sender.join(timeout=2)
+            self.sock.close()
+        replies = [rtt for rtt in self.rtts[:self.sent] if rtt is not None]
+        summary = summarize(replies, self.sent)
+        summary.update({
+            'target': self.target.label,
+            'time': time.time(),
+            'rate': self.rate,
+            'duration': self.duration,
+            'achieved_rate': self.sent / self.send_elapsed if self.send_elapsed > 0 else None,
+            'p99': percentile(replies, 99),
+            'pacing': self.pacer.report(),
+        })
+        return summary
+
+
+def run_burst(target, rate=DEFAULT_BURST_RATE, duration=DEFAULT_BURST_DURATION, on_samples=None,
+              prober_ready=None):
+    """Burst-probe target and record the summary in the session.
+
+    prober_ready(prober) is called before probing starts, so a caller on another
+    thread can keep a handle for stop().
+    """
+    prober = BurstProber(target, rate, duration, on_samples=on_samples)
+    if prober_ready:
+        prober_ready(prober)
+    summary = prober.run()
+    metrics_logger.info(f"Burst probe {summary['target']} at {rate} Hz - {format_summary(summary)}",
+                        extra={'session_data': {'burst_tests': summary}})
+    return summary
+
+
+def run_local_burst(rate=DEFAULT_BURST_RATE, duration=DEFAULT_BURST_DURATION, on_samples=None):
+    """Burst against an echo server on loopback (exercises pacing and matching offline)."""
+    from local_endpoints import UdpEchoServer
+
+    with UdpEchoServer() as server:
+        host, port = server.address
+        return run_burst(f"udp-echo:{host}:{port}", rate, duration, on_samples)
+
+
+def format_summary(summary):
+    if not summary['count']:
+        return f"no replies to {summary['sent']} probes"
+    achieved = f"{summary['achieved_rate']:.0f}" if summary['achieved_rate'] else "?"
+    return (f"{summary['sent']} probes ({achieved} Hz) - P50/P95/P99/max "
+            f"{summary['p50']:.2f}/{summary['p95']:.2f}/{summary['p99']:.2f}/{summary['max']:.2f} ms - "
+            f"loss {summary['loss']:.1f}% - pacing error {summary['pacing']['mean_lateness_ms']:.3f} ms avg")
@@ -1,30 +1,68 @@
-import random
 import math
-from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF
-from PyQt5.QtGui import QPainter, QColor, QPainterPath
+import time
+import numpy as np
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRect, QEvent
+from PyQt5.QtGui import QPainter, QColor, QPainterPath, QPixmap, QRegion
 from PyQt5.QtWidgets import QWidget
+from petal_physics import PetalField, SPRITE_SIZES, ROTATION_STEPS, ROTATION_SPAN
+from diagnostics import recorder
+
+PETAL_COLOR = QColor(255, 182, 193)  # Light pink
+
+BASE_INTERVAL_MS = 25
+MAX_INTERVAL_MS = 100
+MIN_PETAL_COUNT = 8
+# Above this many petals a per-rect dirty region costs more than a full repaint
+DIRTY_RECT_LIMIT = 64
+
+
+def petal_path(size):
+    path = QPainterPath()
+    path.moveTo(0, -size/2)
+    path.cubicTo(
+        size/2, -size/2,
+        size/2, size/2,
+        0, size/2
+    )
+    path.cubicTo(
+        -size/2, size/2,
+        -size/2, -size/2,
+        0, -size/2
+    )
+    return path
+
+
+class PetalSprites:
+    """Petal pixmaps rendered once per (size, rotation step) instead of every frame.
+
+    The petal shape is symmetric under a half turn, so rotations only cover 0-180 degrees.
+    """
+
+    def __init__(self, device_pixel_ratio=1.0):
+        self.device_pixel_ratio = device_pixel_ratio
+        # Rotated petals fit in a square of the diagonal; +2 for antialiasing
+        self.extents = np.array([int(math.ceil(size * math.sqrt(2))) + 2 for size in SPRITE_SIZES])
+        self.sprites = []  # [size_index][rotation_step] -> QPixmap
+        for size, extent in zip(SPRITE_SIZES, self.extents):
+            path = petal_path(int(size))
+            self.sprites.append([
+                self._render(path, int(extent), step * ROTATION_SPAN / ROTATION_STEPS)
+                for step in range(ROTATION_STEPS)
+            ])
+
+    def _render(self, path, extent, angle):
+        ratio = self.device_pixel_ratio
+        pixmap = QPixmap(int(extent * ratio), int(extent * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(extent / 2, extent / 2)
+        painter.rotate(angle)
+        painter.fillPath(path, PETAL_COLOR)
+        painter.end()
+        return pixmap
 
-class CherryBlossom:
-    def __init__(self, pos, size):
-        self.pos = pos
-        self.size = size
-        self.angle = random.uniform(0, 360)
-        self.speed = random.uniform(1, 2)  # Slightly faster for better movement
-        self.oscillation = random.uniform(-1.5, 1.5)
-        self.alpha = random.randint(150, 200)  # Randomize transparency
-        self.wave_offset = random.uniform(0, 2 * math.pi)
-        self.drift_direction = random.choice([-1, 1])  # Random left/right drift
-
-    def update(self):
-        # Vertical movement
-        self.pos.setY(self.pos.y() + self.speed)
-        
-        # Horizontal movement with drift
-        drift = math.sin(self.wave_offset + self.pos.y() * 0.05) * 0.8
-        self.pos.setX(self.pos.x() + (drift * self.drift_direction))
-        
-        # Gentle rotation
-        self.angle += 1
 
 class CherryBlossomAnimation(QWidget):
     def __init__(self, parent=None):
@@ -33,93 +71,149 @@ class CherryBlossomAnimation(QWidget):
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.lower()
-        
-        self.petals = []
+
+        self.sprites = PetalSprites(self.devicePixelRatioF())
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_animation)
-        self.timer.start(25)  # Adjusted for better performance
+        self.interval = BASE_INTERVAL_MS
         self.target_petal_count = 25  # Increased petal count
-        
+        self.petal_count = self.target_petal_count
+
+        # Pause while the top-level window is minimized, hidden or unfocused
+        self.pause_when_unfocused = True
+        self.paused = False
+
+        # Adaptive frame budget: shed petals, then frame rate, when frames run long
+        self.adaptive = True
+        self.frame_budget_ms = 4.0  # Update + paint cost allowed per frame
+        self.frame_cost_ms = 0.0  # Exponential moving average
+        self.last_paint_ms = 0.0
+        self.frames_since_adjust = 0
+
         # Create initial petals
-        self.create_petals(self.target_petal_count)
+        self.petals = PetalField(self.target_petal_count, self.width(), self.height())
+
+        if parent is not None:
+            parent.window().installEventFilter(self)
+        self.timer.start(self.interval)
 
     def create_petals(self, count):
-        current_count = len(self.petals)
-        if count > current_count:
-            for _ in range(count - current_count):
-                # Spread petals across the top of the screen
-                spawn_zone = random.randint(0, 3)  # 0: left, 1: center-left, 2: center-right, 3: right
-                if spawn_zone == 0:  # Left side
-                    x = random.uniform(0, self.width() * 0.25)
-                elif spawn_zone == 1:  # Center-left
-                    x = random.uniform(self.width() * 0.25, self.width() * 0.5)
-                elif spawn_zone == 2:  # Center-right
-                    x = random.uniform(self.width() * 0.5, self.width() * 0.75)
-                else:  # Right side
-                    x = random.uniform(self.width() * 0.75, self.width())
-                
-                pos = QPointF(
-                    x,
-                    random.uniform(-50, self.height() * 0.2)  # Spawn in top fifth
-                )
-                size = random.uniform(8, 12)
-                self.petals.append(CherryBlossom(pos, size))
-        else:
-            self.petals = self.petals[:count]
+        self.petals.resize(count)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.petals.set_bounds(self.width(), self.height())
 
+    def eventFilter(self, obj, event):
+        if event.type() in (QEvent.WindowStateChange, QEvent.Hide, QEvent.Show,
+                            QEvent.WindowActivate, QEvent.WindowDeactivate):
+            self.update_paused_state()
+        return False
+
+    def should_pause(self):
+        window = self.window()
+        if not self.isVisible() or not window.isVisible() or window.isMinimized():
+            return True
+        return self.pause_when_unfocused and not window.isActiveWindow()
+
+    def update_paused_state(self):
+        paused = self.should_pause()
+        if paused and not self.paused:
+            self.timer.stop()
+        elif not paused and self.paused:
+            self.timer.start(self.interval)
+        self.paused = paused
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_paused_state()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_paused_state()
+
+    def petal_rects(self):
+        # Integer sprite rects as (left, top, side) arrays
+        extent = self.sprites.extents[self.petals.sprite_index]
+        left = np.floor(self.petals.x - extent / 2).astype(int) - 1
+        top = np.floor(self.petals.y - extent / 2).astype(int) - 1
+        return left, top, extent + 2
+
+    @recorder.timed('petal animation step')
     def update_animation(self):
-        # Update existing petals
-        for petal in self.petals[:]:
-            petal.update()
-            
-            # Remove petals that are out of bounds
-            if (petal.pos.y() > self.height() + 50 or 
-                petal.pos.x() < -50 or 
-                petal.pos.x() > self.width() + 50):
-                self.petals.remove(petal)
-                # Create new petal at random position at top
-                spawn_zone = random.randint(0, 3)
-                if spawn_zone == 0:  # Left side
-                    x = random.uniform(0, self.width() * 0.25)
-                elif spawn_zone == 1:  # Center-left
-                    x = random.uniform(self.width() * 0.25, self.width() * 0.5)
-                elif spawn_zone == 2:  # Center-right
-                    x = random.uniform(self.width() * 0.5, self.width() * 0.75)
-                else:  # Right side
-                    x = random.uniform(self.width() * 0.75, self.width())
-                
-                pos = QPointF(x, random.uniform(-50, 0))
-                size = random.uniform(8, 12)
-                self.petals.append(CherryBlossom(pos, size))
-
-        self.update()
+        started = time.perf_counter()
+        small = len(self.petals) <= DIRTY_RECT_LIMIT
+        if small:
+            before = self.petal_rects()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+        # Move every petal (and respawn the ones that left the window) in one step
+        self.petals.step()
+
+        if small:
+            # Repaint only where petals were or now are
+            dirty = QRegion()
+            for left, top, side in (before, self.petal_rects()):
+                for x, y, s in zip(left.tolist(), top.tolist(), side.tolist()):
+                    dirty = dirty.united(QRect(x, y, s, s))
+            self.update(dirty)
+        else:
+            self.update()
 
-        for petal in self.petals:
-            self.draw_petal(painter, petal)
+        if self.adaptive:
+            cost = (time.perf_counter() - started) * 1000 + self.last_paint_ms
+            self.frame_cost_ms = self.frame_cost_ms * 0.9 + cost * 0.1
+            self.adjust_frame_budget()
 
-    def draw_petal(self, painter, petal):
-        painter.save()
-        painter.translate(petal.pos)
-        painter.rotate(petal.angle)
+    def adjust_frame_budget(self):
+        # Re-evaluate at most every 20 frames so the EWMA can settle after a change
+        self.frames_since_adjust += 1
+        if self.frames_since_adjust < 20:
+            return
+        if self.frame_cost_ms > self.frame_budget_ms:
+            if self.petal_count > MIN_PETAL_COUNT:
+                self.petal_count = max(MIN_PETAL_COUNT, int(self.petal_count * 0.8))
+                self.create_petals(self.petal_count)
+            elif self.interval < MAX_INTERVAL_MS:
+                self.set_interval(min(MAX_INTERVAL_MS, self.interval * 2))
+            self.frames_since_adjust = 0
+        elif self.frame_cost_ms < self.frame_budget_ms / 2:
+            # Recover frame rate first, then petals
+            if self.interval > BASE_INTERVAL_MS:
+                self.set_interval(max(BASE_INTERVAL_MS, self.interval // 2))
+            elif self.petal_count < self.target_petal_count:
+                self.petal_count = min(self.target_petal_count, self.petal_count + 2)
+                self.create_petals(self.petal_count)
+            self.frames_since_adjust = 0
 
-        path = QPainterPath()
-        path.moveTo(0, -petal.size/2)
-        path.cubicTo(
-            petal.size/2, -petal.size/2,
-            petal.size/2, petal.size/2,
-            0, petal.size/2
-        )
-        path.cubicTo(
-            -petal.size/2, petal.size/2,
-            -petal.size/2, -petal.size/2,
-            0, -petal.size/2
+    def set_interval(self, interval):
+        self.interval = interval
+        if self.timer.isActive():
+            self.timer.start(self.interval)
+
+    @recorder.timed('paint petals')
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        clip = event.rect()
+
+        # Cull petals outside the exposed rect before touching Qt per petal
+        left, top, side = self.petal_rects()
+        visible = np.flatnonzero(
+            (left + side >= clip.left()) & (left <= clip.right()) &
+            (top + side >= clip.top()) & (top <= clip.bottom())
         )
+        petals = self.petals
+        half = self.sprites.extents[petals.sprite_index[visible]] / 2
+        xs = (petals.x[visible] - half).tolist()
+        ys = (petals.y[visible] - half).tolist()
+        size_index = petals.sprite_index[visible].tolist()
+        steps = petals.rotation_steps()[visible].tolist()
+        alphas = petals.alpha[visible].tolist()
 
-        # Use only pink colors with varying transparency
-        color = QColor(255, 182, 193, petal.alpha)  # Light pink
-        painter.fillPath(path, color)
-        painter.restore()
+        sprites = self.sprites.sprites
+        for x, y, si, step, alpha in zip(xs, ys, size_index, steps, alphas):
+            # Use only pink colors with varying transparency
+            painter.setOpacity(alpha)
+            painter.drawPixmap(QPointF(x, y), sprites[si][step])
+        painter.end()
+        self.last_paint_ms = (time.perf_counter() - started) * 1000
@@ -0,0 +1,176 @@
+"""
+Hot-path instrumentation for the PING Optimizer application.
+Named spans (probe handling, stats updates, metrics writes, system commands,
+paints...) are timed with perf_counter and counted into a log histogram per
+(thread, span), so the diagnostics panel and the dump file show where the GUI
+thread and each worker spend their time, tail latencies included.
+
+Recording is off by default and then costs one attribute check per span. Turn it
+on with --diagnostics, PING_OPTIMIZER_DIAGNOSTICS=1 or from the panel (Ctrl+Shift+D).
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import functools
+from contextlib import nullcontext
+
+HISTOGRAM_MIN_MS = 0.001
+HISTOGRAM_GROWTH = 1.1  # ~5% precision is plenty for "where does the time go"
+
+_NULL_SPAN = nullcontext()
+
+
+class Span:
+    __slots__ = ('recorder', 'name', 'started')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class SpanStats:
+    __slots__ = ('histogram', 'max_ms')
+
+    def __init__(self):
+        from latency_histogram import LogHistogram  # numpy; only paid once recording is on
+        self.histogram = LogHistogram(min_ms=HISTOGRAM_MIN_MS, growth=HISTOGRAM_GROWTH)
+        self.max_ms = 0.0
+
+    def add(self, duration_ms):
+        self.histogram.add(duration_ms)
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+
+class SpanRecorder:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.spans = {}  # (thread name, span name) -> SpanStats
+        self.since = time.time()
+
+    def enable(self, enabled=True):
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.since = time.time()
+
+    def span(self, name):
+        """Context manager timing its block; a shared no-op while recording is off."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+    def timed(self, name):
+        """Decorator form of span() for whole functions (event handlers, paintEvent...)."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter() - started) * 1000)
+            return wrapper
+        return decorate
+
+    def record(self, name, duration_ms):
+        # For code that already measured itself (e.g. system commands)
+        if not self.enabled:
+            return
+        key = (thread_group(threading.current_thread().name), name)
+        with self.lock:
+            stats = self.spans.get(key)
+            if stats is None:
+                stats = self.spans[key] = SpanStats()
+            stats.add(duration_ms)
+
+    def snapshot(self):
+        """Per-span summaries, busiest first."""
+        elapsed = max(time.time() - self.since, 1e-9)
+        with self.lock:
+            items = [(key, stats.histogram.count, stats.histogram.total, stats.max_ms,
+                      [stats.histogram.percentile(p) for p in (50, 95, 99)])
+                     for key, stats in self.spans.items()]
+        rows = []
+        for (thread, name), count, total, max_ms, percentiles in items:
+            # Bucket edges can overshoot the slowest sample actually seen
+            p50, p95, p99 = (min(p, max_ms) for p in percentiles)
+            rows.append({
+                'thread': thread,
+                'span': name,
+                'count': count,
+                'total_ms': total,
+                'busy_percent': total / (elapsed * 1000) * 100,
+                'mean_ms': total / count if count else None,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'max_ms': max_ms,
+            })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def report(self, rows=None):
+        rows = self.snapshot() if rows is None else rows
+        elapsed = time.time() - self.since
+        lines = [f"Span timings over {elapsed:.0f}s ({'recording' if self.enabled else 'paused'}), ms",
+                 f"{'thread':<20}{'span':<28}{'count':>8}{'busy%':>7}{'mean':>9}{'p50':>9}"
+                 f"{'p95':>9}{'p99':>9}{'max':>9}"]
+        for row in rows:
+            lines.append(f"{row['thread'][:19]:<20}{row['span'][:27]:<28}{row['count']:>8}"
+                         f"{row['busy_percent']:>7.2f}{row['mean_ms']:>9.3f}{row['p50_ms']:>9.3f}"
+                         f"{row['p95_ms']:>9.3f}{row['p99_ms']:>9.3f}{row['max_ms']:>9.3f}")
+        if not rows:
+            lines.append("No spans recorded yet")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        """Write the current summaries (and the text report) to a JSON file; returns the path."""
+        path = path or default_dump_path()
+        rows = self.snapshot()
+        data = {'time': time.time(), 'since': self.since, 'enabled': self.enabled, 'pid': os.getpid(),
+                'spans': rows, 'report': self.report(rows)}
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, path)
+        return path
+
+
+def thread_group(name):
+    # Pool workers (ThreadPoolExecutor-0_3, Thread-12 (...)) are grouped by pool
+    return re.sub(r'[-_]\d+(?: \(.*\))?$', '', name)
+
+
+def default_dump_path():
+    from metrics_store import APP_DIR
+    return os.path.join(APP_DIR, 'tcp_optimizer_diagnostics.json')
+
+
+def load_dump(path=None):
+    try:
+        with open(path or default_dump_path(), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+recorder = SpanRecorder(enabled=os.environ.get('PING_OPTIMIZER_DIAGNOSTICS') == '1')
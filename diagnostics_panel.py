@@ -0,0 +1,85 @@
+"""
+Hidden diagnostics panel for the PING Optimizer application.
+Shows the span timings from diagnostics.recorder, refreshed once a second while
+open, with controls to pause, reset and dump them. Toggled with Ctrl+Shift+D.
+"""
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout
+
+import styles
+from diagnostics import recorder
+
+REFRESH_MS = 1000
+
+
+class DiagnosticsPanel(QWidget):
+    def __init__(self, window):
+        super().__init__(window, Qt.Tool)
+        self.host = window
+        self.setWindowTitle("Diagnostics")
+        self.setStyleSheet(styles.DIAGNOSTICS_PANEL_STYLE)
+        self.resize(900, 420)
+
+        layout = QVBoxLayout(self)
+        self.report_label = QLabel()
+        self.report_label.setTextFormat(Qt.PlainText)
+        self.report_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.report_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        layout.addWidget(self.report_label, 1)
+
+        buttons = QHBoxLayout()
+        self.record_btn = QPushButton()
+        self.record_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.record_btn.clicked.connect(self.toggle_recording)
+        buttons.addWidget(self.record_btn)
+        reset_btn = QPushButton("Reset")
+        reset_btn.setStyleSheet(styles.BUTTON_STYLE)
+        reset_btn.clicked.connect(self.reset)
+        buttons.addWidget(reset_btn)
+        dump_btn = QPushButton("Dump to File")
+        dump_btn.setStyleSheet(styles.BUTTON_STYLE)
+        dump_btn.clicked.connect(self.dump)
+        buttons.addWidget(dump_btn)
+        layout.addLayout(buttons)
+
+        # Only runs while the panel is visible, so a closed panel costs nothing
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def toggle(self):
+        if self.isVisible():
+            self.hide()
+        else:
+            self.show()
+            self.raise_()
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        self.record_btn.setText("Pause Recording" if recorder.enabled else "Start Recording")
+        self.report_label.setText(recorder.report())
+
+    def toggle_recording(self):
+        recorder.enable(not recorder.enabled)
+        self.refresh()
+
+    def reset(self):
+        recorder.reset()
+        self.refresh()
+
+    def dump(self):
+        try:
+            path = recorder.dump()
+        except OSError as e:
+            self.host.notifications.notify(f"Could not write diagnostics: {str(e)}", 'error')
+            return
+        self.host.notifications.notify(f"Diagnostics written to {path}", 'success')
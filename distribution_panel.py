@@ -0,0 +1,232 @@
+"""
+Latency distribution panel for the PING Optimizer application.
+Overlays two latency histograms (or CDFs): the current session before vs after an
+optimization was applied, or any two sessions recorded in the metrics file.
+"""
+
+import math
+import threading
+
+import numpy as np
+from PyQt5.QtCore import Qt, QTimer, QRect, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QPainterPath, QColor, QPen, QFont
+from PyQt5.QtWidgets import QWidget, QFrame, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton
+
+import styles
+from latency_histogram import session_histograms, session_histogram
+from metrics_store import load_metrics
+from diagnostics import recorder
+
+SERIES_COLORS = (QColor(255, 182, 193), QColor(0, 255, 255))  # Before / after
+GRID_COLOR = QColor(0, 255, 255, 60)
+TEXT_COLOR = QColor(255, 255, 255, 180)
+REFRESH_INTERVAL_MS = 500
+LIVE_MODE = "This session: before vs after optimization"
+SESSIONS_MODE = "Compare two recorded sessions"
+
+
+class DistributionPlot(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(180)
+        self.series = []  # (name, LogHistogram)
+        self.cumulative = False
+
+    def set_series(self, series, cumulative=None):
+        self.series = [(name, hist) for name, hist in series if hist is not None and hist.count]
+        if cumulative is not None:
+            self.cumulative = cumulative
+        self.update()
+
+    @recorder.timed('paint distribution')
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(QFont(self.font().family(), 8))
+        rect = QRect(10, 8, max(1, self.width() - 20), max(1, self.height() - 30))
+        painter.setPen(QPen(GRID_COLOR, 1))
+        painter.drawLine(rect.bottomLeft(), rect.bottomRight())
+        if not self.series:
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(rect, Qt.AlignCenter, "No samples yet")
+            painter.end()
+            return
+
+        # Shared log-scaled x range over every populated bucket
+        first = min(hist.populated_range()[0] for _, hist in self.series)
+        last = max(hist.populated_range()[1] for _, hist in self.series)
+        values = self.series[0][1].bucket_values()
+        low = math.log(values[first]) - 0.1
+        high = math.log(values[last]) + 0.1
+
+        curves = [(hist.cdf() if self.cumulative else hist.density())[1][first:last + 1]
+                  for _, hist in self.series]
+        y_max = 1.0 if self.cumulative else max(float(curve.max()) for curve in curves)
+        xs = rect.left() + (np.log(values[first:last + 1]) - low) / (high - low) * rect.width()
+
+        for (name, hist), curve, color in zip(self.series, curves, SERIES_COLORS):
+            ys = rect.bottom() - curve / y_max * rect.height()
+            path = QPainterPath()
+            path.moveTo(QPointF(xs[0], rect.bottom()))
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                path.lineTo(QPointF(x, y))
+            if not self.cumulative:
+                path.lineTo(QPointF(xs[-1], rect.bottom()))
+            painter.setPen(QPen(color, 2))
+            painter.drawPath(path)
+
+            # P95 marker
+            p95 = hist.percentile(95)
+            x = rect.left() + (math.log(p95) - low) / (high - low) * rect.width()
+            painter.setPen(QPen(color, 1, Qt.DashLine))
+            painter.drawLine(QPointF(x, rect.top()), QPointF(x, rect.bottom()))
+
+        # A few x-axis labels in ms
+        painter.setPen(TEXT_COLOR)
+        for fraction in (0, 0.5, 1):
+            value = math.exp(low + fraction * (high - low))
+            x = rect.left() + fraction * rect.width()
+            align = Qt.AlignLeft if fraction == 0 else Qt.AlignRight if fraction == 1 else Qt.AlignHCenter
+            label_rect = QRect(int(x) - (0 if fraction == 0 else 60 if fraction == 1 else 30),
+                               rect.bottom() + 4, 60, 16)
+            painter.drawText(label_rect, align | Qt.AlignVCenter, f"{value:.1f} ms")
+        painter.end()
+
+
+class DistributionPanel(QFrame):
+    # Emitted from the loader thread with [(label, LogHistogram), ...]
+    sessions_loaded = pyqtSignal(object)
+
+    def __init__(self, live_histograms, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet(styles.TRANSPARENT_FRAME_STYLE)
+        self.live_histograms = live_histograms  # {'before': LogHistogram, 'after': LogHistogram}
+        self.sessions = []  # (label, LogHistogram) per recorded session
+        self.dirty = True
+        self.loading = False
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+
+        controls = QHBoxLayout()
+        self.mode_combo = QComboBox()
+        self.mode_combo.setStyleSheet(styles.COMBO_BOX_STYLE)
+        self.mode_combo.addItems([LIVE_MODE, SESSIONS_MODE])
+        self.mode_combo.currentIndexChanged.connect(self.mode_changed)
+        controls.addWidget(self.mode_combo, 1)
+        self.view_combo = QComboBox()
+        self.view_combo.setStyleSheet(styles.COMBO_BOX_STYLE)
+        self.view_combo.addItems(["Histogram", "CDF"])
+        self.view_combo.currentIndexChanged.connect(self.mark_dirty)
+        controls.addWidget(self.view_combo)
+        layout.addLayout(controls)
+
+        session_row = QHBoxLayout()
+        self.session_combos = []
+        for _ in range(2):
+            combo = QComboBox()
+            combo.setStyleSheet(styles.COMBO_BOX_STYLE)
+            combo.currentIndexChanged.connect(self.mark_dirty)
+            session_row.addWidget(combo, 1)
+            self.session_combos.append(combo)
+        self.reload_btn = QPushButton("Reload")
+        self.reload_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.reload_btn.clicked.connect(self.load_sessions)
+        session_row.addWidget(self.reload_btn)
+        self.session_row = QWidget()
+        self.session_row.setLayout(session_row)
+        self.session_row.setVisible(False)
+        layout.addWidget(self.session_row)
+
+        self.plot = DistributionPlot()
+        layout.addWidget(self.plot, 1)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        layout.addWidget(self.summary_label)
+
+        self.sessions_loaded.connect(self.show_sessions)
+        # Live histograms change per sample; the plot only follows at a relaxed cadence
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    def mark_dirty(self, *args):
+        self.dirty = True
+        if self.isVisible() and not self.timer.isActive():
+            self.timer.start()
+
+    def mode_changed(self, index):
+        sessions_mode = self.mode_combo.currentText() == SESSIONS_MODE
+        self.session_row.setVisible(sessions_mode)
+        if sessions_mode and not self.sessions and not self.loading:
+            self.load_sessions()
+        self.mark_dirty()
+
+    def load_sessions(self):
+        # Parsing the metrics file (and bucketing every session) stays off the GUI thread
+        if self.loading:
+            return
+        self.loading = True
+        self.reload_btn.setEnabled(False)
+
+        def load():
+            sessions = []
+            for session in load_metrics().get('sessions', []):
+                samples = len(session.get('optimized_pings', []))
+                if not samples:
+                    continue
+                label = f"{session.get('start_time', '?')[:16].replace('T', ' ')} ({samples} samples)"
+                sessions.append((label, session_histogram(session)))
+                # Sessions with a recorded optimization can also be compared against themselves
+                split = session_histograms(session)
+                if split['after'].count:
+                    sessions.append((f"{label} before optimization", split['before']))
+                    sessions.append((f"{label} after optimization", split['after']))
+            self.sessions_loaded.emit(sessions)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def show_sessions(self, sessions):
+        self.loading = False
+        self.reload_btn.setEnabled(True)
+        self.sessions = sessions
+        for position, combo in enumerate(self.session_combos):
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItems([label for label, _ in sessions])
+            # Default to the two most recent sessions
+            combo.setCurrentIndex(max(0, len(sessions) - 2 + position))
+            combo.blockSignals(False)
+        self.mark_dirty()
+
+    def current_series(self):
+        if self.mode_combo.currentText() == LIVE_MODE:
+            return [("Before", self.live_histograms['before']), ("After", self.live_histograms['after'])]
+        series = []
+        for combo in self.session_combos:
+            index = combo.currentIndex()
+            if 0 <= index < len(self.sessions):
+                series.append(self.sessions[index])
+        return series
+
+    def refresh(self):
+        if not self.dirty or not self.isVisible():
+            self.timer.stop()
+            return
+        self.dirty = False
+        series = self.current_series()
+        self.plot.set_series(series, cumulative=self.view_combo.currentText() == "CDF")
+        lines = []
+        for (name, hist), color in zip(series, SERIES_COLORS):
+            summary = hist.summary()
+            if summary['count']:
+                # The colored square doubles as the plot legend
+                lines.append(f"<span style='color:{color.name()}'>&#9632;</span> {name}: {summary['count']} samples, "
+                             f"P50 {summary['p50']:.1f} / P95 {summary['p95']:.1f} / P99 {summary['p99']:.1f} ms")
+        self.summary_label.setText("<br>".join(lines) or "No samples yet")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.mark_dirty()
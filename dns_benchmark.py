@@ -0,0 +1,232 @@
+"""
+DNS resolver benchmark for the PING Optimizer application.
+Queries every candidate resolver concurrently with asyncio, timing both names the
+resolver should already have cached and random names it cannot have cached
+(forcing a full recursive lookup), over several rounds. Resolvers are ranked by
+median and P95 response time, with unreliable ones pushed to the bottom.
+"""
+
+import time
+import random
+import string
+import asyncio
+
+from dns_wire import build_query, parse_header, with_id, RCODE_NOERROR, RCODE_NXDOMAIN
+from latency_stats import percentile
+
+DEFAULT_RESOLVERS = [
+    '1.1.1.1', '1.0.0.1',  # Cloudflare
+    '8.8.8.8', '8.8.4.4',  # Google
+    '9.9.9.9', '149.112.112.112',  # Quad9
+    '208.67.222.222', '208.67.220.220',  # OpenDNS
+]
+# Popular names every public resolver keeps cached
+CACHED_NAMES = ['google.com', 'youtube.com', 'facebook.com', 'amazon.com', 'microsoft.com',
+                'cloudflare.com', 'wikipedia.org', 'steampowered.com']
+# Parents for random, never-cached names (the answer is NXDOMAIN from the authoritative servers)
+UNCACHED_PARENTS = ['google.com', 'cloudflare.com', 'wikipedia.org', 'microsoft.com']
+MAX_FAILURE_RATE = 5.0  # Percent; resolvers above this rank after every reliable one
+QUERY_TIMEOUT = 2.0
+MAX_IN_FLIGHT = 4  # Concurrent queries per resolver, to stay under rate limits
+
+def system_resolvers():
+    # Currently configured resolvers (Linux/macOS resolv.conf); empty elsewhere
+    servers = []
+    try:
+        with open('/etc/resolv.conf', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver' and ':' not in parts[1]:
+                    servers.append(parts[1])
+    except OSError:
+        pass
+    return servers
+
+
+def random_names(count):
+    return [
+        ''.join(random.choices(string.ascii_lowercase + string.digits, k=16)) + '.' + random.choice(UNCACHED_PARENTS)
+        for _ in range(count)
+    ]
+
+
+class _DnsClientProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.waiters = {}  # query id -> future
+
+    def datagram_received(self, data, addr):
+        header = parse_header(data)
+        if header is None or not header[1]:
+            return
+        future = self.waiters.pop(header[0], None)
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP port unreachable etc.: fail everything in flight
+        for future in self.waiters.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.waiters.clear()
+
+
+class ResolverClient:
+    def __init__(self, server, port=53, timeout=QUERY_TIMEOUT, max_in_flight=MAX_IN_FLIGHT):
+        self.server = server
+        self.port = port
+        self.timeout = timeout
+        self.transport = None
+        self.protocol = None
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await loop.create_datagram_endpoint(
+            _DnsClientProtocol, remote_addr=(self.server, self.port))
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+    async def exchange(self, packet):
+        """Send a query packet (its ID is replaced) and return (response, rtt_ms, None)
+        or (None, None, reason)."""
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            query_id = random.randrange(1, 0x10000)
+            while query_id in self.protocol.waiters:
+                query_id = random.randrange(1, 0x10000)
+            future = loop.create_future()
+            self.protocol.waiters[query_id] = future
+            started = time.perf_counter()
+            try:
+                self.transport.sendto(with_id(packet, query_id))
+                data = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                return None, None, 'timeout'
+            except OSError as e:
+                return None, None, str(e)
+            finally:
+                self.protocol.waiters.pop(query_id, None)
+            return data, (time.perf_counter() - started) * 1000, None
+
+    async def query(self, name):
+        """(rtt_ms, None) on an answer (NOERROR or NXDOMAIN), (None, reason) otherwise."""
+        data, rtt, error = await self.exchange(build_query(name, 0))
+        if data is None:
+            return None, error
+        rcode = parse_header(data)[2]
+        if rcode not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+            return None, f"rcode {rcode}"
+        return rtt, None
+
+
+def _stats(values):
+    return {
+        'count': len(values),
+        'median': percentile(values, 50) if values else None,
+        'p95': percentile(values, 95) if values else None,
+    }
+
+
+async def _benchmark_resolver(server, port, rounds, cached_names, uncached_count, timeout):
+    client = ResolverClient(server, port, timeout)
+    cached, uncached, failures = [], [], {}
+    queries = 0
+    try:
+        await client.open()
+        # Warm-up pass so the "cached" names really are cached at this resolver
+        await asyncio.gather(*(client.query(name) for name in cached_names))
+        for _ in range(rounds):
+            names = [(name, cached) for name in cached_names]
+            names += [(name, uncached) for name in random_names(uncached_count)]
+            results = await asyncio.gather(*(client.query(name) for name, _ in names))
+            for (_, bucket), (rtt, error) in zip(names, results):
+                queries += 1
+                if rtt is None:
+                    failures[error] = failures.get(error, 0) + 1
+                else:
+                    bucket.append(rtt)
+    except OSError as e:
+        failures[str(e)] = failures.get(str(e), 0) + max(1, rounds * (len(cached_names) + uncached_count) - queries)
+        queries = max(queries, rounds * (len(cached_names) + uncached_count))
+    finally:
+        client.close()
+
+    combined = cached + uncached
+    failed = sum(failures.values())
+    return {
+        'server': server if port == 53 else f"{server}:{port}",
+        'address': server,
+        'port': port,
+        'queries': queries,
+        'failures': failed,
+        'failure_rate': failed / queries * 100 if queries else 100.0,
+        'failure_reasons': failures,
+        'median': percentile(combined, 50) if combined else None,
+        'p95': percentile(combined, 95) if combined else None,
+        'cached': _stats(cached),
+        'uncached': _stats(uncached),
+    }
+
+
+def rank_results(results):
+    # Reliable resolvers first, then by median, then by tail latency
+    def key(result):
+        unreliable = result['failure_rate'] > MAX_FAILURE_RATE or result['median'] is None
+        return (unreliable, result['median'] or float('inf'), result['p95'] or float('inf'))
+    ranked = sorted(results, key=key)
+    for rank, result in enumerate(ranked, 1):
+        result['rank'] = rank
+    return ranked
+
+
+async def _run(servers, rounds, cached_names, uncached_count, timeout):
+    return await asyncio.gather(*(
+        _benchmark_resolver(address, port, rounds, cached_names, uncached_count, timeout)
+        for address, port in servers
+    ))
+
+
+def run_dns_benchmark(servers=None, rounds=3, cached_names=CACHED_NAMES, uncached_count=4,
+                      timeout=QUERY_TIMEOUT):
+    """Benchmark resolvers concurrently and return results ranked best-first.
+
+    servers are "ip" or (ip, port) entries; defaults to the public resolvers plus
+    the system's configured ones.
+    """
+    if servers is None:
+        servers = list(dict.fromkeys(system_resolvers() + DEFAULT_RESOLVERS))
+    endpoints = [(s, 53) if isinstance(s, str) else tuple(s) for s in servers]
+    results = asyncio.run(_run(endpoints, rounds, list(cached_names), uncached_count, timeout))
+    return rank_results(list(results))
+
+
+def run_local_dns_benchmark(rounds=3, **kw):
+    """Same benchmark against stand-in resolvers on loopback (fast, slow, flaky)."""
+    from local_endpoints import DnsStubServer
+
+    stubs = [
+        DnsStubServer(delay_ms=1, uncached_delay_ms=15),
+        DnsStubServer(delay_ms=8, uncached_delay_ms=40),
+        DnsStubServer(delay_ms=2, uncached_delay_ms=10, failure_rate=0.2),
+    ]
+    for stub in stubs:
+        stub.start()
+    try:
+        return run_dns_benchmark([stub.address for stub in stubs], rounds=rounds, timeout=0.5, **kw)
+    finally:
+        for stub in stubs:
+            stub.stop()
+
+
+def format_result(result):
+    if result['median'] is None:
+        return f"{result['server']}: no answers ({result['failure_rate']:.0f}% failed)"
+    text = (f"{result['server']}: median {result['median']:.1f} ms, P95 {result['p95']:.1f} ms, "
+            f"failures {result['failure_rate']:.1f}%")
+    if result['cached']['median'] is not None and result['uncached']['median'] is not None:
+        text += (f" (cached {result['cached']['median']:.1f} ms, "
+                 f"uncached {result['uncached']['median']:.1f} ms)")
+    return text
+
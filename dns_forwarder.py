@@ -0,0 +1,408 @@
+"""
+Local caching DNS forwarder for the PING Optimizer application.
+Answers repeat lookups from an in-memory LRU cache that honours record TTLs,
+refreshes frequently used entries shortly before they expire, and sends cache
+misses to several upstream resolvers at once, returning whichever answers first.
+The system resolver can then be pointed at it (see profiles.set_dns_servers).
+
+Runs an asyncio loop on its own thread; UDP only (truncated answers are passed
+through uncached so the client retries over TCP against its other servers).
+"""
+
+import time
+import struct
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+from dns_wire import (question_key, question_end, parse_header, record_ttls, with_id, is_truncated,
+                      RCODE_NOERROR, RCODE_NXDOMAIN)
+from dns_benchmark import ResolverClient, system_resolvers
+
+LISTEN_HOST = '127.0.0.1'
+LISTEN_PORT = 53
+CACHE_SIZE = 4096  # Entries
+MIN_TTL = 1
+MAX_TTL = 3600
+NEGATIVE_TTL = 30  # NXDOMAIN/NODATA answers without an SOA to take the TTL from
+PREFETCH_MIN_HITS = 2  # Hits since the last refresh that make an entry "hot"
+PREFETCH_FRACTION = 0.1  # Refresh hot entries in the last 10% of their TTL...
+PREFETCH_LEAD = 2.0  # ...but at least this many seconds before expiry
+RACE_WIDTH = 3  # Upstreams queried in parallel per miss (fastest first)
+UPSTREAM_TIMEOUT = 2.0
+TICK_INTERVAL = 0.5  # Prefetch scan period
+STATS_INTERVAL = 5.0
+RTT_SMOOTHING = 0.2  # EWMA weight of a new upstream RTT sample
+FALLBACK_UPSTREAMS = ['1.1.1.1', '8.8.8.8', '9.9.9.9']
+
+metrics_logger = logging.getLogger('metrics')
+
+
+class CacheEntry:
+    __slots__ = ('response', 'ttls', 'stored', 'expires', 'ttl', 'fetch_ms', 'hits', 'refreshing')
+
+    def __init__(self, response, ttls, ttl, fetch_ms, now):
+        self.response = response
+        self.ttls = ttls  # [(offset, original ttl)] for aging the answer
+        self.stored = now
+        self.ttl = ttl
+        self.expires = now + ttl
+        self.fetch_ms = fetch_ms  # Upstream round trip a hit avoids
+        self.hits = 0
+        self.refreshing = False
+
+    def reply(self, query_id, question, now):
+        # Cached answer for a new query: its ID and question casing, TTLs reduced by age
+        data = bytearray(self.response)
+        struct.pack_into('!H', data, 0, query_id)
+        end = question_end(self.response)
+        if question is not None and len(question) == end - 12:
+            data[12:end] = question
+        age = int(now - self.stored)
+        for offset, ttl in self.ttls:
+            struct.pack_into('!I', data, offset, max(0, ttl - age))
+        return bytes(data)
+
+
+def cache_ttl(response):
+    """How long an upstream answer may be cached, or None if it must not be."""
+    header = parse_header(response)
+    if header is None or header[2] not in (RCODE_NOERROR, RCODE_NXDOMAIN) or is_truncated(response):
+        return None, []
+    ttls = record_ttls(response)
+    # Negative answers normally carry the zone's SOA, whose TTL then applies
+    ttl = min(ttl for _, ttl in ttls) if ttls else NEGATIVE_TTL
+    if ttl <= 0:
+        return None, ttls
+    return max(MIN_TTL, min(MAX_TTL, ttl)), ttls
+
+
+class DnsCache:
+    """LRU of question key -> CacheEntry; expired entries are dropped on lookup."""
+
+    def __init__(self, capacity=CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def due_for_prefetch(self, now):
+        due = []
+        for key, entry in self.entries.items():
+            if entry.refreshing or entry.hits < PREFETCH_MIN_HITS or entry.expires <= now:
+                continue
+            if entry.expires - now <= max(PREFETCH_LEAD, entry.ttl * PREFETCH_FRACTION):
+                due.append(key)
+        return due
+
+
+class _ServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, forwarder):
+        self.forwarder = forwarder
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.forwarder.handle_query(data, addr)
+
+    def error_received(self, exc):
+        pass  # A client went away before its answer arrived
+
+
+class DnsForwarder:
+    """Caching, racing DNS forwarder listening on host:port (UDP).
+
+    on_stats(dict) is called every stats_interval seconds from the forwarder thread.
+    """
+
+    def __init__(self, upstreams, host=LISTEN_HOST, port=LISTEN_PORT, capacity=CACHE_SIZE,
+                 on_stats=None, stats_interval=STATS_INTERVAL, race_width=RACE_WIDTH,
+                 timeout=UPSTREAM_TIMEOUT):
+        # upstreams are "ip" or (ip, port) entries
+        self.upstreams = [(u, 53) if isinstance(u, str) else tuple(u) for u in upstreams]
+        if not self.upstreams:
+            raise ValueError("No upstream DNS servers")
+        self.host = host
+        self.port = port
+        self.cache = DnsCache(capacity)
+        self.on_stats = on_stats
+        self.stats_interval = stats_interval
+        self.race_width = race_width
+        self.timeout = timeout
+        self.clients = []
+        self.upstream_stats = {}  # "ip:port" -> {'srtt', 'wins', 'failures'}
+        self.in_flight = {}  # question key -> future shared by identical misses
+        self.counters = dict.fromkeys(
+            ('queries', 'hits', 'misses', 'coalesced', 'prefetches', 'failures'), 0)
+        self.latency_saved_ms = 0.0
+        self.started_at = None
+        self.loop = None
+        self.transport = None
+        self.bound_address = None
+        self.stopping = None
+        self.thread = None
+        self.error = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def address(self):
+        return self.bound_address or (self.host, self.port)
+
+    def start(self):
+        # Blocks until the socket is bound, so bind errors reach the caller
+        ready = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._thread_main, args=(ready,), name='DnsForwarder', daemon=True)
+        self.thread.start()
+        ready.wait(timeout=5)
+        if self.error is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+            raise self.error
+        return self
+
+    def stop(self):
+        if self.loop is not None and self.stopping is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.stopping.set)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.timeout + 2)
+        self.thread = None
+        if self.started_at is not None:
+            stats = self.stats()
+            metrics_logger.info(
+                f"DNS forwarder stopped - {format_forwarder_stats(stats)}",
+                extra={'session_data': {'dns_forwarder': stats}})
+            self.started_at = None
+
+    def stats(self):
+        counters = dict(self.counters)
+        answered = counters['hits'] + counters['misses']
+        return {
+            'time': time.time(),
+            'listen': f"{self.address[0]}:{self.address[1]}",
+            'uptime': round(time.monotonic() - self.started_at, 1) if self.started_at else 0,
+            **counters,
+            'entries': len(self.cache),
+            'hit_ratio': counters['hits'] / answered * 100 if answered else 0.0,
+            'latency_saved_ms': round(self.latency_saved_ms, 1),
+            'upstreams': {name: dict(values) for name, values in self.upstream_stats.items()},
+        }
+
+    def _thread_main(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        try:
+            loop.run_until_complete(self._main(ready))
+        except Exception as e:
+            if not ready.is_set():
+                self.error = e
+            else:
+                logging.error(f"DNS forwarder failed: {str(e)}")
+        finally:
+            ready.set()
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+            self.loop = None
+
+    async def _main(self, ready):
+        loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ServerProtocol(self), local_addr=(self.host, self.port))
+        self.bound_address = self.transport.get_extra_info('sockname')[:2]
+        try:
+            for address, port in self.upstreams:
+                client = ResolverClient(address, port, self.timeout, max_in_flight=256)
+                await client.open()
+                self.clients.append(client)
+                self.upstream_stats[f"{address}:{port}"] = {'srtt': None, 'wins': 0, 'failures': 0}
+            self.started_at = time.monotonic()
+            logging.info(f"DNS forwarder listening on {self.bound_address[0]}:{self.bound_address[1]}")
+            ready.set()
+
+            next_stats = time.monotonic() + self.stats_interval
+            while not self.stopping.is_set():
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), TICK_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                now = time.monotonic()
+                for key in self.cache.due_for_prefetch(now):
+                    self._refresh(key)
+                if self.on_stats and now >= next_stats:
+                    next_stats = now + self.stats_interval
+                    self.on_stats(self.stats())
+        finally:
+            self.transport.close()
+            for client in self.clients:
+                client.close()
+            self.clients = []
+
+    def handle_query(self, data, addr):
+        header = parse_header(data)
+        key = question_key(data)
+        if header is None or header[1] or key is None:
+            return  # Not a query we can answer
+        self.counters['queries'] += 1
+        now = time.monotonic()
+        entry = self.cache.get(key, now)
+        if entry is not None:
+            entry.hits += 1
+            self.counters['hits'] += 1
+            self.latency_saved_ms += entry.fetch_ms
+            self.transport.sendto(entry.reply(header[0], data[12:question_end(data)], now), addr)
+            return
+        self.counters['misses'] += 1
+        asyncio.ensure_future(self._answer_miss(key, data, header[0], addr))
+
+    async def _answer_miss(self, key, query, query_id, addr):
+        future = self.in_flight.get(key)
+        if future is None:
+            future = self.in_flight[key] = asyncio.ensure_future(self._resolve(key, query))
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.counters['coalesced'] += 1
+        response = await asyncio.shield(future)
+        if response is None:
+            self.counters['failures'] += 1
+            return  # Let the client time out and fall back to its next server
+        self.transport.sendto(with_id(response, query_id), addr)
+
+    def _refresh(self, key):
+        entry = self.cache.entries.get(key)
+        if entry is None or key in self.in_flight:
+            return
+        entry.refreshing = True
+        self.counters['prefetches'] += 1
+        # Rebuild a query from the cached answer's question section
+        query = entry.response[:2] + b'\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00' + \
+            entry.response[12:question_end(entry.response)]
+        future = self.in_flight[key] = asyncio.ensure_future(self._resolve(key, query))
+        future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+    async def _resolve(self, key, query):
+        """Race the fastest upstreams; cache and return the first usable answer (or None)."""
+        clients = sorted(self.clients, key=self._client_rank)[:self.race_width]
+        tasks = [asyncio.ensure_future(self._ask(client, query)) for client in clients]
+        fallback = None
+        # Losing queries are left to finish: their RTTs keep every upstream's ranking current
+        for next_done in asyncio.as_completed(tasks):
+            client, response, rtt = await next_done
+            header = parse_header(response) if response is not None else None
+            if header is None:
+                continue
+            if header[2] not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+                fallback = fallback or response  # SERVFAIL/REFUSED: hope another does better
+                continue
+            self.upstream_stats[self._name(client)]['wins'] += 1
+            self._store(key, response, rtt)
+            return response
+        return fallback
+
+    async def _ask(self, client, query):
+        response, rtt, _ = await client.exchange(query)
+        stats = self.upstream_stats[self._name(client)]
+        if response is None:
+            stats['failures'] += 1
+        else:
+            srtt = stats['srtt']
+            stats['srtt'] = rtt if srtt is None else srtt + RTT_SMOOTHING * (rtt - srtt)
+        return client, response, rtt
+
+    def _store(self, key, response, fetch_ms):
+        try:
+            ttl, ttls = cache_ttl(response)
+        except (ValueError, IndexError, struct.error):
+            return  # Malformed answer: forward it, don't cache it
+        if ttl is None:
+            self.cache.entries.pop(key, None)
+            return
+        self.cache.put(key, CacheEntry(response, ttls, ttl, fetch_ms, time.monotonic()))
+
+    def _client_rank(self, client):
+        # Unmeasured upstreams first so every one gets measured, then by smoothed RTT
+        srtt = self.upstream_stats[self._name(client)]['srtt']
+        return (srtt is not None, srtt or 0.0)
+
+    @staticmethod
+    def _name(client):
+        return f"{client.server}:{client.port}"
+
+
+def default_upstreams(listen_host=LISTEN_HOST):
+    # The configured resolvers (never the forwarder itself) plus public ones to race against
+    configured = [server for server in system_resolvers() if server != listen_host]
+    return list(dict.fromkeys(configured + FALLBACK_UPSTREAMS))
+
+
+def format_forwarder_stats(stats):
+    return (f"{stats['queries']} queries - hit ratio {stats['hit_ratio']:.1f}% - "
+            f"saved {stats['latency_saved_ms'] / 1000:.2f} s - {stats['prefetches']} prefetched - "
+            f"{stats['entries']} cached")
+
+
+def run_local_forwarder_check(duration=6.0, names=20):
+    """Run a forwarder against stand-in upstreams on loopback and return its stats.
+
+    Names are queried repeatedly for duration seconds with a 3 s upstream TTL, so
+    the result shows cache hits, prefetch refreshes and which upstream won races.
+    """
+    from local_endpoints import DnsStubServer
+
+    upstreams = [
+        DnsStubServer(delay_ms=5, uncached_delay_ms=30, ttl=3),
+        DnsStubServer(delay_ms=15, uncached_delay_ms=60, ttl=3),
+    ]
+    for stub in upstreams:
+        stub.start()
+    forwarder = DnsForwarder([stub.address for stub in upstreams], port=0)
+    try:
+        forwarder.start()
+
+        async def client_load():
+            client = ResolverClient(*forwarder.address, timeout=1.0, max_in_flight=names)
+            await client.open()
+            try:
+                end = time.monotonic() + duration
+                while time.monotonic() < end:
+                    await asyncio.gather(*(client.query(f"host{i}.example.com") for i in range(names)))
+                    await asyncio.sleep(0.25)
+            finally:
+                client.close()
+
+        asyncio.run(client_load())
+        return forwarder.stats()
+    finally:
+        forwarder.stop()
+        for stub in upstreams:
+            stub.stop()
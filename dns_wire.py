@@ -0,0 +1,122 @@
+"""
+Minimal DNS wire-format helpers for the PING Optimizer application.
+Just enough of RFC 1035 to build queries and read response headers; no
+dependency on a full DNS library.
+"""
+
+import struct
+
+HEADER = struct.Struct('!HHHHHH')  # id, flags, qdcount, ancount, nscount, arcount
+RECORD = struct.Struct('!HHIH')  # type, class, ttl, rdlength (after the owner name)
+QTYPE_A = 1
+QTYPE_NS = 2
+QTYPE_AAAA = 28
+QTYPE_OPT = 41  # EDNS pseudo-record; its "TTL" field holds flags, not a lifetime
+QCLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+RCODE_NAMES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+
+def encode_name(name):
+    labels = [label for label in name.rstrip('.').split('.') if label]
+    return b''.join(bytes([len(label)]) + label.encode('idna') for label in labels) + b'\x00'
+
+
+def build_query(name, query_id, qtype=QTYPE_A):
+    # Standard query with recursion desired
+    return HEADER.pack(query_id, 0x0100, 1, 0, 0, 0) + encode_name(name) + struct.pack('!HH', qtype, QCLASS_IN)
+
+
+def parse_header(data):
+    """(id, is_response, rcode, answer_count) or None for a truncated packet."""
+    if len(data) < HEADER.size:
+        return None
+    query_id, flags, _, ancount, _, _ = HEADER.unpack_from(data)
+    return query_id, bool(flags & 0x8000), flags & 0x000F, ancount
+
+
+def skip_name(data, offset):
+    # Returns the offset just past an encoded (possibly compressed) name
+    while offset < len(data):
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += 1 + length
+    raise ValueError("truncated name")
+
+
+def read_name(data, offset):
+    # Decoded name starting at offset, following compression pointers
+    labels = []
+    for _ in range(128):
+        length = data[offset]
+        if length == 0:
+            break
+        if length & 0xC0 == 0xC0:
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        labels.append(data[offset + 1:offset + 1 + length].decode('ascii', 'replace'))
+        offset += 1 + length
+    return '.'.join(labels).lower()
+
+
+def question_key(data):
+    """(name, qtype, qclass) of the first question, or None."""
+    try:
+        if len(data) < HEADER.size or HEADER.unpack_from(data)[2] < 1:
+            return None
+        name = read_name(data, HEADER.size)
+        end = skip_name(data, HEADER.size)
+        qtype, qclass = struct.unpack_from('!HH', data, end)
+        return name, qtype, qclass
+    except (IndexError, ValueError, struct.error):
+        return None
+
+
+def with_id(packet, query_id):
+    return struct.pack('!H', query_id) + packet[2:]
+
+
+def is_truncated(data):
+    return len(data) >= HEADER.size and bool(HEADER.unpack_from(data)[1] & 0x0200)
+
+
+def question_end(data):
+    # Offset just past the (single) question section
+    return skip_name(data, HEADER.size) + 4
+
+
+def record_ttls(data):
+    """[(offset of the TTL field, ttl)] for every resource record except EDNS OPT."""
+    _, _, qdcount, ancount, nscount, arcount = HEADER.unpack_from(data)
+    offset = HEADER.size
+    for _ in range(qdcount):
+        offset = skip_name(data, offset) + 4
+    ttls = []
+    for _ in range(ancount + nscount + arcount):
+        offset = skip_name(data, offset)
+        rtype, _, ttl, rdlength = RECORD.unpack_from(data, offset)
+        if rtype != QTYPE_OPT:
+            ttls.append((offset + 4, ttl))
+        offset += RECORD.size + rdlength
+    if offset > len(data):
+        raise ValueError("truncated record")
+    return ttls
+
+
+def build_response(query, answer_ip=None, ttl=60, rcode=RCODE_NOERROR):
+    """Response echoing query's question, with one A record when answer_ip is given."""
+    query_id, flags, _, _, _, _ = HEADER.unpack_from(query)
+    question = query[HEADER.size:skip_name(query, HEADER.size) + 4]
+    answers = b''
+    if answer_ip is not None and rcode == RCODE_NOERROR:
+        rdata = bytes(int(part) for part in answer_ip.split('.'))
+        answers = struct.pack('!HHHIH', 0xC00C, QTYPE_A, QCLASS_IN, ttl, len(rdata)) + rdata
+    flags = 0x8180 | (flags & 0x0100) | rcode  # Response, recursion available
+    return HEADER.pack(query_id, flags, 1, 1 if answers else 0, 0, 0) + question + answers
@@ -0,0 +1,246 @@
+"""
+Game server discovery for the PING Optimizer application.
+Finds the remote endpoints a running process (picked by name or PID) is talking to,
+keeps that set current as connections come and go, and probes them so latency is
+measured against the actual game servers instead of a fixed public resolver.
+
+TCP endpoints are timed with a TCP handshake. UDP endpoints are probed with
+sequenced datagrams, which only servers (or the bundled reflector) that echo
+traffic answer; UDP endpoints that never reply are left out of the aggregate.
+These are third-party servers, so they are probed every two seconds rather than
+every second, and endpoints that stop counting are probed with an exponential
+backoff (up to once a minute) instead of on every round.
+"""
+
+import time
+import socket
+import logging
+import threading
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+from probes import TcpConnectProbe, UdpEchoProbe
+from latency_stats import percentile
+
+REFRESH_INTERVAL = 2.0
+PROBE_INTERVAL = 2.0  # Gentler than the 1 s ping: these servers aren't ours to load
+PROBE_TIMEOUT = 1.0
+MAX_ENDPOINTS = 16
+UNRESPONSIVE_AFTER = 5  # Consecutive UDP losses before an endpoint stops counting
+MAX_BACKOFF = 60.0  # Longest gap between probes of an unresponsive endpoint
+
+
+def find_processes(name_or_pid):
+    """Running processes matching a PID or an executable name (".exe" optional)."""
+    text = str(name_or_pid).strip()
+    if text.isdigit():
+        try:
+            return [psutil.Process(int(text))]
+        except psutil.Error:
+            return []
+    wanted = text.lower()
+    if wanted.endswith('.exe'):
+        wanted = wanted[:-4]
+    matches = []
+    for process in psutil.process_iter(['name']):
+        name = (process.info['name'] or '').lower()
+        if name.endswith('.exe'):
+            name = name[:-4]
+        if name == wanted:
+            matches.append(process)
+    return matches
+
+
+def is_remote(ip, include_loopback=False):
+    try:
+        address = ipaddress.ip_address(ip.split('%')[0])
+    except ValueError:
+        return False
+    if address.is_loopback:
+        return include_loopback
+    return not (address.is_unspecified or address.is_multicast)
+
+
+def process_endpoints(pids, include_loopback=False):
+    """{(protocol, ip, port)} of remote peers for the given PIDs.
+
+    include_loopback keeps 127.0.0.1/::1 peers (for testing against local stand-ins).
+    """
+    pids = set(pids)
+    try:
+        # One system-wide call is far cheaper than asking each process
+        connections = [c for c in psutil.net_connections(kind='inet') if c.pid in pids]
+    except psutil.AccessDenied:
+        # macOS (and restricted Linux) only allow per-process queries for our own processes
+        connections = []
+        for pid in pids:
+            try:
+                connections.extend(psutil.Process(pid).connections(kind='inet'))
+            except psutil.Error:
+                continue
+    endpoints = set()
+    for conn in connections:
+        if not conn.raddr or not is_remote(conn.raddr.ip, include_loopback):
+            continue  # Unconnected UDP sockets have no peer to probe
+        if conn.type == socket.SOCK_STREAM:
+            if conn.status != psutil.CONN_ESTABLISHED:
+                continue
+            endpoints.add(('tcp', conn.raddr.ip, conn.raddr.port))
+        else:
+            endpoints.add(('udp', conn.raddr.ip, conn.raddr.port))
+    return endpoints
+
+
+def format_endpoint(endpoint):
+    protocol, ip, port = endpoint
+    host = f"[{ip}]" if ':' in ip else ip
+    return f"{protocol.upper()} {host}:{port}"
+
+
+class EndpointProbe:
+    def __init__(self, endpoint, timeout=PROBE_TIMEOUT):
+        protocol, ip, port = endpoint
+        self.endpoint = endpoint
+        if protocol == 'tcp':
+            self.probe_impl = TcpConnectProbe((ip, port), timeout=timeout)
+        else:
+            self.probe_impl = UdpEchoProbe((ip, port), timeout=timeout)
+        self.consecutive_losses = 0
+        self.replied = False
+        self.last_rtt = None
+        self.period = None  # Seconds until the next probe, set by schedule()
+        self.next_due = 0.0
+
+    @property
+    def responsive(self):
+        # UDP peers that have never echoed anything are not a latency signal
+        return self.replied or self.consecutive_losses < UNRESPONSIVE_AFTER
+
+    def probe(self):
+        rtt = self.probe_impl.probe()
+        self.last_rtt = rtt
+        if rtt is None:
+            self.consecutive_losses += 1
+        else:
+            self.consecutive_losses = 0
+            self.replied = True
+        return rtt
+
+    def schedule(self, now, interval):
+        # Doubles the period for every loss past UNRESPONSIVE_AFTER; one reply restores it
+        if self.responsive:
+            self.period = interval
+        else:
+            doublings = min(self.consecutive_losses - UNRESPONSIVE_AFTER + 1, 16)
+            self.period = min(MAX_BACKOFF, interval * 2 ** doublings)
+        self.next_due = now + self.period
+
+    def close(self):
+        self.probe_impl.close()
+
+
+class GameEndpointMonitor:
+    """Tracks a process's remote endpoints and probes them every interval.
+
+    on_sample(rtt_ms or None) receives the median RTT across responsive endpoints
+    each round (the same contract as PingMonitor); on_endpoints(list) receives the
+    per-endpoint state whenever a round completes.
+    """
+
+    def __init__(self, process_name, on_sample=None, on_endpoints=None,
+                 interval=PROBE_INTERVAL, refresh_interval=REFRESH_INTERVAL, include_loopback=False):
+        self.process_name = process_name
+        self.include_loopback = include_loopback
+        self.on_sample = on_sample
+        self.on_endpoints = on_endpoints
+        self.interval = interval
+        self.refresh_interval = refresh_interval
+        self.probes = {}  # endpoint -> EndpointProbe
+        self.pids = []
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.executor = None
+        self.last_refresh = 0.0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.stop_event.clear()
+        self.executor = ThreadPoolExecutor(max_workers=MAX_ENDPOINTS, thread_name_prefix='endpoint-probe')
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=PROBE_TIMEOUT + 2)
+        self.thread = None
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        for probe in self.probes.values():
+            probe.close()
+        self.probes = {}
+
+    def refresh_endpoints(self):
+        # Re-resolve the process too, so a game restart is picked up
+        processes = find_processes(self.process_name)
+        self.pids = [process.pid for process in processes]
+        current = process_endpoints(self.pids, self.include_loopback) if self.pids else set()
+        for endpoint in set(self.probes) - current:
+            self.probes.pop(endpoint).close()
+            logging.info(f"Game endpoint closed: {format_endpoint(endpoint)}")
+        for endpoint in sorted(current - set(self.probes))[:MAX_ENDPOINTS - len(self.probes)]:
+            try:
+                self.probes[endpoint] = EndpointProbe(endpoint)
+            except OSError as e:
+                logging.error(f"Cannot probe {format_endpoint(endpoint)}: {str(e)}")
+                continue
+            logging.info(f"Game endpoint discovered: {format_endpoint(endpoint)}")
+        self.last_refresh = time.monotonic()
+
+    def probe_round(self, now=None):
+        """Probe the endpoints due at now (the round's scheduled monotonic time).
+
+        Returns (median RTT of responsive endpoints or None, whether any endpoint counts).
+        """
+        now = time.monotonic() if now is None else now
+        probes = list(self.probes.values())
+        if not probes:
+            if self.on_endpoints:
+                self.on_endpoints([])
+            return None, False
+        due = [probe for probe in probes if probe.next_due <= now]
+        rtts = list(self.executor.map(lambda probe: probe.probe(), due))
+        for probe in due:
+            probe.schedule(now, self.interval)
+        if self.on_endpoints:
+            self.on_endpoints([
+                {'endpoint': format_endpoint(probe.endpoint), 'rtt': probe.last_rtt, 'responsive': probe.responsive,
+                 'period': probe.period}
+                for probe in probes
+            ])
+        counted = [rtt for probe, rtt in zip(due, rtts) if probe.responsive]
+        answered = [rtt for rtt in counted if rtt is not None]
+        return (percentile(answered, 50) if answered else None), bool(counted)
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                if time.monotonic() - self.last_refresh >= self.refresh_interval:
+                    self.refresh_endpoints()
+                # Unresponsive peers are still probed (backed off) in case they start answering,
+                # but a round with nothing that counts is not reported as loss
+                rtt, counted = self.probe_round(next_time)
+                if counted and self.on_sample:
+                    self.on_sample(rtt)
+            except Exception as e:
+                logging.error(f"Error probing game endpoints: {str(e)}")
+            next_time += self.interval
+            self.stop_event.wait(max(0.0, next_time - time.monotonic()))
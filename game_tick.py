@@ -0,0 +1,281 @@
+"""
+Game-tick traffic simulator for the PING Optimizer application.
+Sends small timestamped UDP packets at a game's tick rate to a reflector while the
+reflector streams its own ticks back, the way client input and server snapshots
+flow during a match. Each direction is measured at tick resolution:
+
+- one-way-delay variation (delay above the fastest packet of the run; the clocks
+  of the two ends never need to agree, only to tick at the same rate)
+- reordering, duplicates and loss
+- late packets: delayed by more than one tick interval, i.e. too late for the
+  tick they belonged to
+
+The reflector is local_endpoints.TickReflector, run in-process, as a separate
+process (`tcp_optimizer_cli.py tick-reflector`) or on another machine.
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import logging
+import threading
+import subprocess
+
+from latency_stats import summarize, percentile
+from pacing import Pacer
+
+# magic, type, flags, session, sequence, timestamp 1, timestamp 2
+TICK_HEADER = struct.Struct('!2sBBIIqq')
+TICK_MAGIC = b'GT'
+MSG_START, MSG_UP, MSG_ACK, MSG_DOWN, MSG_START_ACK, MSG_STOP, MSG_STOP_ACK = range(7)
+
+DEFAULT_TICK_RATE = 64
+DEFAULT_PACKET_SIZE = 64
+DEFAULT_DURATION = 10.0
+TICK_RATES = (20, 30, 60, 64, 128)
+MAX_TICK_RATE = 1000
+GRACE_PERIOD = 0.5  # Seconds to wait for stragglers after the last tick
+CONTROL_TIMEOUT = 1.0
+IDLE_TIMEOUT = 3.0  # Reflector ends a stream when the client goes quiet this long
+
+metrics_logger = logging.getLogger('metrics')
+
+
+def pack_tick(msg_type, session, sequence, ts1=0, ts2=0, size=0):
+    packet = TICK_HEADER.pack(TICK_MAGIC, msg_type, 0, session, sequence & 0xFFFFFFFF, ts1, ts2)
+    return packet + b'\x00' * max(0, size - len(packet))
+
+
+def unpack_tick(data):
+    # (type, session, sequence, ts1, ts2) or None for anything that isn't a tick packet
+    if len(data) < TICK_HEADER.size:
+        return None
+    magic, msg_type, _, session, sequence, ts1, ts2 = TICK_HEADER.unpack_from(data)
+    if magic != TICK_MAGIC:
+        return None
+    return msg_type, session, sequence, ts1, ts2
+
+
+class StreamStats:
+    """Arrival statistics for one direction of a tick stream."""
+
+    def __init__(self, tick_interval_ms):
+        self.tick_interval_ms = tick_interval_ms
+        self.delays = []  # Raw one-way delay (ms, includes the unknown clock offset)
+        self.seen = set()
+        self.highest = -1
+        self.reordered = 0
+        self.duplicates = 0
+        self.jitter = 0.0  # RFC 3550 interarrival jitter estimate
+        self.previous_delay = None
+
+    def add(self, sequence, send_ns, receive_ns):
+        if sequence in self.seen:
+            self.duplicates += 1
+            return
+        self.seen.add(sequence)
+        if sequence < self.highest:
+            self.reordered += 1
+        else:
+            self.highest = sequence
+        delay = (receive_ns - send_ns) / 1e6
+        if self.previous_delay is not None:
+            self.jitter += (abs(delay - self.previous_delay) - self.jitter) / 16
+        self.previous_delay = delay
+        self.delays.append(delay)
+
+    def result(self, sent, late_ms=None):
+        late_ms = self.tick_interval_ms if late_ms is None else late_ms
+        received = len(self.seen)
+        sent = max(sent, received)
+        result = {
+            'sent': sent,
+            'received': received,
+            'loss': (sent - received) / sent * 100 if sent else 0.0,
+            'reordered': self.reordered / received * 100 if received else 0.0,
+            'duplicates': self.duplicates,
+            'jitter': self.jitter,
+            'late': None,
+            'delay_variation': None,
+        }
+        if self.delays:
+            # Delay above the best case of the run; the clock offset cancels out
+            baseline = min(self.delays)
+            variation = [delay - baseline for delay in self.delays]
+            late = sum(1 for value in variation if value > late_ms)
+            result['late'] = late / received * 100
+            result['delay_variation'] = {
+                'p50': percentile(variation, 50),
+                'p95': percentile(variation, 95),
+                'p99': percentile(variation, 99),
+                'max': max(variation),
+            }
+        result['late_threshold_ms'] = late_ms
+        return result
+
+
+class TickSimulator:
+    """Runs one bidirectional tick stream against a reflector and returns the results."""
+
+    def __init__(self, address, rate=DEFAULT_TICK_RATE, size=DEFAULT_PACKET_SIZE,
+                 duration=DEFAULT_DURATION, late_ms=None):
+        if not 1 <= rate <= MAX_TICK_RATE:
+            raise ValueError(f"Tick rate must be between 1 and {MAX_TICK_RATE} Hz")
+        self.address = address
+        self.rate = rate
+        self.size = max(size, TICK_HEADER.size)
+        self.duration = duration
+        self.late_ms = late_ms
+        self.interval_ms = 1000.0 / rate
+        self.session = int.from_bytes(os.urandom(4), 'big')
+        family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.connect(address)
+        # Room for a full test's worth of packets if the receiver falls behind
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.up = StreamStats(self.interval_ms)
+        self.down = StreamStats(self.interval_ms)
+        self.round_trips = []
+        self.sent = 0
+        self.control = {}  # Replies to control messages, by type
+        self.control_event = threading.Event()
+        self.stop_event = threading.Event()
+
+    def control_exchange(self, msg_type, reply_type, sequence=0, ts1=0, ts2=0, attempts=3):
+        for _ in range(attempts):
+            self.control_event.clear()
+            try:
+                self.sock.send(pack_tick(msg_type, self.session, sequence, ts1, ts2))
+            except OSError:
+                pass
+            if self.control_event.wait(CONTROL_TIMEOUT) and reply_type in self.control:
+                return self.control[reply_type]
+        return None
+
+    def receive(self):
+        while not self.stop_event.is_set():
+            try:
+                data = self.sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self.stop_event.is_set():
+                    break
+                continue
+            now = time.perf_counter_ns()
+            message = unpack_tick(data)
+            if message is None or message[1] != self.session:
+                continue
+            msg_type, _, sequence, ts1, ts2 = message
+            if msg_type == MSG_ACK:
+                # ts1: our send time, ts2: the reflector's receive time
+                self.up.add(sequence, ts1, ts2)
+                self.round_trips.append((now - ts1) / 1e6)
+            elif msg_type == MSG_DOWN:
+                self.down.add(sequence, ts1, now)
+            elif msg_type in (MSG_START_ACK, MSG_STOP_ACK):
+                self.control[msg_type] = message
+                self.control_event.set()
+
+    def run(self):
+        self.sock.settimeout(0.2)
+        receiver = threading.Thread(target=self.receive, name='TickReceiver', daemon=True)
+        receiver.start()
+        try:
+            # The reflector streams back at the same rate and size for the same duration
+            if self.control_exchange(MSG_START, MSG_START_ACK, self.rate,
+                                     int(self.duration * 1000), self.size) is None:
+                raise TimeoutError(f"No tick reflector answering at {self.address[0]}:{self.address[1]}")
+            pacer = Pacer(1.0 / self.rate).start()
+            total = int(self.duration * self.rate)
+            for sequence in range(total):
+                if pacer.wait(self.stop_event) is None:
+                    break
+                try:
+                    self.sock.send(pack_tick(MSG_UP, self.session, sequence, time.perf_counter_ns(), size=self.size))
+                except OSError:
+                    pass  # Counts as lost
+                self.sent += 1
+            time.sleep(GRACE_PERIOD)
+            stop_ack = self.control_exchange(MSG_STOP, MSG_STOP_ACK)
+        finally:
+            self.stop_event.set()
+            receiver.join(timeout=1)
+            self.sock.close()
+
+        # STOP_ACK carries the reflector's counts: ticks it sent down, ticks it received
+        down_sent = stop_ack[2] if stop_ack else self.down.highest + 1
+        up_received = stop_ack[3] if stop_ack else None
+        upstream = self.up.result(self.sent, self.late_ms)
+        if up_received is not None:
+            # Lost acks aren't upstream loss; the reflector's own count is exact
+            upstream['received'] = min(up_received, self.sent)
+            upstream['loss'] = (self.sent - upstream['received']) / self.sent * 100 if self.sent else 0.0
+        return {
+            'target': f"{self.address[0]}:{self.address[1]}",
+            'time': time.time(),
+            'rate': self.rate,
+            'size': self.size,
+            'duration': self.duration,
+            'skipped_ticks': pacer.skipped,
+            'upstream': upstream,
+            'downstream': self.down.result(down_sent, self.late_ms),
+            'rtt': summarize(self.round_trips, self.sent),
+        }
+
+
+def run_tick_test(address, rate=DEFAULT_TICK_RATE, size=DEFAULT_PACKET_SIZE, duration=DEFAULT_DURATION,
+                  late_ms=None):
+    result = TickSimulator(address, rate, size, duration, late_ms).run()
+    metrics_logger.info(
+        f"Tick test {rate} Hz x {result['size']} B - {format_result(result)}",
+        extra={'session_data': {'tick_tests': result}})
+    return result
+
+
+def start_reflector_process(host='127.0.0.1'):
+    """Start `tcp_optimizer_cli.py tick-reflector` on a free port; returns (process, address)."""
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tcp_optimizer_cli.py')
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    process = subprocess.Popen([sys.executable, cli, 'tick-reflector', '--no-metrics', '--host', host, '--port', '0'],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, **kwargs)
+    # The reflector prints its bound address first
+    line = process.stdout.readline().split()
+    if not line or ':' not in line[-1]:
+        process.kill()
+        raise RuntimeError("Tick reflector failed to start")
+    address, _, port = line[-1].rpartition(':')
+    return process, (address, int(port))
+
+
+def run_local_tick_test(rate=DEFAULT_TICK_RATE, size=DEFAULT_PACKET_SIZE, duration=DEFAULT_DURATION,
+                        late_ms=None, separate_process=True):
+    """Tick test against a reflector on loopback, by default in its own process
+    so it doesn't compete with the simulator for the interpreter."""
+    if separate_process:
+        process, address = start_reflector_process()
+        try:
+            return run_tick_test(address, rate, size, duration, late_ms)
+        finally:
+            process.terminate()
+            process.wait(timeout=5)
+    from local_endpoints import TickReflector
+    with TickReflector() as reflector:
+        return run_tick_test(reflector.address, rate, size, duration, late_ms)
+
+
+def format_direction(stats):
+    if not stats['received']:
+        return f"no packets ({stats['loss']:.0f}% loss)"
+    variation = stats['delay_variation']
+    return (f"delay variation P50/P95/P99 {variation['p50']:.1f}/{variation['p95']:.1f}/"
+            f"{variation['p99']:.1f} ms - late {stats['late']:.1f}% - loss {stats['loss']:.1f}% - "
+            f"reordered {stats['reordered']:.1f}%")
+
+
+def format_result(result):
+    return f"Up: {format_direction(result['upstream'])} | Down: {format_direction(result['downstream'])}"
@@ -0,0 +1,178 @@
+"""
+Guarded profile apply for the PING Optimizer application.
+Measures a baseline window, snapshots the live settings, applies the profile and
+then keeps watching latency and loss for a probation period. A statistically
+significant regression (a rank test on latency, a proportion test on loss, each
+with a minimum effect size) reverts the profile and restores the snapshot.
+The decision and the evidence behind it are recorded in the session.
+
+Samples come from whatever is measuring: feed every RTT (None for a lost probe)
+to add_sample() from any thread.
+"""
+
+import time
+import logging
+import threading
+
+import profiles
+from latency_stats import summarize, percentile, mann_whitney_greater, proportion_greater
+from settings_drift import profile_settings, live_value
+from tcp_health import read_tcp_counters, counter_rates
+
+BASELINE_SECONDS = 30.0
+PROBATION_SECONDS = 60.0
+CHECK_EVERY = 5.0  # Seconds between regression checks during probation
+MIN_SAMPLES = 20  # Per window, before anything is concluded
+ALPHA = 0.01  # Strict, since probation is checked repeatedly
+MIN_INCREASE_MS = 2.0  # A regression must also be big enough to matter...
+MIN_INCREASE_PERCENT = 10.0  # ...in absolute and relative terms
+MIN_LOSS_INCREASE = 2.0  # Percentage points
+
+metrics_logger = logging.getLogger('metrics')
+
+
+def take_snapshot(profile):
+    # Live values of the TCP globals the profile is about to change (empty off Windows)
+    live = profiles.read_tcp_globals()
+    snapshot = {}
+    for parameter in profile_settings(profile):
+        value = live_value(live, parameter)
+        if value is not None:
+            snapshot[parameter] = value
+    return snapshot
+
+
+def evaluate(baseline, probation):
+    """Compare two windows of samples (None = lost); returns the evidence and a verdict."""
+    before = [rtt for rtt in baseline if rtt is not None]
+    after = [rtt for rtt in probation if rtt is not None]
+    lost_before, lost_after = len(baseline) - len(before), len(probation) - len(after)
+    evidence = {
+        'baseline': summarize(before, len(baseline)),
+        'probation': summarize(after, len(probation)),
+        'latency_p': None,
+        'loss_p': None,
+        'regression': None,
+    }
+    if len(baseline) < MIN_SAMPLES or len(probation) < MIN_SAMPLES:
+        return evidence
+    loss_increase = evidence['probation']['loss'] - evidence['baseline']['loss']
+    evidence['loss_p'] = proportion_greater(lost_before, len(baseline), lost_after, len(probation))
+    if evidence['loss_p'] < ALPHA and loss_increase >= MIN_LOSS_INCREASE:
+        evidence['regression'] = f"loss rose from {evidence['baseline']['loss']:.1f}% to {evidence['probation']['loss']:.1f}%"
+        return evidence
+    if len(before) >= MIN_SAMPLES and len(after) >= MIN_SAMPLES:
+        evidence['latency_p'] = mann_whitney_greater(before, after)
+        median_before, median_after = percentile(before, 50), percentile(after, 50)
+        threshold = max(MIN_INCREASE_MS, median_before * MIN_INCREASE_PERCENT / 100)
+        if evidence['latency_p'] < ALPHA and median_after - median_before >= threshold:
+            evidence['regression'] = f"median latency rose from {median_before:.1f} to {median_after:.1f} ms"
+    return evidence
+
+
+class GuardedApply:
+    """Applies one profile under watch; run() blocks until the decision.
+
+    on_phase(phase, detail) is called from the running thread at 'baseline',
+    'probation' and the final decision: 'kept', 'reverted', 'aborted', 'failed'
+    or 'cancelled'.
+    """
+
+    def __init__(self, name, baseline=BASELINE_SECONDS, probation=PROBATION_SECONDS, on_phase=None):
+        self.profile = profiles.get_profile(name)
+        self.baseline_seconds = baseline
+        self.probation_seconds = probation
+        self.on_phase = on_phase
+        self.samples = {'baseline': [], 'probation': []}
+        self.phase = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def add_sample(self, rtt):
+        with self.lock:
+            window = self.samples.get(self.phase)
+            if window is not None:
+                window.append(rtt)
+
+    def cancel(self):
+        # Ends the current window early; whatever was applied stays applied
+        self.stop_event.set()
+
+    def enter(self, phase, detail=""):
+        with self.lock:
+            self.phase = phase
+        if self.on_phase:
+            self.on_phase(phase, detail)
+
+    def window(self, phase):
+        with self.lock:
+            return list(self.samples[phase])
+
+    def run(self):
+        name = self.profile.name
+        record = {'time': time.time(), 'profile': name, 'baseline_seconds': self.baseline_seconds,
+                  'probation_seconds': self.probation_seconds, 'snapshot': None, 'evidence': None,
+                  'stack_health': None, 'decision': None, 'reason': None}
+        self.enter('baseline', f"measuring {self.baseline_seconds:.0f} s of baseline latency")
+        counters_start = read_tcp_counters()
+        started = time.monotonic()
+        if self.stop_event.wait(self.baseline_seconds):
+            return self.finish(record, 'cancelled', "cancelled before anything was applied")
+        baseline = self.window('baseline')
+        if len(baseline) < MIN_SAMPLES:
+            return self.finish(record, 'aborted', f"only {len(baseline)} baseline samples; nothing applied")
+
+        record['snapshot'] = take_snapshot(self.profile)
+        counters_baseline = read_tcp_counters()
+        baseline_end = time.monotonic()
+        result = profiles.apply_profile(name)
+        if not result['successful']:
+            return self.finish(record, 'failed', f"no {self.profile.title} command succeeded")
+        # Probation is timed from when the commands have run; a slow apply must not shorten it
+        counters_applied = read_tcp_counters()
+        applied_at = time.monotonic()
+
+        self.enter('probation', f"watching latency for {self.probation_seconds:.0f} s")
+        deadline = applied_at + self.probation_seconds
+        evidence = evaluate(baseline, [])
+        while not self.stop_event.wait(max(0.0, min(CHECK_EVERY, deadline - time.monotonic()))):
+            evidence = evaluate(baseline, self.window('probation'))
+            if evidence['regression'] or time.monotonic() >= deadline:
+                break
+        evidence = evaluate(baseline, self.window('probation'))
+        record['evidence'] = evidence
+        now = time.monotonic()
+        counters_end = read_tcp_counters()
+        record['stack_health'] = {
+            'before': counter_rates(counters_start, counters_baseline, baseline_end - started),
+            'after': counter_rates(counters_applied, counters_end, now - applied_at),
+        }
+        if self.stop_event.is_set() and not evidence['regression']:
+            return self.finish(record, 'kept', "probation cut short; settings left applied")
+        if not evidence['regression']:
+            return self.finish(record, 'kept', "no significant regression")
+
+        profiles.revert_profile(name)
+        if record['snapshot']:
+            # The profile's revert commands set defaults; put back the exact values from before
+            profiles.reapply_settings(record['snapshot'], reason='guard')
+        return self.finish(record, 'reverted', evidence['regression'])
+
+    def finish(self, record, decision, reason):
+        record['decision'] = decision
+        record['reason'] = reason
+        metrics_logger.info(f"Guarded apply of {self.profile.title}: {decision} - {reason}",
+                            extra={'session_data': {'guarded_applies': record}})
+        self.enter(decision, reason)
+        with self.lock:
+            self.phase = None  # Stop collecting
+        return record
+
+
+def format_record(record):
+    text = f"{profiles.get_profile(record['profile']).title}: {record['decision']} - {record['reason']}"
+    evidence = record['evidence']
+    if evidence and evidence['baseline']['p50'] is not None and evidence['probation']['p50'] is not None:
+        text += (f" (P50 {evidence['baseline']['p50']:.1f} -> {evidence['probation']['p50']:.1f} ms, "
+                 f"loss {evidence['baseline']['loss']:.1f}% -> {evidence['probation']['loss']:.1f}%)")
+    return text
@@ -0,0 +1,213 @@
+"""
+Per-interface latency comparison for the PING Optimizer application.
+Probes the same targets from every active interface at once, each probe bound to
+that interface's source address, and ranks the interfaces (Ethernet, Wi-Fi, VPN...)
+by median latency, tail latency and loss. The winner's routes can optionally be
+preferred by lowering its interface metric.
+"""
+
+import time
+import socket
+import logging
+import ipaddress
+
+import psutil
+
+from latency_stats import summarize, mann_whitney_greater
+from probe_scheduler import ProbeMonitor, parse_target
+
+DEFAULT_COUNT = 20
+COMPARE_INTERVAL = 0.25  # Seconds between probes per target (ICMP targets follow the system ping)
+MAX_LOSS = 5.0  # Percent; lossier interfaces rank below every clean one
+PREFERRED_METRIC = 5  # Interface metric given to the winner; automatic metrics start at 5-10 on fast links
+ALPHA = 0.05  # Mann-Whitney p-value the winner's advantage over the runner-up must beat...
+MIN_ADVANTAGE_MS = 1.0  # ...and it must be big enough to be worth rerouting for,
+MIN_ADVANTAGE_PERCENT = 5.0  # in absolute and relative terms
+
+metrics_logger = logging.getLogger('metrics')
+
+
+def interface_sources(family=socket.AF_INET, include_loopback=False):
+    """(interface name, address) for every address of every active interface.
+
+    Aliases (e.g. lo:1 on Linux) are listed under their own names.
+    """
+    try:
+        stats = psutil.net_if_stats()
+    except OSError:
+        stats = {}
+    sources = []
+    for name, addrs in psutil.net_if_addrs().items():
+        link = stats.get(name)  # Aliases have no link stats of their own
+        if link is not None and not link.isup:
+            continue
+        for addr in addrs:
+            if addr.family != family:
+                continue
+            address = addr.address.split('%')[0]
+            ip = ipaddress.ip_address(address)
+            if ip.is_link_local or (ip.is_loopback and not include_loopback):
+                continue
+            sources.append((name, address))
+    return sources
+
+
+def rank_interfaces(results):
+    # Reliable interfaces first, then by median, then by tail latency, then by loss
+    def key(result):
+        unreliable = result['loss'] > MAX_LOSS or result['p50'] is None
+        return (unreliable, result['p50'] or float('inf'), result['p95'] or float('inf'), result['loss'])
+    ranked = sorted(results, key=key)
+    for rank, result in enumerate(ranked, 1):
+        result['rank'] = rank
+    return ranked
+
+
+def is_reliable(result):
+    return result['p50'] is not None and result['loss'] <= MAX_LOSS
+
+
+def decide_winner(ranked, samples):
+    """Whether the top-ranked interface is worth preferring; samples maps interface name to RTTs.
+
+    It must be reliable, and when another reliable interface exists it must be faster
+    by a significant margin (one-sided Mann-Whitney p < ALPHA) that is also big enough,
+    so noise between two equally good links never reroutes traffic.
+    Returns {'winner', 'runner_up', 'p_value', 'advantage_ms', 'reason'}.
+    """
+    decision = {'winner': None, 'runner_up': None, 'p_value': None, 'advantage_ms': None}
+    best = ranked[0] if ranked else None
+    if best is None or not is_reliable(best):
+        decision['reason'] = "no interface answered reliably"
+        return decision
+    # Other addresses of the same interface are not rivals
+    rivals = [result for result in ranked[1:] if result['interface'] != best['interface'] and is_reliable(result)]
+    if not rivals:
+        decision['winner'] = best['interface']
+        decision['reason'] = "the only reliable interface"
+        return decision
+    runner_up = rivals[0]
+    decision['runner_up'] = runner_up['interface']
+    decision['advantage_ms'] = runner_up['p50'] - best['p50']
+    # p-value for "the runner-up's latencies tend to be larger than the winner's"
+    decision['p_value'] = mann_whitney_greater(samples.get(best['interface'], []),
+                                               samples.get(runner_up['interface'], []))
+    threshold = max(MIN_ADVANTAGE_MS, runner_up['p50'] * MIN_ADVANTAGE_PERCENT / 100)
+    if decision['p_value'] < ALPHA and decision['advantage_ms'] >= threshold:
+        decision['winner'] = best['interface']
+        decision['reason'] = (f"{decision['advantage_ms']:.1f} ms faster than {runner_up['interface']} "
+                              f"(p={decision['p_value']:.3g})")
+    else:
+        decision['reason'] = (f"not significantly faster than {runner_up['interface']} "
+                              f"({decision['advantage_ms']:.1f} ms, p={decision['p_value']:.3g})")
+    return decision
+
+
+def compare_interfaces(targets, sources=None, count=DEFAULT_COUNT, interval=COMPARE_INTERVAL, timeout=1.0):
+    """Probe targets count times from every source concurrently; returns results ranked best-first."""
+    targets = [parse_target(t) if isinstance(t, str) else t for t in targets]
+    sources = sources if sources is not None else interface_sources()
+    if not sources:
+        raise ValueError("No active interface with an address to compare")
+    samples = {source: [] for source in sources}
+    errors = {}
+    monitors = {}
+    try:
+        for source in sources:
+            monitor = ProbeMonitor(targets, interval=interval, count=count, timeout=timeout, source=source,
+                                   on_target_sample=lambda label, rtt, source=source: samples[source].append(rtt))
+            try:
+                monitors[source] = monitor.start()
+            except OSError as e:
+                # e.g. the address went away, or isn't routable to the targets
+                errors[source] = str(e)
+        for monitor in monitors.values():
+            monitor.wait()
+    finally:
+        for monitor in monitors.values():
+            monitor.stop()
+
+    results = []
+    for source in sources:
+        name, address = source
+        values = samples[source]
+        replies = [rtt for rtt in values if rtt is not None]
+        result = summarize(replies, len(values))
+        result.update({'interface': name, 'address': address, 'samples': replies})
+        if source in monitors:
+            result['targets'] = monitors[source].summaries()
+        if source in errors:
+            result['error'] = errors[source]
+            result['loss'] = 100.0
+        results.append(result)
+    return rank_interfaces(results)
+
+
+def run_interface_comparison(targets, sources=None, count=DEFAULT_COUNT, interval=COMPARE_INTERVAL,
+                             prefer_winner=False):
+    """Compare interfaces, optionally prefer the winner's routes, and record it all in the session."""
+    ranked = compare_interfaces(targets, sources, count, interval)
+    # Raw samples feed the significance test; the session keeps the summaries
+    samples = {}
+    for result in ranked:
+        samples.setdefault(result['interface'], []).extend(result.pop('samples'))
+    decision = decide_winner(ranked, samples)
+    comparison = {
+        'time': time.time(),
+        'targets': [t if isinstance(t, str) else t.label for t in targets],
+        'interfaces': ranked,
+        'winner': decision['winner'],
+        'decision': decision,
+        'metric_change': None,
+    }
+    if decision['winner'] and prefer_winner:
+        comparison['metric_change'] = prefer_interface(decision['winner'])
+    metrics_logger.info(
+        "Interface comparison - " + "; ".join(format_result(result) for result in ranked),
+        extra={'session_data': {'interface_comparisons': comparison}})
+    return comparison
+
+
+def prefer_interface(name, metric=PREFERRED_METRIC):
+    # Lower metric = preferred route; profiles.set_interface_metric(name) undoes it
+    import profiles
+
+    try:
+        return profiles.set_interface_metric(name, metric)
+    except OSError as e:
+        logging.error(f"Could not change the metric of {name}: {str(e)}")
+        return {'profile': 'route_metric', 'action': 'apply', 'successful': [], 'failed': [name], 'total': 1,
+                'error': str(e)}
+
+
+def loopback_sources():
+    """Loopback sources for a self-test: the configured loopback aliases when there are
+    at least two, otherwise three 127/8 addresses (routed to loopback on Linux and Windows)."""
+    sources = [source for source in interface_sources(include_loopback=True)
+               if ipaddress.ip_address(source[1]).is_loopback]
+    if len(sources) >= 2:
+        return sources
+    # Named like Linux aliases so each counts as its own interface
+    return [('lo', '127.0.0.1'), ('lo:1', '127.0.0.2'), ('lo:2', '127.0.0.3')]
+
+
+def run_local_interface_comparison(count=DEFAULT_COUNT, extra_delay_ms=3.0):
+    """Compare loopback sources against an echo server that answers each one more slowly
+    than the one before, so the expected ranking is the source order."""
+    from local_endpoints import UdpEchoServer
+
+    sources = loopback_sources()
+    delays = {address: i * extra_delay_ms for i, (_, address) in enumerate(sources)}
+    with UdpEchoServer(delays=delays) as server:
+        host, port = server.address
+        return run_interface_comparison([f"udp-echo:{host}:{port}"], sources, count)
+
+
+def format_result(result):
+    label = f"{result['interface']} ({result['address']})"
+    if 'error' in result:
+        return f"{label}: {result['error']}"
+    if not result['count']:
+        return f"{label}: no replies"
+    return (f"{label}: P50 {result['p50']:.1f} / P95 {result['p95']:.1f} ms - "
+            f"loss {result['loss']:.1f}%")
@@ -0,0 +1,227 @@
+"""
+Per-interface traffic and error sampling for the PING Optimizer application.
+Polls psutil's per-NIC counters and turns them into throughput, packet rates and
+error/drop rates. Counter state and rates are updated in place, so steady-state
+sampling does not build new per-interface objects every tick.
+"""
+
+import time
+import logging
+import threading
+
+import psutil
+
+SAMPLE_INTERVAL = 1.0
+LINK_STATS_EVERY = 10  # net_if_stats() is slower and rarely changes; refresh every N samples
+RECORD_EVERY = 10  # Samples aggregated into each session record
+
+# Order of the raw counters kept per interface (matches psutil's snetio fields)
+COUNTER_FIELDS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+                  'errin', 'errout', 'dropin', 'dropout')
+
+metrics_logger = logging.getLogger('metrics')
+
+
+class InterfaceRates:
+    """Latest per-second rates and running totals for one interface."""
+
+    __slots__ = ('name', 'tx_mbps', 'rx_mbps', 'tx_pps', 'rx_pps', 'errors_per_s', 'drops_per_s',
+                 'errors', 'drops', 'is_up', 'speed_mbps', 'mtu', 'previous', 'deltas', 'updated')
+
+    def __init__(self, name):
+        self.name = name
+        self.tx_mbps = self.rx_mbps = 0.0
+        self.tx_pps = self.rx_pps = 0.0
+        self.errors_per_s = self.drops_per_s = 0.0
+        self.errors = self.drops = 0  # Since sampling started
+        self.is_up = None
+        self.speed_mbps = 0
+        self.mtu = 0
+        self.previous = [0] * len(COUNTER_FIELDS)
+        self.deltas = [0] * len(COUNTER_FIELDS)
+        self.updated = None
+
+    def utilization(self):
+        # Busiest direction as a percentage of the negotiated link speed
+        if not self.speed_mbps:
+            return None
+        return max(self.tx_mbps, self.rx_mbps) / self.speed_mbps * 100
+
+    def as_dict(self):
+        return {
+            'interface': self.name,
+            'tx_mbps': self.tx_mbps,
+            'rx_mbps': self.rx_mbps,
+            'tx_pps': self.tx_pps,
+            'rx_pps': self.rx_pps,
+            'errors_per_s': self.errors_per_s,
+            'drops_per_s': self.drops_per_s,
+            'errors': self.errors,
+            'drops': self.drops,
+            'is_up': self.is_up,
+            'speed_mbps': self.speed_mbps,
+            'mtu': self.mtu,
+        }
+
+
+def format_interface_rates(rates):
+    # rates is InterfaceRates.as_dict()
+    line = (f"RX {rates['rx_mbps']:.2f} Mbps ({rates['rx_pps']:.0f} pkt/s) - "
+            f"TX {rates['tx_mbps']:.2f} Mbps ({rates['tx_pps']:.0f} pkt/s) - "
+            f"Errors {rates['errors']} - Drops {rates['drops']}")
+    if rates['is_up'] is False:
+        return f"{line} - link down"
+    if rates['speed_mbps']:
+        line += f" - Link {rates['speed_mbps']} Mbps"
+    if rates['mtu']:
+        line += f", MTU {rates['mtu']}"
+    return line
+
+
+class InterfaceSampler:
+    def __init__(self):
+        self.rates = {}  # name -> InterfaceRates
+        self.last_time = None
+        self.samples = 0
+
+    def sample(self):
+        # Returns {name: InterfaceRates}; the first call only primes the counters
+        now = time.monotonic()
+        counters = psutil.net_io_counters(pernic=True)
+        elapsed = now - self.last_time if self.last_time is not None else None
+        for name, snetio in counters.items():
+            rates = self.rates.get(name)
+            if rates is None:
+                rates = self.rates[name] = InterfaceRates(name)
+                rates.previous[:] = snetio[:len(COUNTER_FIELDS)]
+                continue
+            previous, deltas = rates.previous, rates.deltas
+            for i in range(len(COUNTER_FIELDS)):
+                value = snetio[i]
+                # Counters can reset (driver reload, 32-bit wrap); treat a negative delta as zero
+                deltas[i] = max(0, value - previous[i])
+                previous[i] = value
+            if not elapsed:
+                continue
+            rates.tx_mbps = deltas[0] * 8 / elapsed / 1e6
+            rates.rx_mbps = deltas[1] * 8 / elapsed / 1e6
+            rates.tx_pps = deltas[2] / elapsed
+            rates.rx_pps = deltas[3] / elapsed
+            errors = deltas[4] + deltas[5]
+            drops = deltas[6] + deltas[7]
+            rates.errors_per_s = errors / elapsed
+            rates.drops_per_s = drops / elapsed
+            rates.errors += errors
+            rates.drops += drops
+            rates.updated = now
+        for name in list(self.rates):
+            if name not in counters:
+                del self.rates[name]  # Interface went away
+        if self.samples % LINK_STATS_EVERY == 0:
+            self.refresh_link_stats()
+        self.last_time = now
+        self.samples += 1
+        return self.rates
+
+    def refresh_link_stats(self):
+        try:
+            stats = psutil.net_if_stats()
+        except OSError:
+            return
+        for name, rates in self.rates.items():
+            link = stats.get(name)
+            if link is not None:
+                rates.is_up = link.isup
+                rates.speed_mbps = link.speed
+                rates.mtu = link.mtu
+
+
+class InterfaceRecorder:
+    """Averages one interface's rates over RECORD_EVERY samples into session records."""
+
+    def __init__(self, every=RECORD_EVERY):
+        self.every = every
+        self.reset(None)
+
+    def reset(self, name):
+        self.name = name
+        self.count = 0
+        self.totals = [0.0] * 4  # tx_mbps, rx_mbps, tx_pps, rx_pps
+        self.errors = 0
+        self.drops = 0
+
+    def add(self, rates):
+        if rates.name != self.name:
+            self.reset(rates.name)
+        deltas = rates.deltas
+        self.errors += deltas[4] + deltas[5]
+        self.drops += deltas[6] + deltas[7]
+        self.totals[0] += rates.tx_mbps
+        self.totals[1] += rates.rx_mbps
+        self.totals[2] += rates.tx_pps
+        self.totals[3] += rates.rx_pps
+        self.count += 1
+        if self.count < self.every:
+            return None
+        record = {
+            'time': time.time(),
+            'interface': self.name,
+            'tx_mbps': round(self.totals[0] / self.count, 3),
+            'rx_mbps': round(self.totals[1] / self.count, 3),
+            'tx_pps': round(self.totals[2] / self.count, 1),
+            'rx_pps': round(self.totals[3] / self.count, 1),
+            'errors': self.errors,
+            'drops': self.drops,
+        }
+        self.reset(self.name)
+        return record
+
+
+class InterfaceMonitor:
+    """Samples every interface on a background thread and calls on_sample(rates_dict)
+    with the selected interface's rates, recording an aggregate into the metrics session."""
+
+    def __init__(self, interface=None, on_sample=None, interval=SAMPLE_INTERVAL, record=True):
+        self.interface = interface  # May be changed while running
+        self.on_sample = on_sample
+        self.interval = interval
+        self.record = record
+        self.sampler = InterfaceSampler()
+        self.recorder = InterfaceRecorder()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                rates = self.sampler.sample().get(self.interface)
+                if rates is not None and rates.updated is not None:
+                    if self.on_sample:
+                        self.on_sample(rates.as_dict())
+                    record = self.recorder.add(rates) if self.record else None
+                    if record:
+                        metrics_logger.info(
+                            f"Interface stats - {record['interface']} - RX {record['rx_mbps']} Mbps - "
+                            f"TX {record['tx_mbps']} Mbps - Errors {record['errors']} - Drops {record['drops']}",
+                            extra={'session_data': {'interface_samples': record}})
+            except Exception as e:
+                logging.error(f"Error sampling interface counters: {str(e)}")
+            next_time += self.interval
+            self.stop_event.wait(max(0.0, next_time - time.monotonic()))
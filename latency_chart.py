@@ -0,0 +1,407 @@
+"""
+Live latency chart for the PING Optimizer application.
+Samples go into a fixed-size ring buffer and are reduced to one min/max envelope per
+pixel column before drawing, so a multi-hour view costs the same as a one-minute one.
+The plot is kept in a pixmap that is scrolled and patched as new columns arrive
+instead of being redrawn from scratch every frame. Zooming out past what the ring
+buffer holds falls back to the samples persisted in the current metrics session.
+
+Mouse wheel zooms, dragging pans into history, double-click returns to the live view.
+"""
+
+import math
+import time
+
+import numpy as np
+from PyQt5.QtCore import Qt, QTimer, QRect
+from PyQt5.QtGui import QPainter, QPixmap, QColor, QPen, QFont
+from PyQt5.QtWidgets import QWidget
+
+from diagnostics import recorder
+
+RING_CAPACITY = 36000  # One hour at 10 probes/s
+DEFAULT_SPAN_SECONDS = 60
+MIN_SPAN_SECONDS = 10
+MAX_SPAN_SECONDS = 24 * 3600
+REFRESH_INTERVAL_MS = 100
+CONNECT_GAP_SECONDS = 5  # Columns further apart than this are not joined by a line
+MIN_SCALE_MS = 50
+
+LINE_COLOR = QColor(0, 255, 255)
+LOSS_COLOR = QColor(255, 80, 80)
+GRID_COLOR = QColor(0, 255, 255, 60)
+TEXT_COLOR = QColor(255, 255, 255, 180)
+AXIS_WIDTH = 44
+
+
+class RingBuffer:
+    """Fixed-capacity (timestamp, value) store; lost probes are stored as NaN."""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.times = np.zeros(capacity)
+        self.values = np.zeros(capacity)
+        self.capacity = capacity
+        self.head = 0  # Next write position
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def append(self, timestamp, value):
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def oldest_time(self):
+        if not self.count:
+            return None
+        return self.times[(self.head - self.count) % self.capacity]
+
+    def newest_time(self):
+        if not self.count:
+            return None
+        return self.times[(self.head - 1) % self.capacity]
+
+    def ordered(self):
+        # Oldest-first arrays; views unless the buffer has wrapped
+        if self.count < self.capacity:
+            return self.times[:self.count], self.values[:self.count]
+        return (np.concatenate((self.times[self.head:], self.times[:self.head])),
+                np.concatenate((self.values[self.head:], self.values[:self.head])))
+
+    def since(self, timestamp):
+        # Samples at or after timestamp; cheap for the recent tail the live view asks for
+        if self.count == self.capacity and self.head and self.times[0] <= timestamp:
+            start = np.searchsorted(self.times[:self.head], timestamp)
+            return self.times[start:self.head], self.values[start:self.head]
+        times, values = self.ordered()
+        start = np.searchsorted(times, timestamp)
+        return times[start:], values[start:]
+
+
+def minmax_decimate(times, values, start, end, columns):
+    """Reduce samples in [start, end) to per-column (min, max, lost) arrays.
+
+    times must be sorted. Columns without samples come back as NaN; a column is
+    flagged lost when any of its samples is NaN.
+    """
+    mins = np.full(columns, np.nan)
+    maxs = np.full(columns, np.nan)
+    lost = np.zeros(columns, dtype=bool)
+    if columns <= 0 or end <= start:
+        return mins, maxs, lost
+    lo, hi = np.searchsorted(times, (start, end))
+    times, values = times[lo:hi], values[lo:hi]
+    if not len(times):
+        return mins, maxs, lost
+    edges = start + (end - start) / columns * np.arange(columns)
+    starts = np.searchsorted(times, edges)
+    ends = np.append(starts[1:], len(times))
+    filled = ends > starts
+    index = starts[filled]
+    # Non-empty columns partition the samples, so reduceat over their starts is exact
+    mins[filled] = np.fmin.reduceat(values, index)
+    maxs[filled] = np.fmax.reduceat(values, index)
+    lost[filled] = np.add.reduceat(np.isnan(values), index) > 0
+    return mins, maxs, lost
+
+
+class SessionHistory:
+    """Timestamped samples from the persisted session, converted incrementally."""
+
+    def __init__(self, get_session):
+        self.get_session = get_session
+        self.converted = 0
+        self.times = np.empty(0)
+        self.values = np.empty(0)
+
+    def load(self):
+        session = self.get_session() if self.get_session else None
+        pings = session.get('optimized_pings', []) if session else []
+        if len(pings) < self.converted:
+            self.converted = 0
+            self.times = np.empty(0)
+            self.values = np.empty(0)
+        new = [
+            (entry['time'], entry['Current'])
+            for entry in pings[self.converted:]
+            if isinstance(entry.get('Current'), (int, float)) and 'time' in entry
+        ]
+        self.converted = len(pings)
+        if new:
+            times, values = np.array(new).T
+            self.times = np.concatenate((self.times, times))
+            self.values = np.concatenate((self.values, values))
+        return self.times, self.values
+
+
+def nice_scale(value):
+    # Round a y-axis maximum up to 1, 2 or 5 times a power of ten
+    value = max(value, MIN_SCALE_MS)
+    magnitude = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 5, 10):
+        if value <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+class LatencyChart(QWidget):
+    def __init__(self, get_session=None, capacity=RING_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(150)
+        self.ring = RingBuffer(capacity)
+        self.history = SessionHistory(get_session)
+        self.span = DEFAULT_SPAN_SECONDS
+        self.live = True
+        self.view_end = None  # Fixed right edge (epoch seconds) while browsing history
+        self.drag_origin = None
+        self.scale_max = MIN_SCALE_MS
+
+        # Plot pixmap with one envelope entry per pixel column, aligned to absolute time
+        self.plot = None
+        self.env_min = self.env_max = self.env_lost = None
+        self.last_column = None  # Absolute column index of the rightmost plotted column
+        self.needs_full_redraw = True
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL_MS)
+        self.timer.timeout.connect(self.refresh)
+
+    # Data in
+
+    def add_sample(self, value, timestamp=None):
+        self.ring.append(time.time() if timestamp is None else timestamp,
+                         np.nan if value is None else value)
+        if self.live and not self.timer.isActive():
+            self.timer.start()
+
+    def clear(self):
+        self.ring.clear()
+        self.reset_view()
+
+    # View
+
+    def plot_rect(self):
+        return QRect(AXIS_WIDTH, 8, max(1, self.width() - AXIS_WIDTH - 4), max(1, self.height() - 26))
+
+    def column_seconds(self):
+        return self.span / self.plot_rect().width()
+
+    def view_range(self):
+        dt = self.column_seconds()
+        if self.live:
+            end = (math.floor(time.time() / dt) + 1) * dt
+        else:
+            end = self.view_end
+        return end - self.span, end
+
+    def reset_view(self):
+        self.live = True
+        self.view_end = None
+        self.span = DEFAULT_SPAN_SECONDS
+        self.needs_full_redraw = True
+        self.timer.start()
+        self.update()
+
+    def samples_for(self, start):
+        # The ring covers recent history; older ranges come from the persisted session
+        oldest = self.ring.oldest_time()
+        if oldest is not None and start >= oldest:
+            return self.ring.ordered()
+        times, values = self.history.load()
+        if not len(times):
+            return self.ring.ordered()
+        return times, values
+
+    # Rendering
+
+    @recorder.timed('latency chart refresh')
+    def refresh(self):
+        if not self.isVisible():
+            return
+        if self.needs_full_redraw or self.plot is None or self.plot.size() != self.plot_rect().size():
+            self.redraw_all()
+            self.update()
+        elif self.live:
+            self.redraw_tail()
+        newest = self.ring.newest_time()
+        if not self.live or newest is None or newest < self.view_range()[0]:
+            # Static view, or every sample has scrolled out: idle until the next sample
+            self.timer.stop()
+
+    def redraw_all(self):
+        rect = self.plot_rect()
+        columns = rect.width()
+        start, end = self.view_range()
+        times, values = self.samples_for(start)
+        self.env_min, self.env_max, self.env_lost = minmax_decimate(times, values, start, end, columns)
+        self.last_column = round(end / self.column_seconds()) - 1
+        visible_max = np.nanmax(self.env_max) if np.any(~np.isnan(self.env_max)) else 0
+        self.scale_max = nice_scale(visible_max * 1.2)
+        if self.plot is None or self.plot.size() != rect.size():
+            self.plot = QPixmap(rect.size())
+            self.plot.fill(Qt.transparent)
+        self.needs_full_redraw = False
+        self.paint_strip(0)
+
+    def redraw_tail(self):
+        # Scroll the plot by the columns that elapsed and recompute only the newest ones
+        dt = self.column_seconds()
+        columns = len(self.env_max)
+        right = math.floor(time.time() / dt)
+        shift = right - self.last_column
+        if shift >= columns:
+            self.redraw_all()
+            self.update()
+            return
+        if shift > 0:
+            for env, fill in ((self.env_min, np.nan), (self.env_max, np.nan), (self.env_lost, False)):
+                env[:-shift] = env[shift:]
+                env[-shift:] = fill
+            self.plot.scroll(-shift, 0, self.plot.rect())
+            self.last_column = right
+        # The previously newest column may have gained samples too
+        first = max(0, columns - 1 - shift)
+        start = (self.last_column - (columns - 1 - first)) * dt
+        times, values = self.ring.since(start)
+        mins, maxs, lost = minmax_decimate(times, values, start, (self.last_column + 1) * dt, columns - first)
+        self.env_min[first:] = mins
+        self.env_max[first:] = maxs
+        self.env_lost[first:] = lost
+        if np.any(maxs > self.scale_max):
+            self.redraw_all()
+            self.update()
+            return
+        self.paint_strip(first)
+        rect = self.plot_rect()
+        self.update(rect.adjusted(first, 0, 0, 0))
+
+    def value_to_y(self, values, height):
+        return np.clip(height - 1 - values / self.scale_max * (height - 1), 0, height - 1).astype(int)
+
+    def paint_strip(self, x0):
+        # Repaint plot columns x0.. (lines from the last filled column before x0 are clipped)
+        width, height = self.plot.width(), self.plot.height()
+        painter = QPainter(self.plot)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(QRect(x0, 0, width - x0, height), Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        painter.setClipRect(QRect(x0, 0, width - x0, height))
+
+        filled = np.flatnonzero(~np.isnan(self.env_max))
+        before = filled[filled < x0]
+        if len(before):
+            filled = filled[filled >= before[-1]]
+        else:
+            filled = filled[filled >= x0]
+        if len(filled):
+            top = self.value_to_y(self.env_max[filled], height).tolist()
+            bottom = self.value_to_y(self.env_min[filled], height).tolist()
+            gap_columns = CONNECT_GAP_SECONDS / self.column_seconds()
+            painter.setPen(QPen(LINE_COLOR, 1))
+            previous = None
+            for x, y_top, y_bottom in zip(filled.tolist(), top, bottom):
+                painter.drawLine(x, y_top, x, y_bottom)
+                mid = (y_top + y_bottom) // 2
+                if previous is not None and x - previous[0] <= gap_columns:
+                    painter.drawLine(previous[0], previous[1], x, mid)
+                previous = (x, mid)
+
+        lost = np.flatnonzero(self.env_lost[x0:]) + x0
+        if len(lost):
+            painter.setPen(QPen(LOSS_COLOR, 1))
+            for x in lost.tolist():
+                painter.drawLine(x, 0, x, 5)
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.needs_full_redraw = True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.needs_full_redraw = True
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    @recorder.timed('paint latency chart')
+    def paintEvent(self, event):
+        if self.plot is None or self.needs_full_redraw:
+            self.redraw_all()
+        painter = QPainter(self)
+        rect = self.plot_rect()
+        painter.setFont(QFont(self.font().family(), 8))
+
+        # Grid and axis labels are a handful of primitives; only the plot is cached
+        for fraction in (0, 0.5, 1):
+            y = rect.top() + int((rect.height() - 1) * (1 - fraction))
+            painter.setPen(QPen(GRID_COLOR, 1))
+            painter.drawLine(rect.left(), y, rect.right(), y)
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(QRect(0, y - 8, AXIS_WIDTH - 6, 16), Qt.AlignRight | Qt.AlignVCenter,
+                             f"{self.scale_max * fraction:g} ms")
+
+        painter.drawPixmap(rect.topLeft(), self.plot)
+
+        start, end = self.view_range()
+        painter.setPen(TEXT_COLOR)
+        caption = f"last {format_span(self.span)}" if self.live else (
+            f"{time.strftime('%H:%M:%S', time.localtime(start))} - "
+            f"{time.strftime('%H:%M:%S', time.localtime(end))}")
+        painter.drawText(QRect(rect.left(), rect.bottom() + 2, rect.width(), 16),
+                         Qt.AlignRight | Qt.AlignVCenter, caption)
+        painter.end()
+
+    # Zoom and pan
+
+    def wheelEvent(self, event):
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        span = min(MAX_SPAN_SECONDS, max(MIN_SPAN_SECONDS, self.span * factor))
+        if not self.live:
+            # Keep the time under the cursor in place
+            start, end = self.view_range()
+            rect = self.plot_rect()
+            fraction = min(1.0, max(0.0, (event.pos().x() - rect.left()) / rect.width()))
+            anchor = start + fraction * self.span
+            self.view_end = anchor + (1 - fraction) * span
+        self.span = span
+        self.needs_full_redraw = True
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_origin = (event.pos().x(), self.view_range()[1])
+
+    def mouseMoveEvent(self, event):
+        if self.drag_origin is None:
+            return
+        x, end = self.drag_origin
+        offset = (event.pos().x() - x) * self.column_seconds()
+        if self.live and offset <= 0:
+            return
+        self.live = False
+        self.view_end = min(end - offset, time.time())
+        self.needs_full_redraw = True
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        self.drag_origin = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_view()
+
+
+def format_span(seconds):
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f} h"
+    if seconds >= 60:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds:.0f} s"
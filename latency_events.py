@@ -0,0 +1,193 @@
+"""
+Streaming latency event detection for the PING Optimizer application.
+Every sample updates an exponentially weighted mean and variance (the normal
+band), a two-sided Page-Hinkley test against the mean since the last change, and
+a run counter for lost probes - constant time and memory per sample. Three kinds
+of event come out of it:
+
+- spike: a reply far above the band; it is clipped to the band edge before it
+  updates anything, so a lone spike neither widens the band nor reads as a shift
+- shift: latency settled at a new level (the Page-Hinkley statistic crossed its
+  threshold); the band and the reference are re-centred on the new level
+- loss_burst: several probes in a row went unanswered
+
+Events are timestamped and recorded in the session; on_event lets a UI announce them.
+"""
+
+import math
+import time
+import logging
+from collections import deque
+
+EWMA_ALPHA = 0.1  # Band memory of roughly 20 samples
+WARMUP_SAMPLES = 20  # Replies needed before anything is flagged
+MIN_SIGMA_MS = 0.5  # Floor for the band width, so a very steady link doesn't flag 1 ms wobbles
+SPIKE_SIGMAS = 4.0
+MIN_SPIKE_MS = 5.0  # A spike must also be this far above the mean
+SPIKE_COOLDOWN = 2.0  # Seconds; spikes closer together are counted into one event
+PH_DELTA = 0.5  # Page-Hinkley drift allowance, in band sigmas per sample
+PH_THRESHOLD = 12.0  # Page-Hinkley alarm level, in band sigmas
+SHIFT_SAMPLES = 5  # ...with this many samples in a row at the new level (sustained, not a blip)
+MIN_SHIFT_MS = 2.0  # Smaller level changes re-centre silently
+LOSS_BURST = 3  # Consecutive lost probes
+MAX_LEVEL_SAMPLES = 64  # Most recent post-change samples kept for the level estimate
+
+metrics_logger = logging.getLogger('metrics')
+
+
+class PageHinkley:
+    """One-sided Page-Hinkley test; feed deviations from the reference level.
+
+    The change point is where the cumulative sum last hit its minimum, and the
+    new level is the median of the samples since then: samples from before the
+    change don't count, and a lone spike next to it can't pull the median. An
+    alarm also needs the last min_samples samples to all lean the watched way.
+    """
+
+    def __init__(self, delta=PH_DELTA, threshold=PH_THRESHOLD, min_samples=SHIFT_SAMPLES):
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.since_change = deque(maxlen=MAX_LEVEL_SAMPLES)
+        self.reset()
+
+    def reset(self):
+        self.total = 0.0
+        self.minimum = 0.0
+        self.leaning = 0  # Samples in a row in the watched direction
+        self.since_change.clear()
+
+    def add(self, deviation, value):
+        """deviation in sigmas (positive = in the watched direction); returns True on alarm."""
+        self.total += deviation - self.delta
+        if self.total <= self.minimum:
+            # New candidate change point: the level is estimated from what follows it
+            self.minimum = self.total
+            self.since_change.clear()
+        else:
+            self.since_change.append(value)
+        self.leaning = self.leaning + 1 if deviation > self.delta else 0
+        return self.total - self.minimum > self.threshold and self.leaning >= self.min_samples
+
+    @property
+    def level(self):
+        if not self.since_change:
+            return None
+        ordered = sorted(self.since_change)
+        middle = len(ordered) // 2
+        return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class LatencyEventDetector:
+    """Flags spikes, sustained shifts and loss bursts as samples arrive.
+
+    add(rtt_ms or None, timestamp) returns the event it raised, if any; on_event(event)
+    is called for each one as well, and every event is recorded in the session
+    unless record is False.
+    """
+
+    def __init__(self, on_event=None, record=True):
+        self.on_event = on_event
+        self.record = record
+        self.reset()
+
+    def reset(self):
+        self.mean = None
+        self.variance = 0.0
+        self.replies = 0
+        self.reference = None  # Running mean since the last shift
+        self.reference_count = 0
+        self.rising = PageHinkley()
+        self.falling = PageHinkley()
+        self.loss_run = 0
+        self.last_spike = None
+        self.suppressed_spikes = 0
+        self.counts = {'spike': 0, 'shift': 0, 'loss_burst': 0}
+
+    @property
+    def sigma(self):
+        return max(math.sqrt(self.variance), MIN_SIGMA_MS)
+
+    def add(self, rtt, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if rtt is None:
+            self.loss_run += 1
+            if self.loss_run == LOSS_BURST and self.replies >= WARMUP_SAMPLES:
+                return self.emit({'time': timestamp, 'type': 'loss_burst', 'lost': self.loss_run,
+                                  'baseline': self.mean})
+            return None
+        self.loss_run = 0
+        self.replies += 1
+        if self.mean is None:
+            self.mean = self.reference = rtt
+            self.reference_count = 1
+            return None
+
+        sigma = self.sigma
+        edge = SPIKE_SIGMAS * sigma
+        clipped = min(max(rtt, self.mean - edge), self.mean + edge)
+        event = None
+        if self.replies > WARMUP_SAMPLES and rtt - self.mean >= max(edge, MIN_SPIKE_MS):
+            event = self.spike(rtt, sigma, timestamp)
+
+        # Shift detection against the mean since the last change, in band sigmas
+        deviation = (clipped - self.reference) / sigma
+        rose = self.rising.add(deviation, rtt)
+        fell = self.falling.add(-deviation, rtt)
+        if self.replies > WARMUP_SAMPLES and (rose or fell):
+            detector = self.rising if rose else self.falling
+            level = detector.level
+            previous = self.reference
+            self.recentre(level)
+            if abs(level - previous) >= MIN_SHIFT_MS:
+                return self.emit({'time': timestamp, 'type': 'shift', 'from': previous, 'to': level,
+                                  'direction': 'up' if rose else 'down'})
+            return event
+
+        self.reference_count += 1
+        self.reference += (clipped - self.reference) / self.reference_count
+        difference = clipped - self.mean
+        self.mean += EWMA_ALPHA * difference
+        self.variance = (1 - EWMA_ALPHA) * (self.variance + EWMA_ALPHA * difference * difference)
+        return event
+
+    def spike(self, rtt, sigma, timestamp):
+        if self.last_spike is not None and timestamp - self.last_spike < SPIKE_COOLDOWN:
+            self.suppressed_spikes += 1
+            return None
+        self.last_spike = timestamp
+        event = {'time': timestamp, 'type': 'spike', 'rtt': rtt, 'baseline': self.mean, 'sigma': sigma,
+                 'since_last': self.suppressed_spikes}
+        self.suppressed_spikes = 0
+        return self.emit(event)
+
+    def recentre(self, level):
+        self.mean = self.reference = level
+        self.reference_count = SHIFT_SAMPLES
+        self.rising.reset()
+        self.falling.reset()
+
+    def emit(self, event):
+        self.counts[event['type']] += 1
+        if self.record:
+            metrics_logger.info(f"Latency event - {format_event(event)}",
+                                extra={'session_data': {'latency_events': event}})
+        if self.on_event:
+            self.on_event(event)
+        return event
+
+
+def format_event(event):
+    if event['type'] == 'spike':
+        text = f"spike to {event['rtt']:.1f} ms (normal {event['baseline']:.1f} ± {event['sigma']:.1f} ms)"
+        if event['since_last']:
+            text += f", {event['since_last']} more since the last one"
+        return text
+    if event['type'] == 'shift':
+        return f"latency shifted {event['direction']} from {event['from']:.1f} to {event['to']:.1f} ms"
+    return f"{event['lost']} probes lost in a row"
+
+
+def format_counts(counts):
+    return (f"Events: {counts['spike']} spikes - {counts['shift']} shifts - "
+            f"{counts['loss_burst']} loss bursts")
@@ -0,0 +1,106 @@
+"""
+Latency statistics helpers for the PING Optimizer application.
+Shared by the measurement features so every probe type reports the same numbers.
+"""
+
+import math
+
+
+def percentile(values, pct):
+    # Linear interpolation between closest ranks (same as numpy's default)
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * (pct / 100.0)
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return float(ordered[int(rank)])
+    fraction = rank - lower
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+
+def jitter(values):
+    # Mean absolute difference between consecutive samples
+    if len(values) < 2:
+        return 0.0
+    total = 0.0
+    for previous, current in zip(values, values[1:]):
+        total += abs(current - previous)
+    return total / (len(values) - 1)
+
+
+def summarize(samples, sent=None):
+    """Summarize latency samples (ms); `sent` is the number of probes sent, for loss."""
+    if sent is None:
+        sent = len(samples)
+    summary = {
+        'count': len(samples),
+        'sent': sent,
+        'loss': ((sent - len(samples)) / sent * 100) if sent else 0.0,
+        'min': None,
+        'max': None,
+        'avg': None,
+        'p50': None,
+        'p95': None,
+        'jitter': None,
+    }
+    if samples:
+        summary.update({
+            'min': min(samples),
+            'max': max(samples),
+            'avg': sum(samples) / len(samples),
+            'p50': percentile(samples, 50),
+            'p95': percentile(samples, 95),
+            'jitter': jitter(samples),
+        })
+    return summary
+
+
+def normal_sf(z):
+    # P(Z > z) for a standard normal variable
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def mann_whitney_greater(before, after):
+    """One-sided Mann-Whitney U test: p-value for "after tends to be larger than before".
+
+    Uses the normal approximation with a tie correction, which is accurate from
+    about 20 samples per side; latency samples are far from normal, so this
+    compares ranks rather than means.
+    """
+    n1, n2 = len(before), len(after)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(value, 1) for value in after] + [(value, 0) for value in before])
+    rank_sum = 0.0  # Sum of the ranks of `after`
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1])
+        i = j + 1
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    return normal_sf((u - n1 * n2 / 2 - 0.5) / math.sqrt(variance))  # 0.5: continuity correction
+
+
+def proportion_greater(lost_before, sent_before, lost_after, sent_after):
+    """One-sided two-proportion z-test: p-value for "the loss rate rose"."""
+    if not sent_before or not sent_after:
+        return 1.0
+    pooled = (lost_before + lost_after) / (sent_before + sent_after)
+    if pooled in (0.0, 1.0):
+        return 1.0
+    error = math.sqrt(pooled * (1 - pooled) * (1 / sent_before + 1 / sent_after))
+    return normal_sf((lost_after / sent_after - lost_before / sent_before) / error)
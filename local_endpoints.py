@@ -0,0 +1,283 @@
+"""
+Local stand-in endpoints for the PING Optimizer application.
+Small threaded servers bound to loopback so the measurement features can run offline.
+"""
+
+import socket
+import threading
+import logging
+
+
+class LocalServer:
+    """Base class for the stand-in servers: owns the socket and the worker thread."""
+
+    sock_type = socket.SOCK_STREAM
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.running = False
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.sock.getsockname()[:2] if self.sock else (self.host, self.port)
+
+    def start(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        self.sock = socket.socket(family, self.sock_type)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        if self.sock_type == socket.SOCK_STREAM:
+            self.sock.listen(16)
+        self.sock.settimeout(0.2)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def serve(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class UdpEchoServer(LocalServer):
+    """Echoes every datagram back to its sender (stand-in for a latency target).
+
+    With mtu set, datagrams that wouldn't fit a link of that MTU are dropped, as on
+    a path with a smaller MTU that discards DF packets. delays maps a sender address
+    to extra milliseconds before its replies, imitating routes of different quality.
+    """
+
+    sock_type = socket.SOCK_DGRAM
+
+    def __init__(self, host='127.0.0.1', port=0, mtu=None, delays=None):
+        super().__init__(host, port)
+        self.mtu = mtu
+        self.delays = delays or {}
+
+    def serve(self):
+        # IP + UDP header bytes on top of the payload
+        overhead = 48 if ':' in self.host else 28
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+                if self.mtu and len(data) + overhead > self.mtu:
+                    continue
+                delay = self.delays.get(addr[0])
+                if delay:
+                    timer = threading.Timer(delay / 1000, self._reply, args=(data, addr))
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    self.sock.sendto(data, addr)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+    def _reply(self, data, addr):
+        try:
+            if self.sock:
+                self.sock.sendto(data, addr)
+        except OSError:
+            pass
+
+
+class TcpStreamServer(LocalServer):
+    """Accepts connections and hands each one to `handle` on its own thread."""
+
+    chunk_size = 64 * 1024
+
+    def serve(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._handle_safely, args=(conn,), daemon=True).start()
+
+    def _handle_safely(self, conn):
+        try:
+            conn.settimeout(0.5)
+            self.handle(conn)
+        except OSError:
+            pass
+        except Exception as e:
+            logging.debug(f"{type(self).__name__} connection error: {str(e)}")
+        finally:
+            conn.close()
+
+    def handle(self, conn):
+        raise NotImplementedError
+
+
+class TcpSinkServer(TcpStreamServer):
+    """Reads and discards everything it receives (upload load target)."""
+
+    def handle(self, conn):
+        while self.running:
+            try:
+                if not conn.recv(self.chunk_size):
+                    break
+            except socket.timeout:
+                continue
+
+
+class TcpSourceServer(TcpStreamServer):
+    """Writes data as fast as the client reads it (download load source)."""
+
+    def handle(self, conn):
+        payload = b'\x00' * self.chunk_size
+        while self.running:
+            try:
+                conn.sendall(payload)
+            except socket.timeout:
+                continue
+
+
+class DnsStubServer(LocalServer):
+    """Answers every A query with a fixed address (stand-in for a DNS resolver).
+
+    Names it has answered before reply after delay_ms, first-time names after
+    uncached_delay_ms, imitating a resolver's cache; failure_rate drops queries.
+    """
+
+    sock_type = socket.SOCK_DGRAM
+
+    def __init__(self, host='127.0.0.1', port=0, answer='192.0.2.1', delay_ms=1.0,
+                 uncached_delay_ms=20.0, failure_rate=0.0, ttl=60):
+        super().__init__(host, port)
+        self.answer = answer
+        self.delay_ms = delay_ms
+        self.uncached_delay_ms = uncached_delay_ms
+        self.failure_rate = failure_rate
+        self.ttl = ttl
+        self.seen = set()
+        self.queries = 0
+
+    def serve(self):
+        import random
+        from dns_wire import question_key, build_response, QTYPE_A
+
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            key = question_key(data)
+            if key is None:
+                continue
+            self.queries += 1
+            if random.random() < self.failure_rate:
+                continue
+            delay = self.delay_ms if key in self.seen else self.uncached_delay_ms
+            self.seen.add(key)
+            reply = build_response(data, self.answer if key[1] == QTYPE_A else None, ttl=self.ttl)
+            # Replies are delayed on timers so slow answers don't hold up the receive loop
+            timer = threading.Timer(delay / 1000, self._reply, args=(reply, addr))
+            timer.daemon = True
+            timer.start()
+
+    def _reply(self, reply, addr):
+        try:
+            if self.sock:
+                self.sock.sendto(reply, addr)
+        except OSError:
+            pass
+
+
+class TickReflector(LocalServer):
+    """Game-tick reflector (see game_tick): acknowledges every client tick with its
+    receive time and streams its own ticks back at the client's rate and size."""
+
+    sock_type = socket.SOCK_DGRAM
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__(host, port)
+        self.sessions = {}  # (addr, session id) -> state
+
+    def serve(self):
+        import time
+        from game_tick import unpack_tick, pack_tick, MSG_START, MSG_UP, MSG_ACK, MSG_START_ACK, MSG_STOP, MSG_STOP_ACK
+
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            received_ns = time.perf_counter_ns()
+            message = unpack_tick(data)
+            if message is None:
+                continue
+            msg_type, session_id, sequence, ts1, ts2 = message
+            key = (addr, session_id)
+            session = self.sessions.get(key)
+            try:
+                if msg_type == MSG_UP:
+                    if session is not None:
+                        session['received'] += 1
+                        session['last_seen'] = time.monotonic()
+                    self.sock.sendto(pack_tick(MSG_ACK, session_id, sequence, ts1, received_ns, len(data)), addr)
+                elif msg_type == MSG_START:
+                    if session is None:
+                        # sequence: tick rate, ts1: duration (ms), ts2: packet size
+                        session = self.sessions[key] = {
+                            'received': 0, 'sent': 0, 'last_seen': time.monotonic(),
+                            'stop': threading.Event(),
+                        }
+                        threading.Thread(target=self._stream, args=(addr, session_id, session, sequence, ts1 / 1000, ts2),
+                                         daemon=True).start()
+                    self.sock.sendto(pack_tick(MSG_START_ACK, session_id, 0), addr)
+                elif msg_type == MSG_STOP and session is not None:
+                    session['stop'].set()
+                    self.sock.sendto(pack_tick(MSG_STOP_ACK, session_id, session['sent'], session['received']), addr)
+            except OSError:
+                continue
+            self._prune(time.monotonic())
+
+    def _prune(self, now):
+        for key, session in list(self.sessions.items()):
+            # Kept a while after stopping so retried STOPs still get the counts
+            if now - session['last_seen'] > 60:
+                session['stop'].set()
+                del self.sessions[key]
+
+    def _stream(self, addr, session_id, session, rate, duration, size):
+        import time
+        from game_tick import pack_tick, MSG_DOWN, MAX_TICK_RATE, IDLE_TIMEOUT
+        from pacing import Pacer
+
+        rate = max(1, min(rate, MAX_TICK_RATE))
+        pacer = Pacer(1.0 / rate).start()
+        for sequence in range(int(duration * rate)):
+            if pacer.wait(session['stop']) is None or not self.running:
+                break
+            if time.monotonic() - session['last_seen'] > IDLE_TIMEOUT:
+                break
+            try:
+                self.sock.sendto(pack_tick(MSG_DOWN, session_id, sequence, time.perf_counter_ns(), size=size), addr)
+            except (OSError, AttributeError):
+                break  # Socket closed by stop()
+            session['sent'] += 1
@@ -0,0 +1,262 @@
+"""
+OpenMetrics exporter for the PING Optimizer application.
+Serves live latency histograms, probe and loss counters, jitter, applied profiles,
+settings drift, latency events and system command timings at
+http://127.0.0.1:9464/metrics for Prometheus (or any OpenMetrics scraper).
+
+Everything is pre-aggregated as it happens: a sample costs a few increments under
+a lock, and a scrape copies the fixed-size state under the same lock and formats
+it on the HTTP server's own thread. Scrapes cost the same however long the app has
+been running and never wait on the probe loop or the GUI.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import profiles
+
+DEFAULT_PORT = 9464
+DEFAULT_HOST = '127.0.0.1'  # Pass 0.0.0.0 to let a fleet Prometheus scrape it directly
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'ping_optimizer'
+# Latency bucket upper bounds in seconds (+Inf is implied)
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.015, 0.02, 0.03, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 1.0)
+COMMAND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MAX_TARGETS = 32  # Game endpoints come and go; later targets share the "other" label
+JITTER_GAIN = 1 / 16  # RFC 3550 interarrival jitter smoothing
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self):
+        return list(self.counts), self.total, self.count
+
+
+class TargetMetrics:
+    __slots__ = ('latency', 'replies', 'lost', 'jitter', 'last')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.replies = 0
+        self.lost = 0
+        self.jitter = 0.0
+        self.last = None
+
+    def observe(self, rtt_ms):
+        if rtt_ms is None:
+            self.lost += 1
+            return
+        seconds = rtt_ms / 1000
+        if self.last is not None:
+            self.jitter += (abs(seconds - self.last) - self.jitter) * JITTER_GAIN
+        self.last = seconds
+        self.replies += 1
+        self.latency.observe(seconds)
+
+
+class MetricsRegistry:
+    """Pre-aggregated state behind the exporter; every update is O(1) and thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.targets = {}
+        self.commands = {}  # (program, result) -> Histogram
+        self.events = {'spike': 0, 'shift': 0, 'loss_burst': 0}
+        self.drifted = {}
+        self.applied = set(profiles.load_state().get('applied', {}))
+
+    def observe(self, target, rtt_ms):
+        with self.lock:
+            metrics = self.targets.get(target)
+            if metrics is None:
+                if len(self.targets) >= MAX_TARGETS:
+                    target = 'other'
+                metrics = self.targets.setdefault(target, TargetMetrics())
+            metrics.observe(rtt_ms)
+
+    def observe_command(self, cmd, seconds, returncode):
+        program = os.path.splitext(os.path.basename(cmd[0]))[0].lower() if cmd else 'unknown'
+        result = 'ok' if returncode == 0 else 'failed'
+        with self.lock:
+            histogram = self.commands.get((program, result))
+            if histogram is None:
+                histogram = self.commands[(program, result)] = Histogram(COMMAND_BUCKETS)
+            histogram.observe(seconds)
+
+    def note_change(self, change):
+        # profiles.change_listeners record: which profiles are applied now
+        if not change['successful'] or change['action'] not in ('apply', 'revert'):
+            return
+        with self.lock:
+            if change['action'] == 'apply':
+                self.applied.add(change['profile'])
+            else:
+                self.applied.discard(change['profile'])
+
+    def set_drift(self, record):
+        with self.lock:
+            self.drifted = dict(record['drifted'])
+
+    def count_event(self, event):
+        with self.lock:
+            self.events[event['type']] += 1
+
+    def snapshot(self):
+        # Copy under the lock; formatting happens outside it
+        with self.lock:
+            targets = {label: (m.latency.snapshot(), m.replies, m.lost, m.jitter, m.last)
+                       for label, m in self.targets.items()}
+            commands = {key: histogram.snapshot() for key, histogram in self.commands.items()}
+            return targets, commands, dict(self.events), dict(self.drifted), set(self.applied)
+
+    def render(self):
+        targets, commands, events, drifted, applied = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text, unit=None):
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            if unit:
+                lines.append(f"# UNIT {PREFIX}_{name} {unit}")
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+
+        def sample(name, labels, value):
+            label_text = ",".join(f'{key}="{escape(str(val))}"' for key, val in labels)
+            lines.append(f"{PREFIX}_{name}{{{label_text}}} {format_value(value)}" if label_text
+                         else f"{PREFIX}_{name} {format_value(value)}")
+
+        def histogram(name, labels, snapshot, bounds):
+            counts, total, count = snapshot
+            cumulative = 0
+            for bound, bucket in zip(bounds + (float('inf'),), counts):
+                cumulative += bucket
+                sample(f"{name}_bucket", labels + [('le', format_value(bound))], cumulative)
+            sample(f"{name}_count", labels, count)
+            sample(f"{name}_sum", labels, total)
+
+        family('latency_seconds', 'histogram', "Probe round-trip time.", 'seconds')
+        for label, (latency, *_) in sorted(targets.items()):
+            histogram('latency_seconds', [('target', label)], latency, LATENCY_BUCKETS)
+        family('probes', 'counter', "Probes sent, by outcome (loss = lost / (reply + lost)).")
+        for label, (_, replies, lost, _, _) in sorted(targets.items()):
+            sample('probes_total', [('target', label), ('result', 'reply')], replies)
+            sample('probes_total', [('target', label), ('result', 'lost')], lost)
+        family('jitter_seconds', 'gauge', "Smoothed interarrival jitter (RFC 3550).", 'seconds')
+        for label, (_, _, _, jitter, _) in sorted(targets.items()):
+            sample('jitter_seconds', [('target', label)], jitter)
+        family('last_latency_seconds', 'gauge', "Most recent probe round-trip time.", 'seconds')
+        for label, (_, _, _, _, last) in sorted(targets.items()):
+            if last is not None:
+                sample('last_latency_seconds', [('target', label)], last)
+
+        family('profile_applied', 'gauge', "1 if the optimization profile is applied.")
+        for name in sorted(profiles.PROFILES):
+            sample('profile_applied', [('profile', name)], 1 if name in applied else 0)
+        family('settings_drifted', 'gauge', "Applied settings whose live value has drifted.")
+        sample('settings_drifted', [], len(drifted))
+        family('setting_drifted', 'gauge', "1 for each drifted setting.")
+        for name in sorted(drifted):
+            sample('setting_drifted', [('setting', name), ('expected', drifted[name]['expected']),
+                                       ('actual', drifted[name]['actual'])], 1)
+        family('latency_events', 'counter', "Latency spikes, shifts and loss bursts detected.")
+        for kind, count in sorted(events.items()):
+            sample('latency_events_total', [('type', kind)], count)
+
+        family('command_duration_seconds', 'histogram', "System command run time (netsh, PowerShell...).",
+               'seconds')
+        for (program, result), snapshot in sorted(commands.items()):
+            histogram('command_duration_seconds', [('program', program), ('result', result)], snapshot,
+                      COMMAND_BUCKETS)
+        family('start_time_seconds', 'gauge', "When this process started exporting.", 'seconds')
+        sample('start_time_seconds', [], self.started)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # A scrape every few seconds would flood the log
+
+
+class MetricsExporter:
+    """HTTP server for a registry on its own daemon thread.
+
+    Registers the registry for profile changes and command timings while running;
+    the owner feeds samples, drift records and latency events.
+    """
+
+    def __init__(self, registry=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.registry = registry or MetricsRegistry()
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def address(self):
+        return self.server.server_address[:2] if self.server else (self.host, self.port)
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = self.registry
+        profiles.change_listeners.append(self.registry.note_change)
+        profiles.command_listeners.append(self.registry.observe_command)
+        self.thread = threading.Thread(target=self.server.serve_forever, name='MetricsExporter', daemon=True)
+        self.thread.start()
+        host, port = self.address
+        logging.info(f"Serving metrics at http://{host}:{port}/metrics")
+        return self
+
+    def stop(self):
+        if self.server is None:
+            return
+        profiles.change_listeners.remove(self.registry.note_change)
+        profiles.command_listeners.remove(self.registry.observe_command)
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        self.thread = None
@@ -0,0 +1,154 @@
+"""
+Logging and metrics persistence for the PING Optimizer application.
+Nothing is configured at import time; call setup_logging() once from the entry point.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+
+from diagnostics import recorder
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_FILE = os.path.join(APP_DIR, 'tcp_optimizer.log')
+METRICS_FILE = os.path.join(APP_DIR, 'tcp_metrics.json')
+
+# Set by setup_logging() so repeated calls (GUI + CLI in one process) are harmless
+_metrics_handler = None
+
+
+class MetricsHandler(logging.Handler):
+    # Custom handler for JSON metrics
+    def __init__(self, metrics_file):
+        super().__init__()
+        self.metrics_file = metrics_file
+        # Existing history is parsed on first use (or by preload() off the GUI thread)
+        # so startup doesn't pay for reading the whole file
+        self.metrics = None
+
+        # Start new session
+        self.current_session = {
+            'start_time': datetime.now().isoformat(),
+            'baseline_ping': None,
+            'optimized_pings': [],
+            'tcp_commands': {
+                'successful': [],
+                'failed': []
+            },
+            'improvements': []
+        }
+
+    def _ensure_loaded(self):
+        if self.metrics is not None:
+            return
+        metrics = {
+            'sessions': []
+        }
+        # Load existing metrics if file exists
+        if os.path.exists(self.metrics_file):
+            try:
+                with open(self.metrics_file, 'r') as f:
+                    metrics = json.load(f)
+            except:
+                pass
+        metrics.setdefault('sessions', []).append(self.current_session)
+        self.metrics = metrics
+
+    def preload(self):
+        # Same lock emit() runs under, so a background preload can't race a write
+        self.acquire()
+        try:
+            self._ensure_loaded()
+        finally:
+            self.release()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+            if record.levelname == 'INFO':
+                # Structured results attached via extra={'session_data': {...}}
+                session_data = getattr(record, 'session_data', None)
+                if session_data:
+                    for key, value in session_data.items():
+                        self.current_session.setdefault(key, []).append(value)
+                # Parse and store metrics based on message type
+                if 'baseline_ping' in msg:
+                    value = msg.split(': ')[1].replace('ms', '').strip()
+                    self.current_session['baseline_ping'] = float(value)
+                elif 'Successfully applied' in msg:
+                    self.current_session['tcp_commands']['successful'].append(msg)
+                elif 'Command failed' in msg:
+                    self.current_session['tcp_commands']['failed'].append(msg)
+                elif 'Ping stats' in msg:
+                    # Extract ping values and improvement
+                    ping_data = {'time': record.created}  # Epoch seconds, for the latency chart history
+                    parts = msg.split(' - ')
+                    for part in parts:
+                        if ':' in part:
+                            key = part.split(':')[0].strip()
+                            value = part.split(':')[1].strip().replace('ms', '').strip()
+                            if key == 'Improvement':
+                                ping_data[key] = value  # Keep the % symbol for improvement
+                            else:
+                                try:
+                                    ping_data[key] = float(value)
+                                except:
+                                    ping_data[key] = value
+                    self.current_session['optimized_pings'].append(ping_data)
+
+                # Save metrics to file
+                self._ensure_loaded()
+                with recorder.span('metrics write'), open(self.metrics_file, 'w') as f:
+                    json.dump(self.metrics, f, indent=2)
+        except Exception as e:
+            print(f"Error in metrics handler: {e}")
+
+
+# Enhanced Logging Configuration
+def setup_logging(console=True, log_file=LOG_FILE, metrics_file=METRICS_FILE):
+    global _metrics_handler
+    metrics_logger = logging.getLogger('metrics')
+    if _metrics_handler is not None:
+        return metrics_logger
+
+    # Configure main logger
+    handlers = [logging.FileHandler(log_file, delay=True)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+    # Create a separate logger for metrics
+    metrics_logger.setLevel(logging.INFO)
+
+    # Add metrics handler
+    _metrics_handler = MetricsHandler(metrics_file)
+    metrics_formatter = logging.Formatter('%(asctime)s - %(message)s')
+    _metrics_handler.setFormatter(metrics_formatter)
+    metrics_logger.addHandler(_metrics_handler)
+
+    return metrics_logger
+
+
+def get_current_session():
+    # The session being recorded by this process, or None before setup_logging()
+    return _metrics_handler.current_session if _metrics_handler else None
+
+
+def preload_metrics():
+    # Parse the metrics history ahead of the first write; safe to call from a worker thread
+    if _metrics_handler is not None:
+        _metrics_handler.preload()
+
+
+def load_metrics(metrics_file=METRICS_FILE):
+    # Read the persisted metrics without starting a new session
+    try:
+        with open(metrics_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'sessions': []}
@@ -0,0 +1,316 @@
+"""
+Path MTU discovery for the PING Optimizer application.
+Finds the largest packet that reaches a target unfragmented by binary search with
+Don't Fragment probes: the system ping (ICMP echo with DF) for plain hosts, or
+DF-flagged datagrams for udp-echo:host:port targets. The result is compared with
+the MTU of the adapter that carries the route, since an adapter MTU above the path
+MTU leaves full-size TCP segments relying on PMTU discovery, which stalls silently
+wherever ICMP "fragmentation needed" is filtered.
+"""
+
+import sys
+import time
+import errno
+import socket
+import logging
+import subprocess
+
+import psutil
+
+from probes import PROBE_HEADER
+from probe_scheduler import parse_target
+
+ETHERNET_MTU = 1500
+IP_MAX_PACKET = 65535
+MIN_MTU = {socket.AF_INET: 576, socket.AF_INET6: 1280}  # Smallest MTU each IP version guarantees
+IP_HEADER = {socket.AF_INET: 20, socket.AF_INET6: 40}
+UDP_HEADER = 8
+ICMP_HEADER = 8
+TCP_HEADER = 20
+PROBE_ATTEMPTS = 2  # A size only counts as too big after this many unanswered probes
+PROBE_TIMEOUT = 1.0
+
+# Socket options Python doesn't export; values from the platform headers
+if sys.platform == 'win32':
+    DONT_FRAGMENT = {socket.AF_INET: (socket.IPPROTO_IP, 14, 1),  # IP_DONTFRAGMENT
+                     socket.AF_INET6: (socket.IPPROTO_IPV6, 14, 1)}  # IPV6_DONTFRAG
+    PATH_MTU = {socket.AF_INET: (socket.IPPROTO_IP, 73), socket.AF_INET6: (socket.IPPROTO_IPV6, 72)}
+elif sys.platform.startswith('linux'):
+    DONT_FRAGMENT = {socket.AF_INET: (socket.IPPROTO_IP, 10, 2),  # IP_MTU_DISCOVER = IP_PMTUDISC_DO
+                     socket.AF_INET6: (socket.IPPROTO_IPV6, 23, 2)}  # IPV6_MTU_DISCOVER
+    PATH_MTU = {socket.AF_INET: (socket.IPPROTO_IP, 14), socket.AF_INET6: (socket.IPPROTO_IPV6, 24)}
+else:
+    DONT_FRAGMENT = {socket.AF_INET: (socket.IPPROTO_IP, 28, 1)}  # IP_DONTFRAG (macOS/BSD)
+    PATH_MTU = {}
+
+MESSAGE_TOO_BIG = {errno.EMSGSIZE, 10040}  # 10040: WSAEMSGSIZE
+
+metrics_logger = logging.getLogger('metrics')
+
+
+def mss_for_mtu(mtu, family=socket.AF_INET):
+    # Largest TCP payload per segment without options
+    return mtu - IP_HEADER[family] - TCP_HEADER
+
+
+def route_interface(address):
+    """(interface name, source IP) the OS would use to reach address, or (None, source IP)."""
+    family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+    with socket.socket(family, socket.SOCK_DGRAM) as sock:
+        sock.connect(address)  # No packet is sent; this only consults the routing table
+        source = sock.getsockname()[0]
+    for name, addrs in psutil.net_if_addrs().items():
+        if any(addr.address.split('%')[0] == source for addr in addrs):
+            return name, source
+    return None, source
+
+
+def interface_mtus():
+    # {name: (mtu, is_up)} for every adapter
+    try:
+        return {name: (stats.mtu, stats.isup) for name, stats in psutil.net_if_stats().items()}
+    except OSError:
+        return {}
+
+
+def os_path_mtu(address):
+    """The OS path MTU cache entry for address (the route MTU until a "fragmentation
+    needed" message lowers it), or None where the platform doesn't expose it."""
+    family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+    if family not in PATH_MTU:
+        return None
+    try:
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            level, option, value = DONT_FRAGMENT[family]
+            sock.setsockopt(level, option, value)
+            sock.connect(address)
+            return sock.getsockopt(*PATH_MTU[family])
+    except OSError:
+        return None
+
+
+class UdpMtuProber:
+    """DF-flagged datagrams of a given total size to a UDP echo endpoint."""
+
+    def __init__(self, address, timeout=PROBE_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self.family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        if self.family not in DONT_FRAGMENT:
+            raise OSError("Don't Fragment is not supported for this address family here")
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        level, option, value = DONT_FRAGMENT[self.family]
+        self.sock.setsockopt(level, option, value)
+        self.sock.connect(address)
+        self.sequence = 0
+
+    def fits(self, mtu):
+        # True when a packet of mtu bytes (IP header included) got through unfragmented
+        payload_size = mtu - IP_HEADER[self.family] - UDP_HEADER
+        for _ in range(PROBE_ATTEMPTS):
+            self.sequence += 1
+            payload = PROBE_HEADER.pack(self.sequence, time.perf_counter_ns())
+            try:
+                self.sock.send(payload + b'\x00' * (payload_size - len(payload)))
+            except OSError as e:
+                if e.errno in MESSAGE_TOO_BIG:
+                    return False  # Larger than the local link or the cached path MTU
+                continue
+            if self._await_reply():
+                return True
+        return False
+
+    def _await_reply(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.sock.settimeout(remaining)
+            try:
+                data = self.sock.recv(65535)
+            except OSError:
+                # Timeout, or an ICMP error such as "fragmentation needed" surfacing on the socket
+                return False
+            if len(data) >= PROBE_HEADER.size and PROBE_HEADER.unpack_from(data)[0] == self.sequence:
+                return True
+
+    def close(self):
+        self.sock.close()
+
+
+class PingMtuProber:
+    """ICMP echo with Don't Fragment set, through the system ping."""
+
+    def __init__(self, host, family=socket.AF_INET, timeout=PROBE_TIMEOUT):
+        self.host = host
+        self.family = family
+        self.timeout = timeout
+
+    def command(self, payload_size):
+        if sys.platform == 'win32':
+            return ['ping', '-n', '1', '-w', str(int(self.timeout * 1000)), '-f', '-l', str(payload_size), self.host]
+        if sys.platform == 'darwin':
+            return ['ping', '-c', '1', '-t', str(max(1, int(self.timeout))), '-D', '-s', str(payload_size), self.host]
+        return ['ping', '-c', '1', '-W', str(max(1, int(self.timeout))), '-M', 'do', '-s', str(payload_size), self.host]
+
+    def fits(self, mtu):
+        payload_size = mtu - IP_HEADER[self.family] - ICMP_HEADER
+        kwargs = {}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        for _ in range(PROBE_ATTEMPTS):
+            try:
+                completed = subprocess.run(self.command(payload_size), capture_output=True, text=True,
+                                           timeout=self.timeout + 5, **kwargs)
+            except subprocess.TimeoutExpired:
+                continue
+            # Windows ping exits 0 for some errors; only an echo reply carries a TTL
+            if completed.returncode == 0 and 'ttl=' in completed.stdout.lower():
+                return True
+            output = (completed.stdout + completed.stderr).lower()
+            if 'fragment' in output or 'too long' in output:
+                return False  # Refused locally; retrying won't change that
+        return False
+
+    def close(self):
+        pass
+
+
+def search_mtu(fits, low, high):
+    """Largest mtu in [low, high] for which fits(mtu) holds, or None if low doesn't fit.
+
+    Assumes every size below a fitting size also fits, so it takes about
+    log2(high - low) probes instead of one per size.
+    """
+    if not fits(low):
+        return None
+    if fits(high):
+        return high
+    while high - low > 1:
+        middle = (low + high) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def discover_path_mtu(target, timeout=PROBE_TIMEOUT):
+    """Path MTU to a target ("host" for ICMP or "udp-echo:host:port") compared with its adapter."""
+    target = parse_target(target) if isinstance(target, str) else target
+    if target.kind not in ('icmp', 'udp-echo'):
+        raise ValueError("MTU discovery needs an ICMP host or a udp-echo:HOST:PORT target")
+    address = socket.getaddrinfo(target.host, target.port or 0, type=socket.SOCK_DGRAM)[0][4][:2]
+    family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+    interface, source = route_interface(address)
+    adapter_mtu = interface_mtus().get(interface, (None, None))[0]
+    cached = os_path_mtu(address)
+    # The path can't carry more than the first hop does
+    high = adapter_mtu or cached or ETHERNET_MTU
+    prober = UdpMtuProber(address, timeout) if target.kind == 'udp-echo' else PingMtuProber(address[0], family, timeout)
+    started = time.monotonic()
+    try:
+        path_mtu = search_mtu(prober.fits, MIN_MTU[family], high)
+    finally:
+        prober.close()
+    result = {
+        'target': target.label,
+        'address': address[0],
+        'time': time.time(),
+        'interface': interface,
+        'source': source,
+        'interface_mtu': adapter_mtu,
+        'os_path_mtu': os_path_mtu(address) if cached is not None else None,
+        'path_mtu': path_mtu,
+        'mss': mss_for_mtu(path_mtu, family) if path_mtu else None,
+        'seconds': time.monotonic() - started,
+    }
+    result['issues'] = mtu_issues(result)
+    return result
+
+
+def mtu_issues(result):
+    # Mismatches between the discovered path and the adapter configuration
+    issues = []
+    path_mtu, adapter_mtu = result['path_mtu'], result['interface_mtu']
+    if path_mtu is None:
+        issues.append("no reply even to minimum-size packets")
+        return issues
+    if adapter_mtu and adapter_mtu > ETHERNET_MTU and result['interface'] and not is_loopback(result['interface']):
+        issues.append(f"jumbo frames on {result['interface']} (MTU {adapter_mtu}); "
+                      f"Internet paths carry at most {ETHERNET_MTU}")
+    if adapter_mtu and path_mtu < adapter_mtu:
+        issues.append(f"path MTU {path_mtu} is below the adapter MTU {adapter_mtu}; full-size packets "
+                      f"depend on PMTU discovery - set the MTU to {path_mtu} or clamp the MSS to "
+                      f"{result['mss']}")
+    cached = result['os_path_mtu']
+    if cached and cached != path_mtu and cached < min(adapter_mtu or IP_MAX_PACKET, IP_MAX_PACKET):
+        # The cache was lowered by a "fragmentation needed" message
+        issues.append(f"the OS path MTU cache says {cached}")
+    return issues
+
+
+def is_loopback(interface):
+    return interface.lower().startswith(('lo', 'loopback'))
+
+
+def interface_report(results=()):
+    """Effective MTU and MSS per active adapter; effective MTU is the smallest path MTU
+    discovered through it, if any of results went that way."""
+    effective = {}
+    for result in results:
+        if result['interface'] and result['path_mtu']:
+            effective[result['interface']] = min(result['path_mtu'], effective.get(result['interface'], 65535))
+    report = []
+    for name, (mtu, is_up) in sorted(interface_mtus().items()):
+        if not is_up:
+            continue
+        effective_mtu = effective.get(name, mtu)
+        report.append({
+            'interface': name,
+            'mtu': mtu,
+            'effective_mtu': effective_mtu,
+            'mss': mss_for_mtu(effective_mtu),
+            'mismatch': effective_mtu != mtu,
+        })
+    return report
+
+
+def run_mtu_check(targets, timeout=PROBE_TIMEOUT):
+    """Discover the path MTU to every target and record the results in the session."""
+    results = []
+    for target in targets:
+        try:
+            results.append(discover_path_mtu(target, timeout))
+        except (OSError, ValueError) as e:
+            label = target if isinstance(target, str) else target.label
+            logging.error(f"MTU discovery to {label} failed: {str(e)}")
+            results.append({'target': label, 'error': str(e)})
+    check = {'time': time.time(), 'targets': results,
+             'interfaces': interface_report([r for r in results if 'error' not in r])}
+    metrics_logger.info("MTU check - " + "; ".join(format_result(result) for result in results),
+                        extra={'session_data': {'mtu_checks': check}})
+    return check
+
+
+def run_local_mtu_check(mtu=1400):
+    """Discovery against a loopback echo server that drops anything larger than mtu,
+    standing in for a path with a smaller MTU than the adapter."""
+    from local_endpoints import UdpEchoServer
+
+    with UdpEchoServer(mtu=mtu) as server:
+        host, port = server.address
+        return run_mtu_check([f"udp-echo:{host}:{port}"], timeout=0.2)
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"{result['target']}: {result['error']}"
+    if result['path_mtu'] is None:
+        return f"{result['target']}: no reply"
+    via = f" via {result['interface']} (MTU {result['interface_mtu']})" if result['interface'] else ""
+    line = f"{result['target']}: path MTU {result['path_mtu']}, MSS {result['mss']}{via}"
+    if result['issues']:
+        line += " - " + "; ".join(result['issues'])
+    return line
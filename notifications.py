@@ -0,0 +1,97 @@
+"""
+Non-blocking notifications for the PING Optimizer application.
+Toasts stack in the top-right corner of the window and fade on their own, so
+results and latency events never stop the user (or the event loop) the way a
+modal QMessageBox does. Clicking a toast dismisses it.
+"""
+
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation
+from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout, QLayout, QGraphicsOpacityEffect
+
+import styles
+
+TOAST_SECONDS = 5
+FADE_MS = 600
+MAX_TOASTS = 4  # Older toasts make way for new ones
+MARGIN = 20
+TOAST_WIDTH = 360
+
+
+class Toast(QLabel):
+    def __init__(self, text, level, parent):
+        super().__init__(text, parent)
+        self.setWordWrap(True)
+        self.setFixedWidth(TOAST_WIDTH)
+        self.setStyleSheet(styles.TOAST_STYLE % styles.TOAST_COLORS.get(level, styles.CYAN))
+        self.setCursor(Qt.PointingHandCursor)
+        self.opacity = QGraphicsOpacityEffect(self)
+        self.opacity.setOpacity(1.0)
+        self.setGraphicsEffect(self.opacity)
+        self.fade = None
+        self.dismissed = False
+        # Owned by the toast, so it can't fire after a click has already removed it
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fade_out)
+        self.timer.start(TOAST_SECONDS * 1000)
+
+    def fade_out(self):
+        if self.fade is not None:
+            return
+        self.fade = QPropertyAnimation(self.opacity, b"opacity", self)
+        self.fade.setDuration(FADE_MS)
+        self.fade.setStartValue(self.opacity.opacity())
+        self.fade.setEndValue(0.0)
+        self.fade.finished.connect(self.dismiss)
+        self.fade.start()
+
+    def dismiss(self):
+        if self.dismissed:
+            return
+        self.dismissed = True
+        area = self.parent()
+        self.hide()
+        self.deleteLater()
+        if isinstance(area, NotificationArea):
+            area.toast_removed(self)
+
+    def mousePressEvent(self, event):
+        self.dismiss()
+
+
+class NotificationArea(QWidget):
+    """Overlay on the window's top-right corner; sized to its toasts so it never blocks clicks elsewhere."""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.host = window
+        self.toasts = []
+        self.stack = QVBoxLayout(self)
+        self.stack.setContentsMargins(0, 0, 0, 0)
+        self.stack.setSpacing(8)
+        self.stack.setSizeConstraint(QLayout.SetFixedSize)  # Always exactly as big as the toasts
+        self.hide()
+
+    def notify(self, text, level='info'):
+        """level: 'info', 'success', 'warning' or 'error' (the border colour)."""
+        while len(self.toasts) >= MAX_TOASTS:
+            self.toasts[0].dismiss()
+        toast = Toast(text, level, self)
+        self.toasts.append(toast)
+        self.stack.addWidget(toast)
+        self.show()
+        self.raise_()
+        self.reposition()
+
+    def toast_removed(self, toast):
+        if toast in self.toasts:
+            self.toasts.remove(toast)
+            self.stack.removeWidget(toast)
+        if self.toasts:
+            self.reposition()
+        else:
+            self.hide()
+
+    def reposition(self):
+        self.stack.activate()
+        self.move(self.host.width() - self.width() - MARGIN, MARGIN)
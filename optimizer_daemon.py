@@ -0,0 +1,201 @@
+"""
+Headless background daemon for the PING Optimizer application.
+Keeps measuring latency without a display, logs one summary per interval (and
+every spike, shift or loss burst as it happens) to the metrics store and publishes
+its latest state in a small status file.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import threading
+
+import profiles
+from metrics_store import APP_DIR
+from latency_stats import summarize
+from ping_monitor import DEFAULT_TARGET, format_ping_stats
+from probe_scheduler import ProbeMonitor
+from tcp_health import StackHealthTracker, HEALTH_WINDOW
+from settings_drift import DriftMonitor
+from latency_events import LatencyEventDetector
+from diagnostics import recorder
+
+STATUS_FILE = os.path.join(APP_DIR, 'tcp_optimizer_status.json')
+
+metrics_logger = logging.getLogger('metrics')
+
+
+class OptimizerDaemon:
+    def __init__(self, target=DEFAULT_TARGET, report_interval=60, apply=(),
+                 status_file=STATUS_FILE, reapply_drift=False, metrics_port=None, metrics_host=None,
+                 diagnostics=False):
+        self.target = target
+        self.report_interval = report_interval
+        self.apply = list(apply)
+        self.status_file = status_file
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.samples = []
+        self.lost = 0
+        self.totals = {'samples': 0, 'lost': 0, 'intervals': 0}
+        self.monitor = None
+        self.last_summary = None
+        self.health = StackHealthTracker()
+        # Optional OpenMetrics endpoint, fed the same samples, drift records and events
+        self.exporter = None
+        if metrics_port is not None:
+            from metrics_exporter import MetricsExporter, DEFAULT_HOST
+            self.exporter = MetricsExporter(host=metrics_host or DEFAULT_HOST, port=metrics_port)
+        registry = self.exporter.registry if self.exporter else None
+        self.drift = DriftMonitor(auto_reapply=reapply_drift, on_drift=registry.set_drift if registry else None)
+        # Spikes, shifts and loss bursts go straight to the session
+        self.events = LatencyEventDetector(on_event=registry.count_event if registry else None)
+        # Span timings, dumped to the diagnostics file every interval
+        self.diagnostics = diagnostics
+        if diagnostics:
+            recorder.enable()
+
+    def on_sample(self, rtt):
+        self.events.add(rtt)
+        if self.exporter:
+            self.exporter.registry.observe(self.target, rtt)
+        with self.lock:
+            if rtt is None:
+                self.lost += 1
+            else:
+                self.samples.append(rtt)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        if hasattr(signal, 'SIGBREAK'):
+            signal.signal(signal.SIGBREAK, self.stop)
+
+    def start_exporter(self):
+        # Called before anything else starts, so a taken port fails fast; raises OSError
+        if self.exporter and not self.exporter.running:
+            try:
+                self.exporter.start()
+            except OSError as e:
+                logging.error(f"Could not serve metrics on {self.exporter.host}:{self.exporter.port}: {str(e)}")
+                raise
+
+    def run(self):
+        self.start_exporter()
+        logging.info(f"Daemon started (pid {os.getpid()}) measuring {self.target}")
+        self.monitor = ProbeMonitor([self.target], on_sample=self.on_sample)
+        # TCP counter rates before/after each applied profile are attached to the session
+        self.health.start()
+        profiles.change_listeners.append(self.health.note_change)
+        # Applied settings are re-checked against the live values once a minute
+        self.drift.start()
+        try:
+            self.monitor.start()
+            if self.apply:
+                # Collect a baseline window of counters first so "before" means something
+                self.stop_event.wait(HEALTH_WINDOW)
+            for name in self.apply:
+                if self.stop_event.is_set():
+                    break
+                result = profiles.apply_profile(name)
+                logging.info(f"Daemon applied {name}: {len(result['successful'])}/{result['total']} commands successful")
+
+            while not self.stop_event.wait(self.report_interval):
+                # Restart probing if it stopped (e.g. ping exited when the network went away)
+                if not self.monitor.running:
+                    logging.warning("Probing stopped, restarting")
+                    self.monitor.stop()
+                    self.monitor.start()
+                self.report()
+        finally:
+            self.monitor.stop()
+            profiles.change_listeners.remove(self.health.note_change)
+            self.health.stop()
+            self.drift.stop()
+            if self.exporter:
+                self.exporter.stop()
+            self.report()
+            self.write_status(running=False)
+            logging.info("Daemon stopped")
+
+    def report(self):
+        with self.lock:
+            samples, self.samples = self.samples, []
+            lost, self.lost = self.lost, 0
+        self.totals['samples'] += len(samples)
+        self.totals['lost'] += lost
+        self.totals['intervals'] += 1
+        summary = summarize(samples, len(samples) + lost)
+        if samples:
+            metrics_logger.info(format_ping_stats({
+                'current': samples[-1],
+                'min': summary['min'],
+                'max': summary['max'],
+                'avg': summary['avg'],
+            }))
+        self.last_summary = summary
+        self.write_status(running=True)
+        if self.diagnostics:
+            try:
+                recorder.dump()
+            except OSError as e:
+                logging.error(f"Error writing diagnostics: {str(e)}")
+
+    @property
+    def metrics_url(self):
+        if not self.exporter or not self.exporter.running:
+            return None
+        host, port = self.exporter.address
+        return f"http://{host}:{port}/metrics"
+
+    def write_status(self, running):
+        status = {
+            'pid': os.getpid(),
+            'running': running,
+            'target': self.target,
+            'updated': time.time(),
+            'report_interval': self.report_interval,
+            'last_interval': self.last_summary,
+            'tcp_health': self.health.latest_rates,
+            'settings_drift': self.drift.drifted,
+            'latency_events': self.events.counts,
+            'metrics_url': self.metrics_url,
+            'totals': self.totals,
+        }
+        try:
+            tmp_file = self.status_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(status, f, indent=2)
+            os.replace(tmp_file, self.status_file)
+        except OSError as e:
+            logging.error(f"Error writing daemon status: {str(e)}")
+
+
+def read_status(status_file=STATUS_FILE):
+    try:
+        with open(status_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def spawn_detached(argv):
+    # Re-launch the CLI as a background process that outlives the terminal
+    import subprocess
+    kwargs = {
+        'stdin': subprocess.DEVNULL,
+        'stdout': subprocess.DEVNULL,
+        'stderr': subprocess.DEVNULL,
+        'close_fds': True,
+    }
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    return subprocess.Popen([sys.executable] + argv, **kwargs).pid
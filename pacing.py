@@ -0,0 +1,78 @@
+"""
+Precise periodic scheduling for the PING Optimizer application.
+Deadlines are computed from the start time on the high-resolution monotonic
+clock (perf_counter; time.monotonic() only ticks every ~16 ms on Windows before
+Python 3.13), so late wake-ups never accumulate into drift, and the last stretch
+before a deadline is spent yielding in a short spin because sleep() alone can
+overshoot by a millisecond or more.
+"""
+
+import time
+
+SPIN_THRESHOLD = 0.001  # Seconds before a deadline where sleeping gives way to spinning
+MAX_BEHIND = 2  # Ticks the schedule may fall behind before it skips ahead
+
+
+class Pacer:
+    """Yields deadlines start + n * interval.
+
+    wait() returns the deadline (perf_counter ns) it waited for, or None when
+    stop_event was set. After a stall of more than MAX_BEHIND ticks the missed
+    ticks are skipped (and counted) instead of being sent as a burst.
+    """
+
+    def __init__(self, interval, spin=SPIN_THRESHOLD, max_behind=MAX_BEHIND):
+        self.interval_ns = int(interval * 1e9)
+        self.spin_ns = int(spin * 1e9)
+        self.max_behind = max_behind
+        self.start_ns = None
+        self.tick = 0
+        self.skipped = 0
+        self.max_lateness_ns = 0
+        self.total_lateness_ns = 0
+
+    def start(self, start_ns=None):
+        self.start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        self.tick = 0
+        self.skipped = 0
+        self.max_lateness_ns = 0
+        self.total_lateness_ns = 0
+        return self
+
+    def wait(self, stop_event=None):
+        if self.start_ns is None:
+            self.start()
+        deadline = self.start_ns + self.tick * self.interval_ns
+        while True:
+            remaining = deadline - time.perf_counter_ns()
+            if remaining <= 0:
+                break
+            if remaining > self.spin_ns:
+                seconds = (remaining - self.spin_ns) / 1e9
+                if stop_event is not None:
+                    if stop_event.wait(seconds):
+                        return None
+                else:
+                    time.sleep(seconds)
+            else:
+                time.sleep(0)  # Yield the GIL while spinning
+        if stop_event is not None and stop_event.is_set():
+            return None
+        lateness = time.perf_counter_ns() - deadline
+        self.max_lateness_ns = max(self.max_lateness_ns, lateness)
+        self.total_lateness_ns += lateness
+        self.tick += 1
+        behind = lateness // self.interval_ns
+        if behind > self.max_behind:
+            self.tick += behind
+            self.skipped += behind
+        return deadline
+
+    def report(self):
+        # How closely the schedule was kept, in milliseconds
+        fired = max(1, self.tick - self.skipped)
+        return {
+            'mean_lateness_ms': self.total_lateness_ns / fired / 1e6,
+            'max_lateness_ms': self.max_lateness_ns / 1e6,
+            'skipped': self.skipped,
+        }
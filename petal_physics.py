@@ -0,0 +1,119 @@
+"""
+Vectorized particle state for the cherry blossom animation.
+All petals live in NumPy arrays and advance in one step per frame, so thousands of
+petals cost about the same Python overhead as a handful. Qt-free so it can be
+benchmarked headless:
+
+    python petal_physics.py [count ...]
+"""
+
+import sys
+import time
+import numpy as np
+
+SPRITE_SIZES = np.array([8, 10, 12])
+ROTATION_STEPS = 36
+ROTATION_SPAN = 180.0
+SPAWN_MARGIN = 50
+FRAME_BUDGET_MS = 25.0
+
+
+class PetalField:
+    def __init__(self, count, width, height, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.width = width
+        self.height = height
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.size = np.empty(0)
+        self.sprite_index = np.empty(0, dtype=np.intp)
+        self.angle = np.empty(0)
+        self.speed = np.empty(0)
+        self.alpha = np.empty(0)
+        self.wave_offset = np.empty(0)
+        self.drift_direction = np.empty(0)
+        self.resize(count)
+
+    def __len__(self):
+        return len(self.x)
+
+    def resize(self, count):
+        current = len(self.x)
+        if count <= current:
+            for name in ('x', 'y', 'size', 'sprite_index', 'angle', 'speed',
+                         'alpha', 'wave_offset', 'drift_direction'):
+                setattr(self, name, getattr(self, name)[:count])
+            return
+        extra = count - current
+        # New petals start anywhere in the top fifth (like the initial fill)
+        for name, dtype in (('x', float), ('y', float), ('size', float), ('sprite_index', np.intp),
+                            ('angle', float), ('speed', float), ('alpha', float),
+                            ('wave_offset', float), ('drift_direction', float)):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra, dtype=dtype)]))
+        self.spawn(np.arange(current, count), -SPAWN_MARGIN, self.height * 0.2)
+
+    def spawn(self, index, y_low, y_high):
+        # Masked reassignment of every per-petal attribute
+        n = len(index)
+        if n == 0:
+            return
+        rng = self.rng
+        self.x[index] = rng.uniform(0, self.width, n)
+        self.y[index] = rng.uniform(y_low, max(y_low, y_high), n)
+        size = rng.uniform(8, 12, n)
+        self.size[index] = size
+        self.sprite_index[index] = np.abs(size[:, None] - SPRITE_SIZES[None, :]).argmin(axis=1)
+        self.angle[index] = rng.uniform(0, 360, n)
+        self.speed[index] = rng.uniform(1, 2, n)  # Slightly faster for better movement
+        self.alpha[index] = rng.integers(150, 201, n) / 255  # Randomize transparency
+        self.wave_offset[index] = rng.uniform(0, 2 * np.pi, n)
+        self.drift_direction[index] = rng.choice([-1.0, 1.0], n)  # Random left/right drift
+
+    def set_bounds(self, width, height):
+        self.width = width
+        self.height = height
+
+    def step(self):
+        # Vertical movement
+        self.y += self.speed
+
+        # Horizontal movement with drift
+        self.x += np.sin(self.wave_offset + self.y * 0.05) * 0.8 * self.drift_direction
+
+        # Gentle rotation
+        self.angle += 1
+
+        # Respawn out-of-bounds petals at the top
+        out = ((self.y > self.height + SPAWN_MARGIN) |
+               (self.x < -SPAWN_MARGIN) |
+               (self.x > self.width + SPAWN_MARGIN))
+        index = np.flatnonzero(out)
+        self.spawn(index, -SPAWN_MARGIN, 0)
+        return index
+
+    def rotation_steps(self):
+        return np.rint((self.angle % ROTATION_SPAN) / ROTATION_SPAN * ROTATION_STEPS).astype(np.intp) % ROTATION_STEPS
+
+
+def benchmark(counts=(1000, 5000, 10000, 50000), frames=400, width=1920, height=1080):
+    """Time PetalField.step() and return {count: (mean_ms, p99_ms)}."""
+    results = {}
+    for count in counts:
+        field = PetalField(count, width, height, seed=1)
+        timings = []
+        for _ in range(frames):
+            started = time.perf_counter()
+            field.step()
+            field.rotation_steps()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[count] = (sum(timings) / len(timings), timings[int(len(timings) * 0.99) - 1])
+    return results
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or (1000, 5000, 10000, 50000)
+    print(f"{'petals':>8}{'mean ms':>10}{'p99 ms':>10}  budget {FRAME_BUDGET_MS:.0f} ms")
+    for count, (mean_ms, p99_ms) in benchmark(counts).items():
+        status = 'ok' if p99_ms < FRAME_BUDGET_MS else 'OVER'
+        print(f"{count:>8}{mean_ms:>10.3f}{p99_ms:>10.3f}  {status}")
@@ -0,0 +1,199 @@
+"""
+ICMP ping measurement for the PING Optimizer application.
+Runs the system `ping` in the background and turns its output into rolling statistics.
+"""
+
+import re
+import sys
+import logging
+import threading
+import subprocess
+
+from diagnostics import recorder
+
+DEFAULT_TARGET = '8.8.8.8'
+
+# Windows prints "time=12ms" / "time<1ms", Linux and macOS print "time=12.3 ms"
+PING_TIME_RE = re.compile(r"time[=<]\s*([\d.]+)\s*ms")
+# Matched lowercased: Windows "Request timed out.", macOS "Request timeout for icmp_seq 3",
+# Linux (with -O) "no answer yet for icmp_seq=3" and "Destination Host Unreachable"
+PING_LOSS_MARKERS = ('request timed out', 'request timeout', 'no answer yet', 'destination host unreachable',
+                     'destination net unreachable', 'general failure')
+# Linux and macOS number their probes ("icmp_seq=3", macOS losses "icmp_seq 3"); Windows doesn't
+PING_SEQ_RE = re.compile(r"icmp_seq[= ](\d+)")
+ICMP_SEQ_MODULO = 1 << 16
+
+
+def ping_command(target, count=None, source=None):
+    if sys.platform == 'win32':
+        command = ['ping', target, '-n', str(count)] if count else ['ping', target, '-t']
+        return command + ['-S', source] if source else command
+    command = ['ping']
+    if source:
+        # -I takes a source address on Linux; macOS spells it -S
+        command += ['-S' if sys.platform == 'darwin' else '-I', source]
+    if sys.platform.startswith('linux'):
+        # Report unanswered probes; without -O Linux ping prints nothing for them
+        command.append('-O')
+    if count:
+        command += ['-c', str(count)]
+    return command + [target]
+
+
+def parse_ping_line(line):
+    # Returns the RTT in ms, None for a lost probe, or False for unrelated output
+    if isinstance(line, bytes):
+        line = line.decode(errors='replace')
+    match = PING_TIME_RE.search(line)
+    if match:
+        return float(match.group(1))
+    lowered = line.lower()
+    if any(marker in lowered for marker in PING_LOSS_MARKERS):
+        return None
+    return False
+
+
+class PingSequence:
+    """Turns ping output lines into samples, counting gaps in icmp_seq as losses.
+
+    Catches losses a ping without -O (busybox, older iputils) never reports; a
+    late reply to a probe already counted lost is dropped rather than counted twice.
+    """
+
+    def __init__(self):
+        self.last_seq = None
+
+    def samples(self, line):
+        rtt = parse_ping_line(line)
+        if rtt is False:
+            return []
+        match = PING_SEQ_RE.search(line)
+        if match is None:
+            return [rtt]
+        seq = int(match.group(1))
+        if self.last_seq is None:
+            self.last_seq = seq
+            return [rtt]
+        # Modular, since icmp_seq wraps at 65536
+        ahead = (seq - self.last_seq) % ICMP_SEQ_MODULO
+        if ahead == 0 or ahead > ICMP_SEQ_MODULO // 2:
+            return []  # Duplicate or late reply
+        self.last_seq = seq
+        return [None] * (ahead - 1) + [rtt]
+
+
+def format_ping_stats(stats):
+    # Same message format the MetricsHandler parses into the session
+    return (
+        f"Ping stats - Current: {stats['current']:.1f}ms - "
+        f"Min: {stats['min']:.1f}ms - "
+        f"Max: {stats['max']:.1f}ms - "
+        f"Avg: {stats['avg']:.1f}ms" +
+        (f" - Improvement: {stats['improvement']}" if 'improvement' in stats else "")
+    )
+
+
+class RollingPingStats:
+    def __init__(self, window_size=10):
+        self.window_size = window_size  # Number of recent pings to consider for moving average
+        self.ping_window = []  # Store recent pings
+        self.last_ping = None
+        self.lost = 0
+
+    def reset(self):
+        self.ping_window = []
+        self.last_ping = None
+        self.lost = 0
+
+    def add_sample(self, ping_time, baseline=None):
+        # Returns the stats dict for a reply, or None for a lost probe
+        if ping_time is None:
+            self.lost += 1
+            return None
+        self.last_ping = ping_time
+
+        # Update ping window for moving average
+        self.ping_window.append(ping_time)
+        if len(self.ping_window) > self.window_size:
+            self.ping_window.pop(0)
+
+        # Calculate stats
+        current_avg = sum(self.ping_window) / len(self.ping_window)
+        stats = {
+            'current': ping_time,
+            'min': min(self.ping_window),
+            'max': max(self.ping_window),
+            'avg': current_avg
+        }
+
+        # Calculate improvement if we have a baseline
+        if baseline and len(self.ping_window) >= 3:
+            improvement = ((baseline - current_avg) / baseline) * 100
+            if abs(improvement) >= 1:  # Only show if >= 1% change
+                if improvement > 0:
+                    stats['improvement'] = f"⬇️ {abs(improvement):.1f}%"
+                else:
+                    stats['improvement'] = f"⬆️ {abs(improvement):.1f}%"
+        return stats
+
+
+class PingMonitor:
+    """Runs `ping` on a reader thread and calls on_sample(rtt_ms or None) per reply/loss."""
+
+    def __init__(self, target=DEFAULT_TARGET, on_sample=None, count=None, source=None):
+        self.target = target
+        self.on_sample = on_sample
+        self.count = count
+        self.source = source  # Local address to ping from
+        self.process = None
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        kwargs = {}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+        self.process = subprocess.Popen(
+            ping_command(self.target, self.count, self.source),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            **kwargs
+        )
+        self.thread = threading.Thread(target=self._read_output, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.process:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def wait(self, timeout=None):
+        # Block until a counted run finishes
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _read_output(self):
+        process = self.process
+        sequence = PingSequence()
+        try:
+            for line in process.stdout:
+                with recorder.span('ping output line'):
+                    for rtt in sequence.samples(line.strip()):
+                        if self.on_sample:
+                            self.on_sample(rtt)
+        except (OSError, ValueError):
+            # Pipe closed by stop()
+            pass
+        except Exception as e:
+            logging.error(f"Error reading ping output: {str(e)}")
@@ -0,0 +1,83 @@
+"""
+Display-rate presentation of ping statistics for the PING Optimizer application.
+Samples can arrive much faster than a label is worth repainting, so the presenter
+only keeps the newest aggregate and pushes it to the widgets on a fixed cadence,
+touching a label only when its rendered text actually changes.
+"""
+
+from PyQt5.QtCore import QObject, QTimer
+
+from diagnostics import recorder
+
+DISPLAY_INTERVAL_MS = 100  # ~10 refreshes per second is plenty for numeric labels
+STAT_KEYS = ('current', 'min', 'max', 'avg')
+
+
+def render_ping_stats(ping_stats):
+    # Label text for each display key; "--" for anything without a value yet
+    texts = dict.fromkeys(STAT_KEYS, "--")
+    if not ping_stats:
+        return texts
+    for key in STAT_KEYS:
+        value = ping_stats.get(key)
+        if isinstance(value, (int, float)):
+            texts[key] = f"{int(round(value))} ms"
+    if ping_stats.get('improvement') and texts['avg'] != "--":
+        texts['avg'] = f"{texts['avg']} {ping_stats['improvement']}"
+    return texts
+
+
+class PingStatsPresenter(QObject):
+    def __init__(self, displays, container=None, interval_ms=DISPLAY_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.displays = displays  # key -> QLabel
+        self.container = container  # Widget whose repaint is batched per refresh
+        self.pending = None
+        self.dirty = False
+        self.rendered = {key: label.text() for key, label in displays.items()}
+        self.refreshes = 0
+        self.label_updates = 0
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def submit(self, ping_stats):
+        # Cheap enough to call per sample: only the newest state is kept
+        self.pending = ping_stats
+        self.dirty = True
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def clear(self):
+        self.submit(None)
+
+    @recorder.timed('ping display refresh')
+    def flush(self):
+        if not self.dirty:
+            # Nothing arrived since the last refresh; idle until the next sample
+            self.timer.stop()
+            return
+        self.dirty = False
+        self.refreshes += 1
+        changes = [
+            (key, text)
+            for key, text in render_ping_stats(self.pending).items()
+            if key in self.displays and self.rendered.get(key) != text
+        ]
+        if not changes:
+            return
+        # One relayout/repaint for the whole batch instead of one per label
+        if self.container is not None:
+            self.container.setUpdatesEnabled(False)
+        try:
+            for key, text in changes:
+                self.displays[key].setText(text)
+                self.rendered[key] = text
+        finally:
+            if self.container is not None:
+                self.container.setUpdatesEnabled(True)
+        self.label_updates += len(changes)
+
+    def stop(self):
+        self.timer.stop()
@@ -0,0 +1,277 @@
+"""
+Multi-target latency probing for the PING Optimizer application.
+A target is an ICMP host or an application-level probe, written as
+
+    8.8.8.8 / icmp:8.8.8.8      system ping
+    tcp:1.1.1.1:443             TCP handshake time (SYN -> SYN-ACK)
+    udp:9.9.9.9:53              UDP request/response (a DNS query)
+    udp-echo:host:port          sequenced datagrams to an echo service
+
+ICMP is often deprioritized or dropped by routers and game hosts, so TCP and UDP
+probes measure what real traffic sees. Every target is probed on its own
+schedule, concurrently, and summarized with the same statistics as ICMP.
+"""
+
+import time
+import socket
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from probes import TcpConnectProbe, UdpEchoProbe, UdpRequestProbe
+from latency_stats import summarize
+from ping_monitor import PingMonitor
+from dns_wire import build_query, parse_header, QTYPE_NS
+from diagnostics import recorder
+
+PROBE_KINDS = ('icmp', 'tcp', 'udp', 'udp-echo')
+DEFAULT_PORTS = {'tcp': 443, 'udp': 53, 'udp-echo': 7}
+PROBE_INTERVAL = 1.0
+PROBE_TIMEOUT = 1.0
+STATS_WINDOW = 300  # Most recent probes per target the statistics cover
+MAX_WORKERS = 16
+
+
+class ProbeTarget:
+    __slots__ = ('kind', 'host', 'port')
+
+    def __init__(self, kind, host, port=None):
+        self.kind = kind
+        self.host = host
+        self.port = port
+
+    @property
+    def label(self):
+        if self.kind == 'icmp':
+            return self.host
+        host = f"[{self.host}]" if ':' in self.host else self.host
+        kind = 'UDP echo' if self.kind == 'udp-echo' else self.kind.upper()
+        return f"{kind} {host}:{self.port}"
+
+    def resolve(self):
+        # (ip, port) for socket probes; raises OSError for unknown hosts
+        info = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_DGRAM if self.kind != 'tcp'
+                                  else socket.SOCK_STREAM)
+        return info[0][4][:2]
+
+
+def parse_target(spec):
+    """ProbeTarget from "host", "icmp:host", "tcp:host:port", "udp:[v6]:port"...; raises ValueError."""
+    text = spec.strip()
+    kind, sep, rest = text.partition(':')
+    if not sep or kind.lower() not in PROBE_KINDS:
+        kind, rest = 'icmp', text
+    kind = kind.lower()
+    host, port = rest, None
+    if kind != 'icmp':
+        if rest.startswith('['):
+            host, _, tail = rest[1:].partition(']')
+            port = tail[1:] if tail.startswith(':') else None
+        elif rest.count(':') == 1:
+            host, port = rest.split(':')
+        try:
+            port = int(port) if port else DEFAULT_PORTS[kind]
+        except ValueError:
+            raise ValueError(f"Invalid port in probe target '{spec}'")
+    if not host:
+        raise ValueError(f"No host in probe target '{spec}'")
+    return ProbeTarget(kind, host, port)
+
+
+def parse_targets(text):
+    # Comma- or whitespace-separated target list
+    return [parse_target(spec) for spec in text.replace(',', ' ').split()]
+
+
+def dns_request(sequence):
+    # Root NS query: every resolver has it cached, so this times the resolver, not recursion
+    return build_query('', sequence & 0xFFFF, QTYPE_NS)
+
+
+def dns_reply_matches(sequence, data):
+    header = parse_header(data)
+    return header is not None and header[1] and header[0] == sequence & 0xFFFF
+
+
+def make_probe(target, timeout=PROBE_TIMEOUT, source=None):
+    address = target.resolve()
+    if target.kind == 'tcp':
+        return TcpConnectProbe(address, timeout=timeout, source=source)
+    if target.kind == 'udp':
+        return UdpRequestProbe(address, dns_request, match=dns_reply_matches, timeout=timeout, source=source)
+    return UdpEchoProbe(address, timeout=timeout, source=source)
+
+
+class TargetStats:
+    """Rolling window of one target's results (None = lost) plus lifetime totals."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.window = deque(maxlen=window)
+        self.sent = 0
+        self.lost = 0
+        self.last = None  # Most recent reply
+        self.lock = threading.Lock()
+
+    def add(self, rtt):
+        with self.lock:
+            self.window.append(rtt)
+            self.sent += 1
+            if rtt is None:
+                self.lost += 1
+            else:
+                self.last = rtt
+
+    def summary(self):
+        with self.lock:
+            window = list(self.window)
+            sent, lost, last = self.sent, self.lost, self.last
+        summary = summarize([rtt for rtt in window if rtt is not None], len(window))
+        summary['last'] = last
+        summary['total_sent'] = sent
+        summary['total_lost'] = lost
+        return summary
+
+
+def format_target_summary(label, summary):
+    if not summary['count']:
+        return f"{label}: no replies" if summary['sent'] else f"{label}: waiting"
+    return (f"{label}: P50 {summary['p50']:.1f} / P95 {summary['p95']:.1f} ms - "
+            f"loss {summary['loss']:.1f}% - jitter {summary['jitter']:.1f} ms")
+
+
+class ProbeMonitor:
+    """Probes every target concurrently, each on its own interval.
+
+    on_sample(rtt_ms or None) receives the first target's results, the same contract
+    as PingMonitor; on_target_sample(label, rtt_ms or None) receives every target's.
+    With count set, each target is probed count times and the monitor then finishes.
+    source = (interface name, local address) sends every probe from that interface.
+    """
+
+    def __init__(self, targets, on_sample=None, on_target_sample=None, interval=PROBE_INTERVAL,
+                 count=None, timeout=PROBE_TIMEOUT, window=STATS_WINDOW, source=None):
+        self.targets = [parse_target(t) if isinstance(t, str) else t for t in targets]
+        if not self.targets:
+            raise ValueError("No probe targets")
+        labels = [target.label for target in self.targets]
+        duplicates = sorted({label for label in labels if labels.count(label) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate probe target(s): {', '.join(duplicates)}")
+        self.on_sample = on_sample
+        self.on_target_sample = on_target_sample
+        self.interval = interval
+        self.count = count
+        # A probe never outlives its interval, so each target has at most one in flight
+        self.timeout = min(timeout, interval)
+        self.stats = {target.label: TargetStats(window) for target in self.targets}
+        self.source = source
+        self.ping_monitors = []
+        self.probes = {}  # label -> socket probe
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()  # Set when a probe finishes or on stop
+        self.thread = None
+        self.executor = None
+
+    @property
+    def running(self):
+        if self.thread is not None and self.thread.is_alive():
+            return True
+        return any(monitor.running for monitor in self.ping_monitors)
+
+    def start(self):
+        self.stop_event.clear()
+        socket_targets = [target for target in self.targets if target.kind != 'icmp']
+        # Resolve and open everything first so bad targets fail here, not on the thread
+        try:
+            for target in socket_targets:
+                self.probes[target.label] = make_probe(target, self.timeout, self.source)
+            for target in self.targets:
+                if target.kind == 'icmp':
+                    monitor = PingMonitor(target.host, on_sample=lambda rtt, target=target: self.record(target, rtt),
+                                          count=self.count, source=self.source and self.source[1])
+                    self.ping_monitors.append(monitor.start())
+        except Exception:
+            self.stop()
+            raise
+        if socket_targets:
+            self.executor = ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(socket_targets)),
+                                               thread_name_prefix='probe')
+            self.thread = threading.Thread(target=self._run, args=(socket_targets,), daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        for monitor in self.ping_monitors:
+            monitor.stop()
+        self.ping_monitors = []
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.timeout + 2)
+        self.thread = None
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        for probe in self.probes.values():
+            probe.close()
+        self.probes = {}
+
+    def wait(self, timeout=None):
+        # Block until a counted run finishes
+        for monitor in self.ping_monitors:
+            monitor.wait(timeout)
+        if self.thread:
+            self.thread.join(timeout)
+
+    @recorder.timed('probe handling')
+    def record(self, target, rtt):
+        self.stats[target.label].add(rtt)
+        if self.on_target_sample:
+            self.on_target_sample(target.label, rtt)
+        if self.on_sample and target is self.targets[0]:
+            self.on_sample(rtt)
+
+    def summaries(self):
+        # {label: summary} in target order
+        return {target.label: self.stats[target.label].summary() for target in self.targets}
+
+    def _probe_once(self, target):
+        try:
+            rtt = self.probes[target.label].probe()
+        except Exception as e:
+            logging.error(f"Error probing {target.label}: {str(e)}")
+            rtt = None
+        if not self.stop_event.is_set():
+            self.record(target, rtt)
+
+    def _run(self, targets):
+        # Targets are staggered across the interval so their probes don't go out in bursts
+        start = time.monotonic()
+        due = {target.label: start + i * self.interval / len(targets) for i, target in enumerate(targets)}
+        sent = dict.fromkeys(due, 0)
+        in_flight = {}
+        while not self.stop_event.is_set():
+            # Cleared before the scan, so a probe finishing during it still wakes the wait below
+            self.wake.clear()
+            now = time.monotonic()
+            for target in targets:
+                label = target.label
+                future = in_flight.get(label)
+                if future is not None:
+                    if not future.done():
+                        continue  # A slow probe delays only its own target
+                    del in_flight[label]
+                if (self.count is not None and sent[label] >= self.count) or now < due[label]:
+                    continue
+                in_flight[label] = self.executor.submit(self._probe_once, target)
+                in_flight[label].add_done_callback(lambda _: self.wake.set())
+                sent[label] += 1
+                # Keep the cadence, but don't fire a backlog after a stall
+                due[label] = max(due[label] + self.interval, now)
+            if self.count is not None and not in_flight and all(n >= self.count for n in sent.values()):
+                break
+            # Targets with a probe in flight are woken by its completion, not by their due time
+            waiting = [due[target.label] for target in targets if target.label not in in_flight
+                       and (self.count is None or sent[target.label] < self.count)]
+            self.wake.wait(max(0.0, min(waiting) - time.monotonic()) if waiting else None)
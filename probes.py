@@ -0,0 +1,178 @@
+"""
+Latency probes for the PING Optimizer application.
+Each probe measures one round trip and returns the RTT in milliseconds, or None when lost.
+"""
+
+import sys
+import time
+import errno
+import select
+import socket
+import struct
+
+# Probe payload: sequence number + send timestamp (ns), padded to the requested size
+PROBE_HEADER = struct.Struct('!Iq')
+
+# connect_ex() results meaning "handshake under way" / "peer answered with a RST"
+CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY,
+                   getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK)}
+CONNECT_REFUSED = {errno.ECONNREFUSED, getattr(errno, 'WSAECONNREFUSED', errno.ECONNREFUSED)}
+# SO_LINGER on, zero timeout: close() aborts with a RST instead of leaving TIME_WAIT behind
+ABORT_ON_CLOSE = struct.pack('hh' if sys.platform == 'win32' else 'ii', 1, 0)
+
+
+def bind_source(sock, source):
+    """Send from source = (interface name or None, local address).
+
+    Binding the address selects the interface on strong-host stacks (Windows);
+    Linux routes by destination alone, so the socket is also tied to the device
+    where that's permitted (SO_BINDTODEVICE needs CAP_NET_RAW).
+    """
+    if source is None:
+        return
+    interface, address = source
+    sock.bind((address, 0))
+    if interface and hasattr(socket, 'SO_BINDTODEVICE'):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.split(':')[0].encode())
+        except OSError:
+            pass
+
+
+class UdpEchoProbe:
+    """Sends sequenced datagrams to a UDP echo endpoint and matches the replies."""
+
+    def __init__(self, address, timeout=1.0, payload_size=32, source=None):
+        self.address = address
+        self.timeout = timeout
+        self.payload_size = max(payload_size, PROBE_HEADER.size)
+        family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        bind_source(self.sock, source)
+        self.sequence = 0
+
+    def probe(self):
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        sent_ns = time.perf_counter_ns()
+        payload = PROBE_HEADER.pack(self.sequence, sent_ns)
+        payload += b'\x00' * (self.payload_size - len(payload))
+        try:
+            self.sock.sendto(payload, self.address)
+        except OSError:
+            return None
+
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(remaining)
+            try:
+                data, _ = self.sock.recvfrom(65535)
+            except socket.timeout:
+                return None
+            except OSError:
+                return None
+            if len(data) < PROBE_HEADER.size:
+                continue
+            sequence, _ = PROBE_HEADER.unpack_from(data)
+            # Ignore late replies to earlier probes
+            if sequence == self.sequence:
+                return (time.perf_counter_ns() - sent_ns) / 1e6
+
+    def close(self):
+        self.sock.close()
+
+
+class TcpConnectProbe:
+    """Times a TCP handshake (SYN -> SYN-ACK) to a host/port with a non-blocking connect.
+
+    A refused connection still answered with a RST, so it counts as a round trip.
+    The socket is reset rather than closed gracefully, so frequent probes leave no
+    TIME_WAIT sockets and the peer never sees application data.
+    """
+
+    def __init__(self, address, timeout=1.0, source=None):
+        self.address = address
+        self.timeout = timeout
+        self.source = source
+        self.family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+
+    def probe(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        try:
+            bind_source(sock, self.source)
+            sock.setblocking(False)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, ABORT_ON_CLOSE)
+            started = time.perf_counter_ns()
+            error = sock.connect_ex(self.address)
+            if error in CONNECT_PENDING:
+                # Windows reports a failed connect through the exception set
+                _, writable, failed = select.select([], [sock], [sock], self.timeout)
+                if not writable and not failed:
+                    return None
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            finished = time.perf_counter_ns()
+        except OSError:
+            return None
+        finally:
+            sock.close()
+        if error == 0 or error in CONNECT_REFUSED:
+            return (finished - started) / 1e6
+        return None
+
+    def close(self):
+        pass
+
+
+class UdpRequestProbe:
+    """Times an application-level UDP request until the peer's reply.
+
+    request is bytes, or a callable(sequence) returning the bytes for each probe;
+    match(sequence, data) decides whether a datagram answers the current request
+    (by default any datagram from the peer does).
+    """
+
+    def __init__(self, address, request, match=None, timeout=1.0, source=None):
+        self.address = address
+        self.request = request
+        self.match = match
+        self.timeout = timeout
+        family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        bind_source(self.sock, source)
+        # Connected, so only the peer's datagrams (and its ICMP errors) are received
+        self.sock.connect(address)
+        self.sequence = 0
+
+    def drain(self):
+        # Discard late replies to earlier requests
+        self.sock.setblocking(False)
+        try:
+            while True:
+                self.sock.recv(65535)
+        except OSError:
+            pass
+
+    def probe(self):
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        payload = self.request(self.sequence) if callable(self.request) else self.request
+        self.drain()
+        sent_ns = time.perf_counter_ns()
+        deadline = time.perf_counter() + self.timeout
+        try:
+            self.sock.send(payload)
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self.sock.settimeout(remaining)
+                data = self.sock.recv(65535)
+                if self.match is None or self.match(self.sequence, data):
+                    return (time.perf_counter_ns() - sent_ns) / 1e6
+        except OSError:
+            # Includes timeouts and port unreachable: no service answered
+            return None
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,474 @@
+"""
+Optimization profiles for the PING Optimizer application.
+Holds the command lists for every profile and applies/reverts them without any UI,
+so the GUI, the CLI and the daemon share one implementation.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import subprocess
+import ipaddress
+
+from metrics_store import APP_DIR
+from diagnostics import recorder
+
+STATE_FILE = os.path.join(APP_DIR, 'tcp_optimizer_state.json')
+
+metrics_logger = logging.getLogger('metrics')
+
+# Callables invoked with the profile_changes record after every apply/revert
+# (e.g. the stack-health tracker); failures are logged, never raised
+change_listeners = []
+# Held while settings are being changed, so observers never see a half-applied profile
+change_lock = threading.RLock()
+# Callables invoked with (command, seconds, returncode or None if it couldn't run)
+# after every system command, e.g. for the metrics exporter's command timings
+command_listeners = []
+
+# Essential TCP optimization commands that should work on all systems
+TCP_COMMANDS = [
+    ['netsh', 'int', 'tcp', 'set', 'global', 'initialRto=2000'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'rss=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=restricted'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'netdma=disabled']
+]
+
+# Optional TCP settings that might not be supported on all systems
+TCP_OPTIONAL_COMMANDS = [
+    ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=ctcp']
+]
+
+# Essential TCP reversion commands that should work on all systems
+TCP_REVERT_COMMANDS = [
+    ['netsh', 'int', 'tcp', 'set', 'global', 'initialRto=3000'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'netdma=enabled']
+]
+
+TCP_OPTIONAL_REVERT_COMMANDS = [
+    ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=default']
+]
+
+# Basic TCP/IP optimizations that work across most adapters
+INTERFACE_COMMANDS = [
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'chimney=disabled'],
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'ecncapability=disabled'],
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'timestamps=disabled']
+]
+
+# Commands to revert interface settings
+INTERFACE_REVERT_COMMANDS = [
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'chimney=enabled'],
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'ecncapability=enabled'],
+    ['netsh', 'interface', 'tcp', 'set', 'global', 'timestamps=enabled']
+]
+
+# Game mode optimization commands
+GAME_MODE_COMMANDS = [
+    ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -AutoTuningLevelLocal Normal'],
+    ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -ScalingHeuristics Disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'heuristics', 'disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
+    ['powershell', 'Disable-NetAdapterLso -Name *'],
+    ['powershell', 'Set-NetOffloadGlobalSetting -PacketCoalescingFilter Disabled']
+]
+
+# Commands to revert game mode settings
+GAME_MODE_REVERT_COMMANDS = [
+    ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -AutoTuningLevelLocal Normal'],
+    ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -ScalingHeuristics Enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'heuristics', 'enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
+    ['powershell', 'Enable-NetAdapterLso -Name *'],
+    ['powershell', 'Set-NetOffloadGlobalSetting -PacketCoalescingFilter Enabled']
+]
+
+# QoS optimization commands
+QOS_COMMANDS = [
+    ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=ctcp'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'dca=enabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'ecn=disabled'],
+    ['powershell', 'Set-NetQosPolicy -Name "Gaming Traffic" -IPProtocol Both -NetworkProfile All -Priority 1']
+]
+
+# Commands to revert QoS settings
+QOS_REVERT_COMMANDS = [
+    ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=default'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'dca=disabled'],
+    ['netsh', 'int', 'tcp', 'set', 'global', 'ecn=enabled'],
+    ['powershell', 'Remove-NetQosPolicy -Name "Gaming Traffic" -Confirm:$false']
+]
+
+
+class Profile:
+    def __init__(self, name, title, commands, revert_commands,
+                 optional_commands=(), optional_revert_commands=()):
+        self.name = name
+        self.title = title
+        self.commands = commands
+        self.revert_commands = revert_commands
+        self.optional_commands = list(optional_commands)
+        self.optional_revert_commands = list(optional_revert_commands)
+
+
+PROFILES = {
+    'tcp': Profile('tcp', 'TCP Settings', TCP_COMMANDS, TCP_REVERT_COMMANDS,
+                   TCP_OPTIONAL_COMMANDS, TCP_OPTIONAL_REVERT_COMMANDS),
+    'interface': Profile('interface', 'Interface Settings', INTERFACE_COMMANDS, INTERFACE_REVERT_COMMANDS),
+    'game': Profile('game', 'Game Mode', GAME_MODE_COMMANDS, GAME_MODE_REVERT_COMMANDS),
+    'qos': Profile('qos', 'QoS Settings', QOS_COMMANDS, QOS_REVERT_COMMANDS),
+}
+
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown profile: {name} (choose from {', '.join(PROFILES)})")
+
+
+def run_command(cmd):
+    # Windows-only flag keeps netsh/powershell from flashing a console window
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    started = time.perf_counter()
+    returncode = None
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False, **kwargs)
+        returncode = result.returncode
+        return result
+    finally:
+        seconds = time.perf_counter() - started
+        recorder.record(f"command {os.path.basename(cmd[0])}", seconds * 1000)
+        for listener in list(command_listeners):
+            try:
+                listener(cmd, seconds, returncode)
+            except Exception as e:
+                logging.error(f"Error in command listener: {str(e)}")
+
+
+def run_command_list(commands):
+    # Run a profile's commands without any UI, returning the number that succeeded
+    success_count = 0
+    for cmd in commands:
+        try:
+            result = run_command(cmd)
+            if result.returncode == 0:
+                success_count += 1
+            else:
+                logging.warning(f"Command failed: {' '.join(cmd)}\nError: {result.stderr}")
+        except Exception as e:
+            logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
+    return success_count
+
+
+def _run_profile_commands(profile, commands, optional_commands, action, progress=None):
+    verb = 'applied' if action == 'apply' else 'reverted'
+    result = {
+        'profile': profile.name,
+        'action': action,
+        'successful': [],
+        'failed': [],
+        'total': len(commands),
+    }
+
+    # Execute main commands first
+    for i, cmd in enumerate(commands, 1):
+        cmd_str = ' '.join(cmd)
+        try:
+            metrics_logger.info(f"Executing {profile.title} command: {cmd_str}")
+            completed = run_command(cmd)
+            if completed.returncode == 0:
+                result['successful'].append(cmd_str)
+                metrics_logger.info(f"Successfully {verb}: {cmd_str}")
+            else:
+                result['failed'].append(cmd_str)
+                metrics_logger.info(f"Command failed: {cmd_str}\nError: {completed.stderr}")
+        except Exception as e:
+            result['failed'].append(cmd_str)
+            metrics_logger.error(f"Error executing command: {cmd_str}\nError: {str(e)}")
+        if progress:
+            progress(int((i / len(commands)) * 100))
+
+    # Try optional commands but don't count in success/failure
+    for cmd in optional_commands:
+        cmd_str = ' '.join(cmd)
+        try:
+            completed = run_command(cmd)
+            if completed.returncode == 0:
+                metrics_logger.info(f"Successfully executed optional command: {cmd_str}")
+            else:
+                metrics_logger.info(f"Optional command not supported or failed: {cmd_str}\nError: {completed.stderr}")
+        except Exception as e:
+            metrics_logger.info(f"Optional command not supported: {cmd_str}\nError: {str(e)}")
+
+    return result
+
+
+def _change_record(result):
+    # Timestamped entry for the session's profile_changes list
+    return {
+        'time': time.time(),
+        'profile': result['profile'],
+        'action': result['action'],
+        'successful': len(result['successful']),
+        'total': result['total'],
+    }
+
+
+def _notify_change(change):
+    for listener in list(change_listeners):
+        try:
+            listener(change)
+        except Exception as e:
+            logging.error(f"Error in profile change listener: {str(e)}")
+
+
+def apply_profile(name, progress=None):
+    profile = get_profile(name)
+    with change_lock:
+        result = _run_profile_commands(profile, profile.commands, profile.optional_commands,
+                                       'apply', progress)
+        if result['successful']:
+            update_state(name, applied=True)
+    change = _change_record(result)
+    metrics_logger.info(f"{profile.title} applied - {len(result['successful'])}/{result['total']} commands successful",
+                        extra={'session_data': {'profile_changes': change}})
+    _notify_change(change)
+    return result
+
+
+def revert_profile(name, progress=None):
+    profile = get_profile(name)
+    with change_lock:
+        result = _run_profile_commands(profile, profile.revert_commands, profile.optional_revert_commands,
+                                       'revert', progress)
+        if result['successful']:
+            update_state(name, applied=False)
+    change = _change_record(result)
+    metrics_logger.info(f"{profile.title} reverted - {len(result['successful'])}/{result['total']} commands successful",
+                        extra={'session_data': {'profile_changes': change}})
+    _notify_change(change)
+    return result
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'applied': {}}
+
+
+def save_state(state):
+    # Write-then-rename so a crash never leaves a half-written state file
+    tmp_file = STATE_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+
+def update_state(name, applied):
+    try:
+        state = load_state()
+        if applied:
+            state.setdefault('applied', {})[name] = time.time()
+        else:
+            state.setdefault('applied', {}).pop(name, None)
+        save_state(state)
+    except Exception as e:
+        logging.error(f"Error saving profile state: {str(e)}")
+
+
+def read_tcp_globals_text():
+    # Raw `netsh int tcp show global` output; empty off Windows or on failure
+    try:
+        result = run_command(['netsh', 'int', 'tcp', 'show', 'global'])
+    except OSError:
+        return ''
+    return result.stdout if result.returncode == 0 else ''
+
+
+def parse_tcp_globals(text):
+    # `netsh int tcp show global` output -> {setting: value}
+    settings = {}
+    for line in text.splitlines():
+        if ':' in line:
+            key, value = line.rsplit(':', 1)
+            key = key.strip().strip('.').strip()
+            if key:
+                settings[key] = value.strip()
+    return settings
+
+
+def read_tcp_globals():
+    # Parse `netsh int tcp show global` into {setting: value}; empty off Windows
+    return parse_tcp_globals(read_tcp_globals_text())
+
+
+def reapply_settings(settings, reason='drift'):
+    """Set individual TCP globals ({parameter: value}) again, e.g. after they drifted
+    or to restore a snapshot. Logged and announced to change_listeners like a profile change.
+    """
+    commands = [['netsh', 'int', 'tcp', 'set', 'global', f'{name}={value}'] for name, value in settings.items()]
+    with change_lock:
+        result = _run_adapter_commands(reason, commands)
+    result['action'] = 'reapply'
+    change = _change_record(result)
+    metrics_logger.info(f"TCP settings re-applied ({reason}) - {len(result['successful'])}/{result['total']} "
+                        f"commands successful", extra={'session_data': {'profile_changes': change}})
+    _notify_change(change)
+    return result
+
+
+def is_admin():
+    if sys.platform == 'win32':
+        import ctypes
+        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+    return os.geteuid() == 0
+
+
+def set_dns_servers(adapter, servers):
+    """Point an adapter at the given DNS servers; no servers restores automatic (DHCP) DNS.
+
+    Returns a result dict shaped like apply_profile()'s.
+    """
+    if not adapter:
+        raise ValueError("No network adapter selected")
+    if sys.platform == 'win32':
+        if servers:
+            commands = [['netsh', 'interface', 'ip', 'set', 'dns', f'name={adapter}', 'static', servers[0], 'validate=no']]
+            # Additional servers are appended, not set, so they don't replace the primary
+            commands += [['netsh', 'interface', 'ip', 'add', 'dns', f'name={adapter}', server, f'index={i}', 'validate=no']
+                         for i, server in enumerate(servers[1:], 2)]
+        else:
+            commands = [['netsh', 'interface', 'ip', 'set', 'dns', f'name={adapter}', 'dhcp']]
+    else:
+        # systemd-resolved per-link DNS
+        commands = [['resolvectl', 'dns', adapter] + list(servers)] if servers else [['resolvectl', 'revert', adapter]]
+
+    return _run_adapter_commands('dns', commands)
+
+
+def parse_netsh_dns_servers(text):
+    """`netsh interface ip show dnsservers name=X` output -> {'dhcp': bool, 'servers': [...]}.
+
+    Raises ValueError when the output doesn't say where the servers come from
+    (e.g. an unknown adapter or a localized Windows).
+    """
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        heading, sep, first = line.partition(':')
+        if not sep or 'DNS' not in heading:
+            continue
+        if 'DHCP' in heading:
+            dhcp = True
+        elif 'Statically' in heading:
+            dhcp = False
+        else:
+            continue
+        servers = []
+        # One address on the heading line, the rest on their own lines below it
+        for value in [first] + lines[i + 1:]:
+            value = value.strip()
+            try:
+                servers.append(str(ipaddress.ip_address(value.split('%')[0])))
+            except ValueError:
+                if servers or (value and value != 'None'):
+                    break
+        return {'dhcp': dhcp, 'servers': servers}
+    raise ValueError("Could not find the adapter's DNS servers in the netsh output")
+
+
+def parse_resolvectl_dns(text):
+    # `resolvectl dns LINK` output ("Link 2 (eth0): 1.1.1.1 9.9.9.9") -> {'dhcp': bool, 'servers': [...]}
+    _, sep, values = text.strip().partition('):')
+    if not sep:
+        raise ValueError("Could not find the link's DNS servers in the resolvectl output")
+    servers = values.split()
+    # No per-link servers: the link uses its network configuration, which revert restores
+    return {'dhcp': not servers, 'servers': servers}
+
+
+def get_dns_servers(adapter):
+    """The adapter's current DNS configuration as {'dhcp': bool, 'servers': [...]};
+    raises OSError when it can't be read.
+    """
+    if not adapter:
+        raise ValueError("No network adapter selected")
+    if sys.platform == 'win32':
+        command = ['netsh', 'interface', 'ip', 'show', 'dnsservers', f'name={adapter}']
+        parse = parse_netsh_dns_servers
+    else:
+        command = ['resolvectl', 'dns', adapter]
+        parse = parse_resolvectl_dns
+    result = run_command(command)
+    if result.returncode != 0:
+        raise OSError(f"{' '.join(command[:2])} failed: {(result.stderr or result.stdout).strip()}")
+    try:
+        return parse(result.stdout)
+    except ValueError as e:
+        raise OSError(str(e))
+
+
+def restore_dns_servers(adapter, previous):
+    # Put back a configuration saved by get_dns_servers()
+    return set_dns_servers(adapter, [] if previous['dhcp'] else previous['servers'])
+
+
+def set_interface_metric(adapter, metric=None):
+    """Give an adapter's routes priority with a low interface metric; None restores the
+    automatic metric. Windows only (other systems set route metrics per route).
+
+    Returns a result dict shaped like apply_profile()'s.
+    """
+    if not adapter:
+        raise ValueError("No network adapter selected")
+    if sys.platform != 'win32':
+        raise OSError("Changing interface metrics is only supported on Windows")
+    alias = adapter.replace("'", "''")
+    if metric is None:
+        command = f"Set-NetIPInterface -InterfaceAlias '{alias}' -AutomaticMetric Enabled"
+    else:
+        command = f"Set-NetIPInterface -InterfaceAlias '{alias}' -InterfaceMetric {int(metric)}"
+    return _run_adapter_commands('route_metric', [['powershell', command]])
+
+
+def _run_adapter_commands(profile, commands):
+    result = {'profile': profile, 'action': 'apply', 'successful': [], 'failed': [], 'total': len(commands)}
+    for cmd in commands:
+        cmd_str = ' '.join(cmd)
+        try:
+            completed = run_command(cmd)
+            if completed.returncode == 0:
+                result['successful'].append(cmd_str)
+                metrics_logger.info(f"Successfully applied: {cmd_str}")
+            else:
+                result['failed'].append(cmd_str)
+                metrics_logger.info(f"Command failed: {cmd_str}\nError: {completed.stderr}")
+        except Exception as e:
+            result['failed'].append(cmd_str)
+            metrics_logger.error(f"Error executing command: {cmd_str}\nError: {str(e)}")
+    return result
@@ -0,0 +1,199 @@
+"""
+Settings drift detection for the PING Optimizer application.
+Windows updates and driver reinstalls can silently reset tuned TCP settings. The
+drift monitor periodically snapshots `netsh int tcp show global`, and only when
+that output or the set of applied profiles changed does it diff the live values
+against what the applied profiles set. Drift is recorded in the session and
+reported, and can optionally be corrected by re-applying just the drifted settings.
+
+Only the netsh TCP globals can be checked this cheaply; PowerShell-applied
+settings (LSO, offloads, QoS policies) are not covered.
+"""
+
+import os
+import time
+import zlib
+import logging
+import threading
+
+import profiles
+
+DRIFT_INTERVAL = 60.0  # One netsh call a minute; skipped entirely while nothing is applied
+
+# netsh `set global` parameter -> label fragment in `show global` output
+SETTING_LABELS = {
+    'rss': 'receive-side scaling',
+    'autotuninglevel': 'auto-tuning level',
+    'ecncapability': 'ecn capability',
+    'ecn': 'ecn capability',
+    'timestamps': 'timestamps',
+    'initialrto': 'initial rto',
+    'chimney': 'chimney offload',
+    'netdma': 'netdma',
+    'dca': 'direct cache access',
+    'congestionprovider': 'congestion control provider',
+}
+
+metrics_logger = logging.getLogger('metrics')
+
+
+def profile_settings(profile):
+    # {parameter: value} for the profile's `netsh ... set global name=value` commands;
+    # optional commands are left out since they fail on systems that don't support them
+    settings = {}
+    for cmd in profile.commands:
+        if cmd[0] == 'netsh' and 'global' in cmd and '=' in cmd[-1]:
+            name, _, value = cmd[-1].partition('=')
+            settings[name.lower()] = value.lower()
+    return settings
+
+
+def expected_settings(applied):
+    """What the applied profiles ({name: applied time}) set, later applies winning."""
+    expected = {}
+    for name in sorted(applied, key=applied.get):
+        try:
+            expected.update(profile_settings(profiles.get_profile(name)))
+        except ValueError:
+            continue  # A profile from an older version
+    return expected
+
+
+def live_value(live, parameter):
+    label = SETTING_LABELS.get(parameter)
+    if label is None:
+        return None
+    for key, value in live.items():
+        if label in key.lower():
+            return value.lower()
+    return None
+
+
+def diff_settings(expected, live):
+    """{parameter: {'expected', 'actual'}} for settings whose live value differs.
+    Settings this Windows version doesn't report (e.g. chimney on Windows 10) are skipped."""
+    drifted = {}
+    for parameter, value in expected.items():
+        actual = live_value(live, parameter)
+        if actual is not None and actual != value:
+            drifted[parameter] = {'expected': value, 'actual': actual}
+    return drifted
+
+
+class DriftMonitor:
+    """Checks applied settings against reality every interval seconds.
+
+    on_drift(record) is called whenever the set of drifted settings changes (an
+    empty 'drifted' dict means everything matches again). With auto_reapply, the
+    drifted settings are re-applied and the next check confirms the fix.
+    """
+
+    def __init__(self, interval=DRIFT_INTERVAL, on_drift=None, auto_reapply=False,
+                 read_settings=profiles.read_tcp_globals_text):
+        self.interval = interval
+        self.on_drift = on_drift
+        self.auto_reapply = auto_reapply
+        self.read_settings = read_settings
+        self.state_mtime = None
+        self.applied = {}
+        self.expected = {}
+        self.digest = None  # CRC of the last netsh output that was diffed
+        self.drifted = {}
+        self.checks = 0
+        self.diffs = 0  # Checks that actually had to parse and diff
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
+
+    def refresh_expected(self):
+        # Re-derive the expected settings only when the state file changed
+        try:
+            mtime = os.stat(profiles.STATE_FILE).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self.state_mtime and self.checks:
+            return False
+        self.state_mtime = mtime
+        self.applied = profiles.load_state().get('applied', {})
+        self.expected = expected_settings(self.applied)
+        return True
+
+    def check(self):
+        """Run one check; returns the drifted settings."""
+        # A profile being applied right now isn't drift; look again next time
+        if not profiles.change_lock.acquire(blocking=False):
+            return self.drifted
+        try:
+            return self._check()
+        finally:
+            profiles.change_lock.release()
+
+    def _check(self):
+        self.checks += 1
+        expected_changed = self.refresh_expected()
+        if not self.expected:
+            self.digest = None
+            self._update({})
+            return self.drifted
+        text = self.read_settings()
+        if not text:
+            return self.drifted  # netsh unavailable; nothing to compare against
+        digest = zlib.crc32(text.encode())
+        if digest == self.digest and not expected_changed:
+            return self.drifted
+        self.digest = digest
+        self.diffs += 1
+        self._update(diff_settings(self.expected, profiles.parse_tcp_globals(text)))
+        return self.drifted
+
+    def _update(self, drifted):
+        if drifted == self.drifted:
+            return
+        self.drifted = drifted
+        record = {
+            'time': time.time(),
+            'profiles': sorted(self.applied),
+            'drifted': drifted,
+            'reapplied': None,
+        }
+        if drifted and self.auto_reapply:
+            result = profiles.reapply_settings({name: value['expected'] for name, value in drifted.items()})
+            record['reapplied'] = {'successful': len(result['successful']), 'total': result['total']}
+            self.digest = None  # Verify the fix on the next check
+        if drifted:
+            metrics_logger.info(f"Settings drift - {format_drift(drifted)}",
+                                extra={'session_data': {'settings_drift': record}})
+        else:
+            metrics_logger.info("Settings drift resolved", extra={'session_data': {'settings_drift': record}})
+        if self.on_drift:
+            self.on_drift(record)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"Error checking settings drift: {str(e)}")
+            self.stop_event.wait(self.interval)
+
+
+def format_drift(drifted):
+    if not drifted:
+        return "all applied settings in place"
+    return ", ".join(f"{name} is {value['actual']} (applied {value['expected']})"
+                     for name, value in sorted(drifted.items()))
@@ -0,0 +1,52 @@
+"""
+Startup phase timing for the PING Optimizer application.
+Import this module first so its clock starts before anything expensive is loaded;
+`python tcp_optimizer_qt.py --profile-startup` prints the report.
+"""
+
+import time
+from contextlib import contextmanager
+
+# Process-wide reference point for every startup measurement
+START = time.perf_counter()
+
+
+class StartupProfiler:
+    def __init__(self, start=START):
+        self.start = start
+        self.phases = []  # (name, offset_ms, duration_ms) in the order they finished
+        self.marks = {}  # name -> offset_ms
+
+    @contextmanager
+    def phase(self, name):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, (begin - self.start) * 1000, (end - begin) * 1000))
+
+    def mark(self, name):
+        # Only the first occurrence counts (e.g. "first paint")
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self.start) * 1000
+        return self.marks[name]
+
+    def report(self):
+        lines = ["Startup profile (ms)", f"{'phase':<40}{'start':>10}{'duration':>10}"]
+        for name, offset, duration in self.phases:
+            lines.append(f"{name:<40}{offset:>10.1f}{duration:>10.1f}")
+        if self.marks:
+            lines.append("")
+            for name, offset in sorted(self.marks.items(), key=lambda item: item[1]):
+                lines.append(f"{name:<40}{offset:>10.1f}")
+        return "\n".join(lines)
+
+    def as_dict(self):
+        return {
+            'phases': [{'name': n, 'start_ms': o, 'duration_ms': d} for n, o, d in self.phases],
+            'marks': dict(self.marks),
+        }
+
+
+profiler = StartupProfiler()
@@ -300,3 +300,35 @@ POPUP_STYLE = """
         font-weight: bold;
     }
 """
+
+# Toast notifications; %s is the border colour for the notification level
+TOAST_STYLE = """
+    QLabel {
+        background-color: rgba(0, 0, 0, 0.85);
+        color: white;
+        border: 2px solid %s;
+        border-radius: 10px;
+        padding: 10px 15px;
+        font-family: 'Segoe UI', sans-serif;
+        font-size: 14px;
+    }
+"""
+
+TOAST_COLORS = {
+    'info': CYAN,
+    'success': "#00ff00",
+    'warning': "#ffaa00",
+    'error': "#ff5050",
+}
+
+# Diagnostics panel (hidden, Ctrl+Shift+D)
+DIAGNOSTICS_PANEL_STYLE = """
+    QWidget {
+        background-color: rgba(0, 0, 0, 0.9);
+        color: #00ffff;
+    }
+    QLabel {
+        font-family: Consolas, 'Courier New', monospace;
+        font-size: 12px;
+    }
+"""
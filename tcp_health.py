@@ -0,0 +1,246 @@
+"""
+TCP stack-health counters for the PING Optimizer application.
+Samples the kernel's TCP counters (retransmissions, timeouts, resets, out-of-order
+segments, listen drops) and reports per-second rates, so an optimization can be
+judged by how the stack behaves and not only by whether its command exited 0.
+
+Linux reads /proc/net/snmp and /proc/net/netstat; Windows parses `netstat -s`,
+which exposes fewer counters (no timeouts, out-of-order or listen drops).
+"""
+
+import re
+import sys
+import time
+import logging
+import threading
+from collections import deque
+
+from profiles import run_command
+
+SNMP_FILE = '/proc/net/snmp'
+NETSTAT_FILE = '/proc/net/netstat'
+SAMPLE_INTERVAL = 5.0
+HEALTH_WINDOW = 30.0  # Seconds of counters compared before and after a change
+
+# Our counter name -> (/proc table, field)
+LINUX_COUNTERS = {
+    'segments_in': ('Tcp', 'InSegs'),
+    'segments_out': ('Tcp', 'OutSegs'),
+    'retransmits': ('Tcp', 'RetransSegs'),
+    'in_errors': ('Tcp', 'InErrs'),
+    'resets_sent': ('Tcp', 'OutRsts'),
+    'connection_resets': ('Tcp', 'EstabResets'),
+    'timeouts': ('TcpExt', 'TCPTimeouts'),
+    'out_of_order': ('TcpExt', 'TCPOFOQueue'),
+    'listen_drops': ('TcpExt', 'ListenDrops'),
+    'listen_overflows': ('TcpExt', 'ListenOverflows'),
+}
+
+# `netstat -s -p tcp` line label -> our counter name (IPv4 and IPv6 are summed)
+WINDOWS_COUNTERS = {
+    'Segments Received': 'segments_in',
+    'Segments Sent': 'segments_out',
+    'Segments Retransmitted': 'retransmits',
+    'Reset Connections': 'connection_resets',
+    'Failed Connection Attempts': 'failed_connects',
+}
+WINDOWS_LINE_RE = re.compile(r"^\s*(.+?)\s*=\s*(\d+)\s*$")
+
+metrics_logger = logging.getLogger('metrics')
+
+
+def parse_proc_tables(text):
+    # /proc/net/snmp and /proc/net/netstat: pairs of "Table: names..." / "Table: values..." lines
+    tables = {}
+    lines = text.splitlines()
+    for header, values in zip(lines[::2], lines[1::2]):
+        name, _, fields = header.partition(':')
+        _, _, numbers = values.partition(':')
+        try:
+            tables[name.strip()] = dict(zip(fields.split(), (int(n) for n in numbers.split())))
+        except ValueError:
+            continue
+    return tables
+
+
+def read_linux_counters(snmp_file=SNMP_FILE, netstat_file=NETSTAT_FILE):
+    tables = {}
+    for path in (snmp_file, netstat_file):
+        try:
+            with open(path, 'r') as f:
+                tables.update(parse_proc_tables(f.read()))
+        except OSError:
+            continue
+    counters = {}
+    for name, (table, field) in LINUX_COUNTERS.items():
+        value = tables.get(table, {}).get(field)
+        if value is not None:
+            counters[name] = value
+    return counters
+
+
+def parse_windows_netstat(text):
+    counters = {}
+    for line in text.splitlines():
+        match = WINDOWS_LINE_RE.match(line)
+        if match and match.group(1) in WINDOWS_COUNTERS:
+            name = WINDOWS_COUNTERS[match.group(1)]
+            counters[name] = counters.get(name, 0) + int(match.group(2))
+    return counters
+
+
+def read_windows_counters():
+    counters = {}
+    for protocol in ('tcp', 'tcpv6'):
+        try:
+            result = run_command(['netstat', '-s', '-p', protocol])
+        except OSError:
+            continue
+        if result.returncode == 0:
+            for name, value in parse_windows_netstat(result.stdout).items():
+                counters[name] = counters.get(name, 0) + value
+    return counters
+
+
+def read_tcp_counters():
+    # {counter: cumulative value}; counters the platform doesn't expose are absent
+    if sys.platform == 'win32':
+        return read_windows_counters()
+    if sys.platform.startswith('linux'):
+        return read_linux_counters()
+    return {}
+
+
+def counter_rates(before, after, elapsed):
+    """Per-second rates between two counter snapshots, plus the retransmit percentage."""
+    if not elapsed or elapsed <= 0:
+        return {}
+    rates = {}
+    for name, value in after.items():
+        if name in before:
+            rates[name] = max(0, value - before[name]) / elapsed
+    if rates.get('segments_out'):
+        rates['retransmit_percent'] = rates.get('retransmits', 0) / rates['segments_out'] * 100
+    return rates
+
+
+def format_health(rates):
+    if not rates:
+        return "Stack health: no counters available"
+    parts = [f"Retransmits {rates.get('retransmits', 0):.1f}/s"]
+    if 'retransmit_percent' in rates:
+        parts[0] += f" ({rates['retransmit_percent']:.2f}%)"
+    for name, label in (('timeouts', 'Timeouts'), ('connection_resets', 'Resets'),
+                        ('out_of_order', 'Out-of-order'), ('listen_drops', 'Listen drops')):
+        if name in rates:
+            parts.append(f"{label} {rates[name]:.1f}/s")
+    return "Stack health - " + " - ".join(parts)
+
+
+class StackHealthTracker:
+    """Samples TCP counters on a background thread and attaches before/after rates
+    to every profile change it is told about (see profiles.change_listeners)."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, window=HEALTH_WINDOW, on_sample=None,
+                 read_counters=read_tcp_counters):
+        self.interval = interval
+        self.window = window
+        self.on_sample = on_sample  # Called with the latest per-interval rates
+        self.read_counters = read_counters
+        self.history = deque(maxlen=int(window / interval) + 2)  # (monotonic, counters)
+        self.pending = []  # Changes waiting for their "after" window
+        self.latest_rates = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        # Whatever has been observed so far is still worth recording
+        self.finish_pending(force=True)
+
+    def sample(self):
+        now = time.monotonic()
+        counters = self.read_counters()
+        with self.lock:
+            if self.history:
+                previous_time, previous = self.history[-1]
+                self.latest_rates = counter_rates(previous, counters, now - previous_time)
+            self.history.append((now, counters))
+        if self.on_sample and self.latest_rates:
+            self.on_sample(dict(self.latest_rates))
+        self.finish_pending()
+
+    def note_change(self, change):
+        # Called right after a profile was applied or reverted (any thread)
+        now = time.monotonic()
+        counters = self.read_counters()
+        with self.lock:
+            window = [(t, c) for t, c in self.history if now - t <= self.window]
+            before = counter_rates(window[0][1], counters, now - window[0][0]) if window else {}
+            before_seconds = now - window[0][0] if window else 0
+            # A newer change ends the observation window of earlier ones
+            overtaken, self.pending = self.pending, []
+        for entry in overtaken:
+            self.record(entry, counters, now)
+        with self.lock:
+            self.pending.append({
+                'change': change,
+                'time': now,
+                'counters': counters,
+                'before': before,
+                'before_seconds': before_seconds,
+            })
+
+    def finish_pending(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            due, waiting = [], []
+            for entry in self.pending:
+                (due if force or now - entry['time'] >= self.window else waiting).append(entry)
+            if not due:
+                return
+            self.pending = waiting
+        counters = self.read_counters()
+        for entry in due:
+            self.record(entry, counters, now)
+
+    def record(self, entry, counters, now):
+        change = entry['change']
+        after = counter_rates(entry['counters'], counters, now - entry['time'])
+        health = {
+            'time': change.get('time', time.time()),
+            'profile': change.get('profile'),
+            'action': change.get('action'),
+            'before_seconds': round(entry['before_seconds'], 1),
+            'after_seconds': round(now - entry['time'], 1),
+            'before': entry['before'],
+            'after': after,
+        }
+        metrics_logger.info(
+            f"Stack health for {health['profile']} {health['action']} - "
+            f"retransmits/s before {entry['before'].get('retransmits', 0):.2f}, after {after.get('retransmits', 0):.2f}",
+            extra={'session_data': {'stack_health': health}})
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"Error sampling TCP counters: {str(e)}")
+            next_time += self.interval
+            self.stop_event.wait(max(0.0, next_time - time.monotonic()))
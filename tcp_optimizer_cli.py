@@ -0,0 +1,616 @@
+"""
+Headless command-line interface for the PING Optimizer application.
+
+    python tcp_optimizer_cli.py measure [--target HOST | tcp:HOST:PORT | udp:HOST:PORT ...] [--count N]
+    python tcp_optimizer_cli.py apply tcp game ... [--guard [--baseline 30] [--probation 60]]
+    python tcp_optimizer_cli.py revert tcp game ...
+    python tcp_optimizer_cli.py benchmark [--profiles game qos]
+    python tcp_optimizer_cli.py dns-bench [--servers IP ...] [--apply ADAPTER]
+    python tcp_optimizer_cli.py dns-forward [--upstream IP ...] [--point ADAPTER]
+    python tcp_optimizer_cli.py tick-test [--reflector HOST:PORT] [--rate 128] [--size 64]
+    python tcp_optimizer_cli.py tick-reflector [--port 27999]
+    python tcp_optimizer_cli.py burst --target udp-echo:HOST:PORT [--rate 1000] [--duration 5]
+    python tcp_optimizer_cli.py mtu [--target HOST | udp-echo:HOST:PORT ...]
+    python tcp_optimizer_cli.py compare-interfaces [--target HOST ...] [--prefer]
+    python tcp_optimizer_cli.py drift [--reapply]
+    python tcp_optimizer_cli.py status
+    python tcp_optimizer_cli.py daemon [--detach] [--metrics-port 9464] [--diagnostics]
+    python tcp_optimizer_cli.py diagnostics [--file PATH]
+
+Imports nothing from Qt, and each command imports only the modules it needs.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+
+def print_result(data, as_json, text):
+    if as_json:
+        print(json.dumps(data, indent=2, default=str))
+    else:
+        print(text)
+
+
+def cmd_measure(args):
+    from ping_monitor import DEFAULT_TARGET, format_ping_stats
+    from probe_scheduler import ProbeMonitor, format_target_summary
+    from latency_events import LatencyEventDetector, format_event
+
+    def on_target_sample(label, rtt):
+        if rtt is not None and not args.json and not args.quiet:
+            print(f"{label}: {rtt:.1f} ms")
+
+    def on_event(event):
+        if not args.json:
+            print(f"! {format_event(event)}")
+
+    events = LatencyEventDetector(on_event=on_event)
+    try:
+        monitor = ProbeMonitor(args.target or [DEFAULT_TARGET], on_sample=events.add,
+                               on_target_sample=on_target_sample, count=args.count, interval=args.interval)
+        monitor.start()
+    except (OSError, ValueError) as e:
+        print(f"Failed to start probing: {str(e)}", file=sys.stderr)
+        return 2
+    try:
+        monitor.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+
+    summaries = []
+    lines = []
+    for label, summary in monitor.summaries().items():
+        summary['target'] = label
+        summaries.append(summary)
+        if summary['count']:
+            args.metrics_logger.info(format_ping_stats({
+                'current': summary['last'],
+                'min': summary['min'],
+                'max': summary['max'],
+                'avg': summary['avg'],
+            }))
+            lines.append(f"{label}: {summary['count']}/{summary['sent']} replies, "
+                         f"loss {summary['loss']:.1f}% - min/avg/max {summary['min']:.1f}/"
+                         f"{summary['avg']:.1f}/{summary['max']:.1f} ms - "
+                         f"P50/P95 {summary['p50']:.1f}/{summary['p95']:.1f} ms - jitter {summary['jitter']:.1f} ms")
+        else:
+            lines.append(format_target_summary(label, summary))
+    # A single target keeps the original single-object JSON shape
+    print_result(summaries[0] if len(summaries) == 1 else summaries, args.json, "\n".join(lines))
+    return 0 if any(summary['count'] for summary in summaries) else 1
+
+
+def _run_profiles(args, action):
+    import profiles
+
+    if not profiles.is_admin():
+        print("Warning: not running as administrator, commands will likely fail", file=sys.stderr)
+    run = profiles.apply_profile if action == 'apply' else profiles.revert_profile
+    results = []
+    for name in args.profiles:
+        results.append(run(name))
+    lines = [f"{profiles.get_profile(r['profile']).title}: {len(r['successful'])}/{r['total']} commands "
+             f"{'applied' if action == 'apply' else 'reverted'}" for r in results]
+    print_result(results, args.json, "\n".join(lines))
+    return 0 if all(r['successful'] for r in results) else 1
+
+
+def cmd_apply(args):
+    if args.guard:
+        return _run_guarded(args)
+    return _run_profiles(args, 'apply')
+
+
+def _run_guarded(args):
+    import profiles
+    from guarded_apply import GuardedApply, format_record
+    from ping_monitor import DEFAULT_TARGET
+    from probe_scheduler import ProbeMonitor
+
+    if not profiles.is_admin():
+        print("Warning: not running as administrator, commands will likely fail", file=sys.stderr)
+
+    def on_phase(phase, detail):
+        if not args.json:
+            print(f"{phase}: {detail}")
+
+    records = []
+    for name in args.profiles:
+        guard = GuardedApply(name, args.baseline, args.probation, on_phase=on_phase)
+        try:
+            monitor = ProbeMonitor(args.target or [DEFAULT_TARGET], on_sample=guard.add_sample)
+            monitor.start()
+        except (OSError, ValueError) as e:
+            print(f"Failed to start probing: {str(e)}", file=sys.stderr)
+            return 2
+        try:
+            records.append(guard.run())
+        except KeyboardInterrupt:
+            guard.cancel()
+            break
+        finally:
+            monitor.stop()
+    print_result(records, args.json, "\n".join(format_record(record) for record in records))
+    return 0 if records and all(record['decision'] == 'kept' for record in records) else 1
+
+
+def cmd_revert(args):
+    return _run_profiles(args, 'revert')
+
+
+def cmd_benchmark(args):
+    import bufferbloat
+    import profiles
+
+    test_profiles = [('Current Settings', None, None)]
+    for name in args.profiles:
+        title = profiles.get_profile(name).title
+        test_profiles.append((
+            title,
+            lambda name=name: profiles.apply_profile(name),
+            lambda name=name: profiles.revert_profile(name),
+        ))
+    results = bufferbloat.run_local_profile_comparison(
+        test_profiles,
+        direction=args.direction,
+        idle_seconds=args.idle,
+        loaded_seconds=args.loaded,
+        interval=args.interval,
+        streams=args.streams,
+        rate_limit_mbps=args.rate_limit,
+    )
+    args.metrics_logger.info(
+        "Bufferbloat test completed",
+        extra={'session_data': {'bufferbloat_tests': results}}
+    )
+    lines = [f"{r['profile']}: {bufferbloat.format_result(r)}" for r in results]
+    print_result(results, args.json, "\n".join(lines))
+    return 0
+
+
+def cmd_dns_bench(args):
+    import dns_benchmark
+
+    if args.local:
+        results = dns_benchmark.run_local_dns_benchmark(rounds=args.rounds)
+    else:
+        results = dns_benchmark.run_dns_benchmark(args.servers or None, rounds=args.rounds)
+    args.metrics_logger.info(
+        "DNS benchmark completed",
+        extra={'session_data': {'dns_benchmarks': results}}
+    )
+    lines = [f"{r['rank']}. {dns_benchmark.format_result(r)}" for r in results]
+    status = 0
+    if args.apply:
+        import profiles
+
+        winners = [r['address'] for r in results
+                   if r['port'] == 53 and r['median'] is not None
+                   and r['failure_rate'] <= dns_benchmark.MAX_FAILURE_RATE][:2]
+        if winners:
+            result = profiles.set_dns_servers(args.apply, winners)
+            lines.append(f"DNS for {args.apply} set to {', '.join(winners)}: "
+                         f"{len(result['successful'])}/{result['total']} commands applied")
+            status = 0 if not result['failed'] else 1
+        else:
+            lines.append("No reliable resolver on port 53 to apply")
+            status = 1
+    print_result(results, args.json, "\n".join(lines))
+    return status
+
+
+def cmd_dns_forward(args):
+    import dns_forwarder
+
+    if args.local:
+        stats = dns_forwarder.run_local_forwarder_check()
+        args.metrics_logger.info(
+            "DNS forwarder check completed",
+            extra={'session_data': {'dns_forwarder': stats}}
+        )
+        print_result(stats, args.json, dns_forwarder.format_forwarder_stats(stats))
+        return 0
+
+    if args.point:
+        import ipaddress
+        # Adapters send queries to port 53 of a concrete address; anything else breaks system DNS
+        try:
+            concrete = not ipaddress.ip_address(args.listen).is_unspecified
+        except ValueError:
+            concrete = False
+        if args.port != 53 or not concrete:
+            print("--point needs the forwarder on port 53 of a concrete address (e.g. --listen 127.0.0.1)",
+                  file=sys.stderr)
+            return 2
+
+    def on_stats(stats):
+        if not args.json:
+            print(dns_forwarder.format_forwarder_stats(stats))
+
+    upstreams = args.upstream or dns_forwarder.default_upstreams(args.listen)
+    forwarder = dns_forwarder.DnsForwarder(upstreams, host=args.listen, port=args.port, on_stats=on_stats)
+    try:
+        forwarder.start()
+    except OSError as e:
+        print(f"Failed to start DNS forwarder on {args.listen}:{args.port}: {str(e)}", file=sys.stderr)
+        return 2
+    previous = None
+    if args.point:
+        import profiles
+        # Saved first so exactly these servers go back; without them the adapter is left alone
+        try:
+            previous = profiles.get_dns_servers(args.point)
+        except (OSError, ValueError) as e:
+            print(f"Not pointing {args.point} at the forwarder: could not read its DNS servers ({str(e)})",
+                  file=sys.stderr)
+            forwarder.stop()
+            return 2
+        result = profiles.set_dns_servers(args.point, [args.listen])
+        if result['failed']:
+            # A partial change (primary set, secondaries not) is undone right away
+            profiles.restore_dns_servers(args.point, previous)
+            print(f"Could not point {args.point} at the forwarder; its DNS servers were restored", file=sys.stderr)
+            forwarder.stop()
+            return 2
+    print(f"Forwarding DNS on {args.listen}:{args.port} to {', '.join(upstreams)} (Ctrl+C to stop)")
+    try:
+        while forwarder.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if previous is not None:
+            # The forwarder is going away; give the adapter the servers it had before
+            profiles.restore_dns_servers(args.point, previous)
+        forwarder.stop()
+    stats = forwarder.stats()
+    print_result(stats, args.json, dns_forwarder.format_forwarder_stats(stats))
+    return 0
+
+
+def cmd_tick_test(args):
+    import game_tick
+
+    try:
+        if args.reflector:
+            host, _, port = args.reflector.rpartition(':')
+            result = game_tick.run_tick_test((host.strip('[]'), int(port)), args.rate, args.size, args.duration,
+                                             args.late)
+        else:
+            result = game_tick.run_local_tick_test(args.rate, args.size, args.duration, args.late)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Tick test failed: {str(e)}", file=sys.stderr)
+        return 2
+    text = (f"{result['rate']} Hz x {result['size']} bytes for {result['duration']:.0f}s to {result['target']}\n"
+            f"Upstream:   {game_tick.format_direction(result['upstream'])}\n"
+            f"Downstream: {game_tick.format_direction(result['downstream'])}")
+    print_result(result, args.json, text)
+    return 0
+
+
+def cmd_tick_reflector(args):
+    from local_endpoints import TickReflector
+
+    reflector = TickReflector(args.host, args.port).start()
+    host, port = reflector.address
+    # start_reflector_process() reads the address from this first line
+    print(f"Tick reflector listening on {host}:{port}", flush=True)
+    try:
+        while reflector.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reflector.stop()
+    return 0
+
+
+def cmd_burst(args):
+    import burst
+
+    if not args.target and not args.local:
+        print("Burst needs --target udp-echo:HOST:PORT, or --local", file=sys.stderr)
+        return 2
+    try:
+        if args.local:
+            result = burst.run_local_burst(args.rate, args.duration)
+        else:
+            result = burst.run_burst(args.target, args.rate, args.duration)
+    except (OSError, ValueError) as e:
+        print(f"Burst failed: {str(e)}", file=sys.stderr)
+        return 2
+    pacing = result['pacing']
+    text = (f"{result['target']} at {result['rate']} Hz for {result['duration']:.0f}s\n"
+            f"{burst.format_summary(result)}\n"
+            f"Pacing: max {pacing['max_lateness_ms']:.2f} ms late, {pacing['skipped']} ticks skipped")
+    print_result(result, args.json, text)
+    return 0
+
+
+def cmd_mtu(args):
+    import mtu
+    from ping_monitor import DEFAULT_TARGET
+
+    if args.local:
+        result = mtu.run_local_mtu_check(args.local)
+    else:
+        result = mtu.run_mtu_check(args.target or [DEFAULT_TARGET])
+    lines = [mtu.format_result(target) for target in result['targets']]
+    lines.append("Interfaces:")
+    for interface in result['interfaces']:
+        line = (f"  {interface['interface']}: MTU {interface['mtu']} - effective {interface['effective_mtu']} "
+                f"- MSS {interface['mss']}")
+        lines.append(line + (" - MISMATCH" if interface['mismatch'] else ""))
+    print_result(result, args.json, "\n".join(lines))
+    return 1 if any('error' in target or target['issues'] for target in result['targets']) else 0
+
+
+def cmd_compare_interfaces(args):
+    import interface_compare
+    from ping_monitor import DEFAULT_TARGET
+
+    try:
+        if args.local:
+            comparison = interface_compare.run_local_interface_comparison(args.count)
+        else:
+            comparison = interface_compare.run_interface_comparison(args.target or [DEFAULT_TARGET],
+                                                                    count=args.count, prefer_winner=args.prefer)
+    except ValueError as e:
+        print(f"Interface comparison failed: {str(e)}", file=sys.stderr)
+        return 2
+    lines = [f"{result['rank']}. {interface_compare.format_result(result)}" for result in comparison['interfaces']]
+    lines.append(f"Winner: {comparison['winner'] or 'none'} - {comparison['decision']['reason']}")
+    change = comparison['metric_change']
+    if change is not None:
+        status = "preferred" if change['successful'] else "could not be preferred"
+        lines.append(f"{comparison['winner']} {status} (interface metric {interface_compare.PREFERRED_METRIC})")
+    print_result(comparison, args.json, "\n".join(lines))
+    return 0 if comparison['winner'] else 1
+
+
+def cmd_status(args):
+    import profiles
+    from metrics_store import load_metrics
+    from optimizer_daemon import read_status
+
+    state = profiles.load_state()
+    daemon = read_status()
+    sessions = load_metrics().get('sessions', [])
+    last_pings = None
+    for session in reversed(sessions):
+        if session.get('optimized_pings'):
+            last_pings = session['optimized_pings'][-1]
+            break
+    status = {
+        'applied_profiles': sorted(state.get('applied', {})),
+        'tcp_globals': profiles.read_tcp_globals() if args.tcp_globals else None,
+        'daemon': daemon,
+        'sessions': len(sessions),
+        'last_ping_stats': last_pings,
+    }
+
+    lines = [f"Applied profiles: {', '.join(status['applied_profiles']) or 'none'}"]
+    if daemon:
+        age = time.time() - daemon.get('updated', 0)
+        state_text = 'running' if daemon.get('running') else 'stopped'
+        lines.append(f"Daemon: {state_text} (pid {daemon.get('pid')}, target {daemon.get('target')}, "
+                     f"updated {age:.0f}s ago)")
+        if daemon.get('settings_drift'):
+            from settings_drift import format_drift
+            lines.append(f"Settings drift: {format_drift(daemon['settings_drift'])}")
+        if daemon.get('latency_events'):
+            from latency_events import format_counts
+            lines.append(format_counts(daemon['latency_events']))
+        if daemon.get('metrics_url'):
+            lines.append(f"Metrics: {daemon['metrics_url']}")
+    else:
+        lines.append("Daemon: not started")
+    if last_pings:
+        lines.append("Last ping stats: " + ", ".join(f"{k} {v}" for k, v in last_pings.items()))
+    lines.append(f"Recorded sessions: {len(sessions)}")
+    if status['tcp_globals']:
+        lines.append("TCP globals:")
+        lines.extend(f"  {k}: {v}" for k, v in status['tcp_globals'].items())
+    print_result(status, args.json, "\n".join(lines))
+    return 0
+
+
+def cmd_drift(args):
+    from settings_drift import DriftMonitor, format_drift
+
+    monitor = DriftMonitor(auto_reapply=args.reapply)
+    drifted = monitor.check()
+    result = {'applied_profiles': sorted(monitor.applied), 'checked': sorted(monitor.expected),
+              'drifted': drifted}
+    if not monitor.expected:
+        text = "No applied profile with checkable settings"
+    else:
+        text = f"Settings drift: {format_drift(drifted)}"
+        if drifted and args.reapply:
+            text += "\nDrifted settings re-applied"
+    print_result(result, args.json, text)
+    return 1 if drifted and not args.reapply else 0
+
+
+def cmd_daemon(args):
+    from optimizer_daemon import OptimizerDaemon, spawn_detached
+
+    if args.detach:
+        argv = [os.path.abspath(__file__), 'daemon', '--target', args.target, '--interval', str(args.interval)]
+        for name in args.apply:
+            argv += ['--apply', name]
+        if args.reapply_drift:
+            argv.append('--reapply-drift')
+        if args.metrics_port is not None:
+            argv += ['--metrics-port', str(args.metrics_port), '--metrics-host', args.metrics_host]
+        if args.diagnostics:
+            argv.append('--diagnostics')
+        pid = spawn_detached(argv)
+        print(f"Daemon started in background (pid {pid})")
+        return 0
+
+    daemon = OptimizerDaemon(args.target, report_interval=args.interval, apply=args.apply,
+                             reapply_drift=args.reapply_drift, metrics_port=args.metrics_port,
+                             metrics_host=args.metrics_host, diagnostics=args.diagnostics)
+    try:
+        daemon.start_exporter()
+    except OSError as e:
+        print(f"Could not serve metrics on {args.metrics_host}:{args.metrics_port}: {str(e)}", file=sys.stderr)
+        return 2
+    daemon.install_signal_handlers()
+    daemon.run()
+    return 0
+
+
+def cmd_diagnostics(args):
+    from diagnostics import load_dump, default_dump_path
+
+    path = args.file or default_dump_path()
+    dump = load_dump(path)
+    if dump is None:
+        print(f"No diagnostics dump at {path} (run the daemon with --diagnostics, "
+              f"or use Dump to File in the app's Ctrl+Shift+D panel)", file=sys.stderr)
+        return 1
+    age = time.time() - dump['time']
+    print_result(dump, args.json, f"{dump['report']}\n(pid {dump['pid']}, written {age:.0f}s ago)")
+    return 0
+
+
+def build_parser():
+    from ping_monitor import DEFAULT_TARGET
+    from profiles import PROFILES
+
+    profile_names = list(PROFILES)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', help="print machine-readable output")
+    common.add_argument('--no-metrics', action='store_true', help="don't record to tcp_metrics.json")
+
+    parser = argparse.ArgumentParser(description="PING Optimizer headless interface")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    measure = subparsers.add_parser('measure', parents=[common], help="measure latency (ICMP, TCP or UDP probes)")
+    measure.add_argument('--target', action='append',
+                         help=f"host (ICMP), tcp:HOST:PORT, udp:HOST:PORT or udp-echo:HOST:PORT; "
+                              f"repeat to probe several at once (default {DEFAULT_TARGET})")
+    measure.add_argument('--interval', type=float, default=1.0, help="seconds between TCP/UDP probes per target")
+    measure.add_argument('--count', type=int, default=10)
+    measure.add_argument('--quiet', action='store_true', help="only print the summary")
+    measure.set_defaults(func=cmd_measure)
+
+    apply = subparsers.add_parser('apply', parents=[common], help="apply optimization profiles")
+    apply.add_argument('profiles', nargs='+', choices=profile_names)
+    apply.add_argument('--guard', action='store_true',
+                       help="measure a baseline, apply, and revert if latency or loss regresses")
+    apply.add_argument('--target', action='append', help=f"probe target(s) for --guard (default {DEFAULT_TARGET})")
+    apply.add_argument('--baseline', type=float, default=30.0, help="baseline seconds for --guard")
+    apply.add_argument('--probation', type=float, default=60.0, help="probation seconds for --guard")
+    apply.set_defaults(func=cmd_apply)
+
+    revert = subparsers.add_parser('revert', parents=[common], help="revert optimization profiles")
+    revert.add_argument('profiles', nargs='+', choices=profile_names)
+    revert.set_defaults(func=cmd_revert)
+
+    benchmark = subparsers.add_parser('benchmark', parents=[common], help="latency-under-load test per profile")
+    benchmark.add_argument('--profiles', nargs='*', default=[], choices=profile_names)
+    benchmark.add_argument('--direction', default='both', choices=['upload', 'download', 'both'])
+    benchmark.add_argument('--idle', type=float, default=5.0, help="idle phase seconds")
+    benchmark.add_argument('--loaded', type=float, default=10.0, help="loaded phase seconds")
+    benchmark.add_argument('--interval', type=float, default=0.1, help="probe interval seconds")
+    benchmark.add_argument('--streams', type=int, default=4)
+    benchmark.add_argument('--rate-limit', type=float, default=None, help="total load in Mbit/s")
+    benchmark.set_defaults(func=cmd_benchmark)
+
+    dns_bench = subparsers.add_parser('dns-bench', parents=[common], help="rank DNS resolvers by response time")
+    dns_bench.add_argument('--servers', nargs='*', default=[], help="resolvers to test (default: public + system)")
+    dns_bench.add_argument('--rounds', type=int, default=3)
+    dns_bench.add_argument('--local', action='store_true', help="benchmark stand-in resolvers on loopback")
+    dns_bench.add_argument('--apply', metavar='ADAPTER', help="set the two best resolvers on this adapter")
+    dns_bench.set_defaults(func=cmd_dns_bench)
+
+    dns_forward = subparsers.add_parser('dns-forward', parents=[common], help="run the local caching DNS forwarder")
+    dns_forward.add_argument('--upstream', nargs='*', default=[], help="upstream resolvers (default: system + public)")
+    dns_forward.add_argument('--listen', default='127.0.0.1')
+    dns_forward.add_argument('--port', type=int, default=53)
+    dns_forward.add_argument('--point', metavar='ADAPTER', help="point this adapter's DNS at the forwarder while it runs")
+    dns_forward.add_argument('--local', action='store_true', help="self-check against stand-in upstreams on loopback")
+    dns_forward.set_defaults(func=cmd_dns_forward)
+
+    tick_test = subparsers.add_parser('tick-test', parents=[common], help="simulate game-tick UDP traffic")
+    tick_test.add_argument('--reflector', metavar='HOST:PORT', help="remote tick reflector (default: local process)")
+    tick_test.add_argument('--rate', type=int, default=64, help="ticks per second in each direction")
+    tick_test.add_argument('--size', type=int, default=64, help="packet size in bytes")
+    tick_test.add_argument('--duration', type=float, default=10.0, help="seconds")
+    tick_test.add_argument('--late', type=float, default=None, help="late threshold in ms (default: one tick)")
+    tick_test.set_defaults(func=cmd_tick_test)
+
+    tick_reflector = subparsers.add_parser('tick-reflector', parents=[common], help="run a game-tick reflector")
+    tick_reflector.add_argument('--host', default='0.0.0.0')
+    tick_reflector.add_argument('--port', type=int, default=27999)
+    tick_reflector.set_defaults(func=cmd_tick_reflector)
+
+    burst = subparsers.add_parser('burst', parents=[common], help="probe a UDP echo target at 100-1000 Hz")
+    burst.add_argument('--target', help="udp-echo:HOST:PORT (an echo service you run)")
+    burst.add_argument('--rate', type=int, default=500, help="probes per second (10-1000)")
+    burst.add_argument('--duration', type=float, default=5.0, help="seconds (at most 30)")
+    burst.add_argument('--local', action='store_true', help="burst a local echo server (self-test)")
+    burst.set_defaults(func=cmd_burst)
+
+    mtu = subparsers.add_parser('mtu', parents=[common], help="discover the path MTU and check adapter MTUs")
+    mtu.add_argument('--target', action='append', help="HOST (DF ping) or udp-echo:HOST:PORT; repeatable")
+    mtu.add_argument('--local', type=int, metavar='MTU', help="self-test against a loopback path of this MTU")
+    mtu.set_defaults(func=cmd_mtu)
+
+    compare = subparsers.add_parser('compare-interfaces', parents=[common],
+                                    help="rank interfaces by latency to the same targets")
+    compare.add_argument('--target', action='append', help="probe target (any measure --target form); repeatable")
+    compare.add_argument('--count', type=int, default=20, help="probes per target and interface")
+    compare.add_argument('--prefer', action='store_true', help="lower the winner's interface metric (Windows)")
+    compare.add_argument('--local', action='store_true', help="self-test with loopback source addresses")
+    compare.set_defaults(func=cmd_compare_interfaces)
+
+    drift = subparsers.add_parser('drift', parents=[common], help="check applied settings against live values")
+    drift.add_argument('--reapply', action='store_true', help="re-apply the settings that drifted")
+    drift.set_defaults(func=cmd_drift)
+
+    status = subparsers.add_parser('status', parents=[common], help="show applied profiles, daemon and last stats")
+    status.add_argument('--tcp-globals', action='store_true', help="also query netsh for live TCP globals")
+    status.set_defaults(func=cmd_status)
+
+    daemon = subparsers.add_parser('daemon', parents=[common], help="measure continuously in the background")
+    daemon.add_argument('--target', default=DEFAULT_TARGET, help="host (ICMP), tcp:HOST:PORT or udp:HOST:PORT")
+    daemon.add_argument('--interval', type=float, default=60.0, help="report interval seconds")
+    daemon.add_argument('--apply', action='append', default=[], choices=profile_names)
+    daemon.add_argument('--detach', action='store_true', help="fork into the background and exit")
+    daemon.add_argument('--reapply-drift', action='store_true', help="re-apply settings that drift back")
+    daemon.add_argument('--metrics-port', type=int, default=None,
+                        help="serve OpenMetrics at http://HOST:PORT/metrics (e.g. 9464)")
+    daemon.add_argument('--metrics-host', default='127.0.0.1', help="address for --metrics-port")
+    daemon.add_argument('--diagnostics', action='store_true',
+                        help="record hot-path span timings and dump them every interval")
+    daemon.set_defaults(func=cmd_daemon)
+
+    diagnostics = subparsers.add_parser('diagnostics', parents=[common], help="show the last span timings dump")
+    diagnostics.add_argument('--file', help="dump file (default: tcp_optimizer_diagnostics.json)")
+    diagnostics.set_defaults(func=cmd_diagnostics)
+    return parser
+
+
+def main(argv=None):
+    import logging
+
+    args = build_parser().parse_args(argv)
+    if args.no_metrics:
+        args.metrics_logger = logging.getLogger('metrics')
+    else:
+        from metrics_store import setup_logging
+        args.metrics_logger = setup_logging(console=False)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
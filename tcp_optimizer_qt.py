@@ -1,117 +1,38 @@
+from startup_profiler import profiler  # Imported first so its clock covers every import
 import sys
 import os
 import subprocess
 import threading
 import time
 import re
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                           QLabel, QPushButton, QFrame, QTabWidget, QComboBox,
-                           QMessageBox, QLineEdit, QProgressBar, QApplication,
-                           QSizePolicy, QCheckBox, QScrollArea, QRadioButton, 
-                           QButtonGroup, QGraphicsOpacityEffect, QGridLayout)
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QPoint, QRect, QEasingCurve
-from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont, QPalette, QBrush
+import argparse
+with profiler.phase("import PyQt5"):
+    from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+                               QLabel, QPushButton, QFrame, QTabWidget, QComboBox,
+                               QMessageBox, QLineEdit, QProgressBar, QApplication,
+                               QSizePolicy, QCheckBox, QScrollArea, QRadioButton, 
+                               QButtonGroup, QGraphicsOpacityEffect, QGridLayout, QShortcut)
+    from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QPoint, QRect, QEasingCurve, pyqtSignal
+    from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont, QPalette, QBrush, QImage, QKeySequence
 import logging
-import psutil
-import styles  # Import the styles module
-from cherry_blossom_animation import CherryBlossomAnimation
-import json
-from datetime import datetime
-
-# Enhanced Logging Configuration
-def setup_logging():
-    log_dir = os.path.dirname(os.path.abspath(__file__))
-    log_file = os.path.join(log_dir, 'tcp_optimizer.log')
-    metrics_file = os.path.join(log_dir, 'tcp_metrics.json')
-
-    # Configure main logger
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-
-    # Create a separate logger for metrics
-    metrics_logger = logging.getLogger('metrics')
-    metrics_logger.setLevel(logging.INFO)
-    
-    # Custom handler for JSON metrics
-    class MetricsHandler(logging.Handler):
-        def __init__(self, metrics_file):
-            super().__init__()
-            self.metrics_file = metrics_file
-            self.metrics = {
-                'sessions': []
-            }
-            # Load existing metrics if file exists
-            if os.path.exists(metrics_file):
-                try:
-                    with open(metrics_file, 'r') as f:
-                        self.metrics = json.load(f)
-                except:
-                    pass
-            
-            # Start new session
-            self.current_session = {
-                'start_time': datetime.now().isoformat(),
-                'baseline_ping': None,
-                'optimized_pings': [],
-                'tcp_commands': {
-                    'successful': [],
-                    'failed': []
-                },
-                'improvements': []
-            }
-            self.metrics['sessions'].append(self.current_session)
-
-        def emit(self, record):
-            try:
-                msg = self.format(record)
-                if record.levelname == 'INFO':
-                    # Parse and store metrics based on message type
-                    if 'baseline_ping' in msg:
-                        value = msg.split(': ')[1].replace('ms', '').strip()
-                        self.current_session['baseline_ping'] = float(value)
-                    elif 'Successfully applied' in msg:
-                        self.current_session['tcp_commands']['successful'].append(msg)
-                    elif 'Command failed' in msg:
-                        self.current_session['tcp_commands']['failed'].append(msg)
-                    elif 'Ping stats' in msg:
-                        # Extract ping values and improvement
-                        ping_data = {}
-                        parts = msg.split(' - ')
-                        for part in parts:
-                            if ':' in part:
-                                key = part.split(':')[0].strip()
-                                value = part.split(':')[1].strip().replace('ms', '').strip()
-                                if key == 'Improvement':
-                                    ping_data[key] = value  # Keep the % symbol for improvement
-                                else:
-                                    try:
-                                        ping_data[key] = float(value)
-                                    except:
-                                        ping_data[key] = value
-                        self.current_session['optimized_pings'].append(ping_data)
-                    
-                    # Save metrics to file
-                    with open(self.metrics_file, 'w') as f:
-                        json.dump(self.metrics, f, indent=2)
-            except Exception as e:
-                print(f"Error in metrics handler: {e}")
-
-    # Add metrics handler
-    metrics_handler = MetricsHandler(metrics_file)
-    metrics_formatter = logging.Formatter('%(asctime)s - %(message)s')
-    metrics_handler.setFormatter(metrics_formatter)
-    metrics_logger.addHandler(metrics_handler)
-
-    return metrics_logger
-
-# Initialize loggers
-metrics_logger = setup_logging()
+with profiler.phase("import app modules"):
+    import styles  # Import the styles module
+    import profiles
+    from profiles import GAME_MODE_COMMANDS
+    from metrics_store import setup_logging, preload_metrics, get_current_session
+    from ping_monitor import RollingPingStats, DEFAULT_TARGET, format_ping_stats
+    from ping_presenter import PingStatsPresenter
+    from latency_chart import LatencyChart
+    from latency_histogram import LogHistogram
+    from distribution_panel import DistributionPanel
+    from latency_events import LatencyEventDetector
+    from notifications import NotificationArea
+    from diagnostics import recorder
+# psutil, the cherry blossom animation and the bufferbloat test are imported lazily,
+# after the window has painted for the first time
+
+# Configured by setup_logging() when the window is created, not at import time
+metrics_logger = logging.getLogger('metrics')
 
 class ValueDisplay(QFrame):
     def __init__(self, label_text, parent=None):
@@ -159,17 +80,63 @@ class GlassFrame(QFrame):
         self.setStyleSheet(styles.GLASS_PANEL_STYLE)
 
 class TCPOptimizerQt(QMainWindow):
-    def __init__(self):
+    # Emitted from the bufferbloat worker thread with the list of per-profile results
+    bufferbloat_finished = pyqtSignal(object)
+    # Emitted from the ping reader thread with the RTT in ms (None for a lost probe)
+    ping_sample = pyqtSignal(object)
+    # Emitted from the loader thread with the decoded background QImage
+    background_loaded = pyqtSignal(object)
+    # Emitted once the window has painted and the deferred subsystems are up
+    startup_finished = pyqtSignal()
+    # Emitted from the interface sampler thread with the selected interface's rates
+    interface_sample = pyqtSignal(object)
+    # Emitted from the stack-health thread with the latest TCP counter rates
+    health_sample = pyqtSignal(object)
+    # Emitted from the game endpoint monitor with per-endpoint probe results
+    game_endpoints_probed = pyqtSignal(object)
+    # Emitted from the DNS benchmark worker thread with the ranked resolver results
+    dns_benchmark_finished = pyqtSignal(object)
+    # Emitted from the DNS forwarder thread with its cache statistics
+    dns_forwarder_stats = pyqtSignal(object)
+    # Emitted from the tick simulator worker thread with its result (or an error dict)
+    tick_test_finished = pyqtSignal(object)
+    # Emitted from the burst prober with batches of (time, rtt_ms or None) in send order
+    burst_samples = pyqtSignal(object)
+    # Emitted from the burst worker thread with its summary (or an error dict)
+    burst_finished = pyqtSignal(object)
+    # Emitted from the MTU discovery worker thread with the check result
+    mtu_check_finished = pyqtSignal(object)
+    # Emitted from the interface comparison worker thread with the ranked comparison
+    interface_comparison_finished = pyqtSignal(object)
+    # Emitted from the drift monitor thread when the set of drifted settings changes
+    settings_drift = pyqtSignal(object)
+    # Emitted from the guarded apply thread with (profile name, phase, detail)
+    guard_phase = pyqtSignal(object)
+    # Emitted from the guarded apply thread with the decision record (or an error dict)
+    guard_finished = pyqtSignal(object)
+
+    def __init__(self, metrics_port=None, metrics_host='127.0.0.1'):
         super().__init__()
+        with profiler.phase("logging setup"):
+            setup_logging()
         self.setWindowTitle("TCP Optimizer")
         self.setStyleSheet(styles.MAIN_WINDOW_STYLE)
         self.setMinimumSize(1200, 800)
+        # Results and latency events are announced as toasts rather than modal dialogs
+        self.notifications = NotificationArea(self)
         
-        # Initialize cherry blossom animation first
-        self.cherry_animation = CherryBlossomAnimation(self)
-        self.cherry_animation.resize(self.size())
-        self.cherry_animation.lower()  # Ensure it stays behind other widgets
-        self.cherry_animation.show()
+        # Created after the first paint (see finish_startup)
+        self.cherry_animation = None
+        self.bg_label = None
+        self.background_cache = None
+        # Smooth background rescale runs once resizing has settled
+        self.resize_settle_timer = QTimer(self)
+        self.resize_settle_timer.setSingleShot(True)
+        self.resize_settle_timer.setInterval(150)
+        self.resize_settle_timer.timeout.connect(self.finish_background_resize)
+        self.first_paint_done = False
+        self.background_pending = True  # Startup finishes once the background is up
+        self.background_loaded.connect(self.apply_background_image)
         
         # Initialize variables
         self.running_ping = False
@@ -180,17 +147,50 @@ class TCPOptimizerQt(QMainWindow):
             'avg': '--'
         }
         # Ping measurement variables
-        self.window_size = 10  # Number of recent pings to consider for moving average
-        self.ping_window = []  # Store recent pings
+        self.ping_tracker = RollingPingStats(window_size=10)  # Rolling window for moving average
         self.last_ping = None  # Store last ping for immediate comparison
         self.baseline_ping = None  # Baseline ping before optimization
         self.baseline_window = []  # Store baseline window for better comparison
+        # Session latency distribution, split at the most recent optimization
+        self.latency_histograms = {'before': LogHistogram(), 'after': LogHistogram()}
+        self.histogram_phase = 'before'
         self.interface_combo = None  
         self.tcp_optimized = False  # Flag to track TCP optimization
         self.interface_optimized = False  # Flag to track interface optimization
         self.qos_optimized = False  # Flag to track QoS optimization
         self.game_mode_enabled = False  # Flag to track game mode
         self.show_improvement = False  # New flag to control arrow display
+        self.bufferbloat_thread = None  # Worker thread for the latency-under-load test
+        self.bufferbloat_finished.connect(self.show_bufferbloat_results)
+        self.dns_benchmark_thread = None  # Worker thread for the DNS resolver benchmark
+        self.dns_benchmark_finished.connect(self.show_dns_benchmark_results)
+        self.dns_forwarder = None  # Local caching DNS forwarder, while enabled
+        self.dns_forwarder_adapter = None  # Adapter pointed at the forwarder
+        self.dns_forwarder_restore = None  # That adapter's DNS configuration before, from get_dns_servers()
+        self.dns_forwarder_stats.connect(self.show_dns_forwarder_stats)
+        self.tick_test_thread = None  # Worker thread for the game-tick simulator
+        self.tick_test_finished.connect(self.show_tick_test_results)
+        self.burst_thread = None  # Worker thread for high-frequency burst probing
+        self.burst_prober = None  # Running BurstProber, kept for stop()
+        self.burst_samples.connect(self.ingest_burst_samples)
+        self.burst_finished.connect(self.show_burst_results)
+        self.mtu_check_thread = None  # Worker thread for path MTU discovery
+        self.mtu_check_finished.connect(self.show_mtu_check_results)
+        self.interface_comparison_thread = None  # Worker thread for the per-interface latency comparison
+        self.interface_comparison_finished.connect(self.show_interface_comparison)
+        self.guarded_apply = None  # Running GuardedApply; fed every ping sample
+        self.guard_phase.connect(self.show_guard_phase)
+        self.guard_finished.connect(self.show_guard_result)
+        # Spikes, sustained shifts and loss bursts in the live samples
+        self.latency_events = LatencyEventDetector(on_event=self.show_latency_event)
+        # Optional OpenMetrics endpoint, started with the other deferred subsystems
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.metrics_exporter = None
+        self.metrics_target = DEFAULT_TARGET  # Target label of the samples being exported
+        # Span timings panel; hidden from the UI, built the first time it's toggled
+        self.diagnostics_panel = None
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.toggle_diagnostics_panel)
         
         # Set up the main widget and layout
         main_widget = QWidget()
@@ -214,42 +214,100 @@ class TCPOptimizerQt(QMainWindow):
         main_layout.addWidget(right_panel, 1)
         
         # Create content for panels
-        self.create_left_panel(left_panel)
-        self.create_right_panel(right_panel)
-        
-        # Set background image
-        self.set_background_image()
+        with profiler.phase("build panels"):
+            self.create_left_panel(left_panel)
+            self.create_right_panel(right_panel)
         
         # Set window attributes for transparency
         self.setAttribute(Qt.WA_TranslucentBackground)
         
-        # Initialize ping process and timer
-        self.ping_process = None
-        self.ping_timer = QTimer()
-        self.ping_timer.timeout.connect(self.update_ping_stats)
-        self.ping_values = []
+        # Ping runs on a reader thread; samples arrive on the GUI thread via ping_sample
+        self.ping_monitor = None
+        self.ping_sample.connect(self.update_ping_stats)
+        self.interface_monitor = None  # Started after the first paint
+        self.interface_sample.connect(self.update_interface_traffic)
+        self.health_tracker = None  # Started after the first paint
+        self.health_sample.connect(self.update_stack_health)
+        self.drift_monitor = None  # Started after the first paint
+        self.drift_marked = {}  # Profile -> status text it had before being marked as drifted
+        self.settings_drift.connect(self.show_settings_drift)
+        self.game_endpoints_probed.connect(self.show_game_endpoints)
+
+        # Default status until the background check reports back
+        self.tcp_status.setText("TCP Settings: Default")
+        self.optimize_btn.setEnabled(True)
+        self.revert_btn.setEnabled(False)
 
-        # Check initial TCP settings
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            profiler.mark("first paint")
+            # Let the first frame reach the screen before doing the expensive work
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        with profiler.phase("cherry blossom animation"):
+            from cherry_blossom_animation import CherryBlossomAnimation
+            self.cherry_animation = CherryBlossomAnimation(self)
+            self.cherry_animation.resize(self.size())
+            self.cherry_animation.lower()  # Ensure it stays behind other widgets
+            self.cherry_animation.show()
+            if self.bg_label is not None:
+                self.bg_label.lower()
+
+        with profiler.phase("interface list"):
+            self.populate_interfaces()
+            self.start_interface_monitor()
+        self.start_health_tracker()
+        self.start_drift_monitor()
+        if self.metrics_port is not None:
+            self.start_metrics_exporter()
+
+        # Disk and subprocess work runs off the GUI thread
+        self.set_background_image()
+        threading.Thread(target=preload_metrics, daemon=True).start()
         self.check_initial_tcp_settings()
+        self.maybe_finish_startup()
+
+    def toggle_diagnostics_panel(self):
+        if self.diagnostics_panel is None:
+            from diagnostics_panel import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel(self)
+        self.diagnostics_panel.toggle()
+
+    def maybe_finish_startup(self):
+        if self.first_paint_done and not self.background_pending and "startup complete" not in profiler.marks:
+            profiler.mark("startup complete")
+            self.startup_finished.emit()
 
     def set_background_image(self):
+        # Decode on a worker thread (QImage is thread-safe, QPixmap is not)
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        background_path = os.path.join(current_dir, "background.jpg")
+
+        def load():
+            with profiler.phase("background image decode"):
+                image = QImage(background_path)
+            if image.isNull():
+                logging.error(f"Failed to load background image from {background_path}")
+                image = None
+            self.background_loaded.emit(image)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def apply_background_image(self, image):
         try:
+            if image is None:
+                return
             # Create background label
             self.bg_label = QLabel(self)
             self.bg_label.setObjectName("bgLabel")
             
-            # Load and scale background image using absolute path
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            background_path = os.path.join(current_dir, "background.jpg")
-            
-            background_image = QPixmap(background_path)
-            if not background_image.isNull():
-                scaled_image = background_image.scaled(
-                    self.size(),
-                    Qt.KeepAspectRatioByExpanding,
-                    Qt.SmoothTransformation
-                )
-                self.bg_label.setPixmap(scaled_image)
+            from background_cache import BackgroundCache
+            self.background_cache = BackgroundCache(image)
+            if not self.background_cache.source.isNull():
+                self.bg_label.setPixmap(self.background_cache.smooth(self.size()))
                 self.bg_label.setGeometry(0, 0, self.width(), self.height())
                 
                 # Add semi-transparent overlay
@@ -261,31 +319,44 @@ class TCPOptimizerQt(QMainWindow):
                 
                 # Ensure background stays behind other widgets
                 self.bg_label.lower()
-            else:
-                logging.error(f"Failed to load background image from {background_path}")
+                self.bg_label.show()
+                profiler.mark("background shown")
+                # Fill the size cache for common window sizes while idle
+                QTimer.singleShot(1000, self.prescale_background)
                 
         except Exception as e:
             logging.error(f"Error setting background: {str(e)}")
+        finally:
+            self.background_pending = False
+            self.maybe_finish_startup()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        if hasattr(self, 'bg_label'):
-            # Update background image size using absolute path
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            background_path = os.path.join(current_dir, "background.jpg")
-            bg_image = QPixmap(background_path)
-            if not bg_image.isNull():
-                source_rect = QRect(-200, 0, bg_image.width(), bg_image.height())
-                scaled_image = bg_image.copy(source_rect).scaled(
-                    self.width(), self.height(),
-                    Qt.KeepAspectRatioByExpanding,
-                    Qt.SmoothTransformation
-                )
-                self.bg_label.setPixmap(scaled_image)
-                self.bg_label.setGeometry(0, 0, self.width(), self.height())
+        if self.bg_label is not None and self.background_cache is not None:
+            # Cheap scale while the edge is being dragged, smooth one once it settles
+            self.bg_label.setPixmap(self.background_cache.fast(self.size()))
+            self.bg_label.setGeometry(0, 0, self.width(), self.height())
+            self.resize_settle_timer.start()
         
-        if hasattr(self, 'cherry_animation'):
+        if self.cherry_animation is not None:
             self.cherry_animation.resize(self.size())
+        self.notifications.reposition()
+
+    def finish_background_resize(self):
+        if self.bg_label is not None and self.background_cache is not None:
+            self.bg_label.setPixmap(self.background_cache.smooth(self.size()))
+
+    def prescale_background(self):
+        # One size per idle tick so the GUI thread is never blocked for long
+        if self.background_cache is None:
+            return
+        if self.resize_settle_timer.isActive():
+            QTimer.singleShot(1000, self.prescale_background)
+            return
+        missing = self.background_cache.missing_common_sizes()
+        if missing:
+            self.background_cache.smooth(missing[0])
+            QTimer.singleShot(50, self.prescale_background)
 
     def create_right_panel(self, right_panel):
         layout = QVBoxLayout(right_panel)
@@ -300,21 +371,26 @@ class TCPOptimizerQt(QMainWindow):
         tcp_tab = QWidget()
         interface_tab = QWidget()
         game_tab = QWidget()
+        distribution_tab = QWidget()
 
         # Set up layouts for each tab
         tcp_layout = QVBoxLayout(tcp_tab)
         interface_layout = QVBoxLayout(interface_tab)
         game_layout = QVBoxLayout(game_tab)
+        distribution_layout = QVBoxLayout(distribution_tab)
 
         # Add tabs to widget
         self.tab_widget.addTab(tcp_tab, "TCP Settings")
         self.tab_widget.addTab(interface_tab, "Network Interface")
         self.tab_widget.addTab(game_tab, "Game Mode")
+        self.tab_widget.addTab(distribution_tab, "Latency Distribution")
 
         # Set up each tab's content
         self.setup_tcp_tab(tcp_layout)
         self.setup_interface_tab(interface_layout)
         self.setup_game_tab(game_layout)
+        self.distribution_panel = DistributionPanel(self.latency_histograms)
+        distribution_layout.addWidget(self.distribution_panel)
 
         layout.addWidget(self.tab_widget)
 
@@ -354,6 +430,31 @@ class TCPOptimizerQt(QMainWindow):
         button_layout.addWidget(self.revert_btn)
         
         tab_layout.addLayout(button_layout)
+
+        # Kernel TCP counters (retransmits, timeouts, resets...) as per-interval rates
+        self.stack_health_label = QLabel("Stack health: waiting for counters...")
+        self.stack_health_label.setWordWrap(True)
+        self.stack_health_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        tab_layout.addWidget(self.stack_health_label)
+
+        # Applied settings vs the live values (Windows updates and driver installs reset them)
+        self.drift_label = QLabel("Settings drift: not checked yet")
+        self.drift_label.setWordWrap(True)
+        self.drift_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        tab_layout.addWidget(self.drift_label)
+        self.drift_reapply_checkbox = QCheckBox("Re-apply drifted settings automatically")
+        self.drift_reapply_checkbox.setStyleSheet(styles.CHECKBOX_STYLE)
+        self.drift_reapply_checkbox.toggled.connect(self.set_drift_reapply)
+        tab_layout.addWidget(self.drift_reapply_checkbox)
+
+        # Measure first, apply, then watch latency and undo it if things got worse
+        self.guard_checkbox = QCheckBox("Guarded apply: revert TCP settings or game mode if latency regresses")
+        self.guard_checkbox.setStyleSheet(styles.CHECKBOX_STYLE)
+        tab_layout.addWidget(self.guard_checkbox)
+        self.guard_label = QLabel("")
+        self.guard_label.setWordWrap(True)
+        self.guard_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        tab_layout.addWidget(self.guard_label)
         
         # Add some spacing at the bottom
         tab_layout.addStretch()
@@ -368,17 +469,43 @@ class TCPOptimizerQt(QMainWindow):
         interface_layout = QVBoxLayout(interface_frame)
         interface_layout.setSpacing(15)
 
-        # Network interface selection
+        # Network interface selection (populated after the first paint)
         self.interface_combo = QComboBox()
         self.interface_combo.setStyleSheet(styles.COMBO_BOX_STYLE)
         
-        # Populate interface combo
-        for iface in psutil.net_if_addrs().keys():
-            self.interface_combo.addItem(iface)
-        
         interface_layout.addWidget(QLabel("Select Network Interface:"))
         interface_layout.addWidget(self.interface_combo)
 
+        # Live throughput, packet rates, errors and drops for the selected interface
+        self.interface_traffic_label = QLabel("Collecting interface statistics...")
+        self.interface_traffic_label.setWordWrap(True)
+        self.interface_traffic_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        interface_layout.addWidget(self.interface_traffic_label)
+
+        # Path MTU to the probe targets vs the adapter MTU
+        self.mtu_check_btn = QPushButton("Check MTU")
+        self.mtu_check_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.mtu_check_btn.setToolTip("Discover the path MTU to the ICMP and udp-echo probe targets")
+        self.mtu_check_btn.clicked.connect(self.run_mtu_check)
+        interface_layout.addWidget(self.mtu_check_btn)
+
+        self.mtu_check_label = QLabel("")
+        self.mtu_check_label.setWordWrap(True)
+        self.mtu_check_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        interface_layout.addWidget(self.mtu_check_label)
+
+        # Same targets from every interface at once, ranked by latency
+        self.compare_interfaces_btn = QPushButton("Compare Interfaces")
+        self.compare_interfaces_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.compare_interfaces_btn.setToolTip("Probe the probe targets from every active interface and rank them")
+        self.compare_interfaces_btn.clicked.connect(self.run_interface_comparison)
+        interface_layout.addWidget(self.compare_interfaces_btn)
+
+        self.interface_comparison_label = QLabel("")
+        self.interface_comparison_label.setWordWrap(True)
+        self.interface_comparison_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        interface_layout.addWidget(self.interface_comparison_label)
+
         # Status label
         self.interface_status = QLabel("Interface Settings: Default")
         self.interface_status.setStyleSheet(styles.HEADING_LABEL_STYLE)
@@ -404,6 +531,171 @@ class TCPOptimizerQt(QMainWindow):
         interface_layout.addLayout(button_layout)
         layout.addWidget(interface_frame)
 
+    def run_mtu_check(self):
+        if self.mtu_check_thread and self.mtu_check_thread.is_alive():
+            return
+        from probe_scheduler import parse_targets
+        try:
+            targets = [target for target in parse_targets(self.probe_targets_input.text())
+                       if target.kind in ('icmp', 'udp-echo')]
+        except ValueError:
+            targets = []
+        targets = targets or [DEFAULT_TARGET]
+        self.mtu_check_btn.setEnabled(False)
+        self.mtu_check_label.setText(f"Discovering the path MTU to {len(targets)} target(s)...")
+
+        def worker():
+            try:
+                import mtu
+                result = mtu.run_mtu_check(targets)
+            except Exception as e:
+                logging.error(f"MTU check failed: {str(e)}")
+                result = {'error': str(e)}
+            self.mtu_check_finished.emit(result)
+
+        self.mtu_check_thread = threading.Thread(target=worker, daemon=True)
+        self.mtu_check_thread.start()
+
+    def show_mtu_check_results(self, result):
+        import mtu
+        self.mtu_check_btn.setEnabled(True)
+        if 'error' in result:
+            self.mtu_check_label.setText(f"MTU check failed: {result['error']}")
+            return
+        lines = [mtu.format_result(target) for target in result['targets']]
+        for interface in result['interfaces']:
+            if interface['mismatch']:
+                lines.append(f"{interface['interface']}: MTU {interface['mtu']}, effective "
+                             f"{interface['effective_mtu']} (MSS {interface['mss']})")
+        self.mtu_check_label.setText("\n".join(lines))
+
+    def run_interface_comparison(self):
+        if self.interface_comparison_thread and self.interface_comparison_thread.is_alive():
+            return
+        from probe_scheduler import parse_targets
+        try:
+            targets = parse_targets(self.probe_targets_input.text()) or [DEFAULT_TARGET]
+        except ValueError as e:
+            self.interface_comparison_label.setText(str(e))
+            return
+        self.compare_interfaces_btn.setEnabled(False)
+        self.interface_comparison_label.setText("Probing from every active interface...")
+
+        def worker():
+            try:
+                import interface_compare
+                comparison = interface_compare.run_interface_comparison(targets)
+            except Exception as e:
+                logging.error(f"Interface comparison failed: {str(e)}")
+                comparison = {'error': str(e)}
+            self.interface_comparison_finished.emit(comparison)
+
+        self.interface_comparison_thread = threading.Thread(target=worker, daemon=True)
+        self.interface_comparison_thread.start()
+
+    def show_interface_comparison(self, comparison):
+        import interface_compare
+        self.compare_interfaces_btn.setEnabled(True)
+        if 'error' in comparison:
+            self.interface_comparison_label.setText(f"Interface comparison failed: {comparison['error']}")
+            return
+        lines = [f"{result['rank']}. {interface_compare.format_result(result)}" for result in comparison['interfaces']]
+        lines.append(f"Winner: {comparison['winner'] or 'none'} - {comparison['decision']['reason']}")
+        self.interface_comparison_label.setText("\n".join(lines))
+        winner = comparison['winner']
+        # Interface metrics can only be changed on Windows, and only matter with a rival
+        if not winner or sys.platform != 'win32' or not comparison['decision']['runner_up']:
+            return
+        reply = QMessageBox.question(
+            self, "Prefer Interface",
+            f"Route traffic through {winner} first (interface metric {interface_compare.PREFERRED_METRIC})?",
+            QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            result = interface_compare.prefer_interface(winner)
+            if result['failed']:
+                self.notifications.notify(f"Could not change the metric of {winner}.", 'warning')
+
+    def populate_interfaces(self):
+        import psutil
+        for iface in psutil.net_if_addrs().keys():
+            self.interface_combo.addItem(iface)
+
+    def start_interface_monitor(self):
+        # Per-interface traffic/error counters, sampled once a second off the GUI thread
+        from interface_stats import InterfaceMonitor
+        self.interface_monitor = InterfaceMonitor(self.interface_combo.currentText(),
+                                                  on_sample=self.interface_sample.emit)
+        self.interface_combo.currentTextChanged.connect(self.select_monitored_interface)
+        self.interface_monitor.start()
+
+    def start_health_tracker(self):
+        # Every apply/revert gets before/after TCP counter rates attached in the session
+        from tcp_health import StackHealthTracker
+        self.health_tracker = StackHealthTracker(on_sample=self.health_sample.emit)
+        profiles.change_listeners.append(self.health_tracker.note_change)
+        self.health_tracker.start()
+
+    def start_drift_monitor(self):
+        from settings_drift import DriftMonitor
+        self.drift_monitor = DriftMonitor(on_drift=self.settings_drift.emit,
+                                          auto_reapply=self.drift_reapply_checkbox.isChecked())
+        self.drift_monitor.start()
+
+    def start_metrics_exporter(self):
+        from metrics_exporter import MetricsExporter
+        try:
+            self.metrics_exporter = MetricsExporter(host=self.metrics_host, port=self.metrics_port).start()
+        except OSError as e:
+            logging.error(f"Could not serve metrics on port {self.metrics_port}: {str(e)}")
+            self.notifications.notify(f"Could not serve metrics on port {self.metrics_port}: {str(e)}", 'warning')
+
+    def set_drift_reapply(self, enabled):
+        if self.drift_monitor:
+            self.drift_monitor.auto_reapply = enabled
+
+    def show_settings_drift(self, record):
+        from settings_drift import format_drift, profile_settings
+        drifted = record['drifted']
+        text = f"Settings drift: {format_drift(drifted)}"
+        if record['reapplied']:
+            text += f" - re-applied {record['reapplied']['successful']}/{record['reapplied']['total']}"
+        self.drift_label.setText(text)
+        if self.metrics_exporter:
+            self.metrics_exporter.registry.set_drift(record)
+        if drifted:
+            self.notifications.notify(text, 'warning')
+        # The optimized/enabled flags only know what was applied; show which no longer holds
+        status_labels = {'tcp': self.tcp_status, 'interface': self.interface_status,
+                         'qos': self.qos_status, 'game': self.game_mode_status}
+        for name, label in status_labels.items():
+            applied = name in record['profiles']
+            settings = profile_settings(profiles.get_profile(name))
+            # Only settings whose expected value came from this profile count against it
+            affected = applied and any(settings.get(key) == value['expected'] for key, value in drifted.items())
+            if affected and name not in self.drift_marked:
+                self.drift_marked[name] = label.text()
+                label.setText(f"{profiles.get_profile(name).title}: Drifted")
+            elif not affected and name in self.drift_marked:
+                previous = self.drift_marked.pop(name)
+                if applied:
+                    label.setText(previous)  # Back in place; a revert has already set its own text
+
+    def update_stack_health(self, rates):
+        from tcp_health import format_health
+        self.stack_health_label.setText(format_health(rates))
+
+    def select_monitored_interface(self, name):
+        self.interface_monitor.interface = name
+        self.interface_traffic_label.setText("Collecting interface statistics...")
+
+    def update_interface_traffic(self, rates):
+        from interface_stats import format_interface_rates
+        if rates['interface'] != self.interface_combo.currentText():
+            return  # Sample for the previously selected interface
+        text = format_interface_rates(rates)
+        if text != self.interface_traffic_label.text():
+            self.interface_traffic_label.setText(text)
+
     def setup_game_tab(self, layout):
         # Game Mode Options with matching transparency
         game_frame = QFrame()
@@ -457,101 +749,275 @@ class TCPOptimizerQt(QMainWindow):
         qos_button_layout.addWidget(self.qos_revert_btn)
 
         game_layout.addLayout(qos_button_layout)
+
+        # Measure latency to the servers a running game is actually connected to
+        game_process_layout = QHBoxLayout()
+        game_process_label = QLabel("Game process:")
+        game_process_label.setStyleSheet(styles.HEADING_LABEL_STYLE)
+        game_process_layout.addWidget(game_process_label)
+        self.game_process_input = QLineEdit()
+        self.game_process_input.setPlaceholderText(f"Name or PID (empty = ping {DEFAULT_TARGET})")
+        self.game_process_input.setStyleSheet(styles.INPUT_STYLE)
+        game_process_layout.addWidget(self.game_process_input)
+        game_layout.addLayout(game_process_layout)
+
+        self.game_endpoints_label = QLabel("")
+        self.game_endpoints_label.setWordWrap(True)
+        self.game_endpoints_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        game_layout.addWidget(self.game_endpoints_label)
+
+        # Latency-under-load (bufferbloat) test
+        self.bufferbloat_btn = QPushButton("Run Bufferbloat Test")
+        self.bufferbloat_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.bufferbloat_btn.clicked.connect(self.run_bufferbloat_test)
+        game_layout.addWidget(self.bufferbloat_btn)
+
+        self.bufferbloat_label = QLabel("")
+        self.bufferbloat_label.setWordWrap(True)
+        self.bufferbloat_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        game_layout.addWidget(self.bufferbloat_label)
+
+        # Game-tick traffic simulator (both directions, against a reflector)
+        from game_tick import TICK_RATES, DEFAULT_TICK_RATE
+        tick_layout = QHBoxLayout()
+        self.tick_rate_combo = QComboBox()
+        self.tick_rate_combo.setStyleSheet(styles.COMBO_BOX_STYLE)
+        for rate in TICK_RATES:
+            self.tick_rate_combo.addItem(f"{rate} Hz", rate)
+        self.tick_rate_combo.setCurrentIndex(self.tick_rate_combo.findData(DEFAULT_TICK_RATE))
+        tick_layout.addWidget(self.tick_rate_combo)
+        self.tick_size_combo = QComboBox()
+        self.tick_size_combo.setStyleSheet(styles.COMBO_BOX_STYLE)
+        for size in (64, 128, 256, 512):
+            self.tick_size_combo.addItem(f"{size} bytes", size)
+        tick_layout.addWidget(self.tick_size_combo)
+        self.tick_reflector_input = QLineEdit()
+        self.tick_reflector_input.setPlaceholderText("Reflector HOST:PORT (empty = local)")
+        self.tick_reflector_input.setStyleSheet(styles.INPUT_STYLE)
+        tick_layout.addWidget(self.tick_reflector_input)
+        game_layout.addLayout(tick_layout)
+
+        self.tick_test_btn = QPushButton("Run Tick Test")
+        self.tick_test_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.tick_test_btn.clicked.connect(self.run_tick_test)
+        game_layout.addWidget(self.tick_test_btn)
+
+        self.tick_test_label = QLabel("")
+        self.tick_test_label.setWordWrap(True)
+        self.tick_test_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        game_layout.addWidget(self.tick_test_label)
+
         layout.addWidget(game_frame)
 
+    def run_tick_test(self):
+        if self.tick_test_thread and self.tick_test_thread.is_alive():
+            return
+        rate = self.tick_rate_combo.currentData()
+        size = self.tick_size_combo.currentData()
+        reflector = self.tick_reflector_input.text().strip()
+        self.tick_test_btn.setEnabled(False)
+        self.tick_test_label.setText(f"Simulating {rate} Hz game traffic for 10 seconds...")
+
+        def worker():
+            try:
+                import game_tick
+                if reflector:
+                    host, _, port = reflector.rpartition(':')
+                    result = game_tick.run_tick_test((host.strip('[]'), int(port)), rate, size)
+                else:
+                    result = game_tick.run_local_tick_test(rate, size)
+            except Exception as e:
+                logging.error(f"Tick test failed: {str(e)}")
+                result = {'error': str(e)}
+            self.tick_test_finished.emit(result)
+
+        self.tick_test_thread = threading.Thread(target=worker, daemon=True)
+        self.tick_test_thread.start()
+
+    def show_tick_test_results(self, result):
+        import game_tick
+        self.tick_test_btn.setEnabled(True)
+        if 'error' in result:
+            self.tick_test_label.setText(f"Tick test failed: {result['error']}")
+            return
+        self.tick_test_label.setText(
+            f"{result['rate']} Hz x {result['size']} bytes to {result['target']}\n"
+            f"Up: {game_tick.format_direction(result['upstream'])}\n"
+            f"Down: {game_tick.format_direction(result['downstream'])}")
+
+    def build_bufferbloat_profiles(self):
+        # Profiles that are already active are measured as part of "Current Settings"
+        # so the test never reverts something the user turned on
+        def apply_game():
+            profiles.apply_profile('game')
+
+        def revert_game():
+            profiles.revert_profile('game')
+
+        def apply_qos():
+            profiles.apply_profile('qos')
+
+        def revert_qos():
+            profiles.revert_profile('qos')
+
+        def apply_both():
+            apply_game()
+            apply_qos()
+
+        def revert_both():
+            revert_qos()
+            revert_game()
+
+        test_profiles = [('Current Settings', None, None)]
+        if not self.game_mode_enabled:
+            test_profiles.append(('Game Mode', apply_game, revert_game))
+        if not self.qos_optimized:
+            test_profiles.append(('QoS', apply_qos, revert_qos))
+        if not self.game_mode_enabled and not self.qos_optimized:
+            test_profiles.append(('Game Mode + QoS', apply_both, revert_both))
+        return test_profiles
+
+    def run_bufferbloat_test(self):
+        if self.bufferbloat_thread and self.bufferbloat_thread.is_alive():
+            return
+        test_profiles = self.build_bufferbloat_profiles()
+        self.bufferbloat_btn.setEnabled(False)
+        self.bufferbloat_label.setText(f"Measuring idle vs loaded latency for {len(test_profiles)} profile(s)...")
+
+        def worker():
+            try:
+                import bufferbloat
+                results = bufferbloat.run_local_profile_comparison(test_profiles)
+            except Exception as e:
+                logging.error(f"Bufferbloat test failed: {str(e)}")
+                results = [{'profile': 'All', 'error': str(e)}]
+            self.bufferbloat_finished.emit(results)
+
+        self.bufferbloat_thread = threading.Thread(target=worker, daemon=True)
+        self.bufferbloat_thread.start()
+
+    def show_bufferbloat_results(self, results):
+        import bufferbloat
+        lines = []
+        for result in results:
+            lines.append(f"{result['profile']}: {bufferbloat.format_result(result)}")
+        metrics_logger.info(
+            "Bufferbloat test completed",
+            extra={'session_data': {'bufferbloat_tests': results}}
+        )
+        self.bufferbloat_label.setText("\n".join(lines))
+        self.bufferbloat_btn.setEnabled(True)
+
+    def start_after_histogram(self):
+        # Samples from here on describe the newly applied settings; earlier ones count as "before"
+        self.latency_histograms['before'].merge(self.latency_histograms['after'])
+        self.latency_histograms['after'].reset()
+        self.histogram_phase = 'after'
+        self.distribution_panel.mark_dirty()
+
     def start_ping(self):
         if not self.running_ping:
             try:
                 self.running_ping = True
                 self.measure_ping_btn.setText("Stop Measuring")
-                self.ping_window = []  # Reset ping window
+                self.ping_tracker.reset()  # Reset ping window
                 self.last_ping = None  # Reset last ping
                 self.show_improvement = False  # Reset improvement display
                 self.baseline_ping = None  # Reset baseline
                 self.baseline_window = []  # Reset baseline window
+                self.latency_chart.clear()
+                self.latency_events.reset()
+                self.latency_events_label.setText("")
                 
-                # Start ping process
-                self.ping_process = subprocess.Popen(
-                    ['ping', '8.8.8.8', '-t'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
-                
-                # Start timer to update stats
-                self.ping_timer.start(1000)  # Update every second
+                # Probe the selected game's servers if one is set, otherwise ping the default target
+                game_process = self.game_process_input.text().strip()
+                if game_process:
+                    from game_endpoints import GameEndpointMonitor, find_processes
+                    if not find_processes(game_process):
+                        raise ValueError(f"No running process matches '{game_process}'")
+                    self.ping_monitor = GameEndpointMonitor(game_process, on_sample=self.ping_sample.emit,
+                                                            on_endpoints=self.game_endpoints_probed.emit)
+                    self.game_endpoints_label.setText(f"Discovering endpoints of {game_process}...")
+                    self.metrics_target = f"game:{game_process}"
+                else:
+                    from probe_scheduler import ProbeMonitor, parse_targets
+                    targets = parse_targets(self.probe_targets_input.text()) or [DEFAULT_TARGET]
+                    self.ping_monitor = ProbeMonitor(targets, on_sample=self.ping_sample.emit)
+                    self.metrics_target = self.ping_monitor.targets[0].label
+                    self.probe_targets_label.setText("")
+                    self.probe_summary_timer.start()
+                self.ping_monitor.start()
                 
             except Exception as e:
                 self.running_ping = False
+                self.probe_summary_timer.stop()
                 logging.error(f"Error starting ping: {str(e)}")
                 QMessageBox.critical(self, "Error", f"Failed to start ping: {str(e)}")
                 self.measure_ping_btn.setText("Start Measuring")
 
     def stop_ping(self):
         self.running_ping = False
-        if self.ping_timer.isActive():
-            self.ping_timer.stop()
-        if self.ping_process:
-            self.ping_process.kill()
-            self.ping_process = None
+        self.probe_summary_timer.stop()
+        if self.ping_monitor:
+            self.ping_monitor.stop()
+            self.ping_monitor = None
         self.measure_ping_btn.setText("Start Measuring")
             
-    def update_ping_stats(self):
+    def update_probe_summaries(self):
+        from probe_scheduler import ProbeMonitor, format_target_summary
+        if not isinstance(self.ping_monitor, ProbeMonitor):
+            return
+        text = "\n".join(format_target_summary(label, summary)
+                         for label, summary in self.ping_monitor.summaries().items())
+        if text != self.probe_targets_label.text():
+            self.probe_targets_label.setText(text)
+
+    def show_game_endpoints(self, endpoints):
+        if not self.running_ping:
+            return
+        lines = []
+        for state in endpoints:
+            if state['rtt'] is not None:
+                status = f"{state['rtt']:.1f} ms"
+            else:
+                status = "no reply" if state['responsive'] else f"no reply (ignored, retried every {state['period']:.0f}s)"
+            lines.append(f"{state['endpoint']}: {status}")
+        text = "\n".join(lines) or "No remote endpoints found yet"
+        if text != self.game_endpoints_label.text():
+            self.game_endpoints_label.setText(text)
+
+    @recorder.timed('update_ping_stats')
+    def update_ping_stats(self, ping_time):
         try:
-            if self.ping_process and self.ping_process.poll() is None:
-                line = self.ping_process.stdout.readline()
-                if isinstance(line, bytes):
-                    line = line.decode()
-                line = line.strip()
-                
-                if "time=" in line:
-                    # Extract ping time
-                    match = re.search(r"time=(\d+)ms", line)
-                    if match:
-                        ping_time = float(match.group(1))
-                        self.last_ping = ping_time
-                        
-                        # Update ping window for moving average
-                        self.ping_window.append(ping_time)
-                        if len(self.ping_window) > self.window_size:
-                            self.ping_window.pop(0)
-                        
-                        # Calculate stats
-                        current_avg = sum(self.ping_window) / len(self.ping_window)
-                        stats = {
-                            'current': ping_time,
-                            'min': min(self.ping_window),
-                            'max': max(self.ping_window),
-                            'avg': current_avg
-                        }
-                        
-                        # Calculate improvement if we have a baseline
-                        improvement = None
-                        if self.baseline_ping is not None and self.show_improvement and len(self.ping_window) >= 3:
-                            improvement = ((self.baseline_ping - current_avg) / self.baseline_ping) * 100
-                            if abs(improvement) >= 1:  # Only show if >= 1% change
-                                if improvement > 0:
-                                    stats['improvement'] = f"⬇️ {abs(improvement):.1f}%"
-                                else:
-                                    stats['improvement'] = f"⬆️ {abs(improvement):.1f}%"
-                        
-                        # Log metrics
-                        metrics_logger.info(
-                            f"Ping stats - Current: {stats['current']:.1f}ms - "
-                            f"Min: {stats['min']:.1f}ms - "
-                            f"Max: {stats['max']:.1f}ms - "
-                            f"Avg: {stats['avg']:.1f}ms" +
-                            (f" - Improvement: {stats['improvement']}" if 'improvement' in stats else "")
-                        )
-                        
-                        # Update UI
-                        self.update_ping_displays(stats)
+            if not self.running_ping:
+                return
+            self.latency_chart.add_sample(ping_time)
+            if self.guarded_apply:
+                self.guarded_apply.add_sample(ping_time)
+            self.latency_events.add(ping_time)
+            if self.metrics_exporter:
+                self.metrics_exporter.registry.observe(self.metrics_target, ping_time)
+            self.latency_histograms[self.histogram_phase].add(ping_time)
+            self.distribution_panel.mark_dirty()
+            if ping_time is None:
+                return
+            self.last_ping = ping_time
+            baseline = self.baseline_ping if self.show_improvement else None
+            stats = self.ping_tracker.add_sample(ping_time, baseline=baseline)
+            
+            # Log metrics
+            metrics_logger.info(format_ping_stats(stats))
+            
+            # Update UI
+            self.update_ping_displays(stats)
                         
         except Exception as e:
             logging.error(f"Error in update_ping_stats: {str(e)}")
 
     def optimize_tcp(self):
+        if self.guard_checkbox.isChecked():
+            self.start_guarded_apply('tcp')
+            return
         try:
             # Set the baseline ping before optimization if not already set
             if self.last_ping is not None and self.baseline_ping is None:
@@ -563,65 +1029,16 @@ class TCPOptimizerQt(QMainWindow):
             self.progress_bar.show()
             self.progress_bar.setValue(0)
             
-            # Essential TCP optimization commands that should work on all systems
-            main_commands = [
-                ['netsh', 'int', 'tcp', 'set', 'global', 'initialRto=2000'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'rss=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=restricted'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'netdma=disabled']
-            ]
-            
-            # Optional TCP settings that might not be supported on all systems
-            optional_commands = [
-                ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=ctcp']
-            ]
-            
-            success_count = 0
-            total_commands = len(main_commands)  # Only count main commands
-            
-            # Execute main commands first
-            for i, cmd in enumerate(main_commands, 1):
-                try:
-                    cmd_str = ' '.join(cmd)
-                    metrics_logger.info(f"Executing TCP command: {cmd_str}")
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    if result.returncode == 0:
-                        success_count += 1
-                        metrics_logger.info(f"Successfully applied: {cmd_str}")
-                    else:
-                        metrics_logger.info(f"Command failed: {cmd_str}\nError: {result.stderr}")
-                    
-                    self.progress_bar.setValue(int((i / total_commands) * 100))
-                    
-                except Exception as e:
-                    metrics_logger.error(f"Error executing command: {cmd_str}\nError: {str(e)}")
-                    continue
-            
-            # Try optional commands but don't count in success/failure
-            for cmd in optional_commands:
-                try:
-                    cmd_str = ' '.join(cmd)
-                    metrics_logger.info(f"Trying optional TCP command: {cmd_str}")
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    if result.returncode == 0:
-                        metrics_logger.info(f"Successfully applied optional command: {cmd_str}")
-                    else:
-                        metrics_logger.info(f"Optional command not supported or failed: {cmd_str}\nError: {result.stderr}")
-                except Exception as e:
-                    metrics_logger.info(f"Optional command not supported: {cmd_str}\nError: {str(e)}")
+            result = profiles.apply_profile('tcp', progress=self.progress_bar.setValue)
+            success_count = len(result['successful'])
+            total_commands = result['total']  # Only count main commands
             
             # Update status based on main commands only
             if success_count > 0:
-                self.tcp_status.setText("TCP Settings: Optimized")
-                self.tcp_status.setStyleSheet(styles.SUCCESS_LABEL_STYLE)
-                self.update_settings_display()
-                self.tcp_optimized = True
-                metrics_logger.info(f"TCP Optimization completed - {success_count}/{total_commands} commands successful")
-                QMessageBox.information(self, "Success", 
-                    f"Successfully optimized {success_count} out of {total_commands} TCP settings.")
+                self.start_after_histogram()
+                self.mark_tcp_optimized()
+                self.notifications.notify(
+                    f"Successfully optimized {success_count} out of {total_commands} TCP settings.", 'success')
             else:
                 raise Exception("Failed to apply any TCP optimizations")
             
@@ -632,60 +1049,75 @@ class TCPOptimizerQt(QMainWindow):
         finally:
             self.progress_bar.hide()
 
+    def mark_tcp_optimized(self):
+        self.tcp_status.setText("TCP Settings: Optimized")
+        self.tcp_status.setStyleSheet(styles.SUCCESS_LABEL_STYLE)
+        self.update_settings_display()
+        self.tcp_optimized = True
+
+    def start_guarded_apply(self, name):
+        from guarded_apply import GuardedApply
+        if self.guarded_apply:
+            self.notifications.notify("A guarded apply is already running.")
+            return
+        # The guard needs live samples for its baseline
+        if not self.running_ping:
+            self.start_ping()
+            if not self.running_ping:
+                return
+        guard = GuardedApply(name, on_phase=lambda phase, detail: self.guard_phase.emit((name, phase, detail)))
+        self.guarded_apply = guard
+        self.optimize_btn.setEnabled(False)
+        self.game_mode_enable_btn.setEnabled(False)
+
+        def worker():
+            try:
+                record = guard.run()
+            except Exception as e:
+                logging.error(f"Error in guarded apply: {str(e)}")
+                record = {'profile': name, 'decision': 'failed', 'reason': str(e), 'evidence': None}
+            self.guard_finished.emit(record)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show_guard_phase(self, update):
+        name, phase, detail = update
+        if phase == 'probation':
+            # Applied: samples from here on describe the new settings
+            self.start_after_histogram()
+            if name == 'tcp':
+                self.mark_tcp_optimized()
+            else:
+                self.mark_game_mode_enabled()
+        self.guard_label.setText(f"Guarded apply of {profiles.get_profile(name).title}: {phase} - {detail}")
+
+    def show_guard_result(self, record):
+        from guarded_apply import format_record
+        self.guarded_apply = None
+        self.guard_label.setText(f"Guarded apply - {format_record(record)}")
+        level = {'kept': 'success', 'reverted': 'warning'}.get(record['decision'], 'error')
+        self.notifications.notify(f"Guarded apply - {format_record(record)}", level)
+        if record['decision'] == 'reverted':
+            if record['profile'] == 'tcp':
+                self.tcp_optimized = False
+                self.show_improvement = False
+                self.update_settings_display()
+            else:
+                self.game_mode_status.setText("Game Mode: Disabled")
+                self.game_mode_enabled = False
+        if not self.tcp_optimized:
+            self.optimize_btn.setEnabled(True)
+        self.game_mode_enable_btn.setEnabled(not self.game_mode_enabled)
+        self.game_mode_disable_btn.setEnabled(self.game_mode_enabled)
+
     def revert_tcp_settings(self):
         try:
             self.progress_bar.show()
             self.progress_bar.setValue(0)
             
-            # Essential TCP reversion commands that should work on all systems
-            main_commands = [
-                ['netsh', 'int', 'tcp', 'set', 'global', 'initialRto=3000'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'netdma=enabled']
-            ]
-            
-            # Optional TCP settings that might not be supported on all systems
-            optional_commands = [
-                ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=default']
-            ]
-            
-            success_count = 0
-            total_commands = len(main_commands)  # Only count main commands
-            
-            # Execute main commands first
-            for i, cmd in enumerate(main_commands, 1):
-                try:
-                    cmd_str = ' '.join(cmd)
-                    metrics_logger.info(f"Executing TCP revert command: {cmd_str}")
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    if result.returncode == 0:
-                        success_count += 1
-                        metrics_logger.info(f"Successfully reverted: {cmd_str}")
-                    else:
-                        metrics_logger.info(f"Command failed: {cmd_str}\nError: {result.stderr}")
-                    
-                    self.progress_bar.setValue(int((i / total_commands) * 100))
-                    
-                except Exception as e:
-                    metrics_logger.error(f"Error executing command: {cmd_str}\nError: {str(e)}")
-                    continue
-            
-            # Try optional commands but don't count in success/failure
-            for cmd in optional_commands:
-                try:
-                    cmd_str = ' '.join(cmd)
-                    metrics_logger.info(f"Trying optional TCP revert command: {cmd_str}")
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    if result.returncode == 0:
-                        metrics_logger.info(f"Successfully executed optional command: {cmd_str}")
-                    else:
-                        metrics_logger.info(f"Optional command not supported or failed: {cmd_str}\nError: {result.stderr}")
-                except Exception as e:
-                    metrics_logger.info(f"Optional command not supported: {cmd_str}\nError: {str(e)}")
+            result = profiles.revert_profile('tcp', progress=self.progress_bar.setValue)
+            success_count = len(result['successful'])
+            total_commands = result['total']  # Only count main commands
             
             # Update status based on main commands only
             if success_count > 0:
@@ -696,9 +1128,8 @@ class TCPOptimizerQt(QMainWindow):
                 self.show_improvement = False  # Disable improvement display
                 self.optimize_btn.setEnabled(True)  # Re-enable optimize button
                 self.revert_btn.setEnabled(False)  # Disable revert button since we're back to default
-                metrics_logger.info(f"TCP Settings reverted - {success_count}/{total_commands} commands successful")
-                QMessageBox.information(self, "Success", 
-                    f"Successfully reverted {success_count} out of {total_commands} TCP settings to default values.")
+                self.notifications.notify(
+                    f"Successfully reverted {success_count} out of {total_commands} TCP settings to default values.", 'success')
             else:
                 raise Exception("Failed to revert any TCP settings")
             
@@ -714,25 +1145,20 @@ class TCPOptimizerQt(QMainWindow):
             # Get the selected DNS option
             dns_text = self.dns_input.text()
             
-            # Simulate DNS change (you would add actual DNS change commands here)
             if dns_text:
                 dns_servers = dns_text.split(',')
-                dns_servers = [server.strip() for server in dns_servers]
+                dns_servers = [server.strip() for server in dns_servers if server.strip()]
             else:
                 dns_servers = []  
             
             # Show progress message
             self.show_dns_status("Changing DNS settings...", "progress")
             
-            # Execute the DNS change commands
-            if dns_servers:
-                for i, server in enumerate(dns_servers, 1):
-                    cmd = f'netsh interface ip set dns name="Ethernet" static {server} validate=no'
-                    subprocess.run(cmd, shell=True, check=True)
-                    self.show_dns_status(f"Setting DNS {i} of {len(dns_servers)}...", "progress")
-            else:
-                cmd = 'netsh interface ip set dns name="Ethernet" dhcp'
-                subprocess.run(cmd, shell=True, check=True)
+            # Applied to the adapter picked in the interface combo
+            adapter_name = self.interface_combo.currentText() if self.interface_combo else ''
+            result = profiles.set_dns_servers(adapter_name, dns_servers)
+            if result['failed']:
+                raise RuntimeError(f"{len(result['failed'])} of {result['total']} DNS commands failed on {adapter_name}")
             
             # Show success message with animation
             self.show_dns_status("DNS changed successfully!", "success")
@@ -765,6 +1191,113 @@ class TCPOptimizerQt(QMainWindow):
         except Exception as e:
             self.show_dns_status(f"Error: {str(e)}", "error")
 
+    def run_dns_benchmark(self):
+        if self.dns_benchmark_thread and self.dns_benchmark_thread.is_alive():
+            return
+        self.dns_benchmark_btn.setEnabled(False)
+        self.show_dns_status("Benchmarking DNS resolvers (cached and uncached lookups)...", "progress")
+
+        def worker():
+            try:
+                import dns_benchmark
+                results = dns_benchmark.run_dns_benchmark()
+            except Exception as e:
+                logging.error(f"DNS benchmark failed: {str(e)}")
+                results = [{'error': str(e)}]
+            self.dns_benchmark_finished.emit(results)
+
+        self.dns_benchmark_thread = threading.Thread(target=worker, daemon=True)
+        self.dns_benchmark_thread.start()
+
+    def show_dns_benchmark_results(self, results):
+        import dns_benchmark
+        self.dns_benchmark_btn.setEnabled(True)
+        if results and 'error' in results[0]:
+            self.show_dns_status(f"DNS benchmark failed: {results[0]['error']}", "error")
+            return
+        metrics_logger.info(
+            "DNS benchmark completed",
+            extra={'session_data': {'dns_benchmarks': results}}
+        )
+        self.show_dns_status("\n".join(f"{r['rank']}. {dns_benchmark.format_result(r)}" for r in results[:5]))
+        winners = [r['address'] for r in results
+                   if r['port'] == 53 and r['median'] is not None
+                   and r['failure_rate'] <= dns_benchmark.MAX_FAILURE_RATE][:2]
+        adapter_name = self.interface_combo.currentText() if self.interface_combo else ''
+        if not winners or not adapter_name:
+            return
+        reply = QMessageBox.question(
+            self, "Apply DNS",
+            f"Use {', '.join(winners)} for {adapter_name}?",
+            QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.dns_input.setText(", ".join(winners))
+            self.apply_dns_settings()
+
+    def toggle_dns_forwarder(self, enabled):
+        if enabled:
+            self.start_dns_forwarder()
+        else:
+            self.stop_dns_forwarder()
+
+    def start_dns_forwarder(self):
+        import dns_forwarder
+        typed = [server.strip() for server in self.dns_input.text().split(',')
+                 if server.strip() and server.strip() != dns_forwarder.LISTEN_HOST]
+        upstreams = typed or dns_forwarder.default_upstreams()
+        try:
+            self.dns_forwarder = dns_forwarder.DnsForwarder(upstreams, on_stats=self.dns_forwarder_stats.emit)
+            self.dns_forwarder.start()
+        except (OSError, ValueError) as e:
+            self.dns_forwarder = None
+            self.dns_cache_checkbox.blockSignals(True)
+            self.dns_cache_checkbox.setChecked(False)
+            self.dns_cache_checkbox.blockSignals(False)
+            self.show_dns_status(f"Could not start the DNS cache: {str(e)}", "error")
+            return
+        adapter_name = self.interface_combo.currentText() if self.interface_combo else ''
+        self.dns_forwarder_adapter = None
+        if not adapter_name:
+            self.show_dns_status(f"DNS cache running on {dns_forwarder.LISTEN_HOST}; "
+                                 f"no adapter selected to point at it", "error")
+            return
+        # Without the adapter's current servers there'd be nothing to put back, so leave it alone
+        try:
+            previous = profiles.get_dns_servers(adapter_name)
+        except OSError as e:
+            logging.error(f"Could not read the DNS servers of {adapter_name}: {str(e)}")
+            self.show_dns_status(f"DNS cache running on {dns_forwarder.LISTEN_HOST}, but {adapter_name} was "
+                                 f"left unchanged: its current DNS servers could not be read", "error")
+            return
+        result = profiles.set_dns_servers(adapter_name, [dns_forwarder.LISTEN_HOST])
+        if result['failed']:
+            # A partial change (primary set, secondaries not) is undone right away
+            profiles.restore_dns_servers(adapter_name, previous)
+            self.show_dns_status(f"DNS cache running on {dns_forwarder.LISTEN_HOST}, "
+                                 f"but the adapter's DNS could not be pointed at it", "error")
+            return
+        self.dns_forwarder_adapter = adapter_name
+        self.dns_forwarder_restore = previous
+        self.show_dns_status(f"DNS cache running; {adapter_name} now resolves through it "
+                             f"(upstreams {', '.join(upstreams)})", "success")
+
+    def stop_dns_forwarder(self):
+        if self.dns_forwarder_adapter:
+            # The forwarder is going away; give the adapter the servers it had before
+            profiles.restore_dns_servers(self.dns_forwarder_adapter, self.dns_forwarder_restore)
+            self.dns_forwarder_adapter = None
+            self.dns_forwarder_restore = None
+        if self.dns_forwarder:
+            import dns_forwarder
+            self.dns_forwarder.stop()
+            self.show_dns_status(f"DNS cache stopped - {dns_forwarder.format_forwarder_stats(self.dns_forwarder.stats())}")
+            self.dns_forwarder = None
+
+    def show_dns_forwarder_stats(self, stats):
+        import dns_forwarder
+        if self.dns_forwarder:
+            self.show_dns_status(f"DNS cache - {dns_forwarder.format_forwarder_stats(stats)}", "success")
+
     def show_dns_status(self, message, status_type="info"):
         if not hasattr(self, 'dns_status_label'):
             logging.error("DNS status label not initialized")
@@ -789,8 +1322,22 @@ class TCPOptimizerQt(QMainWindow):
 
     def closeEvent(self, event):
         # Clean up ping process when closing
-        if self.ping_process:
+        if self.ping_monitor:
             self.stop_ping()
+        if self.interface_monitor:
+            self.interface_monitor.stop()
+        if self.health_tracker:
+            profiles.change_listeners.remove(self.health_tracker.note_change)
+            self.health_tracker.stop()
+        if self.drift_monitor:
+            self.drift_monitor.stop()
+        if self.guarded_apply:
+            self.guarded_apply.cancel()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        self.stop_dns_forwarder()
+        if self.burst_prober:
+            self.burst_prober.stop()
         super().closeEvent(event)
 
     def update_settings_display(self):
@@ -803,23 +1350,11 @@ class TCPOptimizerQt(QMainWindow):
                 'timestamps': 'default'
             }
 
-            try:
-                # Get current TCP settings
-                for setting in settings.keys():
-                    cmd = ['netsh', 'int', 'tcp', 'show', 'global']
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    if result.returncode == 0:
-                        # Parse the output to find current settings
-                        lines = result.stdout.split('\n')
-                        for line in lines:
-                            for key in settings.keys():
-                                if key.lower() in line.lower():
-                                    value = line.split(':')[-1].strip()
-                                    settings[key] = value
-
-            except subprocess.CalledProcessError:
-                # If command fails, keep default values
-                pass
+            # Query netsh once and match each setting against its output
+            for line_key, value in profiles.read_tcp_globals().items():
+                for key in settings.keys():
+                    if key.lower() in line_key.lower():
+                        settings[key] = value
 
             # Update TCP status based on settings
             if all(val == 'default' for val in settings.values()):
@@ -837,20 +1372,16 @@ class TCPOptimizerQt(QMainWindow):
             logging.error(f"Error updating settings display: {str(e)}")
 
     def check_initial_tcp_settings(self):
-        try:
-            # Check current TCP settings
-            result = subprocess.run(['netsh', 'int', 'tcp', 'show', 'global'], 
-                                 capture_output=True, 
-                                 text=True,
-                                 shell=True)
-            
-            # Default settings
-            self.tcp_status.setText("TCP Settings: Default")
-            self.optimize_btn.setEnabled(True)
-            self.revert_btn.setEnabled(False)
-            
-        except Exception as e:
-            logging.error(f"Error checking initial TCP settings: {str(e)}")
+        # netsh takes a noticeable moment to spawn, so query it in the background
+        def check():
+            try:
+                with profiler.phase("initial TCP settings check"):
+                    settings = profiles.read_tcp_globals()
+                logging.debug(f"Initial TCP settings: {settings}")
+            except Exception as e:
+                logging.error(f"Error checking initial TCP settings: {str(e)}")
+
+        threading.Thread(target=check, daemon=True).start()
 
     def optimize_network_interface(self):
         try:
@@ -859,37 +1390,15 @@ class TCPOptimizerQt(QMainWindow):
             if not adapter_name:
                 raise ValueError("No network adapter selected")
             
-            # Basic TCP/IP optimizations that work across most adapters
-            netsh_commands = [
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'chimney=disabled'],
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'ecncapability=disabled'],
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'timestamps=disabled']
-            ]
-            
-            success_count = 0
-            total_commands = len(netsh_commands)
-            
-            # Apply netsh commands
-            for i, cmd in enumerate(netsh_commands, 1):
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    if result.returncode == 0:
-                        success_count += 1
-                        logging.info(f"Successfully applied netsh command: {' '.join(cmd)}")
-                    else:
-                        logging.warning(f"Command failed: {' '.join(cmd)}\nError: {result.stderr}")
-                    
-                    self.progress_bar.setValue(int((i / total_commands) * 100))
-                    
-                except Exception as e:
-                    logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
-                    continue
+            result = profiles.apply_profile('interface', progress=self.progress_bar.setValue)
+            success_count = len(result['successful'])
+            total_commands = result['total']
             
             # Show results
             if success_count > 0:
+                self.start_after_histogram()
                 msg = f"Successfully optimized network settings ({success_count} out of {total_commands} optimizations applied)."
-                QMessageBox.information(self, "Success", msg)
+                self.notifications.notify(msg, 'success')
                 logging.info(msg)
             else:
                 raise Exception("Could not apply network optimizations. Please check if you have administrator privileges.")
@@ -937,18 +1446,7 @@ class TCPOptimizerQt(QMainWindow):
             logging.info(f"Baseline Ping: {baseline}ms")
 
             # List of commands to optimize for gaming
-            commands = [
-                ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -AutoTuningLevelLocal Normal'],
-                ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -ScalingHeuristics Disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'heuristics', 'disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
-                ['powershell', 'Disable-NetAdapterLso -Name *'],  
-                ['powershell', 'Set-NetOffloadGlobalSetting -PacketCoalescingFilter Disabled']
-            ]
+            commands = GAME_MODE_COMMANDS
             
             total_commands = len(commands)
             for i, cmd in enumerate(commands, 1):
@@ -1001,36 +1499,18 @@ class TCPOptimizerQt(QMainWindow):
         try:
             logging.info("Starting QoS optimization...")
             
-            # QoS optimization commands
-            commands = [
-                ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=ctcp'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'dca=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecn=disabled'],
-                ['powershell', 'Set-NetQosPolicy -Name "Gaming Traffic" -IPProtocol Both -NetworkProfile All -Priority 1']
-            ]
-            
-            success_count = 0
-            total_commands = len(commands)
-            
-            for cmd in commands:
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                    success_count += 1
-                    logging.info(f"Successfully applied QoS command: {' '.join(cmd)}")
-                except subprocess.CalledProcessError as e:
-                    logging.warning(f"Command failed: {' '.join(cmd)}\nError: {e.stderr}")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
-                    continue
+            result = profiles.apply_profile('qos')
+            success_count = len(result['successful'])
+            total_commands = result['total']
 
             if success_count > 0:
+                self.start_after_histogram()
                 self.qos_status.setText("QoS Settings: Optimized")
                 self.qos_optimize_btn.setEnabled(False)
                 self.qos_revert_btn.setEnabled(True)
                 self.qos_optimized = True
                 msg = f"Successfully optimized QoS settings ({success_count} out of {total_commands} optimizations applied)."
-                QMessageBox.information(self, "Success", msg)
+                self.notifications.notify(msg, 'success')
             else:
                 raise Exception("Failed to apply any QoS optimizations")
 
@@ -1042,28 +1522,9 @@ class TCPOptimizerQt(QMainWindow):
         try:
             logging.info("Reverting QoS settings...")
             
-            # Commands to revert QoS settings
-            commands = [
-                ['netsh', 'int', 'tcp', 'set', 'global', 'congestionprovider=default'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'dca=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecn=enabled'],
-                ['powershell', 'Remove-NetQosPolicy -Name "Gaming Traffic" -Confirm:$false']
-            ]
-            
-            success_count = 0
-            total_commands = len(commands)
-            
-            for cmd in commands:
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                    success_count += 1
-                    logging.info(f"Successfully reverted QoS command: {' '.join(cmd)}")
-                except subprocess.CalledProcessError as e:
-                    logging.warning(f"Command failed: {' '.join(cmd)}\nError: {e.stderr}")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
-                    continue
+            result = profiles.revert_profile('qos')
+            success_count = len(result['successful'])
+            total_commands = result['total']
 
             if success_count > 0:
                 self.qos_status.setText("QoS Settings: Default")
@@ -1071,7 +1532,7 @@ class TCPOptimizerQt(QMainWindow):
                 self.qos_revert_btn.setEnabled(False)
                 self.qos_optimized = False
                 msg = f"Successfully reverted QoS settings ({success_count} out of {total_commands} settings reverted)."
-                QMessageBox.information(self, "Success", msg)
+                self.notifications.notify(msg, 'success')
             else:
                 raise Exception("Failed to revert any QoS settings")
 
@@ -1080,45 +1541,21 @@ class TCPOptimizerQt(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to revert QoS settings:\n{str(e)}")
 
     def apply_game_settings(self):
+        if self.guard_checkbox.isChecked():
+            self.start_guarded_apply('game')
+            return
         try:
             logging.info("\n=== GAME MODE OPTIMIZATION ===")
             
-            # Game mode optimization commands
-            commands = [
-                ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -AutoTuningLevelLocal Normal'],
-                ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -ScalingHeuristics Disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'heuristics', 'disabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
-                ['powershell', 'Disable-NetAdapterLso -Name *'],
-                ['powershell', 'Set-NetOffloadGlobalSetting -PacketCoalescingFilter Disabled']
-            ]
-            
-            success_count = 0
-            total_commands = len(commands)
-            
-            for cmd in commands:
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                    success_count += 1
-                    logging.info(f"Successfully applied game mode command: {' '.join(cmd)}")
-                except subprocess.CalledProcessError as e:
-                    logging.warning(f"Command failed: {' '.join(cmd)}\nError: {e.stderr}")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
-                    continue
+            result = profiles.apply_profile('game')
+            success_count = len(result['successful'])
+            total_commands = result['total']
 
             if success_count > 0:
-                self.game_mode_status.setText("Game Mode: Enabled")
-                self.game_mode_enable_btn.setEnabled(False)
-                self.game_mode_disable_btn.setEnabled(True)
-                self.game_mode_enabled = True
+                self.start_after_histogram()
+                self.mark_game_mode_enabled()
                 msg = f"Successfully enabled game mode ({success_count} out of {total_commands} optimizations applied)."
-                QMessageBox.information(self, "Success", msg)
+                self.notifications.notify(msg, 'success')
             else:
                 raise Exception("Failed to apply any game mode optimizations")
 
@@ -1126,38 +1563,19 @@ class TCPOptimizerQt(QMainWindow):
             logging.error(f"Error enabling game mode: {str(e)}")
             QMessageBox.critical(self, "Error", f"Failed to enable game mode:\n{str(e)}")
 
+    def mark_game_mode_enabled(self):
+        self.game_mode_status.setText("Game Mode: Enabled")
+        self.game_mode_enable_btn.setEnabled(False)
+        self.game_mode_disable_btn.setEnabled(True)
+        self.game_mode_enabled = True
+
     def revert_game_settings(self):
         try:
             logging.info("Reverting game mode settings...")
             
-            # Commands to revert game mode settings
-            commands = [
-                ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -AutoTuningLevelLocal Normal'],
-                ['powershell', 'Set-NetTCPSetting -SettingName InternetCustom -ScalingHeuristics Enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'chimney=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'ecncapability=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'timestamps=enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'heuristics', 'enabled'],
-                ['netsh', 'int', 'tcp', 'set', 'global', 'rss=enabled'],
-                ['powershell', 'Enable-NetAdapterLso -Name *'],
-                ['powershell', 'Set-NetOffloadGlobalSetting -PacketCoalescingFilter Enabled']
-            ]
-            
-            success_count = 0
-            total_commands = len(commands)
-            
-            for cmd in commands:
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                    success_count += 1
-                    logging.info(f"Successfully reverted game mode command: {' '.join(cmd)}")
-                except subprocess.CalledProcessError as e:
-                    logging.warning(f"Command failed: {' '.join(cmd)}\nError: {e.stderr}")
-                    continue
-                except Exception as e:
-                    logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
-                    continue
+            result = profiles.revert_profile('game')
+            success_count = len(result['successful'])
+            total_commands = result['total']
 
             if success_count > 0:
                 self.game_mode_status.setText("Game Mode: Disabled")
@@ -1165,7 +1583,7 @@ class TCPOptimizerQt(QMainWindow):
                 self.game_mode_disable_btn.setEnabled(False)
                 self.game_mode_enabled = False
                 msg = f"Successfully disabled game mode ({success_count} out of {total_commands} settings reverted)."
-                QMessageBox.information(self, "Success", msg)
+                self.notifications.notify(msg, 'success')
             else:
                 raise Exception("Failed to revert any game mode settings")
 
@@ -1240,6 +1658,46 @@ class TCPOptimizerQt(QMainWindow):
 
         ping_stats_layout.addLayout(stats_grid)
 
+        # Probe targets: ICMP hosts and/or TCP/UDP application probes, measured concurrently
+        self.probe_targets_input = QLineEdit()
+        self.probe_targets_input.setPlaceholderText(
+            f"Targets (default {DEFAULT_TARGET}), e.g. 8.8.8.8, tcp:1.1.1.1:443, udp:9.9.9.9:53")
+        self.probe_targets_input.setToolTip("The first target drives the statistics above; "
+                                            "every target is summarized below")
+        self.probe_targets_input.setStyleSheet(styles.INPUT_STYLE)
+        ping_stats_layout.addWidget(self.probe_targets_input)
+
+        self.probe_targets_label = QLabel("")
+        self.probe_targets_label.setWordWrap(True)
+        self.probe_targets_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        ping_stats_layout.addWidget(self.probe_targets_label)
+        self.latency_events_label = QLabel("")
+        self.latency_events_label.setWordWrap(True)
+        self.latency_events_label.setStyleSheet(styles.SUBHEADING_LABEL_STYLE)
+        ping_stats_layout.addWidget(self.latency_events_label)
+        self.probe_summary_timer = QTimer(self)
+        self.probe_summary_timer.setInterval(1000)
+        self.probe_summary_timer.timeout.connect(self.update_probe_summaries)
+
+        # Short high-rate burst against the first UDP echo target, for sub-second spikes
+        from burst import BURST_RATES, DEFAULT_BURST_RATE
+        burst_layout = QHBoxLayout()
+        self.burst_rate_combo = QComboBox()
+        self.burst_rate_combo.setStyleSheet(styles.COMBO_BOX_STYLE)
+        for rate in BURST_RATES:
+            self.burst_rate_combo.addItem(f"{rate} Hz for 5 s", rate)
+        self.burst_rate_combo.setCurrentIndex(self.burst_rate_combo.findData(DEFAULT_BURST_RATE))
+        burst_layout.addWidget(self.burst_rate_combo)
+        self.burst_btn = QPushButton("Burst")
+        self.burst_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.burst_btn.setToolTip("Probe the first udp-echo: target above at a high rate")
+        self.burst_btn.clicked.connect(self.toggle_burst)
+        burst_layout.addWidget(self.burst_btn)
+        ping_stats_layout.addLayout(burst_layout)
+
+        # Samples are coalesced and shown at display rate rather than per probe
+        self.ping_presenter = PingStatsPresenter(self.ping_displays, container=ping_stats_container, parent=self)
+
         # Measure Ping Button
         self.measure_ping_btn = QPushButton("Start Measuring")
         self.measure_ping_btn.setStyleSheet(styles.BUTTON_STYLE)
@@ -1257,22 +1715,86 @@ class TCPOptimizerQt(QMainWindow):
             self.stop_ping()
             self.measure_ping_btn.setText("Start Measuring")
 
+    def toggle_burst(self):
+        if self.burst_thread and self.burst_thread.is_alive():
+            if self.burst_prober:
+                self.burst_prober.stop()
+            return
+        from probe_scheduler import parse_targets
+        try:
+            targets = [target for target in parse_targets(self.probe_targets_input.text())
+                       if target.kind == 'udp-echo']
+        except ValueError as e:
+            self.notifications.notify(str(e), 'warning')
+            return
+        if not targets:
+            self.notifications.notify("Add a udp-echo:HOST:PORT target to burst (DNS resolvers are not burst).", 'warning')
+            return
+        # One measurement at a time; the burst feeds the same chart and statistics
+        if self.running_ping:
+            self.stop_ping()
+        self.ping_tracker.reset()
+        self.latency_chart.clear()
+        rate = self.burst_rate_combo.currentData()
+        self.burst_btn.setText("Stop Burst")
+        self.measure_ping_btn.setEnabled(False)
+        self.probe_targets_label.setText(f"Bursting {targets[0].label} at {rate} Hz...")
+
+        def worker():
+            try:
+                import burst
+                result = burst.run_burst(targets[0], rate, on_samples=self.burst_samples.emit,
+                                         prober_ready=lambda prober: setattr(self, 'burst_prober', prober))
+            except Exception as e:
+                logging.error(f"Burst failed: {str(e)}")
+                result = {'error': str(e)}
+            self.burst_finished.emit(result)
+
+        self.burst_thread = threading.Thread(target=worker, daemon=True)
+        self.burst_thread.start()
+
+    @recorder.timed('ingest burst samples')
+    def ingest_burst_samples(self, batch):
+        # Batches arrive at ~20 Hz; the session only gets the burst's summary, since
+        # every metrics record rewrites the metrics file
+        stats = None
+        for timestamp, rtt in batch:
+            self.latency_chart.add_sample(rtt, timestamp)
+            self.latency_histograms[self.histogram_phase].add(rtt)
+            if rtt is not None:
+                self.last_ping = rtt
+                stats = self.ping_tracker.add_sample(rtt) or stats
+            else:
+                self.ping_tracker.add_sample(None)
+        self.distribution_panel.mark_dirty()
+        if stats:
+            self.update_ping_displays(stats)
+
+    def show_burst_results(self, result):
+        import burst
+        self.burst_prober = None
+        self.burst_btn.setText("Burst")
+        self.measure_ping_btn.setEnabled(True)
+        if 'error' in result:
+            self.probe_targets_label.setText(f"Burst failed: {result['error']}")
+            return
+        self.probe_targets_label.setText(f"{result['target']} at {result['rate']} Hz: {burst.format_summary(result)}")
+
+    def show_latency_event(self, event):
+        from latency_events import format_event, format_counts
+        text = format_event(event)
+        if self.metrics_exporter:
+            self.metrics_exporter.registry.count_event(event)
+        self.notifications.notify(text[0].upper() + text[1:], 'warning')
+        self.latency_events_label.setText(
+            f"{format_counts(self.latency_events.counts)} - last: {text} at {time.strftime('%H:%M:%S', time.localtime(event['time']))}")
+
     def update_ping_displays(self, ping_stats):
+        # Only the newest stats are kept; the presenter refreshes the labels at display rate
         if ping_stats:
-            for key in ['current', 'min', 'max', 'avg']:
-                if key in ping_stats and key in self.ping_displays:
-                    value = ping_stats[key]
-                    if isinstance(value, (int, float)):
-                        self.ping_displays[key].setText(f"{int(round(value))} ms")
-            
-            # Handle improvement separately
-            if 'improvement' in ping_stats and 'avg' in self.ping_displays:
-                current_text = self.ping_displays['avg'].text()
-                if current_text != "--":
-                    self.ping_displays['avg'].setText(f"{current_text} {ping_stats['improvement']}")
+            self.ping_presenter.submit(ping_stats)
         else:
-            for display in self.ping_displays.values():
-                display.setText("--")
+            self.ping_presenter.clear()
 
     def create_left_panel(self, left_panel):
         # Left Panel Layout
@@ -1284,6 +1806,11 @@ class TCPOptimizerQt(QMainWindow):
         ping_stats_frame = self.create_ping_stats_ui()
         left_layout.addWidget(ping_stats_frame)
 
+        # Live latency chart; zooming out past the ring buffer reads the recorded session
+        self.latency_chart = LatencyChart(get_session=get_current_session)
+        self.latency_chart.setToolTip("Scroll to zoom, drag to browse history, double-click for live view")
+        left_layout.addWidget(self.latency_chart, 1)
+
         # DNS Settings Section with improved styling
         dns_frame = QFrame()
         dns_frame.setStyleSheet(styles.TRANSPARENT_FRAME_STYLE)
@@ -1312,6 +1839,19 @@ class TCPOptimizerQt(QMainWindow):
         apply_dns_btn.clicked.connect(self.apply_dns_settings)
         dns_input_layout.addWidget(apply_dns_btn)
         dns_layout.addLayout(dns_input_layout)
+
+        # Resolver benchmark; offers to apply the winners afterwards
+        self.dns_benchmark_btn = QPushButton("Benchmark DNS")
+        self.dns_benchmark_btn.setStyleSheet(styles.BUTTON_STYLE)
+        self.dns_benchmark_btn.setMinimumHeight(35)
+        self.dns_benchmark_btn.clicked.connect(self.run_dns_benchmark)
+        dns_layout.addWidget(self.dns_benchmark_btn)
+
+        # Local caching forwarder; the selected adapter's DNS points at it while enabled
+        self.dns_cache_checkbox = QCheckBox("Local DNS cache (prefetch + fastest upstream)")
+        self.dns_cache_checkbox.setStyleSheet(styles.CHECKBOX_STYLE)
+        self.dns_cache_checkbox.toggled.connect(self.toggle_dns_forwarder)
+        dns_layout.addWidget(self.dns_cache_checkbox)
         
         # DNS Status Label
         self.dns_status_label = QLabel("")
@@ -1331,29 +1871,9 @@ class TCPOptimizerQt(QMainWindow):
             if not adapter_name:
                 raise ValueError("No network adapter selected")
             
-            # Commands to revert interface settings
-            netsh_commands = [
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'autotuninglevel=normal'],
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'chimney=enabled'],
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'ecncapability=enabled'],
-                ['netsh', 'interface', 'tcp', 'set', 'global', 'timestamps=enabled']
-            ]
-            
-            success_count = 0
-            total_commands = len(netsh_commands)
-            
-            # Apply netsh commands
-            for i, cmd in enumerate(netsh_commands, 1):
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    if result.returncode == 0:
-                        success_count += 1
-                        logging.info(f"Successfully reverted netsh command: {' '.join(cmd)}")
-                    else:
-                        logging.warning(f"Command failed: {' '.join(cmd)}\nError: {result.stderr}")
-                except Exception as e:
-                    logging.warning(f"Error executing command: {' '.join(cmd)}\nError: {str(e)}")
-                    continue
+            result = profiles.revert_profile('interface')
+            success_count = len(result['successful'])
+            total_commands = result['total']
             
             # Update UI
             if success_count > 0:
@@ -1362,7 +1882,7 @@ class TCPOptimizerQt(QMainWindow):
                 self.interface_revert_btn.setEnabled(False)
                 self.interface_optimized = False
                 msg = f"Successfully reverted network settings ({success_count} out of {total_commands} settings reverted)."
-                QMessageBox.information(self, "Success", msg)
+                self.notifications.notify(msg, 'success')
                 logging.info(msg)
             else:
                 raise Exception("Could not revert network settings. Please check if you have administrator privileges.")
@@ -1371,17 +1891,50 @@ class TCPOptimizerQt(QMainWindow):
             logging.error(f"Error reverting interface settings: {str(e)}")
             QMessageBox.critical(self, "Error", f"Failed to revert interface settings:\n{str(e)}")
 
-def is_admin():
-    import ctypes
-    return ctypes.windll.shell32.IsUserAnAdmin() != 0
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="PING Optimizer")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print a per-phase startup time report")
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help="quit once startup has finished (for automated timing)")
+    parser.add_argument('--max-first-paint-ms', type=float, default=None,
+                        help="exit with status 1 if the first paint is slower than this")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve OpenMetrics at http://HOST:PORT/metrics (e.g. 9464)")
+    parser.add_argument('--metrics-host', default='127.0.0.1', help="address for --metrics-port")
+    parser.add_argument('--diagnostics', action='store_true',
+                        help="record hot-path span timings from startup (Ctrl+Shift+D shows them)")
+    # Unknown arguments are passed through to Qt
+    return parser.parse_known_args(argv[1:])
+
+
+def report_startup(args, app):
+    first_paint = profiler.marks.get("first paint")
+    if args.profile_startup:
+        print(profiler.report(), flush=True)
+    if args.max_first_paint_ms is not None and first_paint is not None and first_paint > args.max_first_paint_ms:
+        print(f"Time to first paint {first_paint:.1f}ms exceeds budget of {args.max_first_paint_ms:.1f}ms",
+              file=sys.stderr, flush=True)
+        app.exit(1)
+    elif args.exit_after_startup:
+        app.quit()
+
 
 if __name__ == '__main__':
+    args, qt_args = parse_args(sys.argv)
+    setup_logging()
     logging.debug('Starting TCP Optimizer...')
-    if not is_admin():
+    if args.diagnostics:
+        recorder.enable()
+    # Profiling runs never change settings, so they don't need elevation
+    if not profiles.is_admin() and not (args.profile_startup or args.exit_after_startup):
         print("Please run as administrator")
         sys.exit(1)
         
-    app = QApplication(sys.argv)
-    window = TCPOptimizerQt()
+    with profiler.phase("QApplication"):
+        app = QApplication(sys.argv[:1] + qt_args)
+    with profiler.phase("build window"):
+        window = TCPOptimizerQt(metrics_port=args.metrics_port, metrics_host=args.metrics_host)
+    window.startup_finished.connect(lambda: report_startup(args, app))
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+import burst
+from burst import BurstProber
+from local_endpoints import UdpEchoServer
+
+
+@pytest.fixture
+def echo_target():
+    with UdpEchoServer() as server:
+        host, port = server.address
+        yield f"udp-echo:{host}:{port}"
+
+
+@pytest.mark.parametrize('target', ['udp:127.0.0.1:53', 'tcp:127.0.0.1:443', '127.0.0.1'])
+def test_only_echo_targets_can_be_burst(target):
+    with pytest.raises(ValueError, match="udp-echo"):
+        BurstProber(target)
+
+
+def test_burst_against_loopback_echo(echo_target):
+    batches = []
+    summary = BurstProber(echo_target, rate=200, duration=0.5, on_samples=batches.append).run()
+    assert 90 <= summary['sent'] <= 100
+    assert summary['loss'] == 0
+    assert sum(len(batch) for batch in batches) == summary['sent']
+    times = [sent for batch in batches for sent, _ in batch]
+    assert times == sorted(times)
+
+
+def test_burst_ends_at_the_deadline_after_a_stall(echo_target):
+    prober = BurstProber(echo_target, rate=100, duration=1.0)
+    request = prober.request
+
+    def stalling_request(sequence, sent_ns):
+        if sequence == 10:
+            time.sleep(0.4)  # The Pacer skips the ticks missed here
+        return request(sequence, sent_ns)
+    prober.request = stalling_request
+
+    started = time.perf_counter()
+    summary = prober.run()
+    assert summary['pacing']['skipped'] > 0
+    # Skipped ticks shorten the burst; they are not made up for after the deadline
+    assert summary['sent'] < prober.total
+    assert prober.send_elapsed < prober.duration + 0.05
+    assert time.perf_counter() - started < prober.duration + 0.5
+
+
+def test_stop_ends_a_burst_early(echo_target):
+    prober = BurstProber(echo_target, rate=100, duration=5.0)
+    prober.stop_event.set()
+    summary = prober.run()
+    assert summary['sent'] == 0
+    assert burst.format_summary(summary) == "no replies to 0 probes"
@@ -0,0 +1,67 @@
+import pytest
+
+from dns_benchmark import run_dns_benchmark, rank_results, MAX_FAILURE_RATE
+from local_endpoints import DnsStubServer
+
+
+def run_against(stubs, rounds=3):
+    """Benchmark the stubs; returns ({stub: result}, [stubs in rank order])."""
+    for stub in stubs:
+        stub.start()
+    ports = {stub.address[1]: stub for stub in stubs}
+    try:
+        results = run_dns_benchmark([stub.address for stub in stubs], rounds=rounds, timeout=0.3)
+    finally:
+        for stub in stubs:
+            stub.stop()
+    return {ports[r['port']]: r for r in results}, [ports[r['port']] for r in results]
+
+
+def result(median, p95, failure_rate=0.0):
+    return {'median': median, 'p95': p95, 'failure_rate': failure_rate}
+
+
+def test_faster_resolver_ranks_first():
+    fast = DnsStubServer(delay_ms=1, uncached_delay_ms=10)
+    slow = DnsStubServer(delay_ms=30, uncached_delay_ms=80)
+    by_stub, order = run_against([slow, fast])
+    fast_result, slow_result = by_stub[fast], by_stub[slow]
+    assert order == [fast, slow]
+    assert fast_result['rank'] == 1
+    assert fast_result['median'] < slow_result['median']
+    assert fast_result['p95'] < slow_result['p95']
+    assert fast_result['failure_rate'] == slow_result['failure_rate'] == 0
+    # Uncached names pay the recursive delay, cached ones don't
+    assert slow_result['cached']['median'] < slow_result['uncached']['median']
+
+
+def test_unreliable_resolver_is_demoted_despite_lower_median():
+    flaky = DnsStubServer(delay_ms=1, uncached_delay_ms=5, failure_rate=0.5)
+    steady = DnsStubServer(delay_ms=20, uncached_delay_ms=40)
+    by_stub, order = run_against([flaky, steady])
+    flaky_result = by_stub[flaky]
+    assert flaky_result['failure_rate'] > MAX_FAILURE_RATE
+    assert flaky_result['median'] < by_stub[steady]['median']
+    assert order == [steady, flaky]
+    assert flaky_result['failure_reasons'].get('timeout')
+
+
+def test_unreachable_resolver_ranks_last():
+    dead = DnsStubServer(delay_ms=1, failure_rate=1.0)
+    alive = DnsStubServer(delay_ms=20, uncached_delay_ms=40)
+    by_stub, order = run_against([dead, alive], rounds=1)
+    assert by_stub[dead]['median'] is None
+    assert by_stub[dead]['failure_rate'] == 100
+    assert order[-1] is dead
+
+
+def test_rank_breaks_median_ties_on_p95():
+    ranked = rank_results([result(10, 50), result(10, 12), result(12, 13)])
+    assert [(r['median'], r['p95'], r['rank']) for r in ranked] == [(10, 12, 1), (10, 50, 2), (12, 13, 3)]
+
+
+@pytest.mark.parametrize('failure_rate', [MAX_FAILURE_RATE + 0.1, 50, 100])
+def test_rank_demotes_unreliable_resolvers(failure_rate):
+    ranked = rank_results([result(5, 6, failure_rate), result(40, 90)])
+    assert ranked[0]['median'] == 40
+    assert ranked[1]['failure_rate'] == failure_rate
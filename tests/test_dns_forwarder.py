@@ -0,0 +1,194 @@
+import time
+import socket
+import threading
+
+import pytest
+
+import dns_forwarder
+from dns_forwarder import DnsForwarder, DnsCache, CacheEntry, cache_ttl, NEGATIVE_TTL, MAX_TTL
+from dns_wire import (build_query, build_response, parse_header, record_ttls, question_key, QTYPE_A, QTYPE_AAAA,
+                      RCODE_SERVFAIL, RCODE_NXDOMAIN)
+from local_endpoints import DnsStubServer
+
+
+def response(name='host.example.com', ttl=60, qtype=QTYPE_A, rcode=0):
+    return build_response(build_query(name, 7, qtype), '192.0.2.1' if qtype == QTYPE_A else None, ttl, rcode)
+
+
+def entry(ttl=60, now=0.0, hits=0):
+    data = response(ttl=ttl)
+    entry = CacheEntry(data, record_ttls(data), ttl, 10.0, now)
+    entry.hits = hits
+    return entry
+
+
+@pytest.mark.parametrize('data, expected', [
+    (response(ttl=300), 300),
+    (response(ttl=10 ** 6), MAX_TTL),
+    (response(qtype=QTYPE_AAAA), NEGATIVE_TTL),  # NODATA without an SOA
+    (response(rcode=RCODE_NXDOMAIN), NEGATIVE_TTL),
+    (response(ttl=0), None),
+    (response(rcode=RCODE_SERVFAIL), None),
+])
+def test_cache_ttl(data, expected):
+    assert cache_ttl(data)[0] == expected
+
+
+def test_cached_reply_ages_ttls_and_takes_the_new_query_id():
+    cached = entry(ttl=60, now=100.0)
+    question = build_query('HOST.Example.com', 99)[12:]
+    reply = cached.reply(99, question, 130.4)
+    assert parse_header(reply)[0] == 99
+    assert record_ttls(reply) == [(record_ttls(reply)[0][0], 30)]
+    assert reply[12:12 + len(question)] == question  # The client's casing is echoed
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = DnsCache(capacity=2)
+    cache.put('a', entry())
+    cache.put('b', entry())
+    assert cache.get('a', 1.0) is not None
+    cache.put('c', entry())
+    assert list(cache.entries) == ['a', 'c']
+
+
+def test_expired_entries_are_dropped_on_lookup():
+    cache = DnsCache()
+    cache.put('a', entry(ttl=5, now=0.0))
+    assert cache.get('a', 4.9) is not None
+    assert cache.get('a', 5.0) is None
+    assert len(cache) == 0
+
+
+def test_only_hot_entries_near_expiry_are_prefetched():
+    cache = DnsCache()
+    cache.put('hot', entry(ttl=60, hits=2))
+    cache.put('cold', entry(ttl=60, hits=1))
+    refreshing = entry(ttl=60, hits=5)
+    refreshing.refreshing = True
+    cache.put('refreshing', refreshing)
+    assert cache.due_for_prefetch(50.0) == []
+    assert cache.due_for_prefetch(55.0) == ['hot']  # Last 10% of the TTL
+    assert cache.due_for_prefetch(60.0) == []  # Expired: answered as a miss instead
+
+
+def ask(address, name='host.example.com', qtype=QTYPE_A, query_id=0x1234):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(3)
+        started = time.perf_counter()
+        sock.sendto(build_query(name, query_id, qtype), address)
+        data = sock.recv(4096)
+        return data, (time.perf_counter() - started) * 1000
+
+
+@pytest.fixture
+def stub_forwarder():
+    # Builds a forwarder over stub upstreams; everything is stopped at teardown
+    started = []
+
+    def make(*stubs, **kwargs):
+        for stub in stubs:
+            stub.start()
+            started.append(stub)
+        forwarder = DnsForwarder([stub.address for stub in stubs], port=0, **kwargs).start()
+        started.append(forwarder)
+        return forwarder
+    yield make
+    for server in reversed(started):
+        server.stop()
+
+
+def test_repeat_query_is_answered_from_the_cache(stub_forwarder):
+    stub = DnsStubServer(delay_ms=1, uncached_delay_ms=1, ttl=60)
+    forwarder = stub_forwarder(stub)
+    first, _ = ask(forwarder.address, query_id=1)
+    second, _ = ask(forwarder.address, query_id=2)
+    assert parse_header(second)[0] == 2
+    assert question_key(second) == question_key(first)
+    assert stub.queries == 1
+    stats = forwarder.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_entries_expire_with_their_ttl(stub_forwarder):
+    stub = DnsStubServer(delay_ms=1, uncached_delay_ms=1, ttl=1)
+    forwarder = stub_forwarder(stub)
+    ask(forwarder.address)
+    time.sleep(1.1)
+    ask(forwarder.address)
+    assert stub.queries == 2
+    assert forwarder.stats()['hits'] == 0
+
+
+def test_negative_answers_are_cached(stub_forwarder):
+    stub = DnsStubServer(delay_ms=1, uncached_delay_ms=1)
+    forwarder = stub_forwarder(stub)
+    for _ in range(3):
+        data, _ = ask(forwarder.address, qtype=QTYPE_AAAA)
+        assert parse_header(data)[3] == 0  # NODATA
+    assert stub.queries == 1
+    assert forwarder.cache.entries[question_key(data)].ttl == NEGATIVE_TTL
+
+
+def test_fastest_upstream_wins_the_race(stub_forwarder):
+    slow = DnsStubServer(delay_ms=150, uncached_delay_ms=150)
+    fast = DnsStubServer(delay_ms=5, uncached_delay_ms=5)
+    forwarder = stub_forwarder(slow, fast)
+    slow_name, fast_name = (f"{host}:{port}" for host, port in (slow.address, fast.address))
+    _, elapsed = ask(forwarder.address)
+    assert elapsed < 120
+    assert forwarder.upstream_stats[fast_name]['wins'] == 1
+    assert forwarder.upstream_stats[slow_name]['wins'] == 0
+
+
+def test_a_dead_upstream_does_not_block_answers(stub_forwarder):
+    dead = DnsStubServer(failure_rate=1.0)
+    alive = DnsStubServer(delay_ms=5, uncached_delay_ms=5)
+    forwarder = stub_forwarder(dead, alive, timeout=0.5)
+    dead_name = f"{dead.address[0]}:{dead.address[1]}"
+    for i in range(3):
+        data, _ = ask(forwarder.address, f"host{i}.example.com")
+        assert parse_header(data)[3] == 1
+    time.sleep(0.6)  # Let the dead upstream's queries time out
+    assert forwarder.upstream_stats[dead_name]['failures'] == 3
+    assert forwarder.stats()['failures'] == 0
+
+
+def test_identical_misses_share_one_upstream_query(stub_forwarder):
+    stub = DnsStubServer(uncached_delay_ms=200)
+    forwarder = stub_forwarder(stub)
+    answers = []
+    threads = [threading.Thread(target=lambda i=i: answers.append(ask(forwarder.address, query_id=i)[0]))
+               for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(parse_header(data)[0] for data in answers) == [0, 1, 2]
+    assert stub.queries == 1
+    assert forwarder.stats()['coalesced'] == 2
+
+
+def test_hot_entries_are_refreshed_before_they_expire(stub_forwarder):
+    stub = DnsStubServer(delay_ms=1, uncached_delay_ms=1, ttl=3)
+    forwarder = stub_forwarder(stub)
+    for _ in range(3):
+        ask(forwarder.address)  # One miss, then two hits make it hot
+    time.sleep(1.7)  # Inside the 2 s prefetch lead, plus a scan tick
+    assert forwarder.stats()['prefetches'] == 1
+    assert stub.queries == 2
+    time.sleep(1.5)  # Past the original expiry
+    ask(forwarder.address)
+    assert stub.queries == 2
+    assert forwarder.stats()['misses'] == 1
+
+
+def test_local_forwarder_check():
+    stats = dns_forwarder.run_local_forwarder_check(duration=3.0, names=10)
+    assert stats['queries'] > 0
+    assert stats['hit_ratio'] > 50
+    assert stats['prefetches'] > 0
+    assert stats['failures'] == 0
+    # The 5 ms stub wins the races against the 15 ms one
+    wins = [upstream['wins'] for upstream in stats['upstreams'].values()]
+    assert wins[0] > wins[1]
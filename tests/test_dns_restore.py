@@ -0,0 +1,157 @@
+import subprocess
+
+import pytest
+
+import profiles
+
+NETSH_DHCP = """
+Configuration for interface "Ethernet"
+    DNS servers configured through DHCP:  192.168.1.1
+                                          fe80::1%12
+    Register with which suffix:           Primary only
+
+"""
+
+NETSH_STATIC = """
+Configuration for interface "Wi-Fi"
+    Statically Configured DNS Servers:    1.1.1.1
+                                          9.9.9.9
+    Register with which suffix:           Primary only
+
+"""
+
+NETSH_STATIC_NONE = """
+Configuration for interface "Wi-Fi"
+    Statically Configured DNS Servers:    None
+    Register with which suffix:           Primary only
+"""
+
+
+def test_parse_netsh_dhcp():
+    assert profiles.parse_netsh_dns_servers(NETSH_DHCP) == {'dhcp': True, 'servers': ['192.168.1.1', 'fe80::1']}
+
+
+def test_parse_netsh_static():
+    assert profiles.parse_netsh_dns_servers(NETSH_STATIC) == {'dhcp': False, 'servers': ['1.1.1.1', '9.9.9.9']}
+
+
+def test_parse_netsh_static_none():
+    assert profiles.parse_netsh_dns_servers(NETSH_STATIC_NONE) == {'dhcp': False, 'servers': []}
+
+
+def test_parse_netsh_unrecognized_output_raises():
+    with pytest.raises(ValueError):
+        profiles.parse_netsh_dns_servers('The filename, directory name, or volume label syntax is incorrect.')
+
+
+def test_parse_resolvectl():
+    assert profiles.parse_resolvectl_dns("Link 2 (eth0): 1.1.1.1 9.9.9.9\n") == \
+        {'dhcp': False, 'servers': ['1.1.1.1', '9.9.9.9']}
+    assert profiles.parse_resolvectl_dns("Link 2 (eth0):\n") == {'dhcp': True, 'servers': []}
+
+
+@pytest.fixture
+def fake_commands(monkeypatch):
+    # Records every command instead of running it; outputs['resolvectl dns'] is what a read returns
+    calls = []
+    outputs = {}
+
+    def run_command(cmd):
+        calls.append(cmd)
+        if cmd[:2] == ['resolvectl', 'dns'] and len(cmd) == 3:
+            # A read
+            if 'resolvectl dns' not in outputs:
+                return subprocess.CompletedProcess(cmd, 1, '', 'Failed to resolve interface')
+            return subprocess.CompletedProcess(cmd, 0, outputs['resolvectl dns'], '')
+        return subprocess.CompletedProcess(cmd, 0, '', '')
+    monkeypatch.setattr(profiles, 'run_command', run_command)
+    monkeypatch.setattr(profiles.sys, 'platform', 'linux')
+    return calls, outputs
+
+
+def test_static_servers_are_restored_exactly(fake_commands):
+    calls, outputs = fake_commands
+    outputs['resolvectl dns'] = "Link 3 (wlan0): 1.1.1.1 9.9.9.9\n"
+    previous = profiles.get_dns_servers('wlan0')
+    profiles.set_dns_servers('wlan0', ['127.0.0.1'])
+    profiles.restore_dns_servers('wlan0', previous)
+    assert calls[-1] == ['resolvectl', 'dns', 'wlan0', '1.1.1.1', '9.9.9.9']
+
+
+def test_automatic_dns_is_restored_as_automatic(fake_commands):
+    calls, outputs = fake_commands
+    outputs['resolvectl dns'] = "Link 3 (wlan0):\n"
+    profiles.restore_dns_servers('wlan0', profiles.get_dns_servers('wlan0'))
+    assert calls[-1] == ['resolvectl', 'revert', 'wlan0']
+
+
+def test_unreadable_servers_raise(fake_commands):
+    with pytest.raises(OSError):
+        profiles.get_dns_servers('nosuchlink')
+
+
+class FakeForwarder:
+    # Stands in for DnsForwarder so --point can be exercised without binding port 53
+    instances = []
+
+    def __init__(self, upstreams, host, port, on_stats=None):
+        self.running = False  # The command's wait loop ends at once
+        self.stopped = False
+        FakeForwarder.instances.append(self)
+
+    def start(self):
+        return self
+
+    def stop(self):
+        self.stopped = True
+
+    def stats(self):
+        return {}
+
+
+@pytest.fixture
+def fake_forwarder(monkeypatch):
+    import dns_forwarder
+    FakeForwarder.instances = []
+    monkeypatch.setattr(dns_forwarder, 'DnsForwarder', FakeForwarder)
+    monkeypatch.setattr(dns_forwarder, 'format_forwarder_stats', lambda stats: "stats")
+    return FakeForwarder.instances
+
+
+def dns_forward(*args):
+    import tcp_optimizer_cli
+    return tcp_optimizer_cli.main(['dns-forward', '--no-metrics', '--upstream', '192.0.2.53', *args])
+
+
+@pytest.mark.parametrize('args', [['--port', '5353'], ['--listen', '0.0.0.0'], ['--listen', '::'],
+                                  ['--listen', 'localhost']])
+def test_point_needs_a_concrete_address_on_port_53(fake_commands, fake_forwarder, args, capsys):
+    calls, _ = fake_commands
+    assert dns_forward('--point', 'wlan0', *args) == 2
+    assert "port 53 of a concrete address" in capsys.readouterr().err
+    assert calls == [] and fake_forwarder == []
+
+
+def test_point_restores_the_servers_when_it_ends(fake_commands, fake_forwarder):
+    calls, outputs = fake_commands
+    outputs['resolvectl dns'] = "Link 3 (wlan0): 1.1.1.1\n"
+    assert dns_forward('--point', 'wlan0') == 0
+    assert calls[1:] == [['resolvectl', 'dns', 'wlan0', '127.0.0.1'], ['resolvectl', 'dns', 'wlan0', '1.1.1.1']]
+    assert fake_forwarder[0].stopped
+
+
+def test_failed_point_is_rolled_back(fake_commands, fake_forwarder, monkeypatch, capsys):
+    calls, outputs = fake_commands
+    outputs['resolvectl dns'] = "Link 3 (wlan0): 1.1.1.1\n"
+    run_command = profiles.run_command
+
+    def failing_set(cmd):
+        if cmd == ['resolvectl', 'dns', 'wlan0', '127.0.0.1']:
+            calls.append(cmd)
+            return subprocess.CompletedProcess(cmd, 1, '', 'Permission denied')
+        return run_command(cmd)
+    monkeypatch.setattr(profiles, 'run_command', failing_set)
+    assert dns_forward('--point', 'wlan0') == 2
+    assert calls[-1] == ['resolvectl', 'dns', 'wlan0', '1.1.1.1']
+    assert "restored" in capsys.readouterr().err
+    assert fake_forwarder[0].stopped
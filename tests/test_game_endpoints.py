@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from game_endpoints import EndpointProbe, GameEndpointMonitor, UNRESPONSIVE_AFTER, MAX_BACKOFF
+
+
+class FakeProbe:
+    def __init__(self, rtts):
+        self.rtts = iter(rtts)
+        self.count = 0
+
+    def probe(self):
+        self.count += 1
+        return next(self.rtts, None)
+
+    def close(self):
+        pass
+
+
+def endpoint_probe(port, rtts):
+    probe = EndpointProbe(('udp', '127.0.0.1', port))
+    probe.probe_impl.close()
+    probe.probe_impl = FakeProbe(rtts)
+    return probe
+
+
+@pytest.fixture
+def monitor():
+    monitor = GameEndpointMonitor('game')
+    monitor.executor = ThreadPoolExecutor(max_workers=4)
+    yield monitor
+    monitor.stop()
+
+
+def test_third_party_servers_get_a_gentle_interval():
+    assert GameEndpointMonitor('game').interval >= 2.0
+
+
+def test_unresponsive_endpoint_backs_off_exponentially():
+    probe = endpoint_probe(9, [])
+    periods = []
+    for _ in range(UNRESPONSIVE_AFTER + 8):
+        probe.probe()
+        probe.schedule(0.0, 2.0)
+        periods.append(probe.period)
+    assert periods[:UNRESPONSIVE_AFTER - 1] == [2.0] * (UNRESPONSIVE_AFTER - 1)
+    assert periods[UNRESPONSIVE_AFTER - 1:UNRESPONSIVE_AFTER + 4] == [4.0, 8.0, 16.0, 32.0, MAX_BACKOFF]
+    assert periods[-1] == MAX_BACKOFF
+
+
+def test_a_reply_restores_the_normal_interval():
+    probe = endpoint_probe(9, [None] * 8 + [12.0])
+    for _ in range(9):
+        probe.probe()
+        probe.schedule(0.0, 2.0)
+    assert probe.responsive
+    assert probe.period == 2.0
+
+
+def test_dead_endpoint_is_probed_rarely(monitor):
+    live = endpoint_probe(9, [10.0] * 1000)
+    dead = endpoint_probe(10, [])
+    monitor.probes = {live.endpoint: live, dead.endpoint: dead}
+    samples = []
+    for round_number in range(300):  # Ten minutes of rounds
+        rtt, counted = monitor.probe_round(round_number * monitor.interval)
+        if counted:
+            samples.append(rtt)
+    assert live.probe_impl.count == 300
+    assert dead.probe_impl.count < 25
+    # The dead endpoint never drags the aggregate down to a loss
+    assert samples == [10.0] * 300
+
+
+def test_endpoint_states_report_the_backoff(monitor):
+    dead = endpoint_probe(10, [])
+    monitor.probes = {dead.endpoint: dead}
+    states = []
+    monitor.on_endpoints = states.append
+    for round_number in range(UNRESPONSIVE_AFTER):
+        assert monitor.probe_round(round_number * monitor.interval) == (None, round_number < UNRESPONSIVE_AFTER - 1)
+    (state,) = states[-1]
+    assert state == {'endpoint': 'UDP 127.0.0.1:10', 'rtt': None, 'responsive': False,
+                     'period': monitor.interval * 2}
@@ -0,0 +1,121 @@
+import pytest
+
+from game_tick import StreamStats, TickSimulator, pack_tick, unpack_tick, MSG_UP, TICK_HEADER
+from local_endpoints import TickReflector
+
+RATE = 64
+INTERVAL_MS = 1000.0 / RATE
+CLOCK_OFFSET_NS = -3_600_000_000_000  # The far end's clock is an hour behind; only variation matters
+
+
+def arrive(stats, sequence, delay_ms):
+    # Sent on its tick, received delay_ms later by a clock that disagrees with the sender's
+    send_ns = int(sequence * INTERVAL_MS * 1e6)
+    stats.add(sequence, send_ns, send_ns + CLOCK_OFFSET_NS + int(delay_ms * 1e6))
+
+
+def test_a_clean_stream():
+    stats = StreamStats(INTERVAL_MS)
+    for sequence in range(100):
+        arrive(stats, sequence, 5.0)
+    result = stats.result(100)
+    assert (result['sent'], result['received']) == (100, 100)
+    assert result['loss'] == result['reordered'] == result['late'] == 0.0
+    assert result['duplicates'] == 0
+    assert result['jitter'] == pytest.approx(0.0, abs=1e-6)
+    assert result['delay_variation']['max'] == pytest.approx(0.0, abs=1e-6)
+    assert result['late_threshold_ms'] == INTERVAL_MS
+
+
+def test_loss_counts_sequences_never_seen():
+    stats = StreamStats(INTERVAL_MS)
+    for sequence in range(20):
+        if sequence not in (3, 7, 8, 19):
+            arrive(stats, sequence, 5.0)
+    result = stats.result(20)
+    assert result['received'] == 16
+    assert result['loss'] == pytest.approx(20.0)
+    assert result['reordered'] == 0.0  # A gap isn't reordering
+
+
+def test_more_received_than_reported_sent_is_not_negative_loss():
+    stats = StreamStats(INTERVAL_MS)
+    for sequence in range(10):
+        arrive(stats, sequence, 5.0)
+    result = stats.result(8)  # A sender's count that came up short
+    assert result['sent'] == 10
+    assert result['loss'] == 0.0
+
+
+def test_reordering_counts_packets_behind_the_highest_seen():
+    stats = StreamStats(INTERVAL_MS)
+    for sequence in (0, 1, 4, 2, 3, 5, 6, 7, 9, 8):
+        arrive(stats, sequence, 5.0)
+    result = stats.result(10)
+    assert stats.highest == 9
+    assert result['reordered'] == pytest.approx(30.0)  # 2, 3 and 8
+    assert result['loss'] == 0.0
+
+
+def test_duplicates_are_counted_once_and_kept_out_of_the_delays():
+    stats = StreamStats(INTERVAL_MS)
+    for sequence, delay in ((0, 5.0), (1, 5.0), (1, 90.0), (2, 5.0), (0, 90.0), (3, 5.0)):
+        arrive(stats, sequence, delay)
+    result = stats.result(4)
+    assert result['duplicates'] == 2
+    assert result['received'] == 4
+    assert result['reordered'] == 0.0  # A late duplicate isn't a reordered packet either
+    assert result['delay_variation']['max'] == pytest.approx(0.0, abs=1e-6)
+    assert result['late'] == 0.0
+
+
+def test_late_packets_are_more_than_a_tick_above_the_fastest():
+    stats = StreamStats(INTERVAL_MS)
+    extra = [0.0] * 16 + [INTERVAL_MS - 1, INTERVAL_MS + 1, 40.0, 100.0]
+    for sequence, delay in enumerate(extra):
+        arrive(stats, sequence, 5.0 + delay)
+    result = stats.result(len(extra))
+    assert result['late'] == pytest.approx(15.0)  # 3 of 20
+    assert result['delay_variation']['max'] == pytest.approx(100.0, abs=1e-3)
+    assert result['delay_variation']['p50'] == pytest.approx(0.0, abs=1e-6)
+    # A looser threshold for a game that buffers two ticks
+    relaxed = stats.result(len(extra), late_ms=2 * INTERVAL_MS)
+    assert relaxed['late'] == pytest.approx(10.0)
+    assert relaxed['late_threshold_ms'] == 2 * INTERVAL_MS
+
+
+def test_jitter_follows_the_rfc_3550_estimate():
+    stats = StreamStats(INTERVAL_MS)
+    for sequence in range(41):
+        arrive(stats, sequence, 5.0 if sequence % 2 == 0 else 15.0)
+    # 40 transitions of 10 ms, each moving the estimate 1/16 of the way
+    assert stats.result(41)['jitter'] == pytest.approx(10.0 * (1 - (15 / 16) ** 40), abs=1e-3)
+
+
+def test_nothing_received():
+    result = StreamStats(INTERVAL_MS).result(50)
+    assert result['loss'] == 100.0
+    assert result['late'] is None
+    assert result['delay_variation'] is None
+
+
+def test_tick_packets_round_trip():
+    packet = pack_tick(MSG_UP, 0xDEADBEEF, 2 ** 32 + 5, 123, -456, size=200)
+    assert len(packet) == 200
+    assert unpack_tick(packet) == (MSG_UP, 0xDEADBEEF, 5, 123, -456)
+    assert unpack_tick(b'XX' + packet[2:]) is None
+    assert unpack_tick(packet[:TICK_HEADER.size - 1]) is None
+
+
+def test_loopback_run_against_the_reflector():
+    with TickReflector() as reflector:
+        result = TickSimulator(reflector.address, rate=RATE, size=128, duration=1.0).run()
+    assert result['size'] == 128
+    for direction in ('upstream', 'downstream'):
+        stats = result[direction]
+        assert stats['sent'] == RATE, direction
+        assert stats['received'] == RATE, direction
+        assert stats['loss'] == 0.0, direction
+        assert stats['duplicates'] == 0, direction
+        assert stats['delay_variation'] is not None, direction
+    assert result['rtt']['p50'] is not None
@@ -0,0 +1,162 @@
+import time
+import threading
+
+import pytest
+
+import profiles
+import guarded_apply
+from guarded_apply import GuardedApply, evaluate
+
+APPLY_SECONDS = 0.6
+
+
+@pytest.fixture
+def slow_apply(monkeypatch):
+    def apply_profile(name, progress=None):
+        time.sleep(APPLY_SECONDS)  # netsh can take seconds per command
+        return {'successful': ['netsh'], 'failed': []}
+    monkeypatch.setattr(profiles, 'apply_profile', apply_profile)
+    monkeypatch.setattr(guarded_apply, 'take_snapshot', lambda profile: {})
+    monkeypatch.setattr(guarded_apply, 'CHECK_EVERY', 0.05)
+
+
+def feed(guard, stop, rtt=10.0):
+    while not stop.is_set():
+        guard.add_sample(rtt)
+        time.sleep(0.005)
+
+
+def test_probation_starts_after_the_apply_returns(slow_apply):
+    phases = {}
+    guard = GuardedApply('tcp', baseline=0.3, probation=1.0,
+                         on_phase=lambda phase, detail: phases.setdefault(phase, time.monotonic()))
+    stop = threading.Event()
+    feeder = threading.Thread(target=feed, args=(guard, stop), daemon=True)
+    feeder.start()
+    try:
+        record = guard.run()
+    finally:
+        stop.set()
+        feeder.join()
+    assert record['decision'] == 'kept'
+    assert phases['kept'] - phases['probation'] >= 1.0
+    # The whole probation window was watched, not what was left of it after the apply
+    assert len(guard.samples['probation']) > 100
+
+
+def test_evaluate_flags_a_latency_regression():
+    evidence = evaluate([10.0 + i % 3 for i in range(40)], [20.0 + i % 3 for i in range(40)])
+    assert evidence['regression'] == "median latency rose from 11.0 to 21.0 ms"
+
+
+def test_evaluate_needs_enough_samples():
+    assert evaluate([10.0] * 5, [50.0] * 5)['regression'] is None
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def apply_profile(name, progress=None):
+        calls.append(('apply', name))
+        return {'successful': ['netsh'], 'failed': []}
+
+    def revert_profile(name, progress=None):
+        calls.append(('revert', name))
+        return {'successful': ['netsh'], 'failed': []}
+
+    def reapply_settings(settings, reason='drift'):
+        calls.append(('reapply', dict(settings), reason))
+        return {'successful': ['netsh'], 'failed': []}
+
+    monkeypatch.setattr(profiles, 'apply_profile', apply_profile)
+    monkeypatch.setattr(profiles, 'revert_profile', revert_profile)
+    monkeypatch.setattr(profiles, 'reapply_settings', reapply_settings)
+    monkeypatch.setattr(guarded_apply, 'take_snapshot', lambda profile: {'autotuninglevel': 'normal'})
+    monkeypatch.setattr(guarded_apply, 'CHECK_EVERY', 0.05)
+    return calls
+
+
+def feed_by_phase(guard, stop, rtts):
+    # 10 ms +- 1 while measuring the baseline, whatever rtts says once probation starts
+    i = 0
+    while not stop.is_set():
+        guard.add_sample(rtts.get(guard.phase, 10.0) + i % 3 - 1)
+        i += 1
+        time.sleep(0.005)
+
+
+def test_a_regression_reverts_and_restores_the_snapshot(calls, caplog):
+    guard = GuardedApply('tcp', baseline=0.3, probation=5.0)
+    stop = threading.Event()
+    feeder = threading.Thread(target=feed_by_phase, args=(guard, stop, {'probation': 30.0}), daemon=True)
+    feeder.start()
+    try:
+        with caplog.at_level('INFO', logger='metrics'):
+            record = guard.run()
+    finally:
+        stop.set()
+        feeder.join()
+    assert calls == [('apply', 'tcp'), ('revert', 'tcp'), ('reapply', {'autotuninglevel': 'normal'}, 'guard')]
+    assert record['decision'] == 'reverted'
+    assert record['reason'] == "median latency rose from 10.0 to 30.0 ms"
+    assert record['snapshot'] == {'autotuninglevel': 'normal'}
+    evidence = record['evidence']
+    assert evidence['regression'] == record['reason']
+    assert evidence['latency_p'] < guarded_apply.ALPHA
+    assert evidence['baseline']['p50'] == pytest.approx(10.0)
+    assert evidence['probation']['p50'] == pytest.approx(30.0)
+    # Reverted as soon as the regression showed, not at the end of probation
+    assert len(guard.samples['probation']) < 500
+    logged = [r for r in caplog.records if hasattr(r, 'session_data')]
+    assert logged[-1].session_data == {'guarded_applies': record}
+
+
+def test_no_regression_keeps_the_profile(calls):
+    guard = GuardedApply('tcp', baseline=0.3, probation=0.5)
+    stop = threading.Event()
+    feeder = threading.Thread(target=feed_by_phase, args=(guard, stop, {'probation': 10.0}), daemon=True)
+    feeder.start()
+    try:
+        record = guard.run()
+    finally:
+        stop.set()
+        feeder.join()
+    assert calls == [('apply', 'tcp')]
+    assert record['decision'] == 'kept'
+    assert record['evidence']['regression'] is None
+
+
+def test_too_few_baseline_samples_aborts_before_applying(calls):
+    phases = []
+    guard = GuardedApply('tcp', baseline=0.2, probation=1.0, on_phase=lambda phase, detail: phases.append(phase))
+    for _ in range(guarded_apply.MIN_SAMPLES - 1):
+        guard.samples['baseline'].append(10.0)
+    record = guard.run()
+    assert calls == []
+    assert record['decision'] == 'aborted'
+    assert record['reason'] == f"only {guarded_apply.MIN_SAMPLES - 1} baseline samples; nothing applied"
+    assert record['snapshot'] is None
+    assert phases == ['baseline', 'aborted']
+    guard.add_sample(10.0)  # Ignored once the run is over
+    assert len(guard.samples['baseline']) == guarded_apply.MIN_SAMPLES - 1
+
+
+def test_take_snapshot_keeps_the_reported_values_the_profile_changes(monkeypatch):
+    monkeypatch.setattr(profiles, 'read_tcp_globals', lambda: {
+        'Receive-Side Scaling State': 'enabled',
+        'Receive Window Auto-Tuning Level': 'Normal',
+        'ECN Capability': 'disabled',
+        'RFC 1323 Timestamps': 'allowed',
+        'Initial RTO': '3000',
+        'Max SYN Retransmissions': '4',
+    })
+    snapshot = guarded_apply.take_snapshot(profiles.get_profile('tcp'))
+    # Chimney and NetDMA aren't reported on this Windows version, so there is nothing to restore
+    assert snapshot == {'rss': 'enabled', 'autotuninglevel': 'normal', 'ecncapability': 'disabled',
+                        'timestamps': 'allowed', 'initialrto': '3000'}
+
+
+def test_take_snapshot_is_empty_off_windows(monkeypatch):
+    monkeypatch.setattr(profiles, 'read_tcp_globals', lambda: {})
+    assert guarded_apply.take_snapshot(profiles.get_profile('tcp')) == {}
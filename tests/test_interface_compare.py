@@ -0,0 +1,82 @@
+import random
+import sys
+
+import pytest
+
+import interface_compare
+from interface_compare import rank_interfaces, decide_winner
+
+
+def result(interface, p50, p95=None, loss=0.0, address='192.0.2.1'):
+    return {'interface': interface, 'address': address, 'p50': p50, 'p95': p95 if p95 is not None else p50,
+            'loss': loss}
+
+
+def latencies(median, spread=0.5, count=40, seed=0):
+    rng = random.Random(seed)
+    return [median + rng.uniform(-spread, spread) for _ in range(count)]
+
+
+def test_rank_orders_by_median_then_tail_then_loss():
+    ranked = rank_interfaces([result('wifi', 20, 40), result('eth', 10, 30), result('vpn', 10, 15)])
+    assert [(r['interface'], r['rank']) for r in ranked] == [('vpn', 1), ('eth', 2), ('wifi', 3)]
+
+
+def test_rank_puts_lossy_and_silent_interfaces_last():
+    ranked = rank_interfaces([result('lossy', 5, loss=20.0), result('silent', None), result('eth', 30)])
+    assert [r['interface'] for r in ranked] == ['eth', 'lossy', 'silent']
+
+
+def test_clearly_faster_interface_wins():
+    ranked = rank_interfaces([result('eth', 10), result('wifi', 25)])
+    decision = decide_winner(ranked, {'eth': latencies(10), 'wifi': latencies(25, seed=1)})
+    assert decision['winner'] == 'eth'
+    assert decision['runner_up'] == 'wifi'
+    assert decision['p_value'] < interface_compare.ALPHA
+    assert decision['advantage_ms'] == 15
+
+
+def test_noise_between_equal_interfaces_picks_no_winner():
+    samples = {'eth': latencies(20, spread=5, seed=1), 'wifi': latencies(20, spread=5, seed=2)}
+    ranked = rank_interfaces([result('eth', 19.9), result('wifi', 20.1)])
+    decision = decide_winner(ranked, samples)
+    assert decision['winner'] is None
+    assert "not significantly faster" in decision['reason']
+
+
+def test_significant_but_negligible_advantage_picks_no_winner():
+    # Tight samples make 0.3 ms significant, but it's below the minimum worth rerouting for
+    samples = {'eth': latencies(20.0, spread=0.05), 'wifi': latencies(20.3, spread=0.05, seed=1)}
+    ranked = rank_interfaces([result('eth', 20.0), result('wifi', 20.3)])
+    decision = decide_winner(ranked, samples)
+    assert decision['p_value'] < interface_compare.ALPHA
+    assert decision['winner'] is None
+
+
+def test_unreliable_rivals_are_ignored():
+    ranked = rank_interfaces([result('eth', 20), result('wifi', 5, loss=50.0)])
+    decision = decide_winner(ranked, {'eth': latencies(20)})
+    assert decision['winner'] == 'eth'
+    assert decision['runner_up'] is None
+
+
+def test_other_addresses_of_the_winner_are_not_rivals():
+    ranked = rank_interfaces([result('eth', 10, address='192.0.2.1'), result('eth', 10.1, address='192.0.2.2')])
+    assert decide_winner(ranked, {'eth': latencies(10)})['winner'] == 'eth'
+
+
+def test_no_winner_when_nothing_is_reliable():
+    ranked = rank_interfaces([result('eth', None), result('wifi', 5, loss=80.0)])
+    decision = decide_winner(ranked, {})
+    assert decision['winner'] is None
+    assert decision['reason'] == "no interface answered reliably"
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="binds to 127.0.0.2/3, routed to loopback on Linux")
+def test_loopback_sources_rank_in_delay_order():
+    comparison = interface_compare.run_local_interface_comparison(count=20)
+    sources = interface_compare.loopback_sources()
+    assert [(r['interface'], r['address']) for r in comparison['interfaces']] == sources
+    assert comparison['winner'] == sources[0][0]
+    assert comparison['decision']['runner_up'] == sources[1][0]
+    assert 'samples' not in comparison['interfaces'][0]
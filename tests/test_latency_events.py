@@ -0,0 +1,59 @@
+import pytest
+
+from latency_events import LatencyEventDetector, PageHinkley, WARMUP_SAMPLES
+
+
+def run(samples):
+    detector = LatencyEventDetector(record=False)
+    events = [event for event in (detector.add(rtt, float(i)) for i, rtt in enumerate(samples)) if event]
+    return detector, events
+
+
+def shifts(events):
+    return [event for event in events if event['type'] == 'shift']
+
+
+def steady(level, count, wobble=0.1):
+    return [level + (wobble if i % 2 else -wobble) for i in range(count)]
+
+
+@pytest.mark.parametrize('before_step', [
+    [],
+    [5.34],  # Pre-change noise leaning the new way
+    [61.0],  # A spike just before the step
+    [5.34, 61.0],
+], ids=['clean', 'noise', 'spike', 'noise-and-spike'])
+def test_step_change_reports_the_new_level(before_step):
+    detector, events = run(steady(5.0, 40) + before_step + steady(20.0, 20))
+    (shift,) = shifts(events)
+    assert shift['direction'] == 'up'
+    assert shift['from'] == pytest.approx(5.0, abs=0.5)
+    assert shift['to'] == pytest.approx(20.0, abs=0.2)
+    # The detector re-centres on the level it reported
+    assert detector.reference == pytest.approx(20.0, abs=0.2)
+
+
+def test_step_down_reports_the_new_level():
+    _, events = run(steady(30.0, 40) + [29.0] + steady(12.0, 20))
+    (shift,) = shifts(events)
+    assert shift['direction'] == 'down'
+    assert shift['to'] == pytest.approx(12.0, abs=0.2)
+
+
+def test_lone_spike_is_not_a_shift():
+    _, events = run(steady(5.0, 40) + [61.0] + steady(5.0, 40))
+    assert [event['type'] for event in events] == ['spike']
+
+
+def test_loss_burst_after_warmup():
+    _, events = run(steady(5.0, WARMUP_SAMPLES) + [None, None, None])
+    assert [event['type'] for event in events] == ['loss_burst']
+
+
+def test_level_ignores_samples_before_the_change_point():
+    detector = PageHinkley(delta=0.5, threshold=5.0, min_samples=3)
+    for value in (0.0, 0.0, -1.0):
+        detector.add(value, 5.0 + value)
+    alarms = [detector.add(4.0, 20.0) for _ in range(3)]
+    assert alarms[-1]
+    assert detector.level == 20.0
@@ -0,0 +1,83 @@
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics_exporter import MetricsRegistry, MetricsExporter, MAX_TARGETS, CONTENT_TYPE
+
+
+def metric_lines(text, name):
+    return [line for line in text.splitlines() if line.startswith(f"ping_optimizer_{name}")]
+
+
+def test_render_is_openmetrics():
+    registry = MetricsRegistry()
+    registry.observe('8.8.8.8', 12.0)
+    registry.observe('8.8.8.8', 40.0)
+    registry.observe('8.8.8.8', None)
+    registry.count_event({'type': 'spike'})
+    text = registry.render()
+
+    assert text.endswith("# EOF\n")
+    assert "# TYPE ping_optimizer_latency_seconds histogram" in text
+    assert "# UNIT ping_optimizer_latency_seconds seconds" in text
+    buckets = metric_lines(text, 'latency_seconds_bucket')
+    assert buckets[0] == 'ping_optimizer_latency_seconds_bucket{target="8.8.8.8",le="0.001"} 0'
+    assert 'ping_optimizer_latency_seconds_bucket{target="8.8.8.8",le="0.015"} 1' in buckets
+    assert 'ping_optimizer_latency_seconds_bucket{target="8.8.8.8",le="0.05"} 2' in buckets
+    assert buckets[-1] == 'ping_optimizer_latency_seconds_bucket{target="8.8.8.8",le="+Inf"} 2'
+    assert 'ping_optimizer_latency_seconds_count{target="8.8.8.8"} 2' in text
+    assert 'ping_optimizer_latency_seconds_sum{target="8.8.8.8"} 0.052' in text
+    assert metric_lines(text, 'probes_total') == [
+        'ping_optimizer_probes_total{target="8.8.8.8",result="reply"} 2',
+        'ping_optimizer_probes_total{target="8.8.8.8",result="lost"} 1',
+    ]
+    assert 'ping_optimizer_last_latency_seconds{target="8.8.8.8"} 0.04' in text
+    assert 'ping_optimizer_latency_events_total{type="spike"} 1' in text
+    # Counter families are declared without the _total suffix their samples carry
+    assert "# TYPE ping_optimizer_probes counter" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.observe('game:"quoted"\\name', 5.0)
+    assert 'target="game:\\"quoted\\"\\\\name"' in registry.render()
+
+
+def test_targets_past_the_limit_share_the_other_label():
+    registry = MetricsRegistry()
+    for i in range(MAX_TARGETS + 8):
+        registry.observe(f"10.0.0.{i}", 10.0)
+    registry.observe("10.0.0.0", 10.0)  # Known targets keep their own label
+    text = registry.render()
+    counts = metric_lines(text, 'latency_seconds_count')
+    assert len(counts) == MAX_TARGETS + 1
+    assert 'ping_optimizer_latency_seconds_count{target="other"} 8' in counts
+    assert 'ping_optimizer_latency_seconds_count{target="10.0.0.0"} 2' in counts
+
+
+def test_exporter_serves_metrics_over_http():
+    exporter = MetricsExporter(port=0).start()
+    try:
+        exporter.registry.observe('8.8.8.8', 12.0)
+        host, port = exporter.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as reply:
+            assert reply.headers['Content-Type'] == CONTENT_TYPE
+            assert 'target="8.8.8.8"' in reply.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        exporter.stop()
+
+
+def test_daemon_exits_cleanly_when_the_metrics_port_is_taken(capsys):
+    import tcp_optimizer_cli
+
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        assert tcp_optimizer_cli.main(['daemon', '--no-metrics', '--metrics-port', str(port)]) == 2
+    assert f"Could not serve metrics on 127.0.0.1:{port}" in capsys.readouterr().err
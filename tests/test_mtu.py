@@ -0,0 +1,76 @@
+import sys
+
+import pytest
+
+import mtu
+from mtu import search_mtu, mtu_issues, mss_for_mtu
+
+
+class FakeProber:
+    """Path that carries packets up to path_mtu bytes; None drops everything."""
+
+    def __init__(self, path_mtu):
+        self.path_mtu = path_mtu
+        self.probes = []
+
+    def fits(self, size):
+        self.probes.append(size)
+        return self.path_mtu is not None and size <= self.path_mtu
+
+
+@pytest.mark.parametrize('path_mtu', [576, 577, 1280, 1400, 1492, 1499, 1500])
+def test_search_finds_the_path_mtu(path_mtu):
+    prober = FakeProber(path_mtu)
+    assert search_mtu(prober.fits, 576, 1500) == path_mtu
+    # Binary search: about log2(1500 - 576) probes plus the two bounds
+    assert len(prober.probes) <= 12
+
+
+def test_search_when_nothing_fits():
+    prober = FakeProber(None)
+    assert search_mtu(prober.fits, 576, 1500) is None
+    assert prober.probes == [576]
+
+
+def test_search_when_everything_fits():
+    prober = FakeProber(9000)
+    assert search_mtu(prober.fits, 576, 1500) == 1500
+    assert prober.probes == [576, 1500]
+
+
+def test_mss_for_mtu():
+    assert mss_for_mtu(1500) == 1460
+    assert mss_for_mtu(1500, mtu.socket.AF_INET6) == 1440
+
+
+def make_result(path_mtu, interface_mtu, interface='eth0', os_path_mtu=None):
+    return {'path_mtu': path_mtu, 'interface_mtu': interface_mtu, 'interface': interface,
+            'os_path_mtu': os_path_mtu, 'mss': mss_for_mtu(path_mtu) if path_mtu else None}
+
+
+def test_issues_for_a_matching_path():
+    assert mtu_issues(make_result(1500, 1500)) == []
+
+
+def test_issues_flag_a_path_below_the_adapter():
+    issues = mtu_issues(make_result(1492, 1500))
+    assert len(issues) == 1 and "1492" in issues[0] and "1452" in issues[0]
+
+
+def test_issues_flag_jumbo_frames_but_not_on_loopback():
+    assert any("jumbo" in issue for issue in mtu_issues(make_result(1500, 9000)))
+    assert mtu_issues(make_result(65536, 65536, interface='lo')) == []
+
+
+def test_issues_when_nothing_answers():
+    assert mtu_issues(make_result(None, 1500)) == ["no reply even to minimum-size packets"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="Don't Fragment on loopback is Linux-specific here")
+def test_discovery_against_a_loopback_path_with_a_smaller_mtu():
+    check = mtu.run_local_mtu_check(1400)
+    (result,) = check['targets']
+    assert 'error' not in result
+    assert result['path_mtu'] == 1400
+    assert result['mss'] == 1360
+    assert any("below the adapter MTU" in issue for issue in result['issues'])
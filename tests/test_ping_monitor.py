@@ -0,0 +1,78 @@
+import sys
+
+import pytest
+
+import ping_monitor
+from ping_monitor import ping_command, parse_ping_line, PingSequence, PingMonitor
+
+
+def test_linux_ping_reports_unanswered_probes(monkeypatch):
+    monkeypatch.setattr(sys, 'platform', 'linux')
+    assert ping_command('192.0.2.1', count=5) == ['ping', '-O', '-c', '5', '192.0.2.1']
+
+
+@pytest.mark.parametrize('platform', ['darwin', 'win32'])
+def test_other_platforms_do_not_get_linux_flags(monkeypatch, platform):
+    monkeypatch.setattr(sys, 'platform', platform)
+    assert '-O' not in ping_command('192.0.2.1')
+
+
+@pytest.mark.parametrize('line, expected', [
+    ("64 bytes from 192.0.2.1: icmp_seq=1 ttl=117 time=12.3 ms", 12.3),
+    ("Reply from 192.0.2.1: bytes=32 time<1ms TTL=117", 1.0),
+    ("no answer yet for icmp_seq=2", None),
+    ("Request timeout for icmp_seq 2", None),
+    ("Request timed out.", None),
+    ("From 192.0.2.254 icmp_seq=3 Destination Host Unreachable", None),
+    ("Reply from 192.0.2.254: Destination host unreachable.", None),
+    ("PING 192.0.2.1 (192.0.2.1) 56(84) bytes of data.", False),
+    ("3 packets transmitted, 2 received, 33.3333% packet loss, time 2003ms", False),
+])
+def test_parse_ping_line(line, expected):
+    assert parse_ping_line(line) == expected
+
+
+def reply(seq, rtt=10.0):
+    return f"64 bytes from 192.0.2.1: icmp_seq={seq} ttl=117 time={rtt} ms"
+
+
+def feed(lines):
+    sequence = PingSequence()
+    return [sample for line in lines for sample in sequence.samples(line)]
+
+
+def test_gaps_in_the_sequence_count_as_losses():
+    # What a ping without -O prints when probes 2 and 3 go unanswered
+    assert feed([reply(1), reply(4), reply(5)]) == [10.0, None, None, 10.0, 10.0]
+
+
+def test_reported_losses_are_not_counted_again():
+    lines = [reply(1), "no answer yet for icmp_seq=2", "no answer yet for icmp_seq=3", reply(4)]
+    assert feed(lines) == [10.0, None, None, 10.0]
+
+
+def test_late_and_duplicate_replies_are_dropped():
+    lines = [reply(1), "no answer yet for icmp_seq=2", reply(2, 1500.0), reply(3), reply(3)]
+    assert feed(lines) == [10.0, None, 10.0]
+
+
+def test_sequence_wraps_around():
+    assert feed([reply(65534), reply(65535), reply(1)]) == [10.0, 10.0, None, 10.0]
+
+
+def test_windows_output_has_no_sequence():
+    lines = ["Reply from 192.0.2.1: bytes=32 time=10ms TTL=117", "Request timed out.",
+             "Reply from 192.0.2.1: bytes=32 time=11ms TTL=117"]
+    assert feed(lines) == [10.0, None, 11.0]
+
+
+def test_monitor_counts_silent_losses(monkeypatch):
+    script = "; ".join(f"print({line!r})" for line in
+                       ["PING 192.0.2.1 (192.0.2.1) 56(84) bytes of data.", reply(1), reply(3), reply(4),
+                        "", "--- 192.0.2.1 ping statistics ---", "4 packets transmitted, 3 received"])
+    monkeypatch.setattr(ping_monitor, 'ping_command', lambda *args: [sys.executable, '-c', script])
+    samples = []
+    monitor = PingMonitor('192.0.2.1', on_sample=samples.append, count=4).start()
+    monitor.wait(timeout=10)
+    monitor.stop()
+    assert samples == [10.0, None, 10.0, 10.0]
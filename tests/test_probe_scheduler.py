@@ -0,0 +1,51 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from probe_scheduler import ProbeMonitor
+
+
+@pytest.fixture
+def black_hole():
+    # UDP port that receives everything and never answers
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(0.1)
+    stop = threading.Event()
+
+    def drain():
+        while not stop.is_set():
+            try:
+                sock.recvfrom(2048)
+            except socket.timeout:
+                pass
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+    yield f"udp-echo:127.0.0.1:{sock.getsockname()[1]}"
+    stop.set()
+    thread.join()
+    sock.close()
+
+
+def test_duplicate_targets_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate"):
+        ProbeMonitor(['tcp:127.0.0.1:80', 'tcp:127.0.0.1:80'])
+
+
+def test_counted_timeout_is_clamped_to_interval():
+    assert ProbeMonitor(['tcp:127.0.0.1:80'], interval=0.1, count=3, timeout=1.0).timeout == 0.1
+
+
+def test_waiting_on_lost_probes_does_not_spin(black_hole):
+    samples = []
+    monitor = ProbeMonitor([black_hole], on_sample=samples.append, interval=0.1, count=5, timeout=1.0)
+    cpu_started, started = time.process_time(), time.monotonic()
+    monitor.start()
+    monitor.wait(5)
+    monitor.stop()
+    cpu, wall = time.process_time() - cpu_started, time.monotonic() - started
+    assert samples == [None] * 5
+    # Busy-waiting burns the whole run on the scheduler thread
+    assert cpu < wall / 4
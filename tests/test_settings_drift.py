@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+import profiles
+from settings_drift import DriftMonitor, diff_settings, expected_settings, format_drift
+
+# What `netsh int tcp show global` reports with the tcp profile fully applied
+TUNED = {
+    'Receive-Side Scaling State': 'disabled',
+    'Chimney Offload State': 'disabled',
+    'NetDMA State': 'disabled',
+    'Receive Window Auto-Tuning Level': 'restricted',
+    'ECN Capability': 'disabled',
+    'RFC 1323 Timestamps': 'disabled',
+    'Initial RTO': '2000',
+}
+
+
+def netsh_output(settings):
+    lines = ["Querying active state...", "", "TCP Global Parameters", "-" * 38]
+    lines += [f"{label:<37}: {value}" for label, value in settings.items()]
+    return "\n".join(lines) + "\n"
+
+
+class FakeNetsh:
+    def __init__(self, settings):
+        self.settings = dict(settings)
+        self.reads = 0
+
+    def __call__(self):
+        self.reads += 1
+        return netsh_output(self.settings)
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    path = tmp_path / 'tcp_optimizer_state.json'
+    monkeypatch.setattr(profiles, 'STATE_FILE', str(path))
+    return path
+
+
+def write_state(path, applied, mtime):
+    profiles.save_state({'applied': applied})
+    os.utime(path, (mtime, mtime))  # Explicit, so the test doesn't depend on the filesystem's mtime resolution
+
+
+def test_diff_settings_reports_only_reported_values_that_differ():
+    expected = {'rss': 'disabled', 'autotuninglevel': 'restricted', 'chimney': 'disabled', 'dca': 'enabled'}
+    live = profiles.parse_tcp_globals(netsh_output({
+        'Receive-Side Scaling State': 'enabled',
+        'Receive Window Auto-Tuning Level': 'Restricted',
+        'Chimney Offload State': 'disabled',
+    }))
+    # Values compare case-insensitively; DCA isn't reported, so it can't have drifted
+    assert diff_settings(expected, live) == {'rss': {'expected': 'disabled', 'actual': 'enabled'}}
+    assert diff_settings(expected, {}) == {}
+
+
+def test_expected_settings_lets_the_later_apply_win():
+    assert expected_settings({'tcp': 100.0, 'interface': 200.0})['autotuninglevel'] == 'normal'
+    assert expected_settings({'tcp': 200.0, 'interface': 100.0})['autotuninglevel'] == 'restricted'
+    assert expected_settings({'removed-profile': 100.0}) == {}
+
+
+def test_nothing_applied_never_runs_netsh(state_file):
+    netsh = FakeNetsh(TUNED)
+    monitor = DriftMonitor(read_settings=netsh)
+    assert monitor.check() == {}
+    assert monitor.check() == {}
+    assert netsh.reads == 0
+
+
+def test_unchanged_output_skips_the_diff(state_file):
+    write_state(state_file, {'tcp': 100.0}, mtime=1000)
+    netsh = FakeNetsh(TUNED)
+    records = []
+    monitor = DriftMonitor(read_settings=netsh, on_drift=records.append)
+    for _ in range(3):
+        assert monitor.check() == {}
+    assert (netsh.reads, monitor.diffs) == (3, 1)
+
+    netsh.settings['Receive-Side Scaling State'] = 'enabled'  # A Windows update reset it
+    drifted = {'rss': {'expected': 'disabled', 'actual': 'enabled'}}
+    assert monitor.check() == drifted
+    assert monitor.check() == drifted
+    assert (netsh.reads, monitor.diffs) == (5, 2)
+    assert [record['drifted'] for record in records] == [drifted]
+    assert records[0]['profiles'] == ['tcp']
+    assert records[0]['reapplied'] is None
+    assert format_drift(drifted) == "rss is enabled (applied disabled)"
+
+
+def test_a_state_file_change_refreshes_the_expected_settings(state_file, monkeypatch):
+    write_state(state_file, {'tcp': 100.0}, mtime=1000)
+    netsh = FakeNetsh(TUNED)
+    monitor = DriftMonitor(read_settings=netsh)
+    monitor.check()
+    assert monitor.expected['autotuninglevel'] == 'restricted'
+
+    # Same netsh output, but the interface profile was applied on top since
+    write_state(state_file, {'tcp': 100.0, 'interface': 200.0}, mtime=2000)
+    assert monitor.check() == {'autotuninglevel': {'expected': 'normal', 'actual': 'restricted'}}
+    assert monitor.diffs == 2
+    assert sorted(monitor.applied) == ['interface', 'tcp']
+
+    # Not reloaded while the file stays put
+    loads = []
+    real_load_state = profiles.load_state
+    monkeypatch.setattr(profiles, 'load_state', lambda: loads.append(1) or real_load_state())
+    monitor.check()
+    monitor.check()
+    assert loads == []
+    assert monitor.diffs == 2
+
+    os.remove(state_file)  # Everything reverted and the file cleaned up
+    assert monitor.check() == {}
+    assert monitor.expected == {}
+
+
+@pytest.fixture
+def reapply(monkeypatch):
+    calls = []
+
+    def reapply_settings(settings, reason='drift'):
+        calls.append((dict(settings), reason))
+        return {'successful': [], 'failed': [], 'total': len(settings)}
+    monkeypatch.setattr(profiles, 'reapply_settings', reapply_settings)
+    return calls
+
+
+def test_auto_reapply_fixes_drift_once_and_confirms_it(state_file, reapply):
+    write_state(state_file, {'tcp': 100.0}, mtime=1000)
+    netsh = FakeNetsh(dict(TUNED, **{'Initial RTO': '3000'}))
+    records = []
+    monitor = DriftMonitor(read_settings=netsh, on_drift=records.append, auto_reapply=True)
+    assert monitor.check() == {'initialrto': {'expected': '2000', 'actual': '3000'}}
+    assert reapply == [({'initialrto': '2000'}, 'drift')]
+
+    netsh.settings['Initial RTO'] = '2000'  # The reapply worked
+    assert monitor.check() == {}  # Diffed again even though nothing else changed
+    assert monitor.check() == {}
+    assert monitor.diffs == 2
+    assert len(reapply) == 1
+    assert [record['drifted'] for record in records] == [{'initialrto': {'expected': '2000', 'actual': '3000'}}, {}]
+    assert records[0]['reapplied'] == {'successful': 0, 'total': 1}
+
+
+def test_auto_reapply_does_not_loop_when_the_fix_does_not_stick(state_file, reapply):
+    write_state(state_file, {'tcp': 100.0}, mtime=1000)
+    netsh = FakeNetsh(dict(TUNED, **{'Initial RTO': '3000'}))  # Group policy keeps setting it back
+    records = []
+    monitor = DriftMonitor(read_settings=netsh, on_drift=records.append, auto_reapply=True)
+    for _ in range(5):
+        assert monitor.check() == {'initialrto': {'expected': '2000', 'actual': '3000'}}
+    assert len(reapply) == 1
+    assert len(records) == 1
+    # Verified once after the reapply, then skipped like any unchanged output
+    assert monitor.diffs == 2